@@ -27,6 +27,7 @@ class AccountTypeAdmin(admin.ModelAdmin):
 @admin.register(AccountAccount)
 class AccountAccountAdmin(admin.ModelAdmin):
     list_display = ['code', 'name', 'account_type', 'account_group', 'nature', 'is_control_account', 'status']
+    list_select_related = ['account_type', 'account_group', 'nature', 'status']
     list_filter = ['account_type', 'account_group', 'nature', 'is_control_account', 'status', 'country']
     search_fields = ['code', 'name']
 
@@ -41,12 +42,17 @@ class JournalEntryLineInline(admin.TabularInline):
     extra = 2
     fields = ['position', 'account', 'description', 'debit', 'credit']
     ordering = ['position']
+    # Sin esto cada fila renderiza un <select> con todo el plan de cuentas
+    autocomplete_fields = ['account']
 
 
 @admin.register(JournalEntry)
 class JournalEntryAdmin(admin.ModelAdmin):
     """
     Administrador para asientos contables con sus líneas.
+    
+    El listado no consulta las líneas: totales y balance salen de los
+    campos almacenados (total_debit / total_credit).
     """
     list_display = [
         'id_journal_entry', 
@@ -56,9 +62,14 @@ class JournalEntryAdmin(admin.ModelAdmin):
         'module', 
         'currency',
         'status',
+        'total_debit',
+        'total_credit',
         'is_balanced_display',
         'created_at'
     ]
+    list_select_related = ['currency']
+    # Evita el COUNT(*) sin filtros en cada carga del listado
+    show_full_result_count = False
     list_filter = [
         'date', 
         'operation_type', 
@@ -82,7 +93,6 @@ class JournalEntryAdmin(admin.ModelAdmin):
         'is_balanced_display'
     ]
     inlines = [JournalEntryLineInline]
-    date_hierarchy = 'date'
     
     fieldsets = (
         ('Información del Asiento', {
@@ -174,6 +184,10 @@ class JournalEntryLineAdmin(admin.ModelAdmin):
         'credit',
         'created_at'
     ]
+    list_select_related = ['journal_entry', 'account']
+    show_full_result_count = False
+    raw_id_fields = ['journal_entry']
+    autocomplete_fields = ['account']
     list_filter = [
         'journal_entry__date',
         'account__account_type',
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AccountingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounting'
+
+    def ready(self):
+        # Invalidar los estados financieros cacheados al cambiar períodos cerrados
+        from .statements import connect_signals
+        connect_signals()
@@ -0,0 +1,149 @@
+"""
+Jerarquía del plan de cuentas con tabla de clausura (AccountClosure).
+
+AccountAccount.parent_account forma un árbol. AccountClosure guarda un
+par (ancestro, descendiente, profundidad) por cada camino del árbol, así:
+
+    # saldo de 1.1 y todo lo que cuelga de ella (incluye líneas archivadas)
+    branch_totals([cuenta.pk], date_from, date_to)
+
+Cómo se mantiene:
+
+- AccountAccount.save() agrega los pares de una cuenta nueva
+  (account_added) y reconstruye la tabla si cambia el padre, en la misma
+  transacción que el cambio
+- AccountAccount.delete() la reconstruye (las hijas quedan sin padre)
+- `python manage.py rebuild_account_closure` la reconstruye a mano, por
+  ejemplo tras cambios con queryset.update() o SQL directo
+
+La reconstrucción completa es un solo INSERT ... SELECT con una CTE
+recursiva, sin traer las cuentas a Python.
+"""
+
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from .models import AccountAccount, AccountClosure
+
+
+# Límite de niveles; corta la recursión si los datos tienen un ciclo
+MAX_DEPTH = 64
+
+_ZERO = Decimal('0.00')
+
+
+def rebuild_closure():
+    """
+    Reconstruye la tabla de clausura completa desde parent_account.
+
+    Returns:
+        int: pares insertados
+    """
+    closure = AccountClosure._meta.db_table
+    accounts = AccountAccount._meta.db_table
+    sql = f'''
+        INSERT INTO {closure} (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM {accounts}
+            UNION ALL
+            SELECT tree.ancestor_id, child.id, tree.depth + 1
+            FROM tree
+            JOIN {accounts} child ON child.parent_account_id = tree.descendant_id
+            WHERE tree.depth < %s
+        )
+        SELECT ancestor_id, descendant_id, MIN(depth)
+        FROM tree
+        GROUP BY ancestor_id, descendant_id
+    '''
+    with transaction.atomic():
+        AccountClosure.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [MAX_DEPTH])
+            return cursor.rowcount
+
+
+def account_added(account):
+    """Agrega los pares de una cuenta nueva: ella misma y los ancestros de su padre."""
+    links = [AccountClosure(ancestor_id=account.pk, descendant_id=account.pk, depth=0)]
+    if account.parent_account_id:
+        links.extend(
+            AccountClosure(ancestor_id=ancestor_id, descendant_id=account.pk, depth=depth + 1)
+            for ancestor_id, depth in AccountClosure.objects.filter(
+                descendant_id=account.parent_account_id
+            ).values_list('ancestor_id', 'depth')
+        )
+    AccountClosure.objects.bulk_create(links)
+
+
+def parent_changed():
+    """
+    Un cambio de padre mueve ramas enteras: se reconstruye la tabla
+    completa en el momento, así las validaciones siguientes (check_parent)
+    y los estados leen la jerarquía nueva.
+    """
+    rebuild_closure()
+
+
+def check_parent(account):
+    """
+    Valida que el nuevo padre no sea la propia cuenta ni una de sus
+    descendientes (se formaría un ciclo).
+    """
+    if not account.parent_account_id:
+        return
+    if account.parent_account_id == account.pk or AccountClosure.objects.filter(
+        ancestor_id=account.pk, descendant_id=account.parent_account_id
+    ).exists():
+        raise ValidationError(
+            f'La cuenta {account.code} no puede tener como padre a una de sus subcuentas.'
+        )
+
+
+def descendant_ids(account_id, include_self=True):
+    """IDs de las cuentas de la rama de account_id."""
+    links = AccountClosure.objects.filter(ancestor_id=account_id)
+    if not include_self:
+        links = links.filter(depth__gt=0)
+    return links.values_list('descendant_id', flat=True)
+
+
+def rolled_up(totals, pairs):
+    """
+    Suma los montos de cada cuenta en sus ancestros.
+
+    Args:
+        totals: {pk de la cuenta: (debe, haber)}
+        pairs: pares (ancestro, descendiente) de la clausura
+
+    Returns:
+        dict: {pk del ancestro: (debe, haber)} de los ancestros con montos
+    """
+    rolled = {}
+    for ancestor_id, descendant_id in pairs:
+        if descendant_id not in totals:
+            continue
+        debit, credit = totals[descendant_id]
+        current_debit, current_credit = rolled.get(ancestor_id, (_ZERO, _ZERO))
+        rolled[ancestor_id] = (current_debit + debit, current_credit + credit)
+    return rolled
+
+
+def branch_totals(account_ids, date_from=None, date_to=None):
+    """
+    Débitos y créditos contabilizados de cada cuenta más toda su rama.
+
+    Los montos por cuenta salen de accounting.statements.account_totals
+    (foto de cierre, líneas vivas y archivadas) y se acumulan en cada
+    ancestro con los pares de la clausura.
+
+    Returns:
+        dict: {pk de la cuenta: (debe, haber)}
+    """
+    from .statements import account_totals
+    pairs = list(AccountClosure.objects.filter(
+        ancestor_id__in=list(account_ids)
+    ).values_list('ancestor_id', 'descendant_id'))
+    totals = account_totals(date_from, date_to, {descendant_id for _, descendant_id in pairs})
+    return rolled_up(totals, pairs)
@@ -0,0 +1,12 @@
+"""
+Tareas en segundo plano del módulo de contabilidad.
+"""
+
+from core.jobs import register_job
+from .utils import recalculate_all_account_balances
+
+
+@register_job('accounting.recalculate_balances')
+def recalculate_balances(job, progress):
+    """Recalcula los saldos de todas las cuentas desde los asientos contabilizados."""
+    return recalculate_all_account_balances(progress=progress)
@@ -0,0 +1,211 @@
+"""
+Libro mayor por cuenta: líneas contabilizadas de una cuenta con su saldo
+acumulado.
+
+El saldo acumulado se calcula en la base de datos con una función de
+ventana (SUM(...) OVER (ORDER BY fecha, id)) aplicada solo a las filas de
+la página, y se siembra con:
+
+- el saldo de apertura (movimientos anteriores a date_from) en la primera
+  página
+- el saldo guardado en el cursor en las siguientes
+
+Así cada página cuesta lo mismo sin importar cuántos años de movimientos
+tenga la cuenta: no hay OFFSET ni se suman las páginas anteriores.
+
+Si el rango alcanza períodos archivados, la página se arma con las líneas
+de JournalEntryLine y de ArchivedJournalEntryLine (que conservan su id),
+combinadas en el mismo orden (fecha, id); en ese caso el acumulado de las
+filas de la página se suma en Python.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum, Value, Window, ExpressionWrapper, DecimalField
+from django.db.models.expressions import RowRange
+
+from core.pagination import encode_cursor, decode_cursor, InvalidCursor, KeysetPage
+from core.periods import archived_through
+from .models import JournalEntryLine, ArchivedJournalEntryLine
+from .periods import account_totals_through
+from .utils import DEBIT_NATURE_SYMBOLS, CREDIT_NATURE_SYMBOLS
+
+
+LEDGER_PAGE_SIZE = 50
+
+_AMOUNT_FIELD = DecimalField(max_digits=20, decimal_places=2)
+_ZERO = Decimal('0.00')
+
+
+def nature_sign(account):
+    """
+    Signo con el que los débitos afectan el saldo de la cuenta:
+    1 para naturaleza deudora, -1 para acreedora.
+    """
+    symbol = account.nature.symbol
+    if symbol in DEBIT_NATURE_SYMBOLS:
+        return 1
+    if symbol in CREDIT_NATURE_SYMBOLS:
+        return -1
+    raise ValueError(f'Naturaleza desconocida para la cuenta {account.code}: {symbol}')
+
+
+def signed_amount(sign):
+    """Expresión con la variación de saldo de cada línea (debe - haber, con el signo de la naturaleza)."""
+    return ExpressionWrapper((F('debit') - F('credit')) * Value(sign), output_field=_AMOUNT_FIELD)
+
+
+def line_models(date_from=None):
+    """Tablas de líneas que alcanza un rango que empieza en date_from."""
+    models = [JournalEntryLine]
+    archived = archived_through()
+    if archived is not None and (date_from is None or date_from <= archived):
+        models.append(ArchivedJournalEntryLine)
+    return models
+
+
+def ledger_lines(account, date_from=None, date_to=None, model=JournalEntryLine):
+    """Líneas contabilizadas (POSTED) de la cuenta en el rango de fechas."""
+    lines = model.objects.filter(account=account, journal_entry__status='POSTED')
+    if date_from:
+        lines = lines.filter(journal_entry__date__gte=date_from)
+    if date_to:
+        lines = lines.filter(journal_entry__date__lte=date_to)
+    return lines
+
+
+def opening_balance(account, date_from):
+    """
+    Saldo de la cuenta antes de date_from (cero si no hay fecha de inicio).
+    Parte del último cierre de período (ver accounting.periods).
+    """
+    if not date_from:
+        return _ZERO
+    debit, credit = account_totals_through(
+        date_from - datetime.timedelta(days=1), [account.pk]
+    ).get(account.pk, (_ZERO, _ZERO))
+    return ((debit - credit) * nature_sign(account)).quantize(_ZERO)
+
+
+def _parse_cursor(cursor, account, date_from):
+    """
+    Decodifica un cursor del libro mayor.
+    El cursor incluye la cuenta y la fecha de inicio para que no se pueda
+    reutilizar su saldo con otros filtros.
+    """
+    values = decode_cursor(cursor)
+    if len(values) != 5:
+        raise InvalidCursor('El cursor no corresponde al libro mayor')
+    account_pk, cursor_from, date, line_id, balance = values
+    if account_pk != account.pk or cursor_from != (date_from.isoformat() if date_from else None):
+        raise InvalidCursor('El cursor corresponde a otra cuenta o período')
+    try:
+        return datetime.date.fromisoformat(date), int(line_id), Decimal(balance)
+    except (TypeError, ValueError, ArithmeticError) as e:
+        raise InvalidCursor(str(e))
+
+
+def _cursor(account, date_from, line, balance):
+    return encode_cursor([account.pk, date_from, line.journal_entry.date, line.pk, balance])
+
+
+def _page_rows(model, lines, sign, ordering, limit):
+    """
+    Primero se eligen las filas de la página (búsqueda por índice + LIMIT)
+    y la ventana se calcula solo sobre ellas.
+    """
+    page_ids = lines.order_by(*ordering).values('pk')[:limit]
+    return list(
+        model.objects.filter(pk__in=page_ids)
+        .select_related('journal_entry')
+        .annotate(
+            amount=signed_amount(sign),
+            running=Window(
+                Sum(signed_amount(sign)),
+                order_by=ordering,
+                frame=RowRange(start=None, end=0),
+            ),
+        )
+        .order_by(*ordering)
+    )
+
+
+def ledger_page(account, date_from=None, date_to=None, after=None, before=None, per_page=LEDGER_PAGE_SIZE):
+    """
+    Página del libro mayor de la cuenta, en orden cronológico (fecha, id).
+
+    Cada línea de la página trae los atributos `amount` (variación del
+    saldo) y `balance` (saldo acumulado después de la línea). Un cursor
+    inválido retorna la primera página, como KeysetPaginator.
+
+    Returns:
+        tuple: (KeysetPage, saldo de apertura del período)
+    """
+    sign = nature_sign(account)
+    opening = opening_balance(account, date_from)
+
+    forward = True
+    cursor = after or before
+    seed = opening
+    seek = None
+    if cursor:
+        try:
+            date, line_id, seed = _parse_cursor(cursor, account, date_from)
+            forward = not before or bool(after)
+        except InvalidCursor:
+            cursor = None
+            seed = opening
+        else:
+            if forward:
+                seek = Q(journal_entry__date__gt=date) | Q(journal_entry__date=date, id__gt=line_id)
+            else:
+                seek = Q(journal_entry__date__lt=date) | Q(journal_entry__date=date, id__lt=line_id)
+
+    ordering = [F('journal_entry__date').asc(), F('id').asc()]
+    if not forward:
+        ordering = [F('journal_entry__date').desc(), F('id').desc()]
+
+    models = line_models(date_from)
+    rows = []
+    for model in models:
+        lines = ledger_lines(account, date_from, date_to, model=model)
+        if seek is not None:
+            lines = lines.filter(seek)
+        rows.extend(_page_rows(model, lines, sign, ordering, per_page + 1))
+    if len(models) > 1:
+        # Filas de ambas tablas: se combinan y el acumulado de la ventana
+        # (que era por tabla) se rehace sobre la página combinada
+        rows.sort(key=lambda line: (line.journal_entry.date, line.pk), reverse=not forward)
+        rows = rows[:per_page + 1]
+        running = _ZERO
+        for line in rows:
+            running += line.amount
+            line.running = running
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if forward:
+        # seed = saldo después de la fila del cursor
+        for line in rows:
+            line.balance = (seed + line.running).quantize(_ZERO)
+        has_next, has_previous = has_more, bool(cursor)
+    else:
+        # seed = saldo antes de la fila del cursor; la ventana acumula hacia atrás
+        for line in rows:
+            line.balance = (seed - line.running + line.amount).quantize(_ZERO)
+        rows.reverse()
+        has_next, has_previous = True, has_more
+
+    from_value = date_from.isoformat() if date_from else None
+    page = KeysetPage(
+        rows,
+        has_next=has_next,
+        has_previous=has_previous,
+        next_cursor=_cursor(account, from_value, rows[-1], rows[-1].balance) if rows and has_next else None,
+        previous_cursor=(
+            _cursor(account, from_value, rows[0], rows[0].balance - rows[0].amount)
+            if rows and has_previous else None
+        ),
+    )
+    return page, opening
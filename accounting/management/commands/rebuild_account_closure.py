@@ -0,0 +1,45 @@
+"""
+Comando para reconstruir la tabla de clausura del plan de cuentas.
+
+Uso:
+    python manage.py rebuild_account_closure
+    python manage.py rebuild_account_closure --check
+
+La tabla se mantiene sola al guardar o borrar cuentas; este comando la
+regenera si parent_account se cambió por fuera del ORM (update(), SQL).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting.hierarchy import rebuild_closure
+from accounting.models import AccountAccount, AccountClosure
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla de clausura (AccountClosure) desde parent_account'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo verifica que cada cuenta tenga su par de profundidad 0, sin reconstruir'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            accounts = AccountAccount.objects.count()
+            self_links = AccountClosure.objects.filter(depth=0).count()
+            if accounts != self_links:
+                raise CommandError(
+                    f'La tabla de clausura está desactualizada: {accounts} cuentas, {self_links} pares propios'
+                )
+            self.stdout.write(self.style.SUCCESS(f'Tabla de clausura al día ({accounts} cuentas)'))
+            return
+
+        start = time.perf_counter()
+        links = rebuild_closure()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'Tabla de clausura reconstruida: {links} pares en {elapsed:.1f} ms'
+        ))
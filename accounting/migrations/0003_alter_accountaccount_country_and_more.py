@@ -23,10 +23,13 @@ class Migration(migrations.Migration):
             name='currency',
             field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='core.currency'),
         ),
-        migrations.DeleteModel(
-            name='Country',
-        ),
-        migrations.DeleteModel(
-            name='Currency',
-        ),
+        # Las tablas pasan a core.Country / core.Currency (mismo db_table)
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.DeleteModel(
+                name='Country',
+            ),
+            migrations.DeleteModel(
+                name='Currency',
+            ),
+        ]),
     ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:55
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    """Calcula los totales de los asientos existentes a partir de sus líneas."""
+    JournalEntry = apps.get_model('accounting', 'JournalEntry')
+    JournalEntryLine = apps.get_model('accounting', 'JournalEntryLine')
+
+    def line_sum(field):
+        return Coalesce(
+            Subquery(
+                JournalEntryLine.objects.filter(journal_entry=OuterRef('pk'))
+                .values('journal_entry')
+                .annotate(total=Sum(field))
+                .values('total')
+            ),
+            Value(0),
+            output_field=DecimalField(max_digits=15, decimal_places=2)
+        )
+
+    JournalEntry.objects.update(
+        total_debit=line_sum('debit'),
+        total_credit=line_sum('credit')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_accountaccount_current_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journalentry',
+            name='total_credit',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Suma de los créditos de las líneas del asiento', max_digits=15, verbose_name='Total Crédito'),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='total_debit',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Suma de los débitos de las líneas del asiento', max_digits=15, verbose_name='Total Débito'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_closure(apps, schema_editor):
+    """Genera los pares (ancestro, descendiente) de las cuentas existentes."""
+    AccountAccount = apps.get_model('accounting', 'AccountAccount')
+    AccountClosure = apps.get_model('accounting', 'AccountClosure')
+
+    parents = dict(AccountAccount.objects.values_list('pk', 'parent_account_id'))
+    links = []
+    for pk in parents:
+        ancestor, depth, seen = pk, 0, set()
+        while ancestor is not None and ancestor not in seen:
+            seen.add(ancestor)
+            links.append(AccountClosure(ancestor_id=ancestor, descendant_id=pk, depth=depth))
+            ancestor, depth = parents.get(ancestor), depth + 1
+    AccountClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0006_journalentry_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(help_text='Niveles entre el ancestro y el descendiente')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='accounting.accountaccount')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='accounting.accountaccount')),
+            ],
+            options={
+                'verbose_name': 'Account Closure',
+                'verbose_name_plural': 'Account Closure',
+                'db_table': 'account_closure',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='account_clo_descend_d03b60_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
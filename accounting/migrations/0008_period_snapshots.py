@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0007_accountclosure'),
+        ('core', '0005_fiscalperiod'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='accounting.accountaccount')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_snapshots', to='core.fiscalperiod')),
+            ],
+            options={
+                'verbose_name': 'Account Balance Snapshot',
+                'verbose_name_plural': 'Account Balance Snapshots',
+                'db_table': 'account_balance_snapshot',
+                'unique_together': {('period', 'account')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedJournalEntryLine',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('description', models.CharField(blank=True, max_length=500)),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('position', models.IntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_journal_entry_lines', to='accounting.accountaccount')),
+                ('journal_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_lines', to='accounting.journalentry')),
+            ],
+            options={
+                'verbose_name': 'Archived Journal Entry Line',
+                'verbose_name_plural': 'Archived Journal Entry Lines',
+                'db_table': 'journal_entry_line_archive',
+                'ordering': ['journal_entry', 'position'],
+                'indexes': [models.Index(fields=['journal_entry'], name='journal_ent_journal_297945_idx'), models.Index(fields=['account'], name='journal_ent_account_a2e99b_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from users.models import User
@@ -93,6 +93,75 @@ class AccountAccount(models.Model):
     
     def __str__(self):
         return f"{self.code} - {self.name}"
+    
+    def save(self, *args, **kwargs):
+        from .hierarchy import account_added, parent_changed, check_parent
+        is_new = self._state.adding
+        # La cuenta y la tabla de clausura cambian juntas
+        with transaction.atomic():
+            previous_parent_id = None
+            if not is_new:
+                previous_parent_id = AccountAccount.objects.filter(pk=self.pk).values_list(
+                    'parent_account_id', flat=True
+                ).first()
+                if previous_parent_id != self.parent_account_id:
+                    check_parent(self)
+            super().save(*args, **kwargs)
+            # Mantener la tabla de clausura de la jerarquía
+            if is_new:
+                account_added(self)
+            elif previous_parent_id != self.parent_account_id:
+                parent_changed()
+    
+    def delete(self, *args, **kwargs):
+        from .hierarchy import parent_changed
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            # Las cuentas hijas quedan sin padre (SET_NULL sin señales): reconstruir
+            parent_changed()
+        return result
+    
+    def get_branch_balance(self, date_from=None, date_to=None):
+        """Saldo contabilizado de la cuenta más todas sus descendientes."""
+        from .hierarchy import branch_totals
+        from .utils import get_balance_change
+        debit, credit = branch_totals([self.pk], date_from, date_to).get(self.pk, (0, 0))
+        return get_balance_change(self.nature.symbol, debit, credit)
+
+
+class AccountClosure(models.Model):
+    """
+    Tabla de clausura de la jerarquía del plan de cuentas (parent_account).
+
+    Guarda un par (ancestro, descendiente) por cada cuenta y cada uno de
+    sus ancestros, incluida ella misma con profundidad 0. Así la suma de
+    una cuenta y toda su rama es un JOIN más un agregado, sin recorrer
+    child_accounts nivel por nivel. La mantiene accounting.hierarchy.
+    """
+    
+    ancestor = models.ForeignKey(
+        AccountAccount,
+        on_delete=models.CASCADE,
+        related_name='descendant_links'
+    )
+    descendant = models.ForeignKey(
+        AccountAccount,
+        on_delete=models.CASCADE,
+        related_name='ancestor_links'
+    )
+    depth = models.PositiveSmallIntegerField(help_text="Niveles entre el ancestro y el descendiente")
+    
+    class Meta:
+        db_table = 'account_closure'
+        verbose_name = 'Account Closure'
+        verbose_name_plural = 'Account Closure'
+        unique_together = [['ancestor', 'descendant']]
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
 
 
 class JournalEntry(models.Model):
@@ -177,6 +246,24 @@ class JournalEntry(models.Model):
         help_text="Estado del asiento contable"
     )
     
+    # Totales almacenados - se mantienen al guardar/eliminar líneas (ver refresh_totals)
+    total_debit = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Total Débito",
+        help_text="Suma de los débitos de las líneas del asiento"
+    )
+    total_credit = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Total Crédito",
+        help_text="Suma de los créditos de las líneas del asiento"
+    )
+    
     # Campos de auditoría
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -228,17 +315,32 @@ class JournalEntry(models.Model):
     
     def get_total_debit(self):
         """
-        Calcula el total de débitos del asiento.
+        Retorna el total de débitos del asiento (campo almacenado).
         """
-        from decimal import Decimal
-        return sum(line.debit for line in self.lines.all()) or Decimal('0.00')
+        return self.total_debit
     
     def get_total_credit(self):
         """
-        Calcula el total de créditos del asiento.
+        Retorna el total de créditos del asiento (campo almacenado).
+        """
+        return self.total_credit
+    
+    def refresh_totals(self):
+        """
+        Recalcula total_debit y total_credit desde las líneas y los guarda.
+        Se llama automáticamente al guardar o eliminar una línea.
         """
         from decimal import Decimal
-        return sum(line.credit for line in self.lines.all()) or Decimal('0.00')
+        totals = self.lines.aggregate(
+            total_debit=models.Sum('debit'),
+            total_credit=models.Sum('credit')
+        )
+        self.total_debit = totals['total_debit'] or Decimal('0.00')
+        self.total_credit = totals['total_credit'] or Decimal('0.00')
+        JournalEntry.objects.filter(pk=self.pk).update(
+            total_debit=self.total_debit,
+            total_credit=self.total_credit
+        )
     
     def is_balanced(self):
         """
@@ -246,6 +348,17 @@ class JournalEntry(models.Model):
         """
         return self.get_total_debit() == self.get_total_credit()
     
+    def save(self, *args, **kwargs):
+        from core.periods import ensure_open
+        # Los asientos de períodos cerrados no se modifican
+        ensure_open(self.date)
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        from core.periods import ensure_open
+        ensure_open(self.date)
+        return super().delete(*args, **kwargs)
+    
     def clean(self):
         """
         Validación del modelo a nivel de asiento.
@@ -347,6 +460,21 @@ class JournalEntryLine(models.Model):
         type_str = "Débito" if self.debit > 0 else "Crédito"
         return f"{self.account.code} - {type_str}: {amount}"
     
+    def save(self, *args, **kwargs):
+        from core.periods import ensure_open
+        ensure_open(self.journal_entry.date)
+        super().save(*args, **kwargs)
+        # Mantener los totales almacenados del asiento
+        self.journal_entry.refresh_totals()
+    
+    def delete(self, *args, **kwargs):
+        from core.periods import ensure_open
+        journal_entry = self.journal_entry
+        ensure_open(journal_entry.date)
+        result = super().delete(*args, **kwargs)
+        journal_entry.refresh_totals()
+        return result
+    
     def clean(self):
         """
         Validación del modelo a nivel de línea.
@@ -378,3 +506,75 @@ class JournalEntryLine(models.Model):
                 'Los valores de débito y crédito no pueden ser negativos.'
             )
 
+
+class AccountBalanceSnapshot(models.Model):
+    """
+    Saldo de cierre de una cuenta al final de un período cerrado.
+
+    Guarda los débitos y créditos contabilizados acumulados desde el
+    inicio hasta period.date_to, así los saldos posteriores solo suman
+    las líneas después del cierre (ver accounting.periods).
+    """
+    
+    period = models.ForeignKey(
+        'core.FiscalPeriod',
+        on_delete=models.CASCADE,
+        related_name='account_snapshots'
+    )
+    account = models.ForeignKey(
+        AccountAccount,
+        on_delete=models.CASCADE,
+        related_name='balance_snapshots'
+    )
+    debit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'account_balance_snapshot'
+        verbose_name = 'Account Balance Snapshot'
+        verbose_name_plural = 'Account Balance Snapshots'
+        unique_together = [['period', 'account']]
+    
+    def __str__(self):
+        return f"{self.period_id} - {self.account_id}: {self.debit} / {self.credit}"
+
+
+class ArchivedJournalEntryLine(models.Model):
+    """
+    Línea de asiento de un período cerrado y archivado.
+
+    Mismas columnas (y mismo id) que JournalEntryLine; el cierre con
+    archivo mueve aquí las líneas del período para que la tabla activa
+    solo tenga los períodos abiertos.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    journal_entry = models.ForeignKey(
+        JournalEntry,
+        on_delete=models.CASCADE,
+        related_name='archived_lines'
+    )
+    account = models.ForeignKey(
+        AccountAccount,
+        on_delete=models.PROTECT,
+        related_name='archived_journal_entry_lines'
+    )
+    description = models.CharField(max_length=500, blank=True)
+    debit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    position = models.IntegerField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'journal_entry_line_archive'
+        verbose_name = 'Archived Journal Entry Line'
+        verbose_name_plural = 'Archived Journal Entry Lines'
+        ordering = ['journal_entry', 'position']
+        indexes = [
+            models.Index(fields=['journal_entry']),
+            models.Index(fields=['account']),
+        ]
+    
+    def __str__(self):
+        return f"{self.account_id} - {self.debit} / {self.credit}"
@@ -0,0 +1,126 @@
+"""
+Saldos por cuenta a partir de los cierres de período (ver core.periods).
+
+El saldo acumulado a una fecha se arma con:
+
+- la foto de cierre (AccountBalanceSnapshot) del último período cerrado
+  antes de esa fecha
+- más las líneas contabilizadas posteriores al cierre
+
+Si el rango pedido incluye períodos archivados, las líneas se suman
+también desde ArchivedJournalEntryLine.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
+
+from core.periods import last_closed_period, archived_through
+from .models import JournalEntry, JournalEntryLine, ArchivedJournalEntryLine, AccountBalanceSnapshot
+
+
+_ZERO = Decimal('0.00')
+
+# Columnas comunes de JournalEntryLine y ArchivedJournalEntryLine
+_LINE_COLUMNS = [
+    'id', 'journal_entry_id', 'account_id', 'description', 'debit', 'credit',
+    'position', 'created_at', 'updated_at',
+]
+
+
+def _add(totals, account_id, debit, credit):
+    current_debit, current_credit = totals.get(account_id, (_ZERO, _ZERO))
+    totals[account_id] = (
+        current_debit + Decimal(debit or 0).quantize(_ZERO),
+        current_credit + Decimal(credit or 0).quantize(_ZERO),
+    )
+
+
+def line_totals(date_from=None, date_to=None, account_ids=None):
+    """
+    Débitos y créditos contabilizados por cuenta en el rango de fechas
+    (incluye las líneas archivadas si el rango las alcanza).
+
+    Returns:
+        dict: {pk de la cuenta: (debe, haber)}
+    """
+    models = [JournalEntryLine]
+    archived = archived_through()
+    if archived is not None and (date_from is None or date_from <= archived):
+        models.append(ArchivedJournalEntryLine)
+
+    totals = {}
+    for model in models:
+        lines = model.objects.filter(journal_entry__status='POSTED')
+        if date_from:
+            lines = lines.filter(journal_entry__date__gte=date_from)
+        if date_to:
+            lines = lines.filter(journal_entry__date__lte=date_to)
+        if account_ids is not None:
+            lines = lines.filter(account_id__in=list(account_ids))
+        rows = lines.values('account_id').annotate(debit=Sum('debit'), credit=Sum('credit')).order_by()
+        for row in rows:
+            _add(totals, row['account_id'], row['debit'], row['credit'])
+    return totals
+
+
+def account_totals_through(date=None, account_ids=None):
+    """
+    Débitos y créditos contabilizados acumulados desde el inicio hasta
+    `date` inclusive (o hasta hoy), partiendo del último cierre.
+
+    Returns:
+        dict: {pk de la cuenta: (debe, haber)}
+    """
+    period = last_closed_period(date)
+    totals = {}
+    if period is not None:
+        snapshots = AccountBalanceSnapshot.objects.filter(period=period)
+        if account_ids is not None:
+            snapshots = snapshots.filter(account_id__in=list(account_ids))
+        for account_id, debit, credit in snapshots.values_list('account_id', 'debit', 'credit'):
+            _add(totals, account_id, debit, credit)
+        if date is not None and date <= period.date_to:
+            return totals
+    after = period.date_to + datetime.timedelta(days=1) if period else None
+    for account_id, (debit, credit) in line_totals(after, date, account_ids).items():
+        _add(totals, account_id, debit, credit)
+    return totals
+
+
+# ==================== CIERRE ====================
+
+def close(period):
+    """Guarda los saldos de cierre (acumulados) de todas las cuentas con movimiento."""
+    totals = account_totals_through(period.date_to)
+    AccountBalanceSnapshot.objects.filter(period=period).delete()
+    AccountBalanceSnapshot.objects.bulk_create([
+        AccountBalanceSnapshot(period=period, account_id=account_id, debit=debit, credit=credit)
+        for account_id, (debit, credit) in totals.items()
+        if debit or credit
+    ], batch_size=1000)
+
+
+def archive(period):
+    """Mueve las líneas de los asientos del período a journal_entry_line_archive."""
+    columns = ', '.join(_LINE_COLUMNS)
+    entries = (
+        f'SELECT id FROM {JournalEntry._meta.db_table} WHERE date >= %s AND date <= %s'
+    )
+    params = [
+        connection.ops.adapt_datefield_value(period.date_from),
+        connection.ops.adapt_datefield_value(period.date_to),
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {ArchivedJournalEntryLine._meta.db_table} ({columns}) '
+            f'SELECT {columns} FROM {JournalEntryLine._meta.db_table} '
+            f'WHERE journal_entry_id IN ({entries})',
+            params,
+        )
+        cursor.execute(
+            f'DELETE FROM {JournalEntryLine._meta.db_table} WHERE journal_entry_id IN ({entries})',
+            params,
+        )
@@ -0,0 +1,282 @@
+"""
+Estados financieros: balance de comprobación, balance general y estado
+de resultados.
+
+Todos parten de account_totals(), una sola consulta agregada que agrupa
+las líneas contabilizadas (POSTED) por cuenta dentro del rango de fechas.
+Con esos totales y el plan de cuentas (una consulta más) se arma en
+memoria:
+
+- el subtotal de cada cuenta padre sumando sus descendientes con los
+  pares de la tabla de clausura (accounting.hierarchy)
+- los subtotales por grupo (code_prefix) y por tipo de cuenta
+- las secciones de cada estado, según el primer dígito del código de
+  cuenta (STATEMENT_SECTIONS)
+
+Los estados de períodos cerrados (core.periods) no cambian, así que se
+guardan en la caché de Django. Las señales de JournalEntry /
+JournalEntryLine / AccountAccount invalidan la caché cuando un cambio
+toca un período cerrado (igual que core.refdata, la invalidación solo
+alcanza al proceso que hizo el cambio; los demás la descartan a los
+STATEMENT_CACHE_TIMEOUT segundos).
+"""
+
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.db.models.signals import post_save, post_delete
+
+from core.periods import is_closed
+from .hierarchy import rolled_up
+from .models import AccountAccount, AccountClosure, JournalEntry, JournalEntryLine
+from .periods import account_totals_through, line_totals
+from .utils import DEBIT_NATURE_SYMBOLS
+
+
+# Sección de los estados -> (nombre, prefijos del código de cuenta)
+STATEMENT_SECTIONS = {
+    'ASSET': ('Activo', ('1',)),
+    'LIABILITY': ('Pasivo', ('2',)),
+    'EQUITY': ('Patrimonio', ('3',)),
+    'REVENUE': ('Ingresos', ('4',)),
+    'EXPENSE': ('Gastos y Costos', ('5', '6')),
+}
+
+BALANCE_SHEET_SECTIONS = ('ASSET', 'LIABILITY', 'EQUITY')
+INCOME_STATEMENT_SECTIONS = ('REVENUE', 'EXPENSE')
+
+# Segundos que se guarda en caché el estado de un período cerrado
+STATEMENT_CACHE_TIMEOUT = 3600
+
+_CACHE_PREFIX = 'accounting.statements'
+_ZERO = Decimal('0.00')
+
+
+# ==================== PERÍODOS Y CACHÉ ====================
+
+def is_closed_period(date_to):
+    """True si el rango termina en un período cerrado (sus estados se pueden cachear)."""
+    return is_closed(date_to)
+
+
+def _cache_version():
+    return cache.get_or_set(f'{_CACHE_PREFIX}.version', 1, None)
+
+
+def invalidate_statements():
+    """Descarta todos los estados cacheados (cambia la versión de la caché)."""
+    try:
+        cache.incr(f'{_CACHE_PREFIX}.version')
+    except ValueError:
+        cache.set(f'{_CACHE_PREFIX}.version', 1, None)
+
+
+def invalidate_for_dates(dates):
+    """Invalida la caché si alguna de las fechas cae en un período cerrado."""
+    if any(is_closed(date) for date in dates):
+        invalidate_statements()
+
+
+def _cached(kind, date_from, date_to, build):
+    if not is_closed_period(date_to):
+        return build()
+    key = f'{_CACHE_PREFIX}.{_cache_version()}.{kind}.{date_from}.{date_to}'
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, STATEMENT_CACHE_TIMEOUT)
+    return result
+
+
+# ==================== TOTALES POR CUENTA ====================
+
+def account_totals(date_from=None, date_to=None, account_ids=None):
+    """
+    Débitos y créditos contabilizados por cuenta en el rango de fechas.
+    Sin fecha de inicio parte del último cierre de período; con rango es
+    una sola consulta agregada (ver accounting.periods).
+
+    Returns:
+        dict: {pk de la cuenta: (debe, haber)}
+    """
+    if date_from is None:
+        return account_totals_through(date_to, account_ids)
+    return line_totals(date_from, date_to, account_ids)
+
+
+def _chart():
+    """
+    Plan de cuentas con lo necesario para agrupar (una consulta). El nivel
+    es la mayor profundidad de la cuenta en la tabla de clausura.
+    """
+    return list(
+        AccountAccount.objects.values(
+            'pk', 'code', 'name', 'parent_account_id', 'nature__symbol',
+            'account_group__code_prefix', 'account_group__name', 'account_type__name',
+        ).annotate(level=Max('ancestor_links__depth')).order_by('code')
+    )
+
+
+def section_for(code):
+    """Sección de los estados a la que pertenece un código de cuenta (o None)."""
+    for section, (_, prefixes) in STATEMENT_SECTIONS.items():
+        if code.startswith(prefixes):
+            return section
+    return None
+
+
+def _signed(nature_symbol, debit, credit):
+    return debit - credit if nature_symbol in DEBIT_NATURE_SYMBOLS else credit - debit
+
+
+def _build_rows(totals):
+    """
+    Una fila por cuenta con sus montos propios y los acumulados de toda su
+    rama (la cuenta más sus descendientes según la tabla de clausura).
+    """
+    chart = _chart()
+    by_pk = {account['pk']: account for account in chart}
+    rolled = rolled_up(totals, AccountClosure.objects.values_list('ancestor_id', 'descendant_id'))
+    rows = []
+    for account in chart:
+        debit, credit = totals.get(account['pk'], (_ZERO, _ZERO))
+        rolled_debit, rolled_credit = rolled.get(account['pk'], (_ZERO, _ZERO))
+        rows.append({
+            'account_id': account['pk'],
+            'code': account['code'],
+            'name': account['name'],
+            'nature': account['nature__symbol'],
+            'group': f"{account['account_group__code_prefix']} - {account['account_group__name']}",
+            'type': account['account_type__name'],
+            'section': section_for(account['code']),
+            'parent_id': account['parent_account_id'] if account['parent_account_id'] in by_pk else None,
+            'level': account['level'] or 0,
+            'debit': debit,
+            'credit': credit,
+            'rolled_debit': rolled_debit,
+            'rolled_credit': rolled_credit,
+            'balance': _signed(account['nature__symbol'], debit, credit),
+            'rolled_balance': _signed(account['nature__symbol'], rolled_debit, rolled_credit),
+        })
+    return rows
+
+
+def _subtotals(rows, key):
+    """Debe/haber por grupo o tipo de cuenta (solo montos propios, sin doble conteo)."""
+    subtotals = {}
+    for row in rows:
+        entry = subtotals.setdefault(row[key], {'name': row[key], 'debit': _ZERO, 'credit': _ZERO})
+        entry['debit'] += row['debit']
+        entry['credit'] += row['credit']
+    return sorted(subtotals.values(), key=lambda entry: entry['name'] or '')
+
+
+def _section(rows, section):
+    """
+    Cuentas de una sección con movimiento en su rama. El total de la
+    sección suma las cuentas raíz de la sección, que ya incluyen a sus
+    descendientes.
+    """
+    section_rows = [
+        row for row in rows
+        if row['section'] == section and (row['rolled_debit'] or row['rolled_credit'])
+    ]
+    in_section = {row['account_id'] for row in section_rows}
+    debit = sum((row['rolled_debit'] for row in section_rows if row['parent_id'] not in in_section), _ZERO)
+    credit = sum((row['rolled_credit'] for row in section_rows if row['parent_id'] not in in_section), _ZERO)
+    name = STATEMENT_SECTIONS[section][0]
+    # Activo y gastos son de naturaleza deudora; el resto acreedora
+    nature = 'DR' if section in ('ASSET', 'EXPENSE') else 'CR'
+    return {'key': section, 'name': name, 'rows': section_rows, 'total': _signed(nature, debit, credit)}
+
+
+# ==================== ESTADOS ====================
+
+def trial_balance(date_from=None, date_to=None):
+    """
+    Balance de comprobación del rango: débitos, créditos y saldo por
+    cuenta (propios y acumulados por rama), con subtotales por grupo y
+    por tipo de cuenta.
+    """
+    def build():
+        rows = _build_rows(account_totals(date_from, date_to))
+        total_debit = sum((row['debit'] for row in rows), _ZERO)
+        total_credit = sum((row['credit'] for row in rows), _ZERO)
+        return {
+            'date_from': date_from,
+            'date_to': date_to,
+            'rows': [row for row in rows if row['rolled_debit'] or row['rolled_credit']],
+            'groups': _subtotals(rows, 'group'),
+            'types': _subtotals(rows, 'type'),
+            'total_debit': total_debit,
+            'total_credit': total_credit,
+            'is_balanced': total_debit == total_credit,
+        }
+    return _cached('trial_balance', date_from, date_to, build)
+
+
+def income_statement(date_from=None, date_to=None):
+    """Estado de resultados del rango: ingresos, gastos y resultado neto."""
+    def build():
+        rows = _build_rows(account_totals(date_from, date_to))
+        sections = [_section(rows, section) for section in INCOME_STATEMENT_SECTIONS]
+        revenue, expense = (section['total'] for section in sections)
+        return {
+            'date_from': date_from,
+            'date_to': date_to,
+            'sections': sections,
+            'net_income': revenue - expense,
+        }
+    return _cached('income_statement', date_from, date_to, build)
+
+
+def balance_sheet(as_of=None):
+    """
+    Balance general a la fecha: activo, pasivo y patrimonio acumulados.
+    Mientras no haya asientos de cierre, el resultado acumulado de
+    ingresos y gastos se muestra como resultado del ejercicio dentro del
+    patrimonio.
+    """
+    def build():
+        rows = _build_rows(account_totals(None, as_of))
+        sections = {section: _section(rows, section) for section in STATEMENT_SECTIONS}
+        result = sections['REVENUE']['total'] - sections['EXPENSE']['total']
+        assets = sections['ASSET']['total']
+        liabilities = sections['LIABILITY']['total']
+        equity = sections['EQUITY']['total'] + result
+        return {
+            'as_of': as_of,
+            'sections': [sections[section] for section in BALANCE_SHEET_SECTIONS],
+            'period_result': result,
+            'total_assets': assets,
+            'total_liabilities_equity': liabilities + equity,
+            'is_balanced': assets == liabilities + equity,
+        }
+    return _cached('balance_sheet', None, as_of, build)
+
+
+# ==================== INVALIDACIÓN ====================
+
+def _on_entry_change(sender, instance, **kwargs):
+    invalidate_for_dates([instance.date])
+
+
+def _on_line_change(sender, instance, **kwargs):
+    # Las líneas borradas en cascada no traen el asiento; lo cubre la señal del asiento
+    if JournalEntryLine.journal_entry.is_cached(instance):
+        invalidate_for_dates([instance.journal_entry.date])
+
+
+def _on_account_change(sender, instance, **kwargs):
+    # Cambios en el plan de cuentas (padre, código) alteran todos los estados
+    invalidate_statements()
+
+
+def connect_signals():
+    post_save.connect(_on_entry_change, sender=JournalEntry, dispatch_uid='statements_entry_save')
+    post_delete.connect(_on_entry_change, sender=JournalEntry, dispatch_uid='statements_entry_delete')
+    post_save.connect(_on_line_change, sender=JournalEntryLine, dispatch_uid='statements_line_save')
+    post_delete.connect(_on_line_change, sender=JournalEntryLine, dispatch_uid='statements_line_delete')
+    post_save.connect(_on_account_change, sender=AccountAccount, dispatch_uid='statements_account_save')
+    post_delete.connect(_on_account_change, sender=AccountAccount, dispatch_uid='statements_account_delete')
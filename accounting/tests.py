@@ -1,3 +1,473 @@
+import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import FiscalPeriod
+from core.periods import close_period, period_for_month
+from core.testing import create_reference_data, create_sales_order, create_purchase_order, add_stock
+from inventory.periods import stock_as_of
+from purchases.utils import bulk_transition_purchase_orders
+from sales.utils import bulk_transition_sales_orders
+from .hierarchy import branch_totals
+from .ledger import ledger_page
+from .models import AccountAccount, AccountClosure, JournalEntry, JournalEntryLine, ArchivedJournalEntryLine
+from .periods import account_totals_through
+from .statements import balance_sheet, income_statement, invalidate_statements, trial_balance
+from .utils import (
+    build_sale_entry_data, create_entry_for_sale, create_journal_entries_batch, get_sale_accounts,
+    recalculate_all_account_balances,
+)
+
+
+def month_start(day, months_back):
+    """Primer día del mes `months_back` meses antes del de `day`."""
+    start = day.replace(day=1)
+    for _ in range(months_back):
+        start = (start - datetime.timedelta(days=1)).replace(day=1)
+    return start
+
+
+def ledger_rows(account, date_from=None, per_page=2):
+    """Recorre el libro mayor completo con el cursor y retorna [(id, saldo)]."""
+    rows = []
+    after = None
+    while True:
+        page, _ = ledger_page(account, date_from=date_from, after=after, per_page=per_page)
+        rows.extend((line.pk, line.balance) for line in page)
+        if not page.has_next:
+            return rows
+        after = page.next_cursor
+
+
+class JournalEntryBatchTests(TestCase):
+    """Asientos en lote para eventos masivos (create_journal_entries_batch)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        cls.orders = [
+            create_sales_order(cls.data, [(cls.data.materials[0], quantity, '10.00')], status='DRAFT')
+            for quantity in (1, 2, 3)
+        ]
+
+    def setUp(self):
+        self.accounts = get_sale_accounts()
+
+    def entries(self, orders):
+        return [build_sale_entry_data(order, self.accounts) for order in orders]
+
+    def balances(self):
+        receivable, revenue = (AccountAccount.objects.get(pk=account.pk) for account in self.accounts)
+        return receivable.current_balance, revenue.current_balance
+
+    def test_posted_batch_updates_balances_once_per_account(self):
+        created = create_journal_entries_batch(self.entries(self.orders[:2]), self.data.user, post=True)
+
+        self.assertEqual(set(created), {self.orders[0].id_sales_order, self.orders[1].id_sales_order})
+        entry = JournalEntry.objects.get(reference=self.orders[1].id_sales_order)
+        self.assertEqual(entry.status, 'POSTED')
+        self.assertEqual((entry.total_debit, entry.total_credit), (Decimal('20.00'), Decimal('20.00')))
+        self.assertEqual(list(entry.lines.values_list('position', flat=True)), [1, 2])
+        self.assertEqual(self.balances(), (Decimal('30.00'), Decimal('30.00')))
+
+    def test_documents_with_an_entry_are_skipped(self):
+        create_journal_entries_batch(self.entries(self.orders[:2]), self.data.user, post=True)
+        # Repetidos contra la base y dentro del mismo lote
+        created = create_journal_entries_batch(
+            self.entries([self.orders[0], self.orders[2], self.orders[2]]), self.data.user, post=True
+        )
+
+        self.assertEqual(list(created), [self.orders[2].id_sales_order])
+        self.assertEqual(JournalEntry.objects.count(), 3)
+        self.assertEqual(self.balances(), (Decimal('60.00'), Decimal('60.00')))
+        self.assertEqual(create_journal_entries_batch(self.entries(self.orders), post=True), {})
+
+    def test_draft_batch_does_not_touch_balances(self):
+        create_journal_entries_batch(self.entries(self.orders), self.data.user)
+        self.assertEqual(set(JournalEntry.objects.values_list('status', flat=True)), {'DRAFT'})
+        self.assertEqual(self.balances(), (Decimal('0.00'), Decimal('0.00')))
+
+    def test_unbalanced_entry_rejects_the_whole_batch(self):
+        entries = self.entries(self.orders[:2])
+        entries[1]['lines'][0]['debit'] += 1
+        with self.assertRaises(ValidationError):
+            create_journal_entries_batch(entries, post=True)
+        self.assertFalse(JournalEntry.objects.exists())
+
+
+class JournalEntryTotalsTests(TestCase):
+    """Totales de débito/crédito almacenados en el asiento (JournalEntry.refresh_totals)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        cls.order = create_sales_order(cls.data, [(cls.data.materials[0], 3, '5.00')], status='DRAFT')
+
+    def test_line_changes_refresh_the_stored_totals(self):
+        entry = create_entry_for_sale(self.order, self.data.user)
+        entry.refresh_from_db()
+        self.assertEqual((entry.total_debit, entry.total_credit), (Decimal('15.00'), Decimal('15.00')))
+        self.assertTrue(entry.is_balanced())
+
+        line = entry.lines.get(position=1)
+        line.debit = Decimal('20.00')
+        line.save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.total_debit, Decimal('20.00'))
+        self.assertFalse(entry.is_balanced())
+
+        entry.lines.get(position=2).delete()
+        entry.refresh_from_db()
+        self.assertEqual((entry.total_debit, entry.total_credit), (Decimal('20.00'), Decimal('0.00')))
+
+
+class JournalEntryListTests(TestCase):
+    """Diario paginado por cursor sobre (-date, -id_journal_entry)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        today = timezone.localdate()
+        orders = [
+            create_sales_order(cls.data, [(cls.data.materials[0], 1, '10.00')], status='DRAFT',
+                               issue_date=today - datetime.timedelta(days=number % 3))
+            for number in range(30)
+        ]
+        accounts = get_sale_accounts()
+        create_journal_entries_batch([build_sale_entry_data(order, accounts) for order in orders])
+
+    def setUp(self):
+        self.client.force_login(self.data.user)
+
+    def page(self, **params):
+        return self.client.get(reverse('accounting:journal_entry_list'), params).context['page_obj']
+
+    def test_cursor_pages_cover_every_entry_once(self):
+        first = self.page()
+        self.assertEqual(len(first), 25)
+        self.assertFalse(first.has_previous)
+        second = self.page(after=first.next_cursor)
+        self.assertEqual(len(second), 5)
+        self.assertFalse(second.has_next)
+
+        seen = [entry.id_journal_entry for entry in list(first) + list(second)]
+        expected = list(
+            JournalEntry.objects.order_by('-date', '-id_journal_entry').values_list('id_journal_entry', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(
+            [entry.pk for entry in self.page(before=second.previous_cursor)], [entry.pk for entry in first]
+        )
+
+    def test_filters_apply_before_the_cursor(self):
+        day = timezone.localdate()
+        page = self.page(fecha_desde=day.isoformat())
+        self.assertEqual(len(page), 10)
+        self.assertTrue(all(entry.date == day for entry in page))
+
+
+class PeriodCloseTests(TestCase):
+    """Cierre y archivo de períodos: los saldos y el stock no cambian (core.periods)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        today = timezone.localdate()
+        cls.first_month = month_start(today, 2)
+        cls.second_month = month_start(today, 1)
+        material = cls.data.materials[0]
+
+        def at(day):
+            return timezone.make_aware(datetime.datetime.combine(day, datetime.time(10)))
+
+        add_stock(cls.data, material, 30, movement_date=at(cls.first_month))
+        add_stock(cls.data, material, 12, movement_date=at(cls.second_month + datetime.timedelta(days=3)))
+        purchases = [
+            create_purchase_order(cls.data, [(material, 5, '3.00')], issue_date=cls.first_month),
+            create_purchase_order(cls.data, [(material, 7, '3.00')], issue_date=cls.second_month),
+        ]
+        sales = [
+            create_sales_order(cls.data, [(material, 4, '8.00')], status='DRAFT', issue_date=day)
+            for day in (cls.first_month, cls.first_month + datetime.timedelta(days=1), cls.second_month, today)
+        ]
+        bulk_transition_purchase_orders(
+            [order.id_purchase_order for order in purchases], 'receive', cls.data.user, post_entries=True
+        )
+        sale_ids = [order.id_sales_order for order in sales]
+        bulk_transition_sales_orders(sale_ids, 'confirm', cls.data.user)
+        bulk_transition_sales_orders(sale_ids, 'deliver', cls.data.user, post_entries=True)
+
+    def balances(self):
+        return dict(AccountAccount.objects.values_list('code', 'current_balance'))
+
+    def test_close_and_archive_keep_totals(self):
+        receivable = AccountAccount.objects.get(code='1.1.03')
+        days = [self.first_month, self.second_month - datetime.timedelta(days=1),
+                self.second_month + datetime.timedelta(days=5), timezone.localdate()]
+        live_balances = self.balances()
+        live_totals = account_totals_through()
+        live_stock = [dict(stock_as_of(day)[0]) for day in days]
+        live_ledger = ledger_rows(receivable)
+        live_ledger_from = ledger_rows(receivable, date_from=self.first_month + datetime.timedelta(days=1))
+        self.assertEqual(len(live_ledger), 4)
+        live_branch = receivable.get_branch_balance()
+        live_branch_from = branch_totals([receivable.pk], date_from=self.first_month)
+        self.assertTrue(live_branch)
+
+        close_period(period_for_month(self.first_month.year, self.first_month.month), archive=True)
+        close_period(period_for_month(self.second_month.year, self.second_month.month))
+        self.assertTrue(FiscalPeriod.objects.get(date_from=self.first_month).archived)
+        self.assertTrue(ArchivedJournalEntryLine.objects.exists())
+        self.assertFalse(JournalEntryLine.objects.filter(journal_entry__date__lt=self.second_month).exists())
+
+        recalculate_all_account_balances()
+        self.assertEqual(self.balances(), live_balances)
+        self.assertEqual(account_totals_through(), live_totals)
+        self.assertEqual([dict(stock_as_of(day)[0]) for day in days], live_stock)
+        self.assertEqual(ledger_rows(receivable), live_ledger)
+        self.assertEqual(
+            ledger_rows(receivable, date_from=self.first_month + datetime.timedelta(days=1)), live_ledger_from
+        )
+        self.assertEqual(receivable.get_branch_balance(), live_branch)
+        self.assertEqual(branch_totals([receivable.pk], date_from=self.first_month), live_branch_from)
+
+
+class LedgerTests(TestCase):
+    """Libro mayor con saldo acumulado paginado por cursor (accounting.ledger)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        cls.today = timezone.localdate()
+        orders = [
+            create_sales_order(cls.data, [(cls.data.materials[0], quantity, '10.00')], status='DRAFT',
+                               issue_date=cls.today - datetime.timedelta(days=5 - quantity))
+            for quantity in (1, 2, 3, 4, 5)
+        ]
+        accounts = get_sale_accounts()
+        create_journal_entries_batch(
+            [build_sale_entry_data(order, accounts) for order in orders], cls.data.user, post=True
+        )
+
+    def setUp(self):
+        self.receivable, self.revenue = (
+            AccountAccount.objects.get(pk=account.pk) for account in get_sale_accounts()
+        )
+
+    def test_running_balance_continues_across_pages(self):
+        expected = [Decimal(value) for value in ('10.00', '30.00', '60.00', '100.00', '150.00')]
+        for account in (self.receivable, self.revenue):
+            self.assertEqual([balance for _, balance in ledger_rows(account)], expected)
+            self.assertEqual(account.current_balance, expected[-1])
+
+        first, _ = ledger_page(self.receivable, per_page=2)
+        second, _ = ledger_page(self.receivable, after=first.next_cursor, per_page=2)
+        self.assertEqual([line.amount for line in second], [Decimal('30.00'), Decimal('40.00')])
+        self.assertTrue(second.has_previous)
+
+        # Hacia atrás se reconstruye la misma página con los mismos saldos
+        third, _ = ledger_page(self.receivable, after=second.next_cursor, per_page=2)
+        self.assertFalse(third.has_next)
+        back, _ = ledger_page(self.receivable, before=third.previous_cursor, per_page=2)
+        self.assertEqual([(line.pk, line.balance) for line in back], [(line.pk, line.balance) for line in second])
+
+    def test_date_from_starts_at_the_opening_balance(self):
+        date_from = self.today - datetime.timedelta(days=2)
+        page, opening = ledger_page(self.receivable, date_from=date_from, per_page=2)
+        self.assertEqual(opening, Decimal('30.00'))
+        self.assertEqual([line.balance for line in page], [Decimal('60.00'), Decimal('100.00')])
+        self.assertEqual(
+            [balance for _, balance in ledger_rows(self.receivable, date_from=date_from)],
+            [Decimal('60.00'), Decimal('100.00'), Decimal('150.00')]
+        )
+
+    def test_foreign_or_invalid_cursor_returns_the_first_page(self):
+        first, _ = ledger_page(self.receivable, per_page=2)
+        revenue_page, _ = ledger_page(self.revenue, per_page=2)
+        for cursor in ('no-es-un-cursor', revenue_page.next_cursor):
+            page, _ = ledger_page(self.receivable, after=cursor, per_page=2)
+            self.assertEqual([line.pk for line in page], [line.pk for line in first])
+            self.assertFalse(page.has_previous)
+        # El saldo del cursor no se reutiliza con otra fecha de inicio
+        page, opening = ledger_page(self.receivable, date_from=self.today, after=first.next_cursor, per_page=2)
+        self.assertEqual([line.balance for line in page], [Decimal('150.00')])
+        self.assertEqual(opening, Decimal('100.00'))
+
+    def test_api_returns_balances_and_cursors(self):
+        self.client.force_login(self.data.user)
+        url = reverse('accounting:api_account_ledger', args=[self.receivable.code])
+        data = self.client.get(url, {'per_page': 3}).json()
+        self.assertEqual(data['opening_balance'], '0.00')
+        self.assertEqual([line['balance'] for line in data['lines']], ['10.00', '30.00', '60.00'])
+        data = self.client.get(url, {'per_page': 3, 'after': data['next_cursor']}).json()
+        self.assertEqual([line['balance'] for line in data['lines']], ['100.00', '150.00'])
+        self.assertEqual(self.client.get(url, {'date_from': 'ayer'}).status_code, 400)
+
+
+class StatementTests(TestCase):
+    """Balance de comprobación, estado de resultados y balance general (accounting.statements)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        cls.today = timezone.localdate()
+        cls.last_month = month_start(cls.today, 1)
+        cls.this_month = month_start(cls.today, 0)
+        material = cls.data.materials[0]
+        add_stock(cls.data, material, 10, movement_date=timezone.make_aware(
+            datetime.datetime.combine(cls.last_month, datetime.time(10))
+        ))
+        purchase = create_purchase_order(cls.data, [(material, 5, '3.00')], issue_date=cls.last_month)
+        bulk_transition_purchase_orders([purchase.id_purchase_order], 'receive', cls.data.user, post_entries=True)
+        sale_ids = [
+            create_sales_order(cls.data, [(material, quantity, '8.00')], issue_date=day).id_sales_order
+            for quantity, day in ((4, cls.last_month), (2, cls.today))
+        ]
+        bulk_transition_sales_orders(sale_ids, 'deliver', cls.data.user, post_entries=True)
+
+    def setUp(self):
+        # La caché de estados es del proceso; se descarta lo de otras clases
+        invalidate_statements()
+
+    def test_trial_balance_is_balanced_with_subtotals(self):
+        result = trial_balance()
+        self.assertTrue(result['is_balanced'])
+        self.assertEqual((result['total_debit'], result['total_credit']), (Decimal('63.00'), Decimal('63.00')))
+        self.assertEqual(
+            {row['code']: row['balance'] for row in result['rows']},
+            {'1.1.03': Decimal('48.00'), '1.1.05': Decimal('15.00'),
+             '2.1.01': Decimal('15.00'), '4.1.01': Decimal('48.00')}
+        )
+        for key in ('groups', 'types'):
+            self.assertEqual(sum(entry['debit'] for entry in result[key]), result['total_debit'])
+            self.assertEqual(sum(entry['credit'] for entry in result[key]), result['total_credit'])
+
+        current = trial_balance(date_from=self.this_month, date_to=self.today)
+        self.assertEqual(current['total_debit'], Decimal('16.00'))
+        self.assertEqual({row['code'] for row in current['rows']}, {'1.1.03', '4.1.01'})
+
+    def test_income_statement_and_balance_sheet(self):
+        self.assertEqual(income_statement()['net_income'], Decimal('48.00'))
+        self.assertEqual(income_statement(self.this_month, self.today)['net_income'], Decimal('16.00'))
+
+        sheet = balance_sheet()
+        self.assertTrue(sheet['is_balanced'])
+        self.assertEqual(sheet['period_result'], Decimal('48.00'))
+        self.assertEqual(
+            {section['key']: section['total'] for section in sheet['sections']},
+            {'ASSET': Decimal('63.00'), 'LIABILITY': Decimal('15.00'), 'EQUITY': Decimal('0.00')}
+        )
+        self.assertEqual(sheet['total_liabilities_equity'], Decimal('63.00'))
+        self.assertEqual(balance_sheet(self.this_month - datetime.timedelta(days=1))['total_assets'], Decimal('47.00'))
+
+    def test_closed_period_statements_are_cached_until_the_chart_changes(self):
+        as_of = self.this_month - datetime.timedelta(days=1)
+        close_period(period_for_month(self.last_month.year, self.last_month.month))
+        self.assertEqual(balance_sheet(as_of)['total_assets'], Decimal('47.00'))
+        # Solo se consulta si el período está cerrado
+        with self.assertNumQueries(1):
+            balance_sheet(as_of)
+
+        receivable = AccountAccount.objects.get(code='1.1.03')
+        receivable.name = 'Clientes nacionales'
+        receivable.save()
+        rows = balance_sheet(as_of)['sections'][0]['rows']
+        self.assertIn('Clientes nacionales', [row['name'] for row in rows])
+
+
+class AccountHierarchyTests(TestCase):
+    """Tabla de clausura del plan de cuentas y subtotales por rama (accounting.hierarchy)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        material = cls.data.materials[0]
+        add_stock(cls.data, material, 10)
+        order = create_sales_order(cls.data, [(material, 4, '8.00')])
+        bulk_transition_sales_orders([order.id_sales_order], 'deliver', cls.data.user, post_entries=True)
+
+    def setUp(self):
+        self.receivable = AccountAccount.objects.get(code='1.1.03')
+        self.parent = AccountAccount.objects.create(
+            id_account='ACC-1.1', name='Activo corriente', code='1.1', description='Activo corriente',
+            account_type=self.receivable.account_type, account_group=self.receivable.account_group,
+            nature=self.receivable.nature, currency=self.receivable.currency, country=self.receivable.country,
+        )
+
+    def rows(self):
+        return {row['code']: row for row in trial_balance()['rows']}
+
+    def test_reparenting_rebuilds_closure_in_the_same_transaction(self):
+        self.assertNotIn('1.1', self.rows())
+
+        self.receivable.parent_account = self.parent
+        self.receivable.save()
+        self.assertTrue(AccountClosure.objects.filter(
+            ancestor=self.parent, descendant=self.receivable, depth=1
+        ).exists())
+
+        rows = self.rows()
+        self.assertEqual(rows['1.1.03']['level'], 1)
+        self.assertEqual(rows['1.1']['rolled_debit'], rows['1.1.03']['debit'])
+        self.assertEqual(rows['1.1']['rolled_balance'], Decimal('32.00'))
+        self.assertEqual(self.parent.get_branch_balance(), Decimal('32.00'))
+
+        # La clausura ya refleja el cambio: la cuenta hija no puede ser padre
+        self.parent.parent_account = self.receivable
+        with self.assertRaises(ValidationError):
+            self.parent.save()
+
+    def test_deleting_parent_detaches_the_branch(self):
+        self.receivable.parent_account = self.parent
+        self.receivable.save()
+        self.parent.delete()
+
+        self.assertEqual(
+            list(AccountClosure.objects.filter(descendant=self.receivable).values_list('depth', flat=True)), [0]
+        )
+        self.assertEqual(self.rows()['1.1.03']['level'], 0)
+
+
+class AccountingAdminTests(TestCase):
+    """Listados del admin de contabilidad: consultas fijas sin importar las filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        cls.accounts = get_sale_accounts()
+
+    def setUp(self):
+        self.client.force_login(self.data.user)
+
+    def add_entries(self, count):
+        orders = [
+            create_sales_order(self.data, [(self.data.materials[0], 1, '10.00')], status='DRAFT')
+            for _ in range(count)
+        ]
+        create_journal_entries_batch([build_sale_entry_data(order, self.accounts) for order in orders])
+
+    def queries(self, name, *args):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(f'admin:accounting_{name}', args=args))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        self.add_entries(1)
+        names = ['journalentry_changelist', 'journalentryline_changelist', 'accountaccount_changelist']
+        self.queries(names[0])  # la primera petición del proceso carga las tablas de referencia
+        few = [self.queries(name) for name in names]
+        self.add_entries(5)
+        self.assertEqual([self.queries(name) for name in names], few)
 
-# Create your tests here.
+    def test_line_form_does_not_list_the_chart_of_accounts(self):
+        self.add_entries(1)
+        line = JournalEntryLine.objects.first()
+        response = self.client.get(reverse('admin:accounting_journalentryline_change', args=[line.pk]))
+        self.assertNotContains(response, f'<option value="{self.accounts[1].pk}">')
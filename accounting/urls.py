@@ -11,6 +11,13 @@ urlpatterns = [
     # Listado de asientos contables
     path('journal-entries/', views.journal_entry_list_view, name='journal_entry_list'),
     
+    # Recálculo de saldos en segundo plano
+    path('recalculate-balances/', views.recalculate_balances_view, name='recalculate_balances'),
+    
+    # Libro mayor por cuenta (vista y API)
+    path('accounts/<str:code>/ledger/', views.account_ledger_view, name='account_ledger'),
+    path('api/accounts/<str:code>/ledger/', views.account_ledger_api, name='api_account_ledger'),
+    
     # Detalle de asiento contable
     path('journal-entries/<str:id_journal_entry>/', views.journal_entry_detail_view, name='journal_entry_detail'),
 ]
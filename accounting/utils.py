@@ -5,10 +5,12 @@ Integracion con modulos de Compras, Ventas, Produccion e Inventario.
 
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from django.db.models import F
 from decimal import Decimal
 from datetime import date
 from .models import JournalEntry, JournalEntryLine, AccountAccount
 from core.models import Currency
+from core.refdata import get_by_id
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,7 +18,48 @@ logger = logging.getLogger(__name__)
 
 # ==================== TAREA 2: ASIENTOS PARA COMPRAS ====================
 
-def create_entry_for_purchase(purchase_order, user=None):
+def get_purchase_accounts():
+    """
+    Obtiene las cuentas usadas en los asientos de compra.
+    
+    Returns:
+        tuple: (cuenta de Inventario, cuenta de Cuentas por Pagar)
+    
+    Raises:
+        ValidationError: Si alguna de las cuentas no esta configurada
+    """
+    try:
+        # Cuenta de Inventario (Activo - Debito)
+        inventory_account = AccountAccount.objects.get(code='1.1.05')
+    except AccountAccount.DoesNotExist:
+        # Buscar primera cuenta de tipo Activo
+        inventory_account = AccountAccount.objects.filter(
+            account_type__name__icontains='Activo'
+        ).first()
+        if not inventory_account:
+            raise ValidationError(
+                'No se encontro cuenta de Inventario. '
+                'Por favor, crea una cuenta con codigo 1.1.05 (Inventario)'
+            )
+    
+    try:
+        # Cuenta de Cuentas por Pagar (Pasivo - Credito)
+        payable_account = AccountAccount.objects.get(code='2.1.01')
+    except AccountAccount.DoesNotExist:
+        # Buscar primera cuenta de tipo Pasivo
+        payable_account = AccountAccount.objects.filter(
+            account_type__name__icontains='Pasivo'
+        ).first()
+        if not payable_account:
+            raise ValidationError(
+                'No se encontro cuenta de Cuentas por Pagar. '
+                'Por favor, crea una cuenta con codigo 2.1.01 (Cuentas por Pagar)'
+            )
+    
+    return inventory_account, payable_account
+
+
+def create_entry_for_purchase(purchase_order, user=None, accounts=None, total=None):
     """
     Crea un asiento contable para una orden de compra RECIBIDA.
     
@@ -27,6 +70,10 @@ def create_entry_for_purchase(purchase_order, user=None):
     Args:
         purchase_order: Instancia de PurchaseOrder
         user: Usuario que crea el asiento (opcional)
+        accounts: Tupla (inventario, por pagar) ya resuelta con
+            get_purchase_accounts() (opcional, evita buscarlas por cada orden)
+        total: Importe a contabilizar (opcional; por defecto el total de la
+            orden). Tras recepciones parciales es solo lo pendiente.
     
     Returns:
         JournalEntry creado o None si ya existe
@@ -43,20 +90,17 @@ def create_entry_for_purchase(purchase_order, user=None):
             return None
         
         with transaction.atomic():
-            # Obtener moneda de la primera línea del pedido
-            first_line = purchase_order.lines.first()
-            currency = first_line.currency_supplier if first_line else Currency.objects.first()
+            # Moneda de las líneas del pedido
+            currency = order_currency(purchase_order, 'currency_supplier') or Currency.objects.first()
             if not currency:
                 raise ValidationError('No hay moneda configurada en el sistema')
             
             # Generar ID del asiento
             journal_entry_id = JournalEntry.generate_journal_entry_id()
             
-            # Calcular total de la compra
-            total = Decimal('0.00')
-            for line in purchase_order.lines.all():
-                line_total = Decimal(str(line.quantity)) * line.price
-                total += line_total
+            # Total de la compra (almacenado en la cabecera)
+            if total is None:
+                total = purchase_order.total_amount
             
             if total == 0:
                 logger.warning(f"Compra {purchase_order.id_purchase_order} tiene total 0, no se crea asiento")
@@ -76,33 +120,7 @@ def create_entry_for_purchase(purchase_order, user=None):
             )
             
             # Buscar cuentas contables
-            try:
-                # Cuenta de Inventario (Activo - Debito)
-                inventory_account = AccountAccount.objects.get(code='1.1.05')
-            except AccountAccount.DoesNotExist:
-                # Buscar primera cuenta de tipo Activo
-                inventory_account = AccountAccount.objects.filter(
-                    account_type__name__icontains='Activo'
-                ).first()
-                if not inventory_account:
-                    raise ValidationError(
-                        'No se encontro cuenta de Inventario. '
-                        'Por favor, crea una cuenta con codigo 1.1.05 (Inventario)'
-                    )
-            
-            try:
-                # Cuenta de Cuentas por Pagar (Pasivo - Credito)
-                payable_account = AccountAccount.objects.get(code='2.1.01')
-            except AccountAccount.DoesNotExist:
-                # Buscar primera cuenta de tipo Pasivo
-                payable_account = AccountAccount.objects.filter(
-                    account_type__name__icontains='Pasivo'
-                ).first()
-                if not payable_account:
-                    raise ValidationError(
-                        'No se encontro cuenta de Cuentas por Pagar. '
-                        'Por favor, crea una cuenta con codigo 2.1.01 (Cuentas por Pagar)'
-                    )
+            inventory_account, payable_account = accounts or get_purchase_accounts()
             
             # Crear linea de debito (Inventario)
             JournalEntryLine.objects.create(
@@ -134,7 +152,48 @@ def create_entry_for_purchase(purchase_order, user=None):
 
 # ==================== TAREA 3: ASIENTOS PARA VENTAS ====================
 
-def create_entry_for_sale(sales_order, user=None):
+def get_sale_accounts():
+    """
+    Obtiene las cuentas usadas en los asientos de venta.
+    
+    Returns:
+        tuple: (cuenta de Cuentas por Cobrar, cuenta de Ingresos por Ventas)
+    
+    Raises:
+        ValidationError: Si alguna de las cuentas no esta configurada
+    """
+    try:
+        # Cuenta de Cuentas por Cobrar (Activo - Debito)
+        receivable_account = AccountAccount.objects.get(code='1.1.03')
+    except AccountAccount.DoesNotExist:
+        receivable_account = AccountAccount.objects.filter(
+            account_type__name__icontains='Activo'
+        ).first()
+        if not receivable_account:
+            error_msg = (
+                'No se encontro cuenta de Cuentas por Cobrar. '
+                'Por favor, crea una cuenta con codigo 1.1.03 (Cuentas por Cobrar)'
+            )
+            raise ValidationError(error_msg)
+    
+    try:
+        # Cuenta de Ingresos por Ventas (Ingreso - Credito)
+        revenue_account = AccountAccount.objects.get(code='4.1.01')
+    except AccountAccount.DoesNotExist:
+        revenue_account = AccountAccount.objects.filter(
+            account_type__name__icontains='Ingreso'
+        ).first()
+        if not revenue_account:
+            error_msg = (
+                'No se encontro cuenta de Ingresos. '
+                'Por favor, crea una cuenta con codigo 4.1.01 (Ingresos por Ventas)'
+            )
+            raise ValidationError(error_msg)
+    
+    return receivable_account, revenue_account
+
+
+def create_entry_for_sale(sales_order, user=None, accounts=None, total=None):
     """
     Crea asientos contables para una orden de venta ENTREGADA.
     
@@ -145,11 +204,15 @@ def create_entry_for_sale(sales_order, user=None):
     Args:
         sales_order: Instancia de SalesOrder
         user: Usuario que crea el asiento (opcional)
+        accounts: Tupla (por cobrar, ingresos) ya resuelta con
+            get_sale_accounts() (opcional, evita buscarlas por cada orden)
+        total: Importe a contabilizar (opcional; por defecto el total de la
+            orden). Tras entregas parciales es solo lo pendiente.
     
     Returns:
         JournalEntry creado o None si ya existe
     """
-    print(f"\n=== DEBUG: Entrando a create_entry_for_sale para orden {sales_order.id_sales_order} ===")
+    logger.debug(f"Creando asiento de venta para {sales_order.id_sales_order}")
     try:
         # Verificar si ya existe un asiento para esta orden
         existing = JournalEntry.objects.filter(
@@ -159,13 +222,11 @@ def create_entry_for_sale(sales_order, user=None):
         
         if existing:
             logger.info(f"Ya existe asiento contable para venta {sales_order.id_sales_order}")
-            print(f"DEBUG: Ya existe asiento para {sales_order.id_sales_order}")
             return None
         
         with transaction.atomic():
-            # Obtener moneda (usar la primera moneda de las lineas)
-            first_line = sales_order.lines.first()
-            currency = first_line.currency_customer if first_line else Currency.objects.first()
+            # Moneda de las lineas de la orden
+            currency = order_currency(sales_order, 'currency_customer') or Currency.objects.first()
             
             if not currency:
                 raise ValidationError('No hay moneda configurada en el sistema')
@@ -173,17 +234,14 @@ def create_entry_for_sale(sales_order, user=None):
             # Generar ID del asiento
             journal_entry_id = JournalEntry.generate_journal_entry_id()
             
-            # Calcular total de la venta
-            total = Decimal('0.00')
-            for line in sales_order.lines.all():
-                line_total = Decimal(str(line.quantity)) * line.price
-                total += line_total
+            # Total de la venta (almacenado en la cabecera)
+            if total is None:
+                total = sales_order.total_amount
             
-            print(f"DEBUG: Total calculado para venta: {total}")
+            logger.debug(f"Total de la venta {sales_order.id_sales_order}: {total}")
             
             if total == 0:
                 logger.warning(f"Venta {sales_order.id_sales_order} tiene total 0, no se crea asiento")
-                print(f"DEBUG: Total es 0, no se crea asiento")
                 return None
             
             # Crear asiento contable
@@ -200,41 +258,7 @@ def create_entry_for_sale(sales_order, user=None):
             )
             
             # Buscar cuentas contables
-            print(f"DEBUG: Buscando cuenta de Cuentas por Cobrar (1.1.03)...")
-            try:
-                # Cuenta de Cuentas por Cobrar (Activo - Debito)
-                receivable_account = AccountAccount.objects.get(code='1.1.03')
-                print(f"DEBUG: Cuenta por Cobrar encontrada: {receivable_account.code} - {receivable_account.name}")
-            except AccountAccount.DoesNotExist:
-                print(f"DEBUG: Cuenta 1.1.03 no existe, buscando alternativa...")
-                receivable_account = AccountAccount.objects.filter(
-                    account_type__name__icontains='Activo'
-                ).first()
-                if not receivable_account:
-                    error_msg = (
-                        'No se encontro cuenta de Cuentas por Cobrar. '
-                        'Por favor, crea una cuenta con codigo 1.1.03 (Cuentas por Cobrar)'
-                    )
-                    print(f"DEBUG ERROR: {error_msg}")
-                    raise ValidationError(error_msg)
-            
-            print(f"DEBUG: Buscando cuenta de Ingresos (4.1.01)...")
-            try:
-                # Cuenta de Ingresos por Ventas (Ingreso - Credito)
-                revenue_account = AccountAccount.objects.get(code='4.1.01')
-                print(f"DEBUG: Cuenta de Ingresos encontrada: {revenue_account.code} - {revenue_account.name}")
-            except AccountAccount.DoesNotExist:
-                print(f"DEBUG: Cuenta 4.1.01 no existe, buscando alternativa...")
-                revenue_account = AccountAccount.objects.filter(
-                    account_type__name__icontains='Ingreso'
-                ).first()
-                if not revenue_account:
-                    error_msg = (
-                        'No se encontro cuenta de Ingresos. '
-                        'Por favor, crea una cuenta con codigo 4.1.01 (Ingresos por Ventas)'
-                    )
-                    print(f"DEBUG ERROR: {error_msg}")
-                    raise ValidationError(error_msg)
+            receivable_account, revenue_account = accounts or get_sale_accounts()
             
             # Crear linea de debito (Cuentas por Cobrar)
             JournalEntryLine.objects.create(
@@ -258,12 +282,10 @@ def create_entry_for_sale(sales_order, user=None):
             
             # TODO: Agregar asiento de costo de ventas cuando se implemente costeo de inventario
             
-            print(f"DEBUG: ✓ Asiento contable {journal_entry_id} creado exitosamente para venta {sales_order.id_sales_order} por {total}")
             logger.info(f"Asiento contable {journal_entry_id} creado para venta {sales_order.id_sales_order} por {total}")
             return journal_entry
             
     except Exception as e:
-        print(f"DEBUG ERROR: Excepción en create_entry_for_sale: {type(e).__name__}: {str(e)}")
         logger.error(f"Error al crear asiento contable para venta {sales_order.id_sales_order}: {str(e)}")
         raise
 
@@ -576,6 +598,33 @@ def cancel_journal_entry(journal_entry_id):
 
 # ==================== TAREA 8: ACTUALIZACION DE SALDOS DE CUENTAS ====================
 
+# Simbolos de naturaleza aceptados (los datos usan DR/CR)
+DEBIT_NATURE_SYMBOLS = ('DR', 'DEBIT')
+CREDIT_NATURE_SYMBOLS = ('CR', 'CREDIT')
+
+
+def get_balance_change(nature_symbol, debit, credit):
+    """
+    Calcula el efecto de un debito/credito sobre el saldo de una cuenta.
+    
+    - Naturaleza deudora (DR): los debitos aumentan y los creditos disminuyen
+    - Naturaleza acreedora (CR): los creditos aumentan y los debitos disminuyen
+    
+    Args:
+        nature_symbol: Simbolo de la naturaleza de la cuenta ('DR'/'CR')
+        debit: Monto del debito
+        credit: Monto del credito
+    
+    Returns:
+        Decimal con la variacion del saldo, o None si la naturaleza es desconocida
+    """
+    if nature_symbol in DEBIT_NATURE_SYMBOLS:
+        return debit - credit
+    if nature_symbol in CREDIT_NATURE_SYMBOLS:
+        return credit - debit
+    return None
+
+
 def update_account_balances_from_entry(journal_entry):
     """
     Actualiza los saldos (current_balance) de las cuentas afectadas por un asiento contable.
@@ -625,21 +674,9 @@ def update_account_balances_from_entry(journal_entry):
                 account = line.account
                 nature_symbol = account.nature.symbol
                 
-                balance_change = Decimal('0.00')
-                
-                if nature_symbol == 'DEBIT':
-                    # Cuentas de naturaleza DEBIT (Activos, Gastos):
-                    # - Los debitos AUMENTAN el saldo
-                    # - Los creditos DISMINUYEN el saldo
-                    balance_change = line.debit - line.credit
-                    
-                elif nature_symbol == 'CREDIT':
-                    # Cuentas de naturaleza CREDIT (Pasivos, Patrimonio, Ingresos):
-                    # - Los creditos AUMENTAN el saldo
-                    # - Los debitos DISMINUYEN el saldo
-                    balance_change = line.credit - line.debit
+                balance_change = get_balance_change(nature_symbol, line.debit, line.credit)
                 
-                else:
+                if balance_change is None:
                     logger.warning(
                         f"Naturaleza de cuenta desconocida '{nature_symbol}' "
                         f"para cuenta {account.code} - {account.name}"
@@ -671,7 +708,7 @@ def update_account_balances_from_entry(journal_entry):
     return updated_accounts
 
 
-def recalculate_all_account_balances():
+def recalculate_all_account_balances(progress=None):
     """
     Recalcula todos los saldos de cuentas desde cero basandose en asientos contabilizados.
     
@@ -681,30 +718,41 @@ def recalculate_all_account_balances():
     - Migracion de datos
     - Auditoria y reconciliacion
     
-    ADVERTENCIA: Esta operacion puede ser costosa en sistemas con muchos asientos.
+    Parte de los saldos del ultimo cierre de periodo y suma las lineas
+    posteriores con una consulta agrupada por cuenta. Para no bloquear una peticion HTTP se ejecuta como tarea en segundo plano
+    ('accounting.recalculate_balances').
+    
+    Args:
+        progress: JobProgress opcional para informar el avance
     
     Returns:
         dict: Resumen de cuentas actualizadas
     """
+    from .periods import account_totals_through
+    
     try:
         with transaction.atomic():
-            # Resetear todos los saldos a cero
-            AccountAccount.objects.all().update(current_balance=Decimal('0.00'))
-            
-            # Obtener todos los asientos contabilizados, ordenados por fecha
-            posted_entries = JournalEntry.objects.filter(
-                status='POSTED'
-            ).order_by('date', 'created_at')
-            
-            total_entries = posted_entries.count()
+            total_entries = JournalEntry.objects.filter(status='POSTED').count()
             logger.info(f"Recalculando saldos basandose en {total_entries} asientos contabilizados...")
             
-            # Procesar cada asiento
-            for idx, entry in enumerate(posted_entries, 1):
-                update_account_balances_from_entry(entry)
-                
-                if idx % 100 == 0:
-                    logger.info(f"Procesados {idx}/{total_entries} asientos...")
+            # Totales por cuenta desde el ultimo cierre de periodo (una consulta
+            # agrupada) en lugar de recorrer los asientos uno por uno
+            totals = account_totals_through()
+            accounts = list(AccountAccount.objects.select_related('nature').only('pk', 'code', 'name', 'nature__symbol'))
+            for account in accounts:
+                debit, credit = totals.get(account.pk, (Decimal('0.00'), Decimal('0.00')))
+                balance = get_balance_change(account.nature.symbol, debit, credit)
+                if balance is None:
+                    logger.warning(
+                        f"Naturaleza de cuenta desconocida '{account.nature.symbol}' "
+                        f"para cuenta {account.code} - {account.name}"
+                    )
+                    balance = Decimal('0.00')
+                account.current_balance = balance
+            AccountAccount.objects.bulk_update(accounts, ['current_balance'], batch_size=500)
+            
+            if progress is not None:
+                progress.update(total_entries, total_entries, f"Procesados {total_entries} asientos")
             
             # Obtener resumen de cuentas con saldo
             accounts_with_balance = AccountAccount.objects.exclude(
@@ -727,3 +775,261 @@ def recalculate_all_account_balances():
     except Exception as e:
         logger.error(f"Error al recalcular saldos de cuentas: {str(e)}")
         raise ValidationError(f"Error en recalculacion de saldos: {str(e)}")
+
+
+# ==================== ASIENTOS EN LOTE ====================
+
+def allocate_journal_entry_ids(count):
+    """
+    Reserva un bloque de IDs de asiento consecutivos con una sola consulta.
+    
+    Debe llamarse dentro de la misma transaccion que crea los asientos.
+    
+    Args:
+        count: Cantidad de IDs a generar
+    
+    Returns:
+        list: IDs con formato JE-000001
+    """
+    first_id = JournalEntry.generate_journal_entry_id()
+    first_number = int(first_id.split('-')[1])
+    return [f"JE-{number:06d}" for number in range(first_number, first_number + count)]
+
+
+def order_currency(order, currency_field):
+    """
+    Moneda del asiento de una orden de venta o compra: la moneda común
+    almacenada en la cabecera o, si las lineas mezclan monedas, la de la
+    primera linea. Retorna None si la orden no tiene lineas.
+    """
+    if order.currency_id:
+        return get_by_id(Currency, order.currency_id)
+    first_line = order.lines.first()
+    return getattr(first_line, currency_field) if first_line else None
+
+
+def build_sale_entry_data(sales_order, accounts, total=None):
+    """
+    Arma en memoria los datos del asiento de venta de una orden.
+    
+    Usa el total almacenado en la orden; solo lee las lineas si mezclan
+    monedas (para tomar la de la primera).
+    
+    Args:
+        sales_order: Instancia de SalesOrder
+        accounts: Tupla (por cobrar, ingresos) de get_sale_accounts()
+        total: Importe a contabilizar (opcional; por defecto el total de la
+            orden). Las entregas parciales pasan solo su parte.
+    
+    Returns:
+        dict con los datos del asiento, o None si la orden tiene total 0
+    """
+    if total is None:
+        total = sales_order.total_amount
+    if total == 0:
+        logger.warning(f"Venta {sales_order.id_sales_order} tiene total 0, no se crea asiento")
+        return None
+    
+    receivable_account, revenue_account = accounts
+    return {
+        'date': sales_order.issue_date or date.today(),
+        'description': f"Venta entregada {sales_order.id_sales_order} - Cliente: {sales_order.customer.name}",
+        'operation_type': 'SALE',
+        'reference': sales_order.id_sales_order,
+        'module': 'SALES',
+        'currency': order_currency(sales_order, 'currency_customer'),
+        'lines': [
+            {
+                'account': receivable_account,
+                'description': f"Venta a cliente {sales_order.customer.name}",
+                'debit': total,
+                'credit': Decimal('0.00'),
+            },
+            {
+                'account': revenue_account,
+                'description': f"Ingreso por venta - {sales_order.customer.name}",
+                'debit': Decimal('0.00'),
+                'credit': total,
+            },
+        ],
+    }
+
+
+def build_purchase_entry_data(purchase_order, accounts, total=None):
+    """
+    Arma en memoria los datos del asiento de compra de una orden.
+    
+    Usa el total almacenado en la orden; solo lee las lineas si mezclan
+    monedas (para tomar la de la primera).
+    
+    Args:
+        purchase_order: Instancia de PurchaseOrder
+        accounts: Tupla (inventario, por pagar) de get_purchase_accounts()
+        total: Importe a contabilizar (opcional; por defecto el total de la
+            orden). Las recepciones parciales pasan solo su parte.
+    
+    Returns:
+        dict con los datos del asiento, o None si la orden tiene total 0
+    """
+    if total is None:
+        total = purchase_order.total_amount
+    if total == 0:
+        logger.warning(f"Compra {purchase_order.id_purchase_order} tiene total 0, no se crea asiento")
+        return None
+    
+    inventory_account, payable_account = accounts
+    return {
+        'date': purchase_order.estimated_delivery_date or date.today(),
+        'description': f"Recepcion de compra {purchase_order.id_purchase_order} - Proveedor: {purchase_order.supplier.name}",
+        'operation_type': 'PURCHASE',
+        'reference': purchase_order.id_purchase_order,
+        'module': 'PURCHASES',
+        'currency': order_currency(purchase_order, 'currency_supplier'),
+        'lines': [
+            {
+                'account': inventory_account,
+                'description': f"Compra de materiales - {purchase_order.supplier.name}",
+                'debit': total,
+                'credit': Decimal('0.00'),
+            },
+            {
+                'account': payable_account,
+                'description': f"Adeudo a proveedor {purchase_order.supplier.name}",
+                'debit': Decimal('0.00'),
+                'credit': total,
+            },
+        ],
+    }
+
+
+def create_journal_entries_batch(entries_data, user=None, post=False):
+    """
+    Crea muchos asientos contables con un numero fijo de sentencias SQL.
+    
+    Todos los asientos y lineas se arman en memoria; los IDs se reservan en un
+    solo bloque, se insertan con bulk_create (con total_debit/total_credit ya
+    calculados, bulk_create no pasa por JournalEntryLine.save) y, si post=True, las variaciones
+    de saldo se acumulan por cuenta y se aplican con un UPDATE por cuenta.
+    
+    Los datos cuyo (reference, operation_type) ya tiene asiento se omiten,
+    igual que en create_entry_for_sale/create_entry_for_purchase.
+    
+    Args:
+        entries_data: Lista de dicts con date, description, operation_type,
+            reference, module, currency y lines (account, description,
+            debit, credit). Ver build_sale_entry_data().
+        user: Usuario que crea los asientos (opcional)
+        post: Si True, los asientos se crean contabilizados y se actualizan
+            los saldos de las cuentas
+    
+    Returns:
+        dict: Mapeo reference -> JournalEntry creado
+    
+    Raises:
+        ValidationError: Si algun asiento no esta balanceado o no tiene lineas
+    """
+    entries_data = [data for data in entries_data if data]
+    if not entries_data:
+        return {}
+    
+    for data in entries_data:
+        total_debit = sum((line['debit'] for line in data['lines']), Decimal('0.00'))
+        total_credit = sum((line['credit'] for line in data['lines']), Decimal('0.00'))
+        if not data['lines'] or total_debit != total_credit:
+            raise ValidationError(
+                f"El asiento para {data['reference']} no esta balanceado o no tiene lineas."
+            )
+    
+    # Los periodos cerrados no aceptan asientos nuevos
+    from core.periods import ensure_open
+    ensure_open(min(data['date'] for data in entries_data))
+    
+    # Omitir documentos que ya tienen asiento (una sola consulta)
+    existing = set(JournalEntry.objects.filter(
+        reference__in={data['reference'] for data in entries_data},
+        operation_type__in={data['operation_type'] for data in entries_data}
+    ).values_list('reference', 'operation_type'))
+    
+    pending = []
+    seen = set()
+    for data in entries_data:
+        key = (data['reference'], data['operation_type'])
+        if key in existing or key in seen:
+            logger.info(f"Ya existe asiento contable para {data['reference']} ({data['operation_type']})")
+            continue
+        seen.add(key)
+        pending.append(data)
+    
+    if not pending:
+        return {}
+    
+    status = 'POSTED' if post else 'DRAFT'
+    
+    with transaction.atomic():
+        entry_ids = allocate_journal_entry_ids(len(pending))
+        
+        entries = [
+            JournalEntry(
+                id_journal_entry=entry_id,
+                date=data['date'],
+                description=data['description'],
+                operation_type=data['operation_type'],
+                reference=data['reference'],
+                module=data['module'],
+                currency=data['currency'],
+                status=status,
+                total_debit=sum((line['debit'] for line in data['lines']), Decimal('0.00')),
+                total_credit=sum((line['credit'] for line in data['lines']), Decimal('0.00')),
+                created_by=user
+            )
+            for entry_id, data in zip(entry_ids, pending)
+        ]
+        JournalEntry.objects.bulk_create(entries)
+        
+        # Algunos motores no devuelven la PK en bulk_create
+        if any(entry.pk is None for entry in entries):
+            pks = dict(JournalEntry.objects.filter(
+                id_journal_entry__in=entry_ids
+            ).values_list('id_journal_entry', 'pk'))
+            for entry in entries:
+                entry.pk = pks[entry.id_journal_entry]
+        
+        lines = []
+        balance_deltas = {}
+        for entry, data in zip(entries, pending):
+            for position, line_data in enumerate(data['lines'], start=1):
+                lines.append(JournalEntryLine(
+                    journal_entry=entry,
+                    account=line_data['account'],
+                    description=line_data.get('description', ''),
+                    debit=line_data['debit'],
+                    credit=line_data['credit'],
+                    position=position
+                ))
+                if post:
+                    account = line_data['account']
+                    delta = get_balance_change(account.nature.symbol, line_data['debit'], line_data['credit'])
+                    if delta is None:
+                        logger.warning(
+                            f"Naturaleza de cuenta desconocida '{account.nature.symbol}' "
+                            f"para cuenta {account.code} - {account.name}"
+                        )
+                        continue
+                    balance_deltas[account.pk] = balance_deltas.get(account.pk, Decimal('0.00')) + delta
+        
+        JournalEntryLine.objects.bulk_create(lines)
+        
+        # bulk_create no emite señales: invalidar los estados cacheados a mano
+        if post:
+            from .statements import invalidate_for_dates
+            invalidate_for_dates({data['date'] for data in pending})
+        
+        # Un UPDATE por cuenta afectada, no por linea
+        for account_pk, delta in balance_deltas.items():
+            if delta:
+                AccountAccount.objects.filter(pk=account_pk).update(
+                    current_balance=F('current_balance') + delta
+                )
+    
+    logger.info(f"{len(entries)} asiento(s) contable(s) creados en lote (estado {status})")
+    return {entry.reference: entry for entry in entries}
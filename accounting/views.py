@@ -1,11 +1,17 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import Http404, JsonResponse
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST, require_GET
+from core.jobs import enqueue
+from core.pagination import paginate_keyset, querystring_without
+from core.periods import is_closed
 from django.db.models import Q, Sum
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from .models import JournalEntry, JournalEntryLine
-from .utils import update_account_balances_from_entry
+from .models import JournalEntry, JournalEntryLine, AccountAccount
+from .ledger import ledger_page
+from .utils import update_account_balances_from_entry, get_balance_change
 from datetime import datetime, date
 import logging
 
@@ -22,13 +28,15 @@ def journal_entry_list_view(request):
     - Módulo
     - Referencia (búsqueda parcial)
     - Estado
+    
+    La paginación es por cursor (?after= / ?before=) para que las páginas
+    profundas del diario carguen igual de rápido que la primera.
     """
     # Obtener todos los asientos ordenados por fecha descendente
+    # Los totales se leen de los campos almacenados, no hace falta precargar líneas
     entries = JournalEntry.objects.select_related(
         'currency',
         'created_by'
-    ).prefetch_related(
-        'lines__account'
     ).order_by('-date', '-id_journal_entry')
     
     # FILTROS
@@ -70,28 +78,25 @@ def journal_entry_list_view(request):
     if status and status != '':
         entries = entries.filter(status=status)
     
-    # Paginación
-    paginator = Paginator(entries, 25)  # 25 asientos por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor sobre (-date, -id_journal_entry): sin OFFSET ni COUNT(*)
+    page_obj, pagination = paginate_keyset(
+        request, entries, 25, ('-date', '-id_journal_entry'), count='estimate'
+    )
     
     # Calcular totales para cada asiento en la página
     entries_with_totals = []
     for entry in page_obj:
-        total_debit = entry.get_total_debit()
-        total_credit = entry.get_total_credit()
-        is_balanced = entry.is_balanced()
-        
         entries_with_totals.append({
             'entry': entry,
-            'total_debit': total_debit,
-            'total_credit': total_credit,
-            'is_balanced': is_balanced,
+            'total_debit': entry.total_debit,
+            'total_credit': entry.total_credit,
+            'is_balanced': entry.is_balanced(),
         })
     
     context = {
         'page_obj': page_obj,
         'entries_with_totals': entries_with_totals,
+        **pagination,
         'operation_types': JournalEntry.OPERATION_TYPE_CHOICES,
         'modules': JournalEntry.MODULE_CHOICES,
         'status_choices': JournalEntry.STATUS_CHOICES,
@@ -195,14 +200,11 @@ def journal_entry_detail_view(request, id_journal_entry):
                             nature_symbol = account.nature.symbol
                             
                             # Revertir el cambio (operación inversa)
-                            if nature_symbol == 'DR':  # DEBIT
-                                balance_change = -(line.debit - line.credit)
-                            elif nature_symbol == 'CR':  # CREDIT
-                                balance_change = -(line.credit - line.debit)
-                            else:
+                            balance_change = get_balance_change(nature_symbol, line.debit, line.credit)
+                            if balance_change is None:
                                 continue
                             
-                            account.current_balance += balance_change
+                            account.current_balance -= balance_change
                             account.save(update_fields=['current_balance', 'updated_at'])
                         
                         logger.info(f'Saldos revertidos para asiento {entry.id_journal_entry}')
@@ -230,14 +232,20 @@ def journal_entry_detail_view(request, id_journal_entry):
     # Obtener líneas ordenadas por posición
     lines = entry.lines.all().order_by('position')
     
+    # Los asientos de períodos cerrados no se modifican; si el período se
+    # archivó, sus líneas están en la tabla de archivo
+    period_closed = is_closed(entry.date)
+    if period_closed and not lines:
+        lines = entry.archived_lines.select_related('account__nature', 'account__account_type').order_by('position')
+    
     # Calcular totales
     total_debit = entry.get_total_debit()
     total_credit = entry.get_total_credit()
     is_balanced = entry.is_balanced()
     
     # Determinar si se puede contabilizar o anular
-    can_post = entry.status == 'DRAFT' and is_balanced
-    can_cancel = entry.status == 'POSTED'
+    can_post = entry.status == 'DRAFT' and is_balanced and not period_closed
+    can_cancel = entry.status == 'POSTED' and not period_closed
     
     context = {
         'entry': entry,
@@ -247,6 +255,135 @@ def journal_entry_detail_view(request, id_journal_entry):
         'is_balanced': is_balanced,
         'can_post': can_post,
         'can_cancel': can_cancel,
+        'period_closed': period_closed,
     }
     
     return render(request, 'accounting/journal_entry_detail.html', context)
+
+
+@login_required
+@require_POST
+def recalculate_balances_view(request):
+    """
+    Encola el recálculo de saldos de todas las cuentas
+    (recalculate_all_account_balances) como tarea en segundo plano.
+    Requiere permiso de edición en contabilidad.
+    """
+    if not request.user.is_superuser:
+        user_role = request.user.userrole_set.select_related('role').first()
+        if not user_role or user_role.role.accounting < 2:
+            messages.error(request, 'No tiene permisos para recalcular saldos.')
+            return redirect('accounting:journal_entry_list')
+
+    job = enqueue('accounting.recalculate_balances', user=request.user)
+    messages.info(request, 'El recálculo de saldos se encoló para procesarse en segundo plano.')
+    return redirect('job_detail', job_id=job.pk)
+
+
+def _get_ledger_account(code):
+    """Cuenta del libro mayor por código (o por ID de cuenta)."""
+    account = (
+        AccountAccount.objects.select_related('nature', 'currency')
+        .filter(Q(code=code) | Q(id_account=code)).first()
+    )
+    if account is None:
+        raise Http404('Cuenta no encontrada')
+    return account
+
+
+def _parse_ledger_date(value):
+    """Fecha YYYY-MM-DD del querystring; None si falta. ValueError si es inválida."""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+@login_required
+def account_ledger_view(request, code):
+    """
+    Libro mayor de una cuenta: líneas contabilizadas en el rango de fechas
+    con su saldo acumulado, partiendo del saldo de apertura del período.
+
+    La paginación es por cursor (?after= / ?before=); el cursor lleva el
+    saldo del borde de la página, así que las páginas profundas de un mayor
+    de varios años cargan igual de rápido que la primera.
+    """
+    account = _get_ledger_account(code)
+
+    fecha_desde = request.GET.get('fecha_desde')
+    fecha_hasta = request.GET.get('fecha_hasta')
+    try:
+        date_from = _parse_ledger_date(fecha_desde)
+    except ValueError:
+        messages.warning(request, 'Formato de fecha inválido para "Fecha Desde"')
+        date_from = None
+    try:
+        date_to = _parse_ledger_date(fecha_hasta)
+    except ValueError:
+        messages.warning(request, 'Formato de fecha inválido para "Fecha Hasta"')
+        date_to = None
+
+    page_obj, opening = ledger_page(
+        account, date_from, date_to,
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+
+    context = {
+        'account': account,
+        'page_obj': page_obj,
+        'opening_balance': opening,
+        'pagination_querystring': querystring_without(request),
+        'total_count': None,
+        'total_is_exact': True,
+        'fecha_desde': fecha_desde or '',
+        'fecha_hasta': fecha_hasta or '',
+    }
+    return render(request, 'accounting/account_ledger.html', context)
+
+
+@login_required
+@require_GET
+def account_ledger_api(request, code):
+    """
+    API: Libro mayor de una cuenta en JSON.
+
+    Parámetros: date_from, date_to (YYYY-MM-DD), after / before (cursor)
+    y per_page (máximo 500).
+
+    Returns:
+        JSON con el saldo de apertura, las líneas con su saldo acumulado y
+        los cursores de la página siguiente/anterior
+    """
+    account = _get_ledger_account(code)
+    try:
+        date_from = _parse_ledger_date(request.GET.get('date_from'))
+        date_to = _parse_ledger_date(request.GET.get('date_to'))
+        per_page = min(max(int(request.GET.get('per_page', 100)), 1), 500)
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos (fechas YYYY-MM-DD, per_page entero)'}, status=400)
+
+    page, opening = ledger_page(
+        account, date_from, date_to,
+        after=request.GET.get('after'), before=request.GET.get('before'), per_page=per_page,
+    )
+    return JsonResponse({
+        'account': {'code': account.code, 'name': account.name, 'nature': account.nature.symbol},
+        'date_from': date_from.isoformat() if date_from else None,
+        'date_to': date_to.isoformat() if date_to else None,
+        'opening_balance': str(opening),
+        'lines': [
+            {
+                'id': line.pk,
+                'date': line.journal_entry.date.isoformat(),
+                'journal_entry': line.journal_entry.id_journal_entry,
+                'reference': line.journal_entry.reference,
+                'description': line.description,
+                'debit': str(line.debit),
+                'credit': str(line.credit),
+                'balance': str(line.balance),
+            }
+            for line in page
+        ],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
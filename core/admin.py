@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Status, Currency, Country
+from .models import Status, Currency, Country, Job, FiscalPeriod
 
 # Registra tus modelos aquí.
 
@@ -16,3 +16,17 @@ class CurrencyAdmin(admin.ModelAdmin):
 class CountryAdmin(admin.ModelAdmin):
     list_display = ['code', 'name']
     search_fields = ['code', 'name']
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'job_type', 'status', 'progress_current', 'progress_total', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'job_type']
+    readonly_fields = ['started_at', 'finished_at', 'worker']
+
+@admin.register(FiscalPeriod)
+class FiscalPeriodAdmin(admin.ModelAdmin):
+    list_display = ['code', 'date_from', 'date_to', 'status', 'archived', 'closed_at', 'closed_by']
+    list_filter = ['status', 'archived']
+    # El cierre se hace con `manage.py close_fiscal_period`, no editando el registro
+    readonly_fields = ['status', 'archived', 'closed_at', 'closed_by']
+    raw_id_fields = ['closed_by']
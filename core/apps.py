@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registrar los manejadores de tareas en segundo plano (módulos jobs.py)
+        from .jobs import autodiscover
+        autodiscover()
+
+        # Mantener el índice de búsqueda sincronizado
+        from .search import connect_signals
+        connect_signals()
+
+        # Vaciar el LRU de autocompletado cuando cambian los datos maestros
+        from .autocomplete import connect_signals as connect_autocomplete_signals
+        connect_autocomplete_signals()
+
+        # Tablas de referencia en memoria, invalidadas por señales
+        from .refdata import connect_signals as connect_refdata_signals
+        connect_refdata_signals()
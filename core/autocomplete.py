@@ -0,0 +1,241 @@
+"""
+Autocompletado (type-ahead) para los formularios de órdenes.
+
+Los formularios de ventas y compras ya no incrustan todos los clientes,
+materiales o proveedores en la página: consultan /autocomplete/<fuente>/
+mientras el usuario escribe y reciben una página corta en JSON.
+
+La búsqueda por prefijo usa índices en vez de recorrer la tabla:
+
+- Código (id_material, id_customer, ...): rango code >= q AND code < q + U+10FFFF
+  sobre el índice único del campo (LIKE en SQLite no usa ese índice).
+- Nombre y demás texto: el índice de texto completo de core.search, que
+  tiene índices de prefijo de 2 y 3 caracteres.
+
+Las respuestas se guardan en un LRU pequeño por proceso con vencimiento
+corto; se vacía cuando cambia un registro de alguna fuente.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+from django.apps import apps
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+
+from .search import get_search_fields, ranked_ids
+
+
+# Máximo de resultados por página y valor por defecto
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_DEFAULT_LIMIT = 15
+
+# Máximo de coincidencias que se consideran para paginar
+AUTOCOMPLETE_MAX_RESULTS = 500
+
+# Entradas y segundos de vida del LRU por proceso
+CACHE_MAX_ENTRIES = 512
+CACHE_TIMEOUT = 30
+
+_PREFIX_END = '\U0010ffff'
+
+
+def _material_filter(queryset):
+    return queryset.filter(status__name__in=['Activo', 'Active'])
+
+
+def _active_filter(queryset):
+    return queryset.filter(status=True)
+
+
+def _material_item(obj):
+    return {
+        'id': obj.pk,
+        'code': obj.id_material,
+        'label': obj.name,
+        'unit': {'id': obj.unit_id, 'symbol': obj.unit.symbol},
+    }
+
+
+def _partner_item(code_field):
+    def serialize(obj):
+        return {
+            'id': obj.pk,
+            'code': getattr(obj, code_field),
+            'label': obj.name,
+            'city': obj.city or '',
+        }
+    return serialize
+
+
+def _location_item(obj):
+    return {'id': obj.pk, 'code': obj.code, 'label': obj.name}
+
+
+# Fuente -> modelo, campo código, campo nombre, filtro base y serializador
+AUTOCOMPLETE_SOURCES = {
+    'materials': {
+        'model': 'materials.Material',
+        'code_field': 'id_material',
+        'name_field': 'name',
+        'filter': _material_filter,
+        'select_related': ['unit'],
+        'serialize': _material_item,
+    },
+    'customers': {
+        'model': 'customers.Customer',
+        'code_field': 'id_customer',
+        'name_field': 'name',
+        'filter': _active_filter,
+        'select_related': [],
+        'serialize': _partner_item('id_customer'),
+    },
+    'suppliers': {
+        'model': 'suppliers.Supplier',
+        'code_field': 'id_supplier',
+        'name_field': 'name',
+        'filter': _active_filter,
+        'select_related': [],
+        'serialize': _partner_item('id_supplier'),
+    },
+    'locations': {
+        'model': 'inventory.InventoryLocation',
+        'code_field': 'code',
+        'name_field': 'name',
+        'filter': _active_filter,
+        'select_related': [],
+        'serialize': _location_item,
+    },
+}
+
+
+class UnknownSource(Exception):
+    """La fuente de autocompletado no existe."""
+
+
+# ==================== LRU POR PROCESO ====================
+
+class _LRUCache:
+    """LRU con vencimiento por entrada, seguro entre hilos."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_cache = _LRUCache(CACHE_MAX_ENTRIES, CACHE_TIMEOUT)
+
+
+def clear_cache(**kwargs):
+    _cache.clear()
+
+
+def connect_signals():
+    for name, source in AUTOCOMPLETE_SOURCES.items():
+        model = apps.get_model(source['model'])
+        post_save.connect(clear_cache, sender=model, dispatch_uid=f'autocomplete_save_{name}')
+        post_delete.connect(clear_cache, sender=model, dispatch_uid=f'autocomplete_delete_{name}')
+
+
+# ==================== CONSULTA ====================
+
+def _matching_ids(source, queryset, query, limit):
+    """
+    pk que coinciden con la búsqueda: primero los códigos que empiezan por
+    el texto (en orden de código) y luego las coincidencias por nombre.
+    """
+    code_field = source['code_field']
+    prefixes = {query, query.upper()}
+    code_q = Q()
+    for prefix in prefixes:
+        code_q |= Q(**{f'{code_field}__gte': prefix, f'{code_field}__lt': prefix + _PREFIX_END})
+    ids = list(queryset.filter(code_q).order_by(code_field).values_list('pk', flat=True)[:limit])
+
+    if len(ids) < limit:
+        if get_search_fields(queryset.model):
+            text_ids = ranked_ids(queryset, query, limit=limit)
+        else:
+            # Tablas chicas sin índice de texto (ej: ubicaciones)
+            name_field = source['name_field']
+            text_ids = list(
+                queryset.filter(**{f'{name_field}__istartswith': query})
+                .order_by(name_field).values_list('pk', flat=True)[:limit]
+            )
+        seen = set(ids)
+        ids.extend(pk for pk in text_ids if pk not in seen)
+    return ids[:limit]
+
+
+def autocomplete(source_name, query, page=1, limit=AUTOCOMPLETE_DEFAULT_LIMIT):
+    """
+    Página de resultados de autocompletado.
+
+    Args:
+        source_name: Clave de AUTOCOMPLETE_SOURCES
+        query: Texto escrito por el usuario (vacío = primeros registros por código)
+        page: Número de página (desde 1)
+        limit: Resultados por página (máximo AUTOCOMPLETE_MAX_LIMIT)
+
+    Returns:
+        dict: {'results': [...], 'page': n, 'has_more': bool}
+    """
+    try:
+        source = AUTOCOMPLETE_SOURCES[source_name]
+    except KeyError:
+        raise UnknownSource(source_name)
+
+    query = (query or '').strip()
+    page = max(1, page)
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX_LIMIT))
+
+    key = (source_name, query.lower(), page, limit)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    model = apps.get_model(source['model'])
+    queryset = source['filter'](model.objects.all())
+    start = (page - 1) * limit
+    # Un registro extra indica si hay página siguiente
+    needed = min(start + limit + 1, AUTOCOMPLETE_MAX_RESULTS)
+
+    if query:
+        ids = _matching_ids(source, queryset, query, needed)
+    else:
+        ids = list(queryset.order_by(source['code_field']).values_list('pk', flat=True)[:needed])
+
+    page_ids = ids[start:start + limit]
+    objects = queryset.select_related(*source['select_related']).in_bulk(page_ids)
+    data = {
+        'results': [source['serialize'](objects[pk]) for pk in page_ids if pk in objects],
+        'page': page,
+        'has_more': len(ids) > start + limit,
+    }
+    _cache.set(key, data)
+    return data
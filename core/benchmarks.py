@@ -0,0 +1,245 @@
+"""
+Suite de benchmarks de los caminos críticos del ERP.
+
+Cada benchmark es una función registrada con @benchmark('nombre') que
+recibe el contexto (cliente HTTP autenticado, usuario) y ejecuta una vez
+la operación a medir. run_benchmarks() la repite, toma tiempos y cuenta
+consultas con core.metrics.QueryCollector.
+
+Los benchmarks que escriben (entregar órdenes, recalcular saldos) corren
+dentro de una transacción que se revierte, así la base queda igual y las
+mediciones se pueden repetir.
+
+Lo usa el comando `python manage.py run_benchmarks`, que guarda los
+resultados en JSON y los compara contra un archivo base.
+"""
+
+import datetime
+import time
+import statistics
+
+from django.conf import settings
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core.metrics import QueryCollector
+
+
+# Órdenes confirmadas que entrega el benchmark de entregas
+DELIVERY_BATCH = 200
+
+_registry = {}
+
+
+def benchmark(name):
+    """Decorador que registra un benchmark."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_benchmarks():
+    return dict(_registry)
+
+
+def client_host():
+    """Un host aceptado por ALLOWED_HOSTS para las peticiones del Client."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def make_client(user):
+    client = Client(HTTP_HOST=client_host())
+    client.force_login(user)
+    return client
+
+
+class BenchmarkContext:
+    def __init__(self, user):
+        self.user = user
+        self.client = make_client(user)
+
+    def get(self, path):
+        """GET que consume el contenido (incluso en streaming) y exige estado 200."""
+        response = self.client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} respondió con estado {response.status_code}')
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+
+class _Rollback(Exception):
+    pass
+
+
+def rolled_back(func):
+    """Ejecuta el benchmark dentro de una transacción que se revierte."""
+    def wrapper(context):
+        try:
+            with transaction.atomic():
+                func(context)
+                raise _Rollback()
+        except _Rollback:
+            pass
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+# ==================== BENCHMARKS ====================
+
+@benchmark('inventory.stock_view')
+def stock_view(context):
+    context.get(reverse('inventory:inventory_stock'))
+
+
+@benchmark('inventory.stock_as_of')
+def stock_as_of(context):
+    """Stock de toda la empresa al final de hace 30 días."""
+    date = timezone.localdate() - datetime.timedelta(days=30)
+    context.get(reverse('inventory:api_stock_as_of') + f'?date={date.isoformat()}')
+
+
+@benchmark('inventory.movement_list')
+def movement_list(context):
+    context.get(reverse('inventory:inventory_movement_list'))
+
+
+@benchmark('reporting.dashboard')
+def reporting_dashboard(context):
+    context.get(reverse('reporting:dashboard'))
+
+
+@benchmark('reporting.sales_report')
+def sales_report(context):
+    context.get(reverse('reporting:sales_report'))
+
+
+@benchmark('reporting.purchases_report')
+def purchases_report(context):
+    context.get(reverse('reporting:purchases_report'))
+
+
+@benchmark('materials.export_csv')
+def materials_export(context):
+    context.get(reverse('materials:materials_list') + '?export=csv')
+
+
+@benchmark('sales.export_csv')
+def sales_export(context):
+    context.get(reverse('sales:sales_order_list') + '?export=csv')
+
+
+@benchmark('accounting.account_ledger')
+def account_ledger(context):
+    """Primera página y una página profunda del mayor de la cuenta de inventario."""
+    path = reverse('accounting:api_account_ledger', args=['1.1.05'])
+    response = context.get(path + '?per_page=500')
+    cursor = response.json()['next_cursor']
+    if cursor:
+        context.get(f'{path}?per_page=50&after={cursor}')
+
+
+@benchmark('sales.deliver_orders')
+@rolled_back
+def deliver_orders(context):
+    """Entrega en bloque las órdenes confirmadas más antiguas."""
+    from sales.models import SalesOrder
+    from sales.utils import bulk_transition_sales_orders
+
+    order_ids = list(
+        SalesOrder.objects.filter(status__symbol='CONFIRMED')
+        .order_by('issue_date', 'id').values_list('id_sales_order', flat=True)[:DELIVERY_BATCH]
+    )
+    if not order_ids:
+        raise RuntimeError('No hay órdenes de venta confirmadas (ver generate_synthetic_data)')
+    bulk_transition_sales_orders(order_ids, 'deliver', user=context.user, post_entries=True)
+
+
+@benchmark('accounting.recalculate_balances')
+@rolled_back
+def recalculate_balances(context):
+    from accounting.utils import recalculate_all_account_balances
+    recalculate_all_account_balances()
+
+
+# ==================== EJECUCIÓN ====================
+
+def run_benchmark(func, context, repeat):
+    """
+    Ejecuta un benchmark `repeat` veces.
+
+    Returns:
+        dict: tiempos en segundos (min/median/max), consultas de la última
+        ejecución o 'error' si falló
+    """
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        collector = QueryCollector()
+        start = time.perf_counter()
+        try:
+            with collector.capture():
+                func(context)
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+        timings.append(time.perf_counter() - start)
+        queries = collector.count
+    return {
+        'runs': repeat,
+        'min_s': round(min(timings), 4),
+        'median_s': round(statistics.median(timings), 4),
+        'max_s': round(max(timings), 4),
+        'queries': queries,
+    }
+
+
+def run_benchmarks(names, user, repeat=3, warmup=True, log=None):
+    """Ejecuta los benchmarks indicados y retorna {nombre: resultado}."""
+    context = BenchmarkContext(user)
+    results = {}
+    for name in names:
+        func = _registry[name]
+        if warmup:
+            # Primera ejecución fuera de la medición (cachés, conexiones)
+            run_benchmark(func, context, 1)
+        results[name] = run_benchmark(func, context, max(1, repeat))
+        if log:
+            log(name, results[name])
+    return results
+
+
+def dataset_size():
+    """Filas de las tablas principales, para saber con qué volumen se midió."""
+    from django.apps import apps
+    labels = [
+        'materials.Material', 'customers.Customer', 'suppliers.Supplier',
+        'purchases.PurchaseOrder', 'sales.SalesOrder', 'sales.SalesOrderLine',
+        'inventory.InventoryMovement', 'accounting.JournalEntry', 'accounting.JournalEntryLine',
+    ]
+    return {label: apps.get_model(label).objects.count() for label in labels}
+
+
+def compare(results, baseline, max_regression):
+    """
+    Compara la mediana de cada benchmark contra el archivo base.
+
+    Returns:
+        list: (nombre, base, actual, ratio, excede) por benchmark presente en ambos
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base or 'median_s' not in base or 'median_s' not in result:
+            continue
+        ratio = result['median_s'] / base['median_s'] if base['median_s'] else None
+        rows.append((name, base['median_s'], result['median_s'], ratio,
+                     ratio is not None and ratio > max_regression))
+    return rows
@@ -0,0 +1,528 @@
+"""
+Importación masiva de archivos CSV por streaming.
+
+El archivo subido no se carga completo en memoria: se decodifica de forma
+incremental, se lee fila por fila con csv.DictReader y las filas válidas se
+guardan en lotes de tamaño fijo con bulk_create. Las filas con errores se
+escriben en un archivo CSV descargable en lugar de acumularse en el contexto
+de la plantilla.
+
+Cada módulo define su importador heredando de CSVImporter:
+
+    class MaterialImporter(CSVImporter):
+        model = Material
+        form_class = MaterialForm
+        unique_field = 'id_material'
+
+        def prepare_row(self, row):
+            ...  # convierte nombres a IDs o lanza RowError
+
+    result = MaterialImporter(user=request.user).run(request.FILES['csv_file'])
+"""
+
+import io
+import os
+import csv
+import codecs
+import uuid
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction, IntegrityError
+
+from .search import get_search_fields, index_queryset
+
+logger = logging.getLogger(__name__)
+
+
+# Subdirectorio de MEDIA_ROOT donde se guardan los archivos de errores
+IMPORT_ERRORS_DIR = 'import_errors'
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Filas con error que se muestran como vista previa en la plantilla
+ERROR_PREVIEW_LIMIT = 20
+
+# Tamaño de bloque al leer el archivo para detectar la codificación
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class RowError(Exception):
+    """
+    Error de validación de una fila del CSV.
+
+    Args:
+        errors: dict {campo: [mensajes]} o lista de mensajes
+    """
+
+    def __init__(self, errors):
+        if not isinstance(errors, dict):
+            errors = {'row': list(errors) if isinstance(errors, (list, tuple)) else [str(errors)]}
+        # Normalizar a tipos simples (ErrorDict/ErrorList no se serializan a JSON)
+        errors = {field: [str(message) for message in messages] for field, messages in errors.items()}
+        self.errors = errors
+        super().__init__('; '.join(
+            f'{field}: {message}' for field, messages in errors.items() for message in messages
+        ))
+
+
+def detect_encoding(uploaded_file, encodings=('utf-8', 'iso-8859-1')):
+    """
+    Determina la codificación del archivo recorriéndolo por bloques con un
+    decodificador incremental, sin guardar el texto decodificado.
+
+    iso-8859-1 acepta cualquier secuencia de bytes, por lo que funciona como
+    último recurso (igual que la carga anterior).
+    """
+    for encoding in encodings:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        uploaded_file.seek(0)
+        try:
+            for chunk in uploaded_file.chunks(READ_CHUNK_SIZE):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            continue
+        finally:
+            uploaded_file.seek(0)
+        return encoding
+    raise UnicodeDecodeError(encodings[-1], b'', 0, 1, 'No se pudo decodificar el archivo')
+
+
+def error_file_path(filename):
+    """Ruta absoluta de un archivo de errores a partir de su nombre."""
+    return os.path.join(settings.MEDIA_ROOT, IMPORT_ERRORS_DIR, os.path.basename(filename))
+
+
+def error_file_owner(filename):
+    """
+    Retorna el pk (como texto) del usuario que generó el archivo de errores,
+    o None si el nombre no tiene el formato esperado.
+    """
+    parts = os.path.basename(filename).rsplit('.', 1)[0].split('-')
+    if len(parts) < 3:
+        return None
+    return parts[-2]
+
+
+def compute_import_hash(instance, fields):
+    """
+    Hash (sha256) del contenido importable de una instancia: los valores de
+    `fields` ya convertidos a tipos Python, en orden fijo.
+    """
+    payload = '\x1f'.join(f'{field.attname}={getattr(instance, field.attname)}' for field in fields)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CSVImporter:
+    """
+    Importador base de CSV por streaming y lotes.
+
+    Las subclases definen `model`, `form_class` y `unique_field`, y pueden
+    sobrescribir prepare_row(row) para convertir nombres a IDs (unidades,
+    estados, etc.) lanzando RowError si algo no se encuentra. setup() se
+    ejecuta una vez antes de leer el archivo y sirve para cargar esos mapas.
+
+    Con upsert=True las filas cuyo `unique_field` ya existe actualizan el
+    registro (bulk_create con update_conflicts). Cada registro guarda en
+    import_hash el hash del contenido importado; si una fila llega con el
+    mismo hash no se escribe y se cuenta como sin cambios.
+
+    La validación es por lote y por columna: los tipos se revisan con los
+    campos del modelo, las claves foráneas contra los IDs precargados y la
+    unicidad de `unique_field` con una sola consulta IN por lote. Solo las
+    filas que fallan esa validación rápida pasan por el ModelForm, que
+    produce los mensajes de error definitivos.
+    """
+
+    model = None
+    form_class = None
+    unique_field = None
+    delimiter = ';'
+    batch_size = DEFAULT_BATCH_SIZE
+    error_file_prefix = 'import'
+
+    def __init__(self, user=None, batch_size=None, progress=None, upsert=False):
+        self.user = user
+        self.progress = progress
+        self.upsert = upsert
+        if batch_size:
+            self.batch_size = batch_size
+        self.fieldnames = []
+        self.total_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.error_preview = []
+        self.error_filename = None
+        self._error_file = None
+        self._error_writer = None
+        # Claves únicas ya vistas en el archivo (detecta duplicados entre lotes)
+        self._seen_keys = {}
+
+    # ------------------------------------------------------------------
+    # Puntos de extensión
+    # ------------------------------------------------------------------
+
+    def setup(self):
+        """Carga los datos de referencia necesarios para validar las filas."""
+
+    def prepare_row(self, row):
+        """
+        Convierte los valores de texto de la fila al formato del formulario
+        (ej: nombre de unidad -> ID). Lanza RowError si no es posible.
+        """
+        return row
+
+    # ------------------------------------------------------------------
+    # Proceso
+    # ------------------------------------------------------------------
+
+    def run(self, uploaded_file):
+        """
+        Procesa el archivo completo.
+
+        Returns:
+            dict: 'total_rows', 'successful_rows' (insertadas + actualizadas),
+            'inserted_rows', 'updated_rows', 'unchanged_rows', 'error_count',
+            'error_preview' (primeras filas con error), 'error_file'
+            (nombre del archivo de errores o None) y 'upsert'
+        """
+        encoding = detect_encoding(uploaded_file)
+        if encoding == 'utf-8':
+            encoding = 'utf-8-sig'
+
+        self.setup()
+        self._load_field_validators()
+
+        text_stream = io.TextIOWrapper(uploaded_file.file, encoding=encoding, newline='')
+        try:
+            reader = csv.DictReader(text_stream, delimiter=self.delimiter)
+            if reader.fieldnames:
+                # Limpiar BOM y espacios en cabeceras
+                reader.fieldnames = [field.strip().replace('\ufeff', '') for field in reader.fieldnames]
+                self.fieldnames = list(reader.fieldnames)
+
+            batch = []
+            row_number = 1
+            for row in reader:
+                row_number += 1
+                self.total_rows += 1
+                # Limpiar espacios en valores
+                cleaned_row = {
+                    (k or '').strip(): v.strip() if isinstance(v, str) else v
+                    for k, v in row.items()
+                }
+
+                try:
+                    data = self.prepare_row(dict(cleaned_row))
+                except RowError as e:
+                    self.write_error(row_number, cleaned_row, e.errors)
+                    continue
+
+                batch.append((row_number, cleaned_row, data))
+                if len(batch) >= self.batch_size:
+                    self.flush(self.validate_batch(batch))
+                    batch = []
+                    self.report_progress()
+
+            if batch:
+                self.flush(self.validate_batch(batch))
+            self.report_progress(force=True)
+        finally:
+            # No cerrar el archivo subido junto con el wrapper
+            text_stream.detach()
+            self.close_error_file()
+
+        return {
+            'total_rows': self.total_rows,
+            'successful_rows': self.created + self.updated,
+            'inserted_rows': self.created,
+            'updated_rows': self.updated,
+            'unchanged_rows': self.unchanged,
+            'error_count': self.error_count,
+            'error_preview': self.error_preview,
+            'error_file': self.error_filename,
+            'upsert': self.upsert,
+        }
+
+    # ------------------------------------------------------------------
+    # Validación por lote
+    # ------------------------------------------------------------------
+
+    def _load_field_validators(self):
+        """
+        Prepara los campos a validar y los IDs válidos de cada clave foránea
+        (una consulta por tabla relacionada, una sola vez por archivo).
+        """
+        self.fields = [self.model._meta.get_field(name) for name in self.form_class._meta.fields]
+        self.update_fields = [field.name for field in self.fields if field.name != self.unique_field]
+        self.update_fields.append('import_hash')
+        if any(field.name == 'updated_at' for field in self.model._meta.fields):
+            self.update_fields.append('updated_at')
+        self.fk_ids = {
+            field.name: {str(pk) for pk in field.remote_field.model._default_manager.values_list('pk', flat=True)}
+            for field in self.fields if field.is_relation
+        }
+
+    def _clean_value(self, field, value):
+        """
+        Valida un valor con el campo del modelo. Es deliberadamente estricta:
+        ante cualquier duda lanza ValidationError y la fila pasa al formulario.
+
+        Un valor vacío en un campo blank=True se convierte en el valor vacío
+        del campo (None, '' o su default); el resto pasa por field.clean()
+        (to_python, choices/null/blank y validadores).
+        """
+        if value is None or value == '':
+            if field.get_internal_type() == 'BooleanField':
+                return False
+            if not field.blank:
+                raise ValidationError('required')
+            if field.null:
+                return None
+            if field.empty_strings_allowed:
+                return ''
+            if field.has_default():
+                return field.get_default()
+            raise ValidationError('required')
+        if field.is_relation:
+            if str(value) not in self.fk_ids[field.name]:
+                raise ValidationError('invalid_choice')
+            return int(value) if isinstance(value, int) or str(value).isdigit() else value
+        return field.clean(value, None)
+
+    def validate_batch(self, batch):
+        """
+        Valida un lote y retorna la lista (row_number, cleaned_row, instancia)
+        de las filas válidas. Las filas inválidas se escriben como errores.
+        """
+        cleaned = [{} for _ in batch]
+        failed = set()
+
+        # Tipos y validadores, columna por columna
+        for field in self.fields:
+            name = field.name
+            attname = field.attname
+            for index, (_, _, data) in enumerate(batch):
+                if index in failed:
+                    continue
+                try:
+                    cleaned[index][attname] = self._clean_value(field, data.get(name))
+                except (ValidationError, ValueError, TypeError):
+                    failed.add(index)
+
+        # Unicidad: duplicados dentro del archivo y contra la base (una consulta IN)
+        duplicate_errors = {}
+        if self.unique_field:
+            keys = {}
+            for index, (row_number, _, data) in enumerate(batch):
+                if index in failed:
+                    continue
+                key = cleaned[index][self.unique_field]
+                if key in self._seen_keys or key in keys:
+                    first_row = self._seen_keys.get(key) or keys[key]
+                    duplicate_errors[index] = {
+                        self.unique_field: [f'Valor repetido en el archivo (fila {first_row})']
+                    }
+                else:
+                    keys[key] = row_number
+            # En modo upsert las claves existentes son actualizaciones, no errores
+            existing = set(self.model._default_manager.filter(
+                **{f'{self.unique_field}__in': list(keys)}
+            ).values_list(self.unique_field, flat=True)) if keys and not self.upsert else set()
+            unique_message = None
+            for index, (row_number, _, data) in enumerate(batch):
+                if index in failed or index in duplicate_errors:
+                    continue
+                key = cleaned[index][self.unique_field]
+                if key in existing:
+                    if unique_message is None:
+                        unique_message = self.model(**cleaned[index]).unique_error_message(
+                            self.model, (self.unique_field,)
+                        ).messages
+                    duplicate_errors[index] = {self.unique_field: unique_message}
+                self._seen_keys.setdefault(key, row_number)
+
+        valid = []
+        for index, (row_number, cleaned_row, data) in enumerate(batch):
+            if index in duplicate_errors:
+                self.write_error(row_number, cleaned_row, duplicate_errors[index])
+            elif index in failed:
+                # Validación completa solo para las filas que la necesitan
+                instance = self.validate_with_form(row_number, cleaned_row, data)
+                if instance is not None:
+                    valid.append((row_number, cleaned_row, instance))
+            else:
+                instance = self.model(**cleaned[index])
+                instance.created_by = self.user
+                valid.append((row_number, cleaned_row, instance))
+        return valid
+
+    def validate_with_form(self, row_number, cleaned_row, data):
+        """Valida una fila con el ModelForm; retorna la instancia o None."""
+        existing = None
+        if self.upsert and data.get(self.unique_field):
+            # Validar contra el registro existente para que no cuente como duplicado
+            existing = self.model._default_manager.filter(
+                **{self.unique_field: data[self.unique_field]}
+            ).first()
+        form = self.form_class(data, instance=existing)
+        if not form.is_valid():
+            self.write_error(row_number, cleaned_row, RowError(form.errors).errors)
+            return None
+        key = form.cleaned_data.get(self.unique_field) if self.unique_field else None
+        if key is not None:
+            if key in self._seen_keys:
+                self.write_error(row_number, cleaned_row, {
+                    self.unique_field: [f'Valor repetido en el archivo (fila {self._seen_keys[key]})']
+                })
+                return None
+            self._seen_keys[key] = row_number
+        instance = form.save(commit=False)
+        if existing is not None:
+            # Se guarda con bulk_create por la clave única, no por pk
+            instance.pk = None
+        else:
+            instance.created_by = self.user
+        return instance
+
+    def flush(self, batch):
+        """
+        Guarda un lote con bulk_create (con update_conflicts en modo upsert).
+        Si el lote falla por integridad, se reintenta fila por fila para
+        guardar las válidas y reportar las demás.
+        """
+        for _, _, instance in batch:
+            instance.import_hash = compute_import_hash(instance, self.fields)
+
+        stored_hashes = {}
+        if self.upsert and batch:
+            # Una consulta por lote: qué claves existen y con qué contenido
+            keys = [getattr(instance, self.unique_field) for _, _, instance in batch]
+            stored_hashes = dict(self.model._default_manager.filter(
+                **{f'{self.unique_field}__in': keys}
+            ).values_list(self.unique_field, 'import_hash'))
+
+            changed = []
+            for row in batch:
+                instance = row[2]
+                key = getattr(instance, self.unique_field)
+                if key in stored_hashes and stored_hashes[key] == instance.import_hash:
+                    self.unchanged += 1
+                else:
+                    changed.append(row)
+            batch = changed
+            if not batch:
+                return
+
+        try:
+            with transaction.atomic():
+                self._bulk_save([instance for _, _, instance in batch])
+            for _, _, instance in batch:
+                self._count_saved(instance, stored_hashes)
+        except IntegrityError:
+            logger.info(f'Lote de {self.model.__name__} con conflictos; se guarda fila por fila')
+
+            for row_number, cleaned_row, instance in batch:
+                instance.pk = None
+                try:
+                    with transaction.atomic():
+                        self._bulk_save([instance])
+                    self._count_saved(instance, stored_hashes)
+                except IntegrityError as e:
+                    self.write_error(row_number, cleaned_row, {'database': [str(e)]})
+
+        # bulk_create no dispara señales: actualizar el índice de búsqueda del lote
+        if self.unique_field and get_search_fields(self.model):
+            index_queryset(self.model._default_manager.filter(**{
+                f'{self.unique_field}__in': [getattr(instance, self.unique_field) for _, _, instance in batch]
+            }))
+
+    def _bulk_save(self, instances):
+        if self.upsert:
+            self.model.objects.bulk_create(
+                instances,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=[self.unique_field],
+                update_fields=self.update_fields
+            )
+        else:
+            self.model.objects.bulk_create(instances, batch_size=self.batch_size)
+
+    def _count_saved(self, instance, stored_hashes):
+        if getattr(instance, self.unique_field) in stored_hashes:
+            self.updated += 1
+        else:
+            self.created += 1
+
+    def report_progress(self, force=False):
+        """Informa el avance al JobProgress cuando se ejecuta como tarea."""
+        if self.progress is not None:
+            self.progress.update(
+                self.total_rows,
+                message=(
+                    f'{self.created} nuevas, {self.updated} actualizadas, '
+                    f'{self.unchanged} sin cambios, {self.error_count} con errores'
+                ),
+                force=force
+            )
+
+    # ------------------------------------------------------------------
+    # Archivo de errores
+    # ------------------------------------------------------------------
+
+    def write_error(self, row_number, row, errors):
+        """Registra una fila con errores en el archivo CSV de errores."""
+        self.error_count += 1
+        messages = '; '.join(
+            f'{field}: {message}' for field, field_errors in errors.items() for message in field_errors
+        )
+
+        if len(self.error_preview) < ERROR_PREVIEW_LIMIT:
+            self.error_preview.append({'row': row_number, 'data': row, 'errors': errors})
+
+        if self._error_writer is None:
+            self.open_error_file()
+        self._error_writer.writerow(
+            [row_number, messages] + [row.get(field, '') for field in self.fieldnames]
+        )
+
+    def open_error_file(self):
+        directory = os.path.join(settings.MEDIA_ROOT, IMPORT_ERRORS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        owner = self.user.pk if self.user is not None and self.user.pk else 0
+        self.error_filename = f'{self.error_file_prefix}-{owner}-{uuid.uuid4().hex}.csv'
+        self._error_file = open(
+            os.path.join(directory, self.error_filename), 'w', newline='', encoding='utf-8-sig'
+        )
+        self._error_writer = csv.writer(self._error_file, delimiter=self.delimiter)
+        self._error_writer.writerow(['row', 'errors'] + self.fieldnames)
+
+    def close_error_file(self):
+        if self._error_file is not None:
+            self._error_file.close()
+            self._error_file = None
+
+
+def run_import_job(importer_class, job, progress):
+    """
+    Ejecuta un importador sobre el archivo de entrada de una tarea en
+    segundo plano (ver core.jobs). Retorna el resumen sin la vista previa
+    de errores, que queda en el archivo de errores.
+    """
+    path = os.path.join(settings.MEDIA_ROOT, job.input_file)
+    with open(path, 'rb') as handle:
+        importer = importer_class(
+            user=job.created_by,
+            progress=progress,
+            upsert=bool(job.params.get('upsert'))
+        )
+        result = importer.run(File(handle, name=path))
+    result.pop('error_preview', None)
+    return result
@@ -0,0 +1,269 @@
+"""
+Cola de tareas en segundo plano respaldada por la base de datos.
+
+No requiere un broker externo: las tareas se guardan en el modelo Job y el
+comando `python manage.py run_jobs` las ejecuta con un número acotado de
+hilos. Funciona con SQLite porque la toma de una tarea es un UPDATE
+condicional (status=PENDING) y solo un worker logra modificar la fila.
+
+Cada aplicación registra sus manejadores en un módulo jobs.py:
+
+    from core.jobs import register_job
+
+    @register_job('materials.import')
+    def import_materials(job, progress):
+        ...
+        return {'successful_rows': 10}
+
+El manejador recibe el Job y un JobProgress; lo que retorna se guarda en
+Job.result. Si lanza una excepción el Job queda como FAILED.
+"""
+
+import os
+import datetime
+import time
+import uuid
+import socket
+import logging
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from django.shortcuts import redirect
+from django.urls import resolve
+from django.contrib.messages.storage.base import BaseStorage
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+# Subdirectorios de MEDIA_ROOT para archivos de entrada y salida de tareas
+JOB_INPUTS_DIR = 'job_inputs'
+JOB_OUTPUTS_DIR = 'job_outputs'
+
+# Segundos mínimos entre escrituras de progreso de una misma tarea
+PROGRESS_UPDATE_INTERVAL = 1.0
+
+_registry = {}
+
+
+class UnknownJobType(Exception):
+    """El tipo de tarea no tiene un manejador registrado."""
+
+
+def register_job(job_type):
+    """Decorador que registra un manejador para un tipo de tarea."""
+    def decorator(func):
+        _registry[job_type] = func
+        return func
+    return decorator
+
+
+def get_handler(job_type):
+    try:
+        return _registry[job_type]
+    except KeyError:
+        raise UnknownJobType(f'Tipo de tarea no registrado: {job_type}')
+
+
+def autodiscover():
+    """Importa el módulo jobs.py de cada aplicación instalada."""
+    autodiscover_modules('jobs')
+
+
+def enqueue(job_type, params=None, user=None, input_file=''):
+    """
+    Crea una tarea pendiente.
+
+    Args:
+        job_type: Nombre registrado del manejador
+        params: Parámetros serializables a JSON
+        user: Usuario que solicita la tarea
+        input_file: Archivo de entrada relativo a MEDIA_ROOT (ver save_job_input)
+
+    Returns:
+        Job: La tarea creada
+    """
+    get_handler(job_type)
+    return Job.objects.create(
+        job_type=job_type,
+        params=params or {},
+        input_file=input_file,
+        created_by=user
+    )
+
+
+def save_job_input(uploaded_file, prefix='upload'):
+    """
+    Copia un archivo subido a MEDIA_ROOT/job_inputs por bloques y retorna la
+    ruta relativa para guardarla en Job.input_file.
+    """
+    directory = os.path.join(settings.MEDIA_ROOT, JOB_INPUTS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name)[1] or '.csv'
+    filename = f'{prefix}-{uuid.uuid4().hex}{extension}'
+    with open(os.path.join(directory, filename), 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return os.path.join(JOB_INPUTS_DIR, filename)
+
+
+def job_output_path(job, filename):
+    """
+    Ruta absoluta donde una tarea debe escribir su archivo de salida.
+    Registra el nombre relativo en job.output_file.
+    """
+    directory = os.path.join(settings.MEDIA_ROOT, JOB_OUTPUTS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    job.output_file = os.path.join(JOB_OUTPUTS_DIR, f'{job.pk}-{os.path.basename(filename)}')
+    return os.path.join(settings.MEDIA_ROOT, job.output_file)
+
+
+class JobProgress:
+    """
+    Reporta el avance de una tarea. Las escrituras se limitan a una por
+    segundo para no convertir el progreso en un cuello de botella.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self._last_write = 0
+
+    def update(self, current, total=None, message='', force=False):
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_UPDATE_INTERVAL:
+            return
+        self._last_write = now
+        fields = {'progress_current': current, 'progress_message': message[:255]}
+        if total is not None:
+            fields['progress_total'] = total
+        Job.objects.filter(pk=self.job.pk).update(**fields)
+
+
+def claim_next_job(worker_name):
+    """
+    Toma la tarea pendiente más antigua. El UPDATE condicional garantiza que
+    dos workers no ejecuten la misma tarea.
+
+    Returns:
+        Job o None si no hay tareas pendientes
+    """
+    while True:
+        job = Job.objects.filter(status=Job.STATUS_PENDING).order_by('created_at', 'id').first()
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker_name,
+            started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        # Otro worker la tomó primero; intentar con la siguiente
+
+
+def run_job(job):
+    """Ejecuta una tarea ya tomada y guarda su resultado o su error."""
+    close_old_connections()
+    try:
+        handler = get_handler(job.job_type)
+        progress = JobProgress(job)
+        result = handler(job, progress)
+        job.status = Job.STATUS_SUCCESS
+        job.result = result
+    except Exception as e:
+        logger.exception(f'Error en la tarea {job}')
+        job.status = Job.STATUS_FAILED
+        job.error = str(e)
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'error', 'output_file', 'finished_at'])
+        if job.input_file:
+            try:
+                os.remove(os.path.join(settings.MEDIA_ROOT, job.input_file))
+            except OSError:
+                pass
+        close_old_connections()
+    return job
+
+
+def requeue_stale_jobs(max_age_seconds):
+    """
+    Vuelve a dejar pendientes las tareas RUNNING que llevan más de
+    max_age_seconds (ej: el worker se detuvo a mitad de ejecución).
+    """
+    limit = timezone.now() - datetime.timedelta(seconds=max_age_seconds)
+    return Job.objects.filter(status=Job.STATUS_RUNNING, started_at__lt=limit).update(
+        status=Job.STATUS_PENDING,
+        worker='',
+        started_at=None
+    )
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# ==================== EXPORTACIONES ====================
+
+def enqueue_export(request, filename):
+    """
+    Encola la exportación CSV del listado actual (misma vista y mismos
+    filtros) y redirige a la página de seguimiento de la tarea.
+
+    Las vistas de listado la usan cuando reciben ?export=csv&background=1.
+    """
+    query = request.GET.copy()
+    query.pop('background', None)
+    job = enqueue(
+        'core.export_csv',
+        params={'path': request.path, 'query': query.urlencode(), 'filename': filename},
+        user=request.user
+    )
+    return redirect('job_detail', job_id=job.pk)
+
+
+@register_job('core.export_csv')
+def export_csv(job, progress):
+    """
+    Genera la exportación ejecutando la vista de listado con los filtros
+    guardados y escribe la respuesta en un archivo de salida.
+    """
+    # La vista filtra y autoriza con el usuario que pidió la exportación
+    user = job.created_by
+    if user is None or not user.is_active:
+        raise PermissionDenied(
+            'El usuario que solicitó la exportación ya no existe o está inactivo; '
+            'la exportación no se generó.'
+        )
+
+    path = job.params['path']
+    match = resolve(path)
+
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.GET = QueryDict(job.params.get('query', ''))
+    request.META = {'SERVER_NAME': 'localhost', 'SERVER_PORT': '80'}
+    request.user = user
+    request.resolver_match = match
+    # Los mensajes de la vista no tienen a quién mostrarse; se descartan
+    request._messages = BaseStorage(request)
+
+    response = match.func(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise ValueError(f'La exportación respondió con estado {response.status_code}')
+
+    with open(job_output_path(job, job.params.get('filename', 'export.csv')), 'wb') as output:
+        if response.streaming:
+            for chunk in response.streaming_content:
+                output.write(chunk)
+        else:
+            output.write(response.content)
+
+    return {'filename': job.params.get('filename', 'export.csv')}
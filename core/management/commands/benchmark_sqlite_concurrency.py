@@ -0,0 +1,223 @@
+"""
+Management command that measures concurrent write throughput on SQLite.
+
+Usage:
+    python manage.py benchmark_sqlite_concurrency
+    python manage.py benchmark_sqlite_concurrency --writers 8 --readers 4 --transactions 200
+    python manage.py benchmark_sqlite_concurrency --output sqlite-concurrency.json
+
+Copies the configured SQLite database twice to a temporary directory and
+runs the same workload on each copy:
+
+- default: Django's stock SQLite settings (rollback journal, deferred
+  transactions, 5 second busy timeout).
+- configured: the OPTIONS in settings.DATABASES['default'] (WAL, busy
+  timeout, IMMEDIATE transactions, ...).
+
+Each writer thread runs order-entry transactions: it reads the stock of a
+material, then creates a sales order with lines. Reader threads run list
+queries until the writers finish. The report shows committed
+transactions, "database is locked" failures and throughput per mode.
+The real database is not modified.
+"""
+
+import os
+import copy
+import json
+import time
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction, OperationalError, DEFAULT_DB_ALIAS
+from django.db.models import Sum
+from django.utils import timezone
+
+from customers.models import Customer
+from core.models import Currency
+from materials.models import Material
+from purchases.models import OrderStatus
+from sales.models import SalesOrder, SalesOrderLine
+from inventory.models import InventoryMovement
+
+
+BENCH_ALIAS = 'sqlite_concurrency_bench'
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent write throughput of default vs configured SQLite settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Writer threads (default: 8)')
+        parser.add_argument('--readers', type=int, default=2, help='Reader threads (default: 2)')
+        parser.add_argument('--transactions', type=int, default=100,
+                            help='Transactions per writer thread (default: 100)')
+        parser.add_argument('--lines', type=int, default=3, help='Lines per order (default: 3)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('This benchmark only applies to SQLite databases')
+
+        self.fixtures = self._load_fixtures()
+        tuned = copy.deepcopy(source)
+        modes = [
+            ('default', {'ENGINE': source['ENGINE'], 'OPTIONS': {}}),
+            ('configured', tuned),
+        ]
+
+        workdir = tempfile.mkdtemp(prefix='erp-sqlite-bench-')
+        results = {}
+        try:
+            for name, config in modes:
+                path = os.path.join(workdir, f'{name}.sqlite3')
+                self._copy_database(str(source['NAME']), path, wal=(name != 'default'))
+                results[name] = self._run_mode(dict(config, NAME=path), options)
+                self._report(name, results[name])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        base = results['default']['transactions_per_second']
+        if base:
+            gain = results['configured']['transactions_per_second'] / base
+            self.stdout.write(self.style.SUCCESS(f'Throughput gain: x{gain:.2f}'))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump({'options': {k: options[k] for k in ('writers', 'readers', 'transactions', 'lines')},
+                           'results': results}, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _load_fixtures(self):
+        customer = Customer.objects.filter(status=True).first()
+        currency = Currency.objects.first()
+        status = OrderStatus.objects.filter(symbol='DRAFT').first()
+        materials = list(Material.objects.values_list('pk', 'unit_id')[:500])
+        if not (customer and currency and status and materials):
+            raise CommandError('Needs at least one active customer, a currency, the DRAFT status and materials')
+        return {'customer_id': customer.pk, 'currency_id': currency.pk, 'status_id': status.pk,
+                'materials': materials}
+
+    def _copy_database(self, source_path, target_path, wal):
+        """Copia consistente con la API de backup, en el modo de diario indicado."""
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+            target.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        finally:
+            target.close()
+            source.close()
+
+    def _run_mode(self, config, options):
+        configured = connections.configure_settings({
+            DEFAULT_DB_ALIAS: copy.deepcopy(settings.DATABASES[DEFAULT_DB_ALIAS]),
+            BENCH_ALIAS: config,
+        })
+        connections.settings[BENCH_ALIAS] = configured[BENCH_ALIAS]
+
+        stop = threading.Event()
+        stats = {'committed': 0, 'reads': 0, 'errors': Counter()}
+        lock = threading.Lock()
+
+        def record(committed=0, reads=0, error=None):
+            with lock:
+                stats['committed'] += committed
+                stats['reads'] += reads
+                if error:
+                    stats['errors'][error] += 1
+
+        writers = [
+            threading.Thread(target=self._writer, args=(number, options, record))
+            for number in range(options['writers'])
+        ]
+        readers = [
+            threading.Thread(target=self._reader, args=(stop, record))
+            for _ in range(options['readers'])
+        ]
+        start = time.perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        del connections.settings[BENCH_ALIAS]
+
+        attempted = options['writers'] * options['transactions']
+        return {
+            'attempted': attempted,
+            'committed': stats['committed'],
+            'failed': attempted - stats['committed'],
+            'errors': dict(stats['errors']),
+            'elapsed_s': round(elapsed, 3),
+            'transactions_per_second': round(stats['committed'] / elapsed, 1) if elapsed else 0,
+            'reads_per_second': round(stats['reads'] / elapsed, 1) if elapsed else 0,
+        }
+
+    def _writer(self, number, options, record):
+        rng = random.Random(number)
+        fixtures = self.fixtures
+        try:
+            for index in range(options['transactions']):
+                order_id = f'BENCH-{number}-{index}'
+                lines = rng.sample(fixtures['materials'], min(options['lines'], len(fixtures['materials'])))
+                try:
+                    with transaction.atomic(using=BENCH_ALIAS):
+                        # Lectura previa a la escritura, como la validación de stock
+                        InventoryMovement.objects.using(BENCH_ALIAS).filter(
+                            material_id=lines[0][0]
+                        ).aggregate(total=Sum('quantity'))
+                        order = SalesOrder.objects.using(BENCH_ALIAS).create(
+                            id_sales_order=order_id,
+                            customer_id=fixtures['customer_id'],
+                            issue_date=timezone.localdate(),
+                            status_id=fixtures['status_id'],
+                        )
+                        SalesOrderLine.objects.using(BENCH_ALIAS).bulk_create([
+                            SalesOrderLine(
+                                id_sales_order_line=f'{order_id}-L{position:03d}',
+                                sales_order=order,
+                                material_id=material_id,
+                                position=position,
+                                quantity=rng.randint(1, 10),
+                                unit_material_id=unit_id,
+                                price=rng.randint(1, 100),
+                                currency_customer_id=fixtures['currency_id'],
+                            )
+                            for position, (material_id, unit_id) in enumerate(lines, start=1)
+                        ])
+                    record(committed=1)
+                except OperationalError as e:
+                    record(error=str(e))
+        finally:
+            connections[BENCH_ALIAS].close()
+
+    def _reader(self, stop, record):
+        try:
+            while not stop.is_set():
+                try:
+                    list(SalesOrder.objects.using(BENCH_ALIAS).order_by('-id').values_list('id_sales_order')[:50])
+                    record(reads=1)
+                except OperationalError as e:
+                    record(error=f'read: {e}')
+        finally:
+            connections[BENCH_ALIAS].close()
+
+    def _report(self, name, result):
+        self.stdout.write(
+            f"{name:<11} committed {result['committed']}/{result['attempted']} "
+            f"in {result['elapsed_s']}s -> {result['transactions_per_second']} tx/s, "
+            f"{result['reads_per_second']} reads/s"
+        )
+        for error, count in result['errors'].items():
+            self.stdout.write(self.style.WARNING(f'    {count} x {error}'))
@@ -0,0 +1,82 @@
+"""
+Management command that closes a fiscal period.
+
+Usage:
+    python manage.py close_fiscal_period 2026-09
+    python manage.py close_fiscal_period 2026-09 --archive
+    python manage.py close_fiscal_period 2026-09 --archive-only
+    python manage.py close_fiscal_period --list
+
+Saves the closing balance of every account and the stock of every
+(material, location), and marks the month as closed: journal entries,
+journal lines and inventory movements dated inside it can no longer be
+changed. Later balance and stock queries start from this snapshot.
+
+With --archive the period's journal lines and inventory movements are
+also moved to the archive tables, so the active tables only hold open
+periods. Periods close in order, one month after the other.
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import FiscalPeriod
+from core.periods import period_for_month, close_period, archive_period
+
+
+class Command(BaseCommand):
+    help = 'Close a fiscal period (YYYY-MM): snapshot balances and stock, lock it, optionally archive it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', nargs='?', help='Month to close, as YYYY-MM')
+        parser.add_argument('--archive', action='store_true',
+                            help='Also move the period journal lines and movements to the archive tables')
+        parser.add_argument('--archive-only', action='store_true',
+                            help='Archive an already closed period')
+        parser.add_argument('--user', help='Username recorded as closed_by')
+        parser.add_argument('--list', action='store_true', help='List the fiscal periods and exit')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for period in FiscalPeriod.objects.order_by('date_from'):
+                archived = ', archived' if period.archived else ''
+                self.stdout.write(
+                    f'{period.code}: {period.date_from} - {period.date_to} ({period.status}{archived})'
+                )
+            return
+
+        if not options['period']:
+            raise CommandError('Give the period to close as YYYY-MM (or use --list)')
+        try:
+            year, month = (int(part) for part in options['period'].split('-'))
+            period = period_for_month(year, month)
+        except ValueError:
+            raise CommandError(f"'{options['period']}' is not a valid YYYY-MM period")
+
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        start = time.perf_counter()
+        try:
+            if options['archive_only']:
+                archive_period(period)
+            else:
+                close_period(period, user=user, archive=options['archive'])
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+        elapsed = time.perf_counter() - start
+
+        accounts = period.account_snapshots.count()
+        stock = period.stock_snapshots.count()
+        archived = ' and archived' if period.archived else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'Period {period.code} closed{archived} in {elapsed:.2f}s: '
+            f'{accounts} account balances, {stock} stock rows'
+        ))
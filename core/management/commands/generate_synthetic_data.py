@@ -0,0 +1,79 @@
+"""
+Management command that fills the database with realistic synthetic data.
+
+Usage:
+    python manage.py generate_synthetic_data
+    python manage.py generate_synthetic_data --materials 50000 --customers 5000 --suppliers 1000 --years 3
+    python manage.py generate_synthetic_data --materials 0 --customers 0 --suppliers 0 --years 1 --seed 7
+
+Creates materials, customers and suppliers (codes prefixed with SYN-) and
+then walks day by day through the requested years creating purchase and
+sales orders with their lines, inventory movements and journal entries,
+all with historical dates. Sales only consume stock already received, so
+stock never goes negative. Orders from the last days are left CONFIRMED
+so there are pending deliveries to benchmark.
+
+Requires the reference data created by init_order_statuses,
+init_movement_types and init_inventory_location. Journal entries also
+need the accounts from create_essential_accounts; without them only
+orders and movements are generated.
+
+Meant for test and benchmark databases, never for production.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic master data, orders, movements and journal entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--materials', type=int, default=1000)
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--suppliers', type=int, default=200)
+        parser.add_argument('--years', type=float, default=2, help='Years of order history (default: 2)')
+        parser.add_argument('--purchases-per-day', type=int, default=5)
+        parser.add_argument('--sales-per-day', type=int, default=10)
+        parser.add_argument('--max-lines', type=int, default=5, help='Maximum lines per order')
+        parser.add_argument('--seed', type=int, help='Random seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--user', help='Username recorded as creator')
+        parser.add_argument('--draft-entries', action='store_true',
+                            help='Create journal entries as DRAFT instead of POSTED')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User '{options['user']}' not found")
+
+        generator = SyntheticDataGenerator(
+            seed=options['seed'],
+            user=user,
+            batch_size=max(1, options['batch_size']),
+            post_entries=not options['draft_entries'],
+            log=self.stdout.write
+        )
+        try:
+            generator.load_reference_data()
+            generator.create_materials(options['materials'])
+            generator.create_customers(options['customers'])
+            generator.create_suppliers(options['suppliers'])
+            if options['years'] > 0:
+                generator.create_orders(
+                    options['years'],
+                    options['purchases_per_day'],
+                    options['sales_per_day'],
+                    max(1, options['max_lines'])
+                )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write('')
+        for label, count in sorted(generator.summary().items()):
+            self.stdout.write(self.style.SUCCESS(f'{label}: {count} created'))
@@ -0,0 +1,62 @@
+"""
+Management command to bulk-import a master-data CSV (materials, customers, suppliers).
+
+Usage:
+    python manage.py import_csv materials /path/materials.csv
+    python manage.py import_csv suppliers /path/suppliers.csv --upsert --user admin
+
+Uses the same importers as the bulk upload views (';' delimiter, same
+columns as the download templates). With --upsert, rows whose ID already
+exists update the record and rows whose content did not change since the
+last import are skipped, which makes it suitable for nightly syncs.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+
+IMPORTERS = {
+    'materials': 'materials.utils.MaterialImporter',
+    'customers': 'customers.utils.CustomerImporter',
+    'suppliers': 'suppliers.utils.SupplierImporter',
+}
+
+
+class Command(BaseCommand):
+    help = 'Import materials, customers or suppliers from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=sorted(IMPORTERS.keys()))
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--upsert', action='store_true', help='Update existing records instead of rejecting them')
+        parser.add_argument('--user', help='Username recorded as creator of new records')
+        parser.add_argument('--batch-size', type=int, help='Rows per bulk_create batch')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User '{options['user']}' not found")
+
+        importer_class = import_string(IMPORTERS[options['target']])
+        importer = importer_class(user=user, batch_size=options['batch_size'], upsert=options['upsert'])
+
+        try:
+            with open(options['path'], 'rb') as handle:
+                result = importer.run(File(handle, name=options['path']))
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+
+        self.stdout.write(
+            f"Rows: {result['total_rows']}  inserted: {result['inserted_rows']}  "
+            f"updated: {result['updated_rows']}  unchanged: {result['unchanged_rows']}  "
+            f"errors: {result['error_count']}"
+        )
+        if result['error_file']:
+            self.stdout.write(self.style.WARNING(f"Rejected rows written to import_errors/{result['error_file']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Import completed'))
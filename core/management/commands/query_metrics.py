@@ -0,0 +1,120 @@
+"""
+Management command that measures queries and timings of the main views.
+
+Usage:
+    python manage.py query_metrics
+    python manage.py query_metrics reporting:sales_report /inventory/stock/ --repeat 3
+    python manage.py query_metrics --fail-over-budget --json metrics.json
+
+Each URL (a view name or a path) is requested through the full middleware
+stack as the given user, so QueryMetricsMiddleware records the same numbers
+it records in production. Prints queries, DB time, Python time and peak
+memory per view and flags views over their QUERY_BUDGETS entry.
+With --fail-over-budget the command exits with an error when any view is
+over budget, so it can run in CI to catch N+1 regressions.
+"""
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse, NoReverseMatch
+
+from core.benchmarks import client_host
+from core.metrics import registry
+
+
+DEFAULT_VIEWS = [
+    'dashboard',
+    'materials:materials_list',
+    'customers:customers_list',
+    'suppliers:suppliers_list',
+    'purchases:purchase_order_list',
+    'sales:sales_order_list',
+    'inventory:inventory_dashboard',
+    'inventory:inventory_movement_list',
+    'inventory:inventory_stock',
+    'manufacturing:work_order_list',
+    'accounting:journal_entry_list',
+    'reporting:dashboard',
+    'reporting:sales_report',
+    'reporting:purchases_report',
+    'reporting:inventory_report',
+    'reporting:accounting_report',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure query count, DB time, Python time and memory of the main views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help='View names or paths (default: main list and report views)')
+        parser.add_argument('--user', help='Username to request the views as (default: first superuser)')
+        parser.add_argument('--repeat', type=int, default=1, help='Requests per view (default: 1)')
+        parser.add_argument('--memory', action='store_true', help='Track peak memory with tracemalloc')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+        parser.add_argument('--fail-over-budget', action='store_true',
+                            help='Exit with an error if any view exceeds its query budget')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+            if user is None:
+                raise CommandError('No superuser found; use --user')
+
+        client = Client(raise_request_exception=False, HTTP_HOST=client_host())
+        client.force_login(user)
+
+        paths = []
+        for url in options['urls'] or DEFAULT_VIEWS:
+            if url.startswith('/'):
+                paths.append(url)
+                continue
+            try:
+                paths.append(reverse(url))
+            except NoReverseMatch:
+                raise CommandError(f"'{url}' is not a view name or a path")
+
+        registry.reset()
+        with override_settings(QUERY_METRICS_ENABLED=True, QUERY_METRICS_TRACK_MEMORY=options['memory']):
+            for path in paths:
+                for _ in range(max(1, options['repeat'])):
+                    response = client.get(path)
+                    if response.status_code >= 400:
+                        self.stderr.write(f'{path}: HTTP {response.status_code}')
+
+        results = registry.snapshot()
+        self._print_table(results)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
+
+        over_budget = [name for name, stats in results.items() if stats['over_budget']]
+        if over_budget:
+            message = f"{len(over_budget)} view(s) over query budget: {', '.join(over_budget)}"
+            if options['fail_over_budget']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+
+    def _print_table(self, results):
+        self.stdout.write(
+            f"{'View':<40} {'Queries':>8} {'Budget':>7} {'DB ms':>9} {'Python ms':>10} {'Peak KB':>9}"
+        )
+        for name, stats in results.items():
+            budget = stats['query_budget'] if stats['query_budget'] is not None else '-'
+            memory = stats['peak_memory_kb_max'] if stats['peak_memory_kb_max'] is not None else '-'
+            line = (
+                f"{name:<40} {stats['queries_max']:>8} {budget:>7} {stats['db_ms_avg']:>9} "
+                f"{stats['python_ms_avg']:>10} {memory:>9}"
+            )
+            self.stdout.write(self.style.ERROR(line) if stats['over_budget'] else line)
@@ -0,0 +1,32 @@
+"""
+Management command that rebuilds the full-text search index.
+
+Usage:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index customers.Customer
+
+Drops and recreates the FTS5 (SQLite) or tsvector (PostgreSQL) table of
+each indexed model and indexes every row. Needed after restoring a
+database or writing rows without the ORM; normal saves and bulk uploads
+keep the index up to date.
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core.search import SEARCH_INDEXES, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for materials, customers and suppliers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Model labels (default: all indexed models)')
+
+    def handle(self, *args, **options):
+        labels = options['models'] or list(SEARCH_INDEXES)
+        for label in labels:
+            if label not in SEARCH_INDEXES:
+                raise CommandError(f"'{label}' is not an indexed model. Choices: {', '.join(SEARCH_INDEXES)}")
+            count = rebuild_index(apps.get_model(label))
+            self.stdout.write(self.style.SUCCESS(f'{label}: {count} row(s) indexed'))
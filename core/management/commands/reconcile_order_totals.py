@@ -0,0 +1,53 @@
+"""
+Management command that repairs the stored totals of sales and purchase orders.
+
+Usage:
+    python manage.py reconcile_order_totals
+    python manage.py reconcile_order_totals --dry-run
+    python manage.py reconcile_order_totals --only sales --batch-size 5000
+
+Recomputes total_amount, line_count, currency and the delivered/received
+fraction of every order from its lines (one grouped query per batch) and
+rewrites the orders whose stored values drifted, e.g. after lines were
+changed with raw SQL or queryset.update().
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.order_totals import ORDER_TOTALS, reconcile
+
+
+# Máximo de IDs con diferencias que se listan por modelo
+SHOW_IDS = 20
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored order totals from the lines and fix drifted orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted orders without fixing them')
+        parser.add_argument('--only', choices=['sales', 'purchases'], help='Reconcile only this app')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Orders per batch (default: 1000)')
+
+    def handle(self, *args, **options):
+        fix = not options['dry_run']
+        total_drifted = 0
+        for label in ORDER_TOTALS:
+            if options['only'] and not label.startswith(options['only'] + '.'):
+                continue
+            model = apps.get_model(label)
+            checked, drifted = reconcile(model, fix=fix, batch_size=max(1, options['batch_size']))
+            total_drifted += len(drifted)
+
+            verb = 'fixed' if fix else 'drifted'
+            self.stdout.write(f'{label}: {checked} checked, {len(drifted)} {verb}')
+            if drifted:
+                shown = ', '.join(drifted[:SHOW_IDS])
+                more = f' (+{len(drifted) - SHOW_IDS} more)' if len(drifted) > SHOW_IDS else ''
+                self.stdout.write(self.style.WARNING(f'    {shown}{more}'))
+
+        if total_drifted and not fix:
+            self.stdout.write(self.style.WARNING('Run without --dry-run to fix them'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Order totals are consistent'))
@@ -0,0 +1,122 @@
+"""
+Management command that times the critical paths and writes JSON results.
+
+Usage:
+    python manage.py run_benchmarks
+    python manage.py run_benchmarks inventory.stock_view sales.deliver_orders --repeat 5
+    python manage.py run_benchmarks --output results/2026-10.json
+    python manage.py run_benchmarks --baseline results/release-1.json --max-regression 1.25
+
+Runs each benchmark registered in core.benchmarks (stock view, reports,
+CSV exports, bulk delivery, balance recalculation) after one warm-up run,
+and records min/median/max seconds and the query count. Benchmarks that
+write run inside a transaction that is rolled back.
+
+The JSON file also stores the dataset size, so results are only compared
+between databases of the same volume (see generate_synthetic_data).
+With --baseline the medians are compared and the command fails when any
+benchmark is slower than baseline * --max-regression.
+"""
+
+import json
+import platform
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.benchmarks import get_benchmarks, run_benchmarks, dataset_size, compare
+
+
+class Command(BaseCommand):
+    help = 'Run the benchmark suite and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Benchmarks to run (default: all)')
+        parser.add_argument('--repeat', type=int, default=3, help='Measured runs per benchmark (default: 3)')
+        parser.add_argument('--user', help='Username to run as (default: first superuser)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='JSON file from a previous run to compare against')
+        parser.add_argument('--max-regression', type=float, default=1.25,
+                            help='Allowed median ratio against the baseline (default: 1.25)')
+        parser.add_argument('--list', action='store_true', help='List the available benchmarks and exit')
+
+    def handle(self, *args, **options):
+        available = get_benchmarks()
+        if options['list']:
+            for name, func in sorted(available.items()):
+                self.stdout.write(f"{name:<36} {(func.__doc__ or '').strip()}")
+            return
+
+        names = options['names'] or sorted(available)
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise CommandError(f"Unknown benchmark(s): {', '.join(unknown)}. Use --list.")
+
+        User = get_user_model()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+            if user is None:
+                raise CommandError('No superuser found; use --user')
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as source:
+                    baseline = json.load(source)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline: {e}')
+
+        dataset = dataset_size()
+        self.stdout.write('Dataset: ' + ', '.join(f'{label.split(".")[1]}={count}' for label, count in dataset.items()))
+        self.stdout.write(f"{'Benchmark':<36} {'Median s':>9} {'Min s':>8} {'Max s':>8} {'Queries':>8}")
+
+        def log(name, result):
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(f"{name:<36} {result['error']}"))
+            else:
+                self.stdout.write(
+                    f"{name:<36} {result['median_s']:>9} {result['min_s']:>8} "
+                    f"{result['max_s']:>8} {result['queries']:>8}"
+                )
+
+        results = run_benchmarks(names, user, repeat=options['repeat'], log=log)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'dataset': dataset,
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is None:
+            return
+
+        if baseline.get('dataset') != dataset:
+            self.stdout.write(self.style.WARNING('Dataset size differs from the baseline; ratios are indicative only'))
+        self.stdout.write('')
+        self.stdout.write(f"{'Benchmark':<36} {'Baseline s':>10} {'Current s':>10} {'Ratio':>7}")
+        regressions = []
+        for name, base, current, ratio, regressed in compare(results, baseline, options['max_regression']):
+            line = f"{name:<36} {base:>10} {current:>10} {ratio if ratio is None else round(ratio, 2):>7}"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+            if regressed:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} benchmark(s) slower than baseline x{options['max_regression']}: "
+                f"{', '.join(regressions)}"
+            )
@@ -0,0 +1,84 @@
+"""
+Management command that runs background jobs (imports, exports, recalculations).
+
+Usage:
+    python manage.py run_jobs
+    python manage.py run_jobs --workers 4
+    python manage.py run_jobs --once
+
+Jobs are stored in the Job table (core.models) and claimed with a
+conditional UPDATE, so several workers can run against the same database
+(including SQLite) without running a job twice. At most --workers jobs run
+at the same time; each one in its own thread with its own DB connection.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import (
+    autodiscover, claim_next_job, run_job, requeue_stale_jobs, default_worker_name
+)
+
+
+def _run_in_thread(job):
+    try:
+        return run_job(job)
+    finally:
+        # Cada hilo abre su propia conexión; cerrarla al terminar
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run pending background jobs with bounded concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Maximum jobs running at once')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between polls when idle')
+        parser.add_argument('--once', action='store_true', help='Run the pending jobs and exit')
+        parser.add_argument(
+            '--requeue-after',
+            type=int,
+            default=3600,
+            help='Requeue RUNNING jobs older than this many seconds on startup (0 disables)'
+        )
+
+    def handle(self, *args, **options):
+        autodiscover()
+        workers = max(1, options['workers'])
+        worker_name = default_worker_name()
+
+        if options['requeue_after']:
+            requeued = requeue_stale_jobs(options['requeue_after'])
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+
+        self.stdout.write(f'Worker {worker_name} started ({workers} thread(s))')
+        running = set()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    # Tomar tareas mientras haya hilos libres
+                    while len(running) < workers:
+                        job = claim_next_job(worker_name)
+                        if job is None:
+                            break
+                        self.stdout.write(f'Running {job}')
+                        running.add(executor.submit(_run_in_thread, job))
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = future.result()
+                        style = self.style.SUCCESS if job.status == job.STATUS_SUCCESS else self.style.ERROR
+                        self.stdout.write(style(f'Finished {job}'))
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping; waiting for running jobs to finish...')
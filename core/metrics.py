@@ -0,0 +1,184 @@
+"""
+Métricas por vista: número de consultas, tiempo en base de datos, tiempo
+de Python y (opcional) pico de memoria de cada petición.
+
+QueryMetricsMiddleware cuenta las consultas con connection.execute_wrapper,
+así que funciona con DEBUG=False. Los acumulados se guardan en memoria del
+proceso, agrupados por nombre de vista (ej: 'reporting:sales_report'), y se
+consultan en /metrics/ (solo superusuarios).
+
+Cuando una vista supera su presupuesto de consultas se registra un warning
+en el logger 'core.metrics' para detectar regresiones N+1 en producción.
+
+Configuración (settings.py):
+
+    QUERY_METRICS_ENABLED = True
+    QUERY_BUDGET_DEFAULT = 100                    # None = sin límite
+    QUERY_BUDGETS = {'reporting:sales_report': 50}
+    QUERY_METRICS_TRACK_MEMORY = False            # tracemalloc, costoso
+"""
+
+import time
+import threading
+import logging
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def get_budget(view_name):
+    """Presupuesto de consultas de una vista (None = sin límite)."""
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    if view_name in budgets:
+        return budgets[view_name]
+    return getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+
+
+def view_name_for(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class QueryCollector:
+    """execute_wrapper que cuenta consultas y suma su tiempo."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.count += 1
+
+    def capture(self):
+        """Context manager que registra el collector en todas las conexiones."""
+        stack = ExitStack()
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(self))
+        return stack
+
+
+# ==================== ACUMULADOS ====================
+
+class MetricsRegistry:
+    """Acumulados por vista, en memoria del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self.started_at = time.time()
+
+    def record(self, view_name, queries, db_time, total_time, peak_memory=None):
+        python_time = max(total_time - db_time, 0.0)
+        budget = get_budget(view_name)
+        over_budget = budget is not None and queries > budget
+        with self._lock:
+            stats = self._views.setdefault(view_name, {
+                'requests': 0,
+                'queries_total': 0,
+                'queries_max': 0,
+                'db_time_total': 0.0,
+                'python_time_total': 0.0,
+                'time_max': 0.0,
+                'peak_memory_max': None,
+                'over_budget': 0,
+            })
+            stats['requests'] += 1
+            stats['queries_total'] += queries
+            stats['queries_max'] = max(stats['queries_max'], queries)
+            stats['db_time_total'] += db_time
+            stats['python_time_total'] += python_time
+            stats['time_max'] = max(stats['time_max'], total_time)
+            if peak_memory is not None:
+                stats['peak_memory_max'] = max(stats['peak_memory_max'] or 0, peak_memory)
+            if over_budget:
+                stats['over_budget'] += 1
+        return budget, over_budget
+
+    def snapshot(self):
+        """Métricas por vista con promedios, listas para JSON."""
+        with self._lock:
+            views = {name: dict(stats) for name, stats in self._views.items()}
+        result = {}
+        for name, stats in sorted(views.items()):
+            requests = stats['requests']
+            result[name] = {
+                'requests': requests,
+                'queries_avg': round(stats['queries_total'] / requests, 1),
+                'queries_max': stats['queries_max'],
+                'query_budget': get_budget(name),
+                'over_budget': stats['over_budget'],
+                'db_ms_avg': round(stats['db_time_total'] * 1000 / requests, 2),
+                'python_ms_avg': round(stats['python_time_total'] * 1000 / requests, 2),
+                'total_ms_max': round(stats['time_max'] * 1000, 2),
+                'peak_memory_kb_max': (
+                    round(stats['peak_memory_max'] / 1024, 1) if stats['peak_memory_max'] is not None else None
+                ),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self.started_at = time.time()
+
+
+registry = MetricsRegistry()
+
+
+# ==================== MIDDLEWARE ====================
+
+class QueryMetricsMiddleware:
+    """
+    Mide cada petición y acumula los resultados en `registry`.
+
+    Va al inicio de MIDDLEWARE para incluir el costo de los demás
+    middlewares. Las respuestas en streaming se miden hasta que la vista
+    retorna, no mientras se envía el contenido.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        # tracemalloc es global al proceso: solo se usa si nadie más lo inició
+        track_memory = getattr(settings, 'QUERY_METRICS_TRACK_MEMORY', False) and not tracemalloc.is_tracing()
+        if track_memory:
+            tracemalloc.start()
+
+        collector = QueryCollector()
+        start = time.perf_counter()
+        try:
+            with collector.capture():
+                response = self.get_response(request)
+        finally:
+            total_time = time.perf_counter() - start
+            peak_memory = None
+            if track_memory:
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+        view_name = view_name_for(request)
+        if view_name:
+            budget, over_budget = registry.record(
+                view_name, collector.count, collector.db_time, total_time, peak_memory
+            )
+            if over_budget:
+                logger.warning(
+                    f'{view_name} ejecutó {collector.count} consultas '
+                    f'(presupuesto {budget}) en {request.path}'
+                )
+        return response
@@ -7,36 +7,41 @@ class Migration(migrations.Migration):
 
     dependencies = [
         ('core', '0001_initial'),
+        ('accounting', '0001_initial'),
     ]
 
+    # Las tablas countries y currencies ya las crea accounting.0001_initial;
+    # aquí solo se mueve el modelo (accounting.0003 lo quita de esa app).
     operations = [
-        migrations.CreateModel(
-            name='Country',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('code', models.CharField(max_length=10, unique=True)),
-                ('name', models.CharField(max_length=100)),
-            ],
-            options={
-                'verbose_name': 'Country',
-                'verbose_name_plural': 'Countries',
-                'db_table': 'countries',
-                'ordering': ['name'],
-            },
-        ),
-        migrations.CreateModel(
-            name='Currency',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('code', models.CharField(max_length=10, unique=True)),
-                ('name', models.CharField(max_length=100)),
-                ('symbol', models.CharField(max_length=10)),
-            ],
-            options={
-                'verbose_name': 'Currency',
-                'verbose_name_plural': 'Currencies',
-                'db_table': 'currencies',
-                'ordering': ['code'],
-            },
-        ),
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.CreateModel(
+                name='Country',
+                fields=[
+                    ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                    ('code', models.CharField(max_length=10, unique=True)),
+                    ('name', models.CharField(max_length=100)),
+                ],
+                options={
+                    'verbose_name': 'Country',
+                    'verbose_name_plural': 'Countries',
+                    'db_table': 'countries',
+                    'ordering': ['name'],
+                },
+            ),
+            migrations.CreateModel(
+                name='Currency',
+                fields=[
+                    ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                    ('code', models.CharField(max_length=10, unique=True)),
+                    ('name', models.CharField(max_length=100)),
+                    ('symbol', models.CharField(max_length=10)),
+                ],
+                options={
+                    'verbose_name': 'Currency',
+                    'verbose_name_plural': 'Currencies',
+                    'db_table': 'currencies',
+                    'ordering': ['code'],
+                },
+            ),
+        ]),
     ]
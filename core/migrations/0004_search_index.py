@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+SEARCH_MODELS = [
+    ('materials', 'Material'),
+    ('customers', 'Customer'),
+    ('suppliers', 'Supplier'),
+]
+
+
+def create_search_index(apps, schema_editor):
+    """Crea las tablas de búsqueda (FTS5 / tsvector) e indexa los datos existentes."""
+    from core.search import create_search_tables, index_queryset
+
+    models = [apps.get_model(app_label, model_name) for app_label, model_name in SEARCH_MODELS]
+    create_search_tables(schema_editor.connection, models)
+    for model in models:
+        index_queryset(model.objects.using(schema_editor.connection.alias).all())
+
+
+def drop_search_index(apps, schema_editor):
+    from core.search import drop_search_tables
+
+    models = [apps.get_model(app_label, model_name) for app_label, model_name in SEARCH_MODELS]
+    drop_search_tables(schema_editor.connection, models)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_job'),
+        ('materials', '0004_material_import_hash'),
+        ('customers', '0004_customer_import_hash'),
+        ('suppliers', '0004_supplier_import_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FiscalPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(help_text='Identificador del período (ej: 2026-09)', max_length=20, unique=True)),
+                ('date_from', models.DateField()),
+                ('date_to', models.DateField(unique=True)),
+                ('status', models.CharField(choices=[('OPEN', 'Abierto'), ('CLOSED', 'Cerrado')], default='OPEN', max_length=10)),
+                ('archived', models.BooleanField(default=False, help_text='Las líneas de asiento y movimientos del período se movieron a las tablas de archivo')),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='closed_periods', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Fiscal Period',
+                'verbose_name_plural': 'Fiscal Periods',
+                'db_table': 'fiscal_periods',
+                'ordering': ['-date_to'],
+                'indexes': [models.Index(fields=['status', 'date_to'], name='fiscal_peri_status_dac9ac_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.conf import settings
 
 class Status(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -38,3 +39,118 @@ class Country(models.Model):
     
     def __str__(self):
         return self.name
+
+
+class Job(models.Model):
+    """
+    Tarea en segundo plano (importaciones, exportaciones, recálculos).
+
+    Las vistas crean el registro con core.jobs.enqueue() y el comando
+    run_jobs lo ejecuta fuera del ciclo de la petición HTTP.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_SUCCESS = 'SUCCESS'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCESS, 'Success'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job_type = models.CharField(max_length=100, help_text="Nombre registrado del manejador (ej: materials.import)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    params = models.JSONField(default=dict, blank=True)
+    input_file = models.CharField(max_length=255, blank=True, help_text="Archivo de entrada relativo a MEDIA_ROOT")
+    output_file = models.CharField(max_length=255, blank=True, help_text="Archivo generado relativo a MEDIA_ROOT")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    progress_current = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    progress_message = models.CharField(max_length=255, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "jobs"
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.job_type} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCESS, self.STATUS_FAILED)
+
+    def get_progress_percent(self):
+        """Porcentaje de avance, o None si el total no se conoce."""
+        if self.status == self.STATUS_SUCCESS:
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, int(self.progress_current * 100 / self.progress_total))
+
+
+class FiscalPeriod(models.Model):
+    """
+    Período contable (normalmente un mes).
+
+    Al cerrarlo (core.periods.close_period) se guardan los saldos de
+    cierre por cuenta y el stock por (material, ubicación), y el período
+    queda inmutable: no se aceptan asientos ni movimientos con fecha
+    dentro de él. Los cálculos de saldos y stock parten del último cierre.
+    """
+    STATUS_OPEN = 'OPEN'
+    STATUS_CLOSED = 'CLOSED'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Abierto'),
+        (STATUS_CLOSED, 'Cerrado'),
+    ]
+
+    code = models.CharField(max_length=20, unique=True, help_text="Identificador del período (ej: 2026-09)")
+    date_from = models.DateField()
+    date_to = models.DateField(unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    archived = models.BooleanField(
+        default=False,
+        help_text="Las líneas de asiento y movimientos del período se movieron a las tablas de archivo"
+    )
+    closed_at = models.DateTimeField(null=True, blank=True)
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='closed_periods'
+    )
+
+    class Meta:
+        db_table = "fiscal_periods"
+        verbose_name = "Fiscal Period"
+        verbose_name_plural = "Fiscal Periods"
+        ordering = ['-date_to']
+        indexes = [
+            models.Index(fields=['status', 'date_to']),
+        ]
+
+    def __str__(self):
+        return f"{self.code} ({self.get_status_display()})"
+
+    @property
+    def is_closed(self):
+        return self.status == self.STATUS_CLOSED
@@ -0,0 +1,169 @@
+"""
+Totales almacenados en la cabecera de las órdenes de venta y de compra.
+
+SalesOrder y PurchaseOrder guardan total_amount, line_count, currency
+(moneda común de las líneas) y la fracción entregada/recibida, para que
+listados, reportes y asientos contables no tengan que recorrer las líneas.
+
+Cómo se mantienen al día (igual que los totales de JournalEntry):
+
+- save() / delete() de las líneas llaman a order.refresh_totals()
+- los caminos masivos que no pasan por save() (bulk_create, update())
+  llaman a refresh_totals() con las órdenes afectadas
+- `python manage.py reconcile_order_totals` detecta y repara diferencias
+"""
+
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Sum, Count, Min, Max, F, DecimalField
+
+
+ORDER_TOTALS = {
+    'sales.SalesOrder': {
+        'id_field': 'id_sales_order',
+        'line_model': 'sales.SalesOrderLine',
+        'order_field': 'sales_order',
+        'currency_field': 'currency_customer',
+        'progress_field': 'delivered_quantity',
+        'fraction_field': 'delivered_fraction',
+    },
+    'purchases.PurchaseOrder': {
+        'id_field': 'id_purchase_order',
+        'line_model': 'purchases.PurchaseOrderLine',
+        'order_field': 'purchase_order',
+        'currency_field': 'currency_supplier',
+        'progress_field': 'received_quantity',
+        'fraction_field': 'received_fraction',
+    },
+}
+
+REFRESH_BATCH_SIZE = 500
+
+_CENTS = Decimal('0.01')
+_FRACTION = Decimal('0.0001')
+
+
+def _config(order_model):
+    return ORDER_TOTALS[order_model._meta.label]
+
+
+def total_fields(order_model):
+    """Campos de cabecera que mantiene este módulo."""
+    return ['total_amount', 'line_count', 'currency', _config(order_model)['fraction_field']]
+
+
+def compute_totals(order_model, order_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Calcula los totales de las órdenes indicadas con una consulta agrupada
+    sobre sus líneas.
+
+    Returns:
+        dict: {pk de la orden: {campo: valor}}; las órdenes sin líneas
+        quedan en cero
+    """
+    config = _config(order_model)
+    line_model = apps.get_model(config['line_model'])
+    order_id = f"{config['order_field']}_id"
+    currency_id = f"{config['currency_field']}_id"
+    fraction_field = config['fraction_field']
+
+    totals = {
+        pk: {'total_amount': Decimal('0.00'), 'line_count': 0, 'currency_id': None, fraction_field: Decimal('0')}
+        for pk in order_ids
+    }
+    rows = (
+        line_model.objects.using(using)
+        .filter(**{f'{order_id}__in': list(totals)})
+        .values(order_id)
+        .annotate(
+            count=Count('id'),
+            total=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=20, decimal_places=2)),
+            currency_min=Min(currency_id),
+            currency_max=Max(currency_id),
+            ordered=Sum('quantity'),
+            progress=Sum(config['progress_field']),
+        )
+        .order_by()
+    )
+    for row in rows:
+        ordered = row['ordered'] or 0
+        fraction = Decimal(row['progress'] or 0) / ordered if ordered > 0 else Decimal('0')
+        totals[row[order_id]] = {
+            'total_amount': Decimal(row['total'] or 0).quantize(_CENTS),
+            'line_count': row['count'],
+            'currency_id': row['currency_min'] if row['currency_min'] == row['currency_max'] else None,
+            fraction_field: min(fraction, Decimal('1')).quantize(_FRACTION),
+        }
+    return totals
+
+
+def _write(order_model, totals, using):
+    orders = [order_model(pk=pk, **values) for pk, values in totals.items()]
+    order_model.objects.using(using).bulk_update(
+        orders, total_fields(order_model), batch_size=REFRESH_BATCH_SIZE
+    )
+
+
+def refresh_totals(order_model, order_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Recalcula y guarda los totales de las órdenes indicadas.
+
+    Returns:
+        dict: los totales escritos, como compute_totals()
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    totals = {}
+    for start in range(0, len(order_ids), REFRESH_BATCH_SIZE):
+        chunk = compute_totals(order_model, order_ids[start:start + REFRESH_BATCH_SIZE], using)
+        _write(order_model, chunk, using)
+        totals.update(chunk)
+    return totals
+
+
+def _differs(order, values):
+    for field, value in values.items():
+        stored = getattr(order, field)
+        if field == 'currency_id':
+            if stored != value:
+                return True
+        elif Decimal(stored or 0) != Decimal(value or 0):
+            return True
+    return False
+
+
+def reconcile(order_model, fix=True, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """
+    Compara los totales almacenados con los calculados desde las líneas.
+
+    Args:
+        fix: si es True, corrige las órdenes con diferencias
+
+    Returns:
+        tuple: (órdenes revisadas, lista de IDs de negocio con diferencias)
+    """
+    config = _config(order_model)
+    id_field = config['id_field']
+    checked = 0
+    drifted = []
+    last_pk = 0
+    while True:
+        orders = list(
+            order_model.objects.using(using)
+            .filter(pk__gt=last_pk).order_by('pk')
+            .only(id_field, 'total_amount', 'line_count', 'currency', config['fraction_field'])[:batch_size]
+        )
+        if not orders:
+            break
+        last_pk = orders[-1].pk
+        checked += len(orders)
+        totals = compute_totals(order_model, [order.pk for order in orders], using)
+        stale = {order.pk: totals[order.pk] for order in orders if _differs(order, totals[order.pk])}
+        drifted.extend(getattr(order, id_field) for order in orders if order.pk in stale)
+        if fix and stale:
+            _write(order_model, stale, using)
+    return checked, drifted
+
@@ -0,0 +1,284 @@
+"""
+Paginación por cursor (keyset / seek) para listados grandes.
+
+A diferencia de django.core.paginator.Paginator, no usa OFFSET ni COUNT(*):
+cada página se obtiene filtrando a partir de los valores de la última fila
+de la página anterior, por lo que la página 4.000 cuesta lo mismo que la 1.
+
+El ordenamiento debe terminar en un campo único y no nulo (ej: '-id') para
+que el cursor identifique una posición exacta.
+
+Uso típico en una vista de listado:
+
+    page_obj, pagination = paginate_keyset(request, queryset, 10, ('-created_at', '-id'))
+    context = {'page_obj': page_obj, **pagination}
+
+y en la plantilla: {% include "core/partials/pagination.html" %}
+"""
+
+import hashlib
+import datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Q
+
+
+# Parámetros GET que controla el paginador (se excluyen al armar los enlaces)
+CURSOR_PARAMS = ('after', 'before', 'page', 'export')
+
+CURSOR_SALT = 'core.pagination.cursor'
+
+# Segundos que se reutiliza un conteo exacto en modo 'cached'
+COUNT_CACHE_TIMEOUT = 60
+
+
+class InvalidCursor(Exception):
+    """El cursor recibido no se puede decodificar o fue alterado."""
+
+
+def _serialize(value):
+    """Convierte un valor de ordenamiento a un tipo JSON sin perder precisión."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    """
+    Codifica los valores de ordenamiento de una fila como cursor opaco.
+    El cursor va firmado, así que no se puede editar a mano en la URL.
+    """
+    return signing.dumps([_serialize(value) for value in values], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor):
+    """Decodifica un cursor generado por encode_cursor()."""
+    try:
+        values = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list):
+        raise InvalidCursor('Formato de cursor inválido')
+    return values
+
+
+class KeysetPage:
+    """
+    Página de resultados de KeysetPaginator.
+
+    Expone has_next/has_previous y los cursores para construir los enlaces
+    de navegación (?after=... / ?before=...).
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, count=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Paginador por cursor sobre un queryset.
+
+    Uso:
+        paginator = KeysetPaginator(queryset, 25, ordering=('-date', '-id_journal_entry'))
+        page = paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = list(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def _seek_filter(self, values, forward):
+        """
+        Construye el filtro "después de" (o "antes de") la fila con estos valores.
+
+        Para ('-date', '-id') hacia adelante equivale a:
+            date < v1 OR (date = v1 AND id < v2)
+        """
+        if len(values) != len(self.fields):
+            raise InvalidCursor('El cursor no corresponde al ordenamiento')
+
+        condition = Q()
+        for index, order_field in enumerate(self.ordering):
+            descending = order_field.startswith('-')
+            # Hacia adelante: desc -> lt, asc -> gt. Hacia atrás se invierte.
+            lookup = 'lt' if descending == forward else 'gt'
+            term = Q(**{f'{self.fields[index]}__{lookup}': values[index]})
+            for previous_index in range(index):
+                term &= Q(**{self.fields[previous_index]: values[previous_index]})
+            condition |= term
+        return condition
+
+    def _cursor_for(self, obj):
+        values = []
+        for field in self.fields:
+            value = obj
+            for part in field.split('__'):
+                value = getattr(value, part)
+            values.append(getattr(value, 'pk', value))
+        return encode_cursor(values)
+
+    def get_page(self, after=None, before=None):
+        """
+        Retorna la página que sigue a `after` o la que precede a `before`.
+        Sin cursor retorna la primera página. Un cursor inválido también.
+        """
+        queryset = self.queryset
+        forward = True
+        cursor = after or before
+
+        if cursor:
+            try:
+                values = decode_cursor(cursor)
+                forward = not before or bool(after)
+                queryset = queryset.filter(self._seek_filter(values, forward))
+            except InvalidCursor:
+                cursor = None
+                forward = True
+
+        if forward:
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            reversed_ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in self.ordering
+            ]
+            queryset = queryset.order_by(*reversed_ordering)
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if forward:
+            has_next = has_more
+            has_previous = bool(cursor)
+        else:
+            rows.reverse()
+            has_next = True
+            has_previous = has_more
+
+        return KeysetPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=self._cursor_for(rows[-1]) if rows and has_next else None,
+            previous_cursor=self._cursor_for(rows[0]) if rows and has_previous else None,
+        )
+
+
+def estimate_count(queryset, limit=1000):
+    """
+    Cuenta aproximada para mostrar junto a un listado paginado por cursor.
+
+    - Sin filtros en PostgreSQL usa la estadística del planificador (reltuples).
+    - En otro caso cuenta como máximo `limit` filas.
+
+    Returns:
+        tuple: (cantidad, es_exacta). Si es_exacta es False la cantidad es
+        una estimación o un mínimo ("más de limit").
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] > limit:
+            return int(row[0]), False
+
+    count = queryset.order_by()[:limit + 1].count()
+    if count > limit:
+        return limit, False
+    return count, True
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """
+    Conteo exacto reutilizado durante `timeout` segundos para la misma consulta.
+    Navegar entre páginas con los mismos filtros no repite el COUNT(*).
+
+    Returns:
+        tuple: (cantidad, True)
+    """
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        # Filtros que no pueden devolver filas (ej: pk__in=[])
+        return 0, True
+    key = 'core.pagination.count.' + hashlib.md5(f'{sql}{params!r}'.encode('utf-8')).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.order_by().count()
+        cache.set(key, count, timeout)
+    return count, True
+
+
+def querystring_without(request, *keys):
+    """
+    Retorna el querystring actual sin los parámetros indicados
+    (por defecto los del paginador), listo para concatenar con '&'.
+    """
+    querystring = request.GET.copy()
+    for key in keys or CURSOR_PARAMS:
+        querystring.pop(key, None)
+    return querystring.urlencode()
+
+
+def paginate_keyset(request, queryset, per_page, ordering, count='cached'):
+    """
+    Pagina un queryset por cursor leyendo ?after= / ?before= del request.
+
+    Args:
+        request: HttpRequest de la vista
+        queryset: Queryset ya filtrado
+        per_page: Filas por página
+        ordering: Ordenamiento, terminando en un campo único (ej: ('-created_at', '-id'))
+        count: 'cached' (conteo exacto cacheado), 'estimate' (aproximado) o
+            None (sin conteo)
+
+    Returns:
+        tuple: (page_obj, contexto) donde contexto incluye
+        'pagination_querystring', 'total_count' y 'total_is_exact'
+    """
+    paginator = KeysetPaginator(queryset, per_page, ordering)
+    page_obj = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before')
+    )
+
+    if count == 'cached':
+        total_count, total_is_exact = cached_count(queryset)
+    elif count == 'estimate':
+        total_count, total_is_exact = estimate_count(queryset)
+    else:
+        total_count, total_is_exact = None, False
+    page_obj.count = total_count
+
+    return page_obj, {
+        'pagination_querystring': querystring_without(request),
+        'total_count': total_count,
+        'total_is_exact': total_is_exact,
+    }
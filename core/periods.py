@@ -0,0 +1,151 @@
+"""
+Cierre de períodos contables (FiscalPeriod).
+
+Cerrar un período:
+
+1. guarda los saldos de cierre por cuenta (accounting.periods) y el
+   stock por (material, ubicación) (inventory.periods), acumulados desde
+   el inicio hasta el último día del período
+2. marca el período como cerrado: desde entonces ensure_open() rechaza
+   asientos, líneas y movimientos con fecha dentro de él
+3. opcionalmente (archive=True) mueve las líneas de asiento y los
+   movimientos del período a las tablas de archivo
+
+Los saldos y el stock se calculan desde el último cierre más los
+registros posteriores, así no hace falta recorrer toda la historia.
+
+Los módulos de PERIOD_MODULES implementan close(period) y
+archive(period); se ejecutan en ese orden dentro de una transacción.
+
+Uso:
+    python manage.py close_fiscal_period 2026-09
+    python manage.py close_fiscal_period 2026-09 --archive
+"""
+
+import calendar
+import datetime
+from importlib import import_module
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import FiscalPeriod
+
+
+PERIOD_MODULES = [
+    'accounting.periods',
+    'inventory.periods',
+]
+
+
+def _modules():
+    return [import_module(path) for path in PERIOD_MODULES]
+
+
+def last_closed_period(through=None):
+    """Último período cerrado que termina en o antes de `through` (o el último de todos)."""
+    periods = FiscalPeriod.objects.filter(status=FiscalPeriod.STATUS_CLOSED)
+    if through is not None:
+        periods = periods.filter(date_to__lte=through)
+    return periods.order_by('-date_to').first()
+
+
+def closed_through():
+    """Último día cerrado, o None si no hay períodos cerrados."""
+    period = last_closed_period()
+    return period.date_to if period else None
+
+
+def archived_through():
+    """Último día cuyo detalle está en las tablas de archivo, o None."""
+    period = FiscalPeriod.objects.filter(archived=True).order_by('-date_to').first()
+    return period.date_to if period else None
+
+
+def is_closed(date):
+    """True si la fecha cae en un período cerrado."""
+    last = closed_through()
+    return last is not None and date is not None and date <= last
+
+
+def ensure_open(date):
+    """
+    Lanza ValidationError si la fecha cae en un período cerrado.
+    La usan los save()/delete() de asientos, líneas y movimientos.
+    """
+    last = closed_through()
+    if last is not None and date is not None and date <= last:
+        raise ValidationError(
+            f'El período contable que incluye el {date:%d/%m/%Y} está cerrado '
+            f'(cerrado hasta el {last:%d/%m/%Y}); no se puede modificar.'
+        )
+
+
+def period_for_month(year, month):
+    """Período mensual YYYY-MM; se crea abierto si no existe."""
+    last_day = calendar.monthrange(year, month)[1]
+    period, _ = FiscalPeriod.objects.get_or_create(
+        code=f'{year:04d}-{month:02d}',
+        defaults={
+            'date_from': datetime.date(year, month, 1),
+            'date_to': datetime.date(year, month, last_day),
+        },
+    )
+    return period
+
+
+def check_can_close(period):
+    """Valida que el período se pueda cerrar; lanza ValidationError si no."""
+    if period.is_closed:
+        raise ValidationError(f'El período {period.code} ya está cerrado.')
+    if period.date_to >= timezone.localdate():
+        raise ValidationError(f'El período {period.code} todavía no termina.')
+    last = closed_through()
+    if last is not None and period.date_from != last + datetime.timedelta(days=1):
+        raise ValidationError(
+            f'Los períodos se cierran en orden: el siguiente debe empezar el '
+            f'{last + datetime.timedelta(days=1):%d/%m/%Y}.'
+        )
+    from accounting.models import JournalEntry
+    drafts = JournalEntry.objects.filter(
+        status='DRAFT', date__gte=period.date_from, date__lte=period.date_to
+    ).count()
+    if drafts:
+        raise ValidationError(
+            f'El período {period.code} tiene {drafts} asiento(s) en borrador; '
+            f'contabilícelos o anúlelos antes de cerrar.'
+        )
+
+
+def close_period(period, user=None, archive=False):
+    """
+    Cierra el período: guarda las fotos de saldos y stock y lo marca como
+    inmutable. Con archive=True también mueve su detalle a las tablas de
+    archivo.
+    """
+    check_can_close(period)
+    with transaction.atomic():
+        for module in _modules():
+            module.close(period)
+        period.status = FiscalPeriod.STATUS_CLOSED
+        period.closed_at = timezone.now()
+        period.closed_by = user
+        period.save(update_fields=['status', 'closed_at', 'closed_by'])
+    if archive:
+        archive_period(period)
+    return period
+
+
+def archive_period(period):
+    """Mueve las líneas de asiento y movimientos de un período cerrado a las tablas de archivo."""
+    if not period.is_closed:
+        raise ValidationError(f'Solo se archivan períodos cerrados ({period.code} está abierto).')
+    if period.archived:
+        return period
+    with transaction.atomic():
+        for module in _modules():
+            module.archive(period)
+        period.archived = True
+        period.save(update_fields=['archived'])
+    return period
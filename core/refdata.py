@@ -0,0 +1,178 @@
+"""
+Caché por proceso de las tablas de referencia (estados, tipos de
+movimiento, unidades, monedas, naturalezas de cuenta, ...).
+
+Son tablas de pocas filas que casi nunca cambian, pero las vistas las
+consultan en cada operación (ej: OrderStatus.objects.get(symbol='DRAFT')).
+Con esta caché el camino de la petición no hace consultas para ellas:
+
+    from core.refdata import get_by_key, get_by_id
+
+    draft = get_by_key(OrderStatus, 'DRAFT')     # por su clave natural
+    unit = get_by_id(Unit, line['unit_id'])      # por pk
+
+Si el registro no existe se lanza <Modelo>.DoesNotExist, igual que .get(),
+así los bloques try/except existentes siguen funcionando.
+
+Cada tabla se carga completa con una consulta la primera vez que se usa
+(o al llegar la primera petición, ver warm) y se descarta con las señales
+post_save/post_delete. Las señales solo alcanzan al proceso que hizo el
+cambio; los demás procesos recargan la tabla a los REFDATA_TIMEOUT segundos.
+
+Un cambio hecho dentro de una transacción solo se descarta de la caché al
+confirmarse. Mientras tanto el hilo que lo hizo lee esa tabla directo de la
+base (sin guardarla en la caché), así una reversión no deja en caché filas
+que nunca se confirmaron.
+"""
+
+import copy
+import time
+import threading
+
+from django.apps import apps
+from django.core.signals import request_started
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_save, post_delete
+
+
+# Modelo -> campo que identifica el registro (único)
+REFERENCE_MODELS = {
+    'core.Status': 'name',
+    'core.Currency': 'code',
+    'materials.Unit': 'name',
+    'purchases.OrderStatus': 'symbol',
+    'manufacturing.WorkOrderStatus': 'symbol',
+    'inventory.MovementType': 'symbol',
+    'suppliers.PaymentMethod': 'symbol',
+    'accounting.AccountNature': 'symbol',
+    'accounting.AccountType': 'name',
+}
+
+# Segundos tras los que una tabla se recarga aunque no haya llegado señal
+REFDATA_TIMEOUT = 300
+
+_tables = {}
+_lock = threading.Lock()
+
+# Tablas con cambios sin confirmar en la transacción del hilo actual
+_pending = threading.local()
+
+
+def _key_field(model):
+    try:
+        return REFERENCE_MODELS[model._meta.label]
+    except KeyError:
+        raise ValueError(f'{model._meta.label} no es una tabla de referencia')
+
+
+def _load(model):
+    """Lee la tabla completa y arma los índices por clave y por pk."""
+    key_field = _key_field(model)
+    objects = list(model.objects.all())
+    return {
+        'expires': time.monotonic() + REFDATA_TIMEOUT,
+        'by_key': {getattr(obj, key_field): obj for obj in objects},
+        'by_id': {obj.pk: obj for obj in objects},
+        'all': objects,
+    }
+
+
+def _pending_labels():
+    labels = getattr(_pending, 'labels', None)
+    if labels is None:
+        labels = _pending.labels = set()
+    return labels
+
+
+def _table(model):
+    label = model._meta.label
+    pending = _pending_labels()
+    if label in pending:
+        if transaction.get_connection().in_atomic_block:
+            # Cambio sin confirmar: leer de la base sin tocar la caché
+            return _load(model)
+        # La transacción terminó sin commit; la caché no se modificó
+        pending.discard(label)
+    table = _tables.get(label)
+    if table is None or table['expires'] < time.monotonic():
+        table = _load(model)
+        with _lock:
+            _tables[label] = table
+    return table
+
+
+def get_by_key(model, key):
+    """Registro por su clave natural (symbol, code o name según el modelo)."""
+    obj = _table(model)['by_key'].get(key)
+    if obj is None:
+        raise model.DoesNotExist(f'{model.__name__} con {_key_field(model)}={key!r} no existe')
+    # Copia para que un cambio en la vista no altere la caché
+    return copy.copy(obj)
+
+
+def get_by_id(model, pk):
+    """Registro por pk. Acepta el pk como texto (ej: valores de un JSON)."""
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise model.DoesNotExist(f'{model.__name__} con pk={pk!r} no existe')
+    obj = _table(model)['by_id'].get(pk)
+    if obj is None:
+        raise model.DoesNotExist(f'{model.__name__} con pk={pk} no existe')
+    return copy.copy(obj)
+
+
+def all_of(model):
+    """Todos los registros de la tabla, en el orden del Meta.ordering."""
+    return [copy.copy(obj) for obj in _table(model)['all']]
+
+
+def invalidate(model=None):
+    """Descarta una tabla (o todas) para que se recargue en el próximo uso."""
+    with _lock:
+        if model is None:
+            _tables.clear()
+        else:
+            _tables.pop(model._meta.label, None)
+
+
+def warm():
+    """Carga todas las tablas de referencia."""
+    for label in REFERENCE_MODELS:
+        _table(apps.get_model(label))
+
+
+# ==================== SEÑALES ====================
+
+def _on_change(sender, using=None, **kwargs):
+    if not transaction.get_connection(using).in_atomic_block:
+        invalidate(sender)
+        return
+    # Dentro de una transacción la caché se descarta recién al confirmar; si
+    # se revierte, la versión en caché sigue siendo la correcta
+    _pending_labels().add(sender._meta.label)
+    transaction.on_commit(lambda: _committed(sender), using=using)
+
+
+def _committed(model):
+    _pending_labels().discard(model._meta.label)
+    invalidate(model)
+
+
+def _warm_on_first_request(sender, **kwargs):
+    # Solo la primera petición del proceso; no se consulta la base en
+    # AppConfig.ready() porque puede no estar migrada todavía
+    request_started.disconnect(_warm_on_first_request, dispatch_uid='refdata_warm')
+    try:
+        warm()
+    except DatabaseError:
+        # Se cargará tabla por tabla en el primer uso
+        invalidate()
+
+
+def connect_signals():
+    for label in REFERENCE_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(_on_change, sender=model, dispatch_uid=f'refdata_save_{label}')
+        post_delete.connect(_on_change, sender=model, dispatch_uid=f'refdata_delete_{label}')
+    request_started.connect(_warm_on_first_request, dispatch_uid='refdata_warm')
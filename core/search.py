@@ -0,0 +1,301 @@
+"""
+Búsqueda de texto completo para materiales, clientes y proveedores.
+
+Cada modelo indexado tiene una tabla auxiliar "<db_table>_fts":
+
+- SQLite: tabla virtual FTS5 cuyo rowid es el pk del registro.
+- PostgreSQL: tabla (object_id, document tsvector) con índice GIN.
+- Otros motores: sin tabla; la búsqueda cae a __icontains.
+
+El índice se mantiene con señales post_save/post_delete (ver
+connect_signals) y, para las cargas masivas que usan bulk_create, con
+index_queryset(). `python manage.py rebuild_search_index` lo reconstruye.
+
+Las vistas de listado usan ?search=: cada palabra se busca como prefijo
+("acm ind" encuentra "ACME Industrial") y los resultados se ordenan por
+relevancia.
+"""
+
+import re
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_save, post_delete
+
+
+# Modelo -> campos que forman el documento de búsqueda
+SEARCH_INDEXES = {
+    'materials.Material': ['id_material', 'name', 'description'],
+    'customers.Customer': [
+        'id_customer', 'legal_name', 'name', 'tax_id', 'email', 'city', 'contact_name'
+    ],
+    'suppliers.Supplier': [
+        'id_supplier', 'legal_name', 'name', 'tax_id', 'email', 'city', 'contact_name'
+    ],
+}
+
+# Máximo de resultados rankeados que se paginan en una búsqueda
+SEARCH_RESULT_LIMIT = 1000
+
+# Filas por sentencia al reconstruir el índice
+REBUILD_CHUNK_SIZE = 2000
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def get_search_fields(model):
+    return SEARCH_INDEXES.get(model._meta.label)
+
+
+def tokenize(query):
+    """Palabras de la búsqueda, sin operadores ni comillas."""
+    return _TOKEN_RE.findall(query or '')
+
+
+def build_document(obj, fields):
+    return ' '.join(str(getattr(obj, field) or '') for field in fields)
+
+
+# ==================== ESTRUCTURA ====================
+
+def create_search_tables(conn, model_classes):
+    """Crea las tablas de índice que falten (idempotente)."""
+    with conn.cursor() as cursor:
+        for model in model_classes:
+            table = fts_table(model)
+            if conn.vendor == 'sqlite':
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}" USING fts5('
+                    f"body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+            elif conn.vendor == 'postgresql':
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table}" ('
+                    f'object_id bigint PRIMARY KEY, document tsvector NOT NULL)'
+                )
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{table}_document_idx" ON "{table}" USING GIN (document)'
+                )
+
+
+def drop_search_tables(conn, model_classes):
+    with conn.cursor() as cursor:
+        for model in model_classes:
+            if conn.vendor in ('sqlite', 'postgresql'):
+                cursor.execute(f'DROP TABLE IF EXISTS "{fts_table(model)}"')
+
+
+def _supported(conn):
+    return conn.vendor in ('sqlite', 'postgresql')
+
+
+# ==================== ESCRITURA ====================
+
+def _write_documents(conn, model, documents):
+    """Inserta o reemplaza documentos [(pk, texto)] en el índice del modelo."""
+    if not documents or not _supported(conn):
+        return
+    table = fts_table(model)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.executemany(f'DELETE FROM "{table}" WHERE rowid = %s', [(pk,) for pk, _ in documents])
+            cursor.executemany(f'INSERT INTO "{table}" (rowid, body) VALUES (%s, %s)', documents)
+        else:
+            cursor.executemany(
+                f'INSERT INTO "{table}" (object_id, document) VALUES (%s, to_tsvector(\'simple\', %s)) '
+                f'ON CONFLICT (object_id) DO UPDATE SET document = EXCLUDED.document',
+                documents
+            )
+
+
+def _delete_documents(conn, model, pks):
+    if not pks or not _supported(conn):
+        return
+    column = 'rowid' if conn.vendor == 'sqlite' else 'object_id'
+    with conn.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM "{fts_table(model)}" WHERE {column} = %s', [(pk,) for pk in pks])
+
+
+def index_objects(model, objects, using='default'):
+    fields = get_search_fields(model)
+    if fields:
+        _write_documents(connections[using], model, [(obj.pk, build_document(obj, fields)) for obj in objects])
+
+
+def index_queryset(queryset):
+    """
+    Indexa los registros del queryset leyendo solo los campos de búsqueda.
+    Lo usan las cargas masivas, porque bulk_create no dispara señales.
+    """
+    model = queryset.model
+    fields = get_search_fields(model)
+    if not fields:
+        return 0
+    conn = connections[queryset.db]
+    count = 0
+    batch = []
+    for row in queryset.order_by().values_list('pk', *fields).iterator(chunk_size=REBUILD_CHUNK_SIZE):
+        batch.append((row[0], ' '.join(str(value or '') for value in row[1:])))
+        if len(batch) >= REBUILD_CHUNK_SIZE:
+            _write_documents(conn, model, batch)
+            count += len(batch)
+            batch = []
+    _write_documents(conn, model, batch)
+    return count + len(batch)
+
+
+def rebuild_index(model):
+    """Recrea la tabla de índice del modelo y lo indexa completo."""
+    conn = connections[model.objects.db]
+    drop_search_tables(conn, [model])
+    create_search_tables(conn, [model])
+    return index_queryset(model.objects.all())
+
+
+# ==================== SEÑALES ====================
+
+def _on_save(sender, instance, using, raw=False, **kwargs):
+    if raw:
+        return
+    index_objects(sender, [instance], using=using)
+
+
+def _on_delete(sender, instance, using, **kwargs):
+    _delete_documents(connections[using], sender, [instance.pk])
+
+
+def connect_signals():
+    for label in SEARCH_INDEXES:
+        model = apps.get_model(label)
+        post_save.connect(_on_save, sender=model, dispatch_uid=f'search_index_save_{label}')
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=f'search_index_delete_{label}')
+
+
+# ==================== CONSULTA ====================
+
+def _match_sql(conn, model, tokens, limit=None, within=None):
+    """
+    SQL y parámetros que retornan los pk que coinciden con todas las
+    palabras (como prefijo), ordenados por relevancia.
+
+    `within` es un queryset del modelo: si se indica, solo se consideran sus
+    registros, de modo que el límite se aplica después de los filtros.
+    """
+    table = fts_table(model)
+    limit_sql = f' LIMIT {int(limit)}' if limit else ''
+    within_sql, within_params = '', []
+    if within is not None:
+        subquery = within.order_by().values('pk').query
+        sub_sql, sub_params = subquery.get_compiler(using=within.db).as_sql()
+        column = 'rowid' if conn.vendor == 'sqlite' else 'object_id'
+        within_sql, within_params = f' AND {column} IN ({sub_sql})', list(sub_params)
+    if conn.vendor == 'sqlite':
+        match = ' '.join('"{}"*'.format(token.replace('"', '')) for token in tokens)
+        return (
+            f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s{within_sql} ORDER BY rank{limit_sql}',
+            [match] + within_params
+        )
+    tsquery = ' & '.join(f'{token}:*' for token in tokens)
+    return (
+        f'SELECT object_id FROM "{table}" WHERE document @@ to_tsquery(\'simple\', %s){within_sql} '
+        f'ORDER BY ts_rank(document, to_tsquery(\'simple\', %s)) DESC{limit_sql}',
+        [tsquery] + within_params + [tsquery]
+    )
+
+
+def _icontains_filter(model, tokens):
+    condition = Q()
+    for token in tokens:
+        token_q = Q()
+        for field in get_search_fields(model):
+            token_q |= Q(**{f'{field}__icontains': token})
+        condition &= token_q
+    return condition
+
+
+def search_filter(queryset, query):
+    """
+    Filtra el queryset a los registros que coinciden con la búsqueda (sin
+    límite ni orden de relevancia). Útil para exportaciones.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+    conn = connections[queryset.db]
+    if not _supported(conn):
+        return queryset.filter(_icontains_filter(queryset.model, tokens))
+    sql, params = _match_sql(conn, queryset.model, tokens)
+    return queryset.filter(pk__in=RawSQL(sql, params))
+
+
+def ranked_ids(queryset, query, limit=SEARCH_RESULT_LIMIT):
+    """
+    Lista de pk del queryset que coinciden con la búsqueda, ordenada por
+    relevancia (como máximo `limit`). Los filtros del queryset se aplican
+    dentro de la consulta rankeada, antes del límite.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    conn = connections[queryset.db]
+    if not _supported(conn):
+        return list(
+            queryset.filter(_icontains_filter(queryset.model, tokens))
+            .order_by('-pk').values_list('pk', flat=True)[:limit]
+        )
+
+    sql, params = _match_sql(conn, queryset.model, tokens, limit=limit, within=queryset)
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def paginate_search(request, queryset, query, per_page):
+    """
+    Pagina los resultados rankeados de ?search= con la misma interfaz que
+    core.pagination.paginate_keyset (el cursor es la posición en el ranking).
+
+    Returns:
+        tuple: (page_obj, contexto) igual que paginate_keyset
+    """
+    from .pagination import KeysetPage, encode_cursor, decode_cursor, InvalidCursor, querystring_without
+
+    # Un resultado extra indica si el total llegó al límite
+    ids = ranked_ids(queryset, query, limit=SEARCH_RESULT_LIMIT + 1)
+    total_is_exact = len(ids) <= SEARCH_RESULT_LIMIT
+    ids = ids[:SEARCH_RESULT_LIMIT]
+
+    start = 0
+    after, before = request.GET.get('after'), request.GET.get('before')
+    try:
+        if after:
+            start = int(decode_cursor(after)[0])
+        elif before:
+            start = max(0, int(decode_cursor(before)[0]) - per_page)
+    except (InvalidCursor, IndexError, TypeError, ValueError):
+        start = 0
+
+    page_ids = ids[start:start + per_page]
+    objects = queryset.in_bulk(page_ids)
+    rows = [objects[pk] for pk in page_ids if pk in objects]
+    end = start + len(page_ids)
+
+    page_obj = KeysetPage(
+        rows,
+        has_next=end < len(ids),
+        has_previous=start > 0,
+        next_cursor=encode_cursor([end]) if end < len(ids) else None,
+        previous_cursor=encode_cursor([start]) if start > 0 else None,
+        count=len(ids),
+    )
+    return page_obj, {
+        'pagination_querystring': querystring_without(request),
+        'total_count': len(ids),
+        'total_is_exact': total_is_exact,
+    }
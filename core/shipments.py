@@ -0,0 +1,370 @@
+"""
+Entregas y recepciones parciales de órdenes de venta y de compra.
+
+Una orden grande puede despacharse (o recibirse) en varias tandas. Cada
+tanda es un envío (SalesDelivery / PurchaseReceipt) con la cantidad por
+línea, y escribe solo su variación:
+
+- un movimiento de inventario por línea con la cantidad de la tanda
+  (los contadores de StockLevel se actualizan con apply_movements)
+- un asiento contable por el importe de la tanda, con el id del envío
+  como referencia (ej: SO-0001-D002) para que no choque con el de la
+  orden ni con el de otras tandas
+- delivered_quantity / received_quantity de las líneas y los totales de
+  la cabecera (core.order_totals)
+
+Las salidas se validan contra el disponible para prometer de la
+ubicación; si la configuración indica 'availability' (ventas), se suma la
+reserva de las líneas entregadas, que la propia entrega consume.
+
+La orden queda en estado PARTIAL hasta que todas sus líneas están
+completas y entonces pasa a DELIVERED / RECEIVED. Entregar o recibir la
+orden completa (vista de detalle o acción masiva) sobre una orden PARTIAL
+mueve y contabiliza solo lo pendiente (ver pending_amount).
+
+La clave de idempotencia es única por orden: si el cliente reenvía la
+misma tanda (p. ej. tras un timeout) se devuelve el envío ya registrado
+sin leer las líneas ni volver a escribir movimientos o asientos.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import transaction, IntegrityError
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.refdata import get_by_key
+from core.order_totals import refresh_totals
+
+logger = logging.getLogger(__name__)
+
+
+PARTIAL_STATUS = 'PARTIAL'
+
+# Líneas por envío en las APIs
+MAX_SHIPMENT_LINES = 500
+
+SHIPMENTS = {
+    'sales.SalesOrder': {
+        'shipment_model': 'sales.SalesDelivery',
+        'shipment_id_field': 'id_sales_delivery',
+        'id_field': 'id_sales_order',
+        'order_field': 'sales_order',
+        'progress_field': 'delivered_quantity',
+        'location_field': 'source_location',
+        'movement_type': 'SALE_OUT',
+        'prefix': 'D',
+        'allowed_statuses': ['CONFIRMED', PARTIAL_STATUS],
+        'complete_status': 'DELIVERED',
+        'accounts': 'accounting.utils.get_sale_accounts',
+        'entry_data': 'accounting.utils.build_sale_entry_data',
+        # Disponible para la entrega: el de la ubicación más la reserva de las líneas
+        'availability': 'sales.reservations.shipment_available',
+        # Descuenta las reservas de lo entregado
+        'on_shipped': 'sales.reservations.consume_reservations',
+    },
+    'purchases.PurchaseOrder': {
+        'shipment_model': 'purchases.PurchaseReceipt',
+        'shipment_id_field': 'id_purchase_receipt',
+        'id_field': 'id_purchase_order',
+        'order_field': 'purchase_order',
+        'progress_field': 'received_quantity',
+        'location_field': 'destination_location',
+        'movement_type': 'PURCHASE_IN',
+        'prefix': 'R',
+        'allowed_statuses': ['DRAFT', 'CONFIRMED', PARTIAL_STATUS],
+        'complete_status': 'RECEIVED',
+        'accounts': 'accounting.utils.get_purchase_accounts',
+        'entry_data': 'accounting.utils.build_purchase_entry_data',
+        'availability': None,
+        'on_shipped': None,
+    },
+}
+
+_CENTS = Decimal('0.01')
+
+
+class KeyConflict(Exception):
+    """La clave de idempotencia ya se usó en la orden con otras cantidades."""
+
+
+def _config(order_model):
+    return SHIPMENTS[order_model._meta.label]
+
+
+def pending_amount(order):
+    """
+    Importe pendiente de entregar / recibir de la orden (cantidad pendiente
+    × precio). Recorre order.lines.all(), así que aprovecha el prefetch;
+    se calcula antes de marcar las líneas como completas.
+    """
+    progress_field = _config(type(order))['progress_field']
+    total = Decimal('0')
+    for line in order.lines.all():
+        pending = line.quantity - getattr(line, progress_field)
+        if pending > 0:
+            total += Decimal(pending) * line.price
+    return total.quantize(_CENTS)
+
+
+def parse_lines(lines):
+    """
+    Valida las líneas recibidas por la API: [{"position": n, "quantity": q}, ...].
+    Las posiciones repetidas se acumulan.
+
+    Returns:
+        dict: posición -> cantidad
+
+    Raises:
+        ValidationError: Si la lista está vacía, es demasiado larga o tiene
+            posiciones o cantidades inválidas
+    """
+    if not isinstance(lines, list) or not lines:
+        raise ValidationError('Debe incluir al menos una línea en lines')
+    if len(lines) > MAX_SHIPMENT_LINES:
+        raise ValidationError(f'Máximo {MAX_SHIPMENT_LINES} líneas por envío')
+    quantities = {}
+    for item in lines:
+        if not isinstance(item, dict):
+            raise ValidationError('Cada línea debe ser un objeto con position y quantity')
+        position, quantity = item.get('position'), item.get('quantity')
+        if isinstance(position, bool) or not isinstance(position, int):
+            raise ValidationError(f'Posición inválida: {position}')
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+            raise ValidationError(f'Cantidad inválida para la línea {position}: {quantity}')
+        quantities[position] = quantities.get(position, 0) + quantity
+    return quantities
+
+
+def shipment_result(shipment, order_id, config, status_symbol, created, journal_entry=None, warning=None):
+    """Resultado de un envío, igual para el registro y para la repetición de la clave."""
+    result = {
+        'shipment': getattr(shipment, config['shipment_id_field']),
+        'order_id': order_id,
+        'number': shipment.number,
+        'key': shipment.key,
+        'created': created,
+        'status': status_symbol,
+        'lines': [
+            {'position': int(position), 'quantity': quantity}
+            for position, quantity in sorted(shipment.lines.items(), key=lambda item: int(item[0]))
+        ],
+        'journal_entry': journal_entry,
+    }
+    if warning:
+        result['warning'] = warning
+    return result
+
+
+def _journal_entry_id(reference):
+    from accounting.models import JournalEntry
+    return JournalEntry.objects.filter(reference=reference).values_list('id_journal_entry', flat=True).first()
+
+
+def _replay(shipment, order, config, quantities):
+    stored = {int(position): quantity for position, quantity in shipment.lines.items()}
+    if stored != quantities:
+        raise KeyConflict(
+            f'La clave "{shipment.key}" ya se usó en {getattr(order, config["id_field"])} '
+            f'con otras cantidades (envío {getattr(shipment, config["shipment_id_field"])})'
+        )
+    shipment_id = getattr(shipment, config['shipment_id_field'])
+    status_symbol = type(order).objects.filter(pk=order.pk).values_list('status__symbol', flat=True).get()
+    return shipment_result(
+        shipment, getattr(order, config['id_field']), config, status_symbol, created=False,
+        journal_entry=_journal_entry_id(shipment_id)
+    )
+
+
+def record_shipment(order, key, quantities, user=None, post_entries=False):
+    """
+    Registra una entrega (orden de venta) o recepción (orden de compra)
+    parcial de la orden.
+
+    Args:
+        order: SalesOrder o PurchaseOrder
+        key: Clave de idempotencia de la tanda (única por orden)
+        quantities: dict posición de línea -> cantidad de la tanda
+        user: Usuario que registra el envío (opcional)
+        post_entries: Si True, el asiento se crea contabilizado
+
+    Returns:
+        dict: resultado del envío (ver shipment_result); 'created' es False
+        si la clave ya estaba registrada y no se escribió nada
+
+    Raises:
+        ValidationError: Si el estado de la orden, las líneas, las
+            cantidades o el stock no permiten el envío
+        KeyConflict: Si la clave ya se usó con otras cantidades
+        OrderStatus.DoesNotExist / MovementType.DoesNotExist: Si falta el
+            estado PARTIAL (init_order_statuses) o el tipo de movimiento
+    """
+    config = _config(type(order))
+    shipment_model = apps.get_model(config['shipment_model'])
+    key = str(key or '').strip()
+    if not key:
+        raise ValidationError('La clave de idempotencia (key) es requerida')
+    if len(key) > shipment_model._meta.get_field('key').max_length:
+        raise ValidationError('La clave de idempotencia es demasiado larga')
+
+    shipments = shipment_model.objects.filter(**{config['order_field']: order})
+    existing = shipments.filter(key=key).first()
+    if existing is not None:
+        return _replay(existing, order, config, quantities)
+
+    try:
+        with transaction.atomic():
+            return _write_shipment(order, config, shipment_model, key, quantities, user, post_entries)
+    except IntegrityError:
+        # Otra petición registró la misma clave en paralelo
+        existing = shipments.filter(key=key).first()
+        if existing is None:
+            raise
+        return _replay(existing, order, config, quantities)
+
+
+def _write_shipment(order, config, shipment_model, key, quantities, user, post_entries):
+    from purchases.models import OrderStatus
+    from inventory.models import InventoryLocation, InventoryMovement, MovementType
+    from inventory.stock_levels import apply_movements, available_quantities
+    from inventory.utils import get_default_inventory_location
+
+    order_model = type(order)
+    order_id = getattr(order, config['id_field'])
+    progress_field = config['progress_field']
+
+    # Releer la orden bloqueada: el estado pudo cambiar desde que se cargó
+    order = order_model.objects.select_for_update().select_related('status').get(pk=order.pk)
+    if order.status.symbol not in config['allowed_statuses']:
+        raise ValidationError(
+            f'No se puede registrar un envío de una orden en estado "{order.status.name}".'
+        )
+
+    lines = {
+        line.position: line
+        for line in order.lines.model.objects.select_for_update().select_related('material')
+        .filter(**{config['order_field']: order})
+    }
+    for position, quantity in quantities.items():
+        line = lines.get(position)
+        if line is None:
+            raise ValidationError(f'La orden {order_id} no tiene una línea en la posición {position}')
+        pending = line.quantity - getattr(line, progress_field)
+        if quantity > pending:
+            raise ValidationError(
+                f'La línea {position} tiene {max(pending, 0)} pendiente(s); no se pueden enviar {quantity}'
+            )
+        if line.unit_material_id != line.material.unit_id:
+            raise ValidationError(
+                f'La unidad de la línea {position} no coincide con la unidad base de {line.material.name}.'
+            )
+
+    location = getattr(order, config['location_field'])
+    if location is None:
+        try:
+            location = get_default_inventory_location()
+        except InventoryLocation.DoesNotExist:
+            raise ValidationError('No hay ubicaciones de inventario configuradas.')
+    movement_type = get_by_key(MovementType, config['movement_type'])
+
+    if movement_type.symbol.endswith('_OUT'):
+        required = {}
+        for position, quantity in quantities.items():
+            pair = (lines[position].material_id, location.pk)
+            required[pair] = required.get(pair, 0) + quantity
+        if config['availability']:
+            available = import_string(config['availability'])(
+                order, set(required), {lines[position].pk: quantity for position, quantity in quantities.items()}
+            )
+        else:
+            available = available_quantities(required)
+        for pair, quantity in required.items():
+            if quantity > available[pair]:
+                material = next(line.material for line in lines.values() if line.material_id == pair[0])
+                raise ValidationError(
+                    f'Stock insuficiente para enviar {material.name}. Disponible: {max(available[pair], 0)}'
+                )
+
+    number = (shipment_model.objects.filter(**{config['order_field']: order})
+              .aggregate(number=Max('number'))['number'] or 0) + 1
+    shipment_id = f"{order_id}-{config['prefix']}{number:03d}"
+    shipment = shipment_model.objects.create(**{
+        config['shipment_id_field']: shipment_id,
+        config['order_field']: order,
+        'number': number,
+        'key': key,
+        'lines': {str(position): quantity for position, quantity in sorted(quantities.items())},
+        'created_by': user,
+    })
+
+    now = timezone.now()
+    timestamp = now.strftime('%Y%m%d-%H%M%S')
+    movements = []
+    shipped_lines = []
+    amount = Decimal('0')
+    for position, quantity in sorted(quantities.items()):
+        line = lines[position]
+        movements.append(InventoryMovement(
+            id_inventory_movement=f"INV-{timestamp}-{config['prefix']}{shipment.pk}-{line.id}",
+            location=location,
+            material=line.material,
+            quantity=quantity,
+            unit_type_id=line.unit_material_id,
+            movement_type=movement_type,
+            movement_date=now,
+            reference=order_id,
+            created_by=user
+        ))
+        setattr(line, progress_field, getattr(line, progress_field) + quantity)
+        line.updated_at = now
+        shipped_lines.append(line)
+        amount += Decimal(quantity) * line.price
+
+    InventoryMovement.objects.bulk_create(movements)
+    # bulk_create no pasa por save(): actualizar los contadores de stock
+    apply_movements(movements)
+    order.lines.model.objects.bulk_update(shipped_lines, [progress_field, 'updated_at'])
+    # bulk_update no pasa por save(): recalcular la fracción entregada/recibida
+    refresh_totals(order_model, [order.pk])
+    if config['on_shipped']:
+        import_string(config['on_shipped'])(order, {line.pk: quantities[line.position] for line in shipped_lines})
+
+    complete = all(getattr(line, progress_field) >= line.quantity for line in lines.values())
+    status = get_by_key(OrderStatus, config['complete_status'] if complete else PARTIAL_STATUS)
+    order_model.objects.filter(pk=order.pk).update(status=status, updated_at=now)
+
+    journal_entry, warning = _create_entry(order, config, shipment_id, amount, user, post_entries)
+    return shipment_result(
+        shipment, order_id, config, status.symbol, created=True, journal_entry=journal_entry, warning=warning
+    )
+
+
+def _create_entry(order, config, shipment_id, amount, user, post_entries):
+    """
+    Asiento del importe del envío dentro de un savepoint. Igual que en la
+    entrega completa, un fallo contable no revierte el envío; se informa.
+
+    Returns:
+        tuple: (id del asiento o None, aviso o None)
+    """
+    from accounting.utils import create_journal_entries_batch
+
+    try:
+        accounts = import_string(config['accounts'])()
+        data = import_string(config['entry_data'])(order, accounts, total=amount.quantize(_CENTS))
+        if data is None:
+            return None, None
+        data['reference'] = shipment_id
+        data['date'] = timezone.localdate()
+        data['description'] = f"{data['description']} ({shipment_id})"
+        with transaction.atomic():
+            entries = create_journal_entries_batch([data], user=user, post=post_entries)
+    except Exception as e:
+        logger.error(f'Error al crear el asiento contable del envío {shipment_id}: {str(e)}')
+        return None, f'Envío registrado pero fallo contable: {str(e)}'
+    entry = entries.get(shipment_id)
+    return (entry.id_journal_entry if entry else None), None
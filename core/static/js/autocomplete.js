@@ -0,0 +1,52 @@
+// Autocompletado para inputs con data-autocomplete="<fuente>".
+// Las opciones se piden a /autocomplete/<fuente>/ mientras el usuario escribe
+// y se cargan en un <datalist>; el valor elegido es el código del registro,
+// así los manejadores existentes (blur / Enter) siguen buscando el detalle.
+(function () {
+    const DEBOUNCE_MS = 200;
+    const timers = new WeakMap();
+    let counter = 0;
+
+    function getDatalist(input) {
+        if (!input.getAttribute('list')) {
+            counter += 1;
+            const datalist = document.createElement('datalist');
+            datalist.id = 'autocomplete-list-' + counter;
+            document.body.appendChild(datalist);
+            input.setAttribute('list', datalist.id);
+            input.setAttribute('autocomplete', 'off');
+        }
+        return document.getElementById(input.getAttribute('list'));
+    }
+
+    function load(input) {
+        const source = input.dataset.autocomplete;
+        const params = new URLSearchParams({q: input.value.trim(), limit: input.dataset.autocompleteLimit || '15'});
+        fetch('/autocomplete/' + source + '/?' + params.toString(), {credentials: 'same-origin'})
+            .then(function (response) { return response.ok ? response.json() : {results: []}; })
+            .then(function (data) {
+                const datalist = getDatalist(input);
+                datalist.innerHTML = '';
+                data.results.forEach(function (item) {
+                    const option = document.createElement('option');
+                    option.value = item.code;
+                    option.label = item.code + ' - ' + item.label;
+                    datalist.appendChild(option);
+                });
+            });
+    }
+
+    document.addEventListener('input', function (event) {
+        const input = event.target;
+        if (!input.dataset || !input.dataset.autocomplete) return;
+        clearTimeout(timers.get(input));
+        timers.set(input, setTimeout(function () { load(input); }, DEBOUNCE_MS));
+    });
+
+    document.addEventListener('focusin', function (event) {
+        const input = event.target;
+        if (input.dataset && input.dataset.autocomplete && !input.getAttribute('list')) {
+            load(input);
+        }
+    });
+})();
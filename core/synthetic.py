@@ -0,0 +1,504 @@
+"""
+Generador de datos sintéticos para pruebas de volumen y benchmarks.
+
+Crea materiales, clientes y proveedores, y luego recorre día por día un
+rango de años generando órdenes de compra y de venta con sus líneas,
+movimientos de inventario y asientos contables, con fechas históricas:
+
+- Las compras se reciben en su fecha estimada de entrega (PURCHASE_IN).
+- Las ventas solo usan stock disponible en la ubicación a esa fecha, así
+  que el inventario nunca queda negativo (SALE_OUT).
+- Las órdenes de los últimos días quedan CONFIRMED, para que haya
+  entregas y recepciones pendientes que medir; las de venta con su
+  reserva de stock.
+
+Todo se escribe con bulk_create, mes por mes, en una transacción por mes.
+Los códigos usan el prefijo SYN- para distinguirlos de los datos reales.
+Lo usa el comando `python manage.py generate_synthetic_data`.
+"""
+
+import random
+import datetime
+import unicodedata
+from decimal import Decimal
+from collections import defaultdict
+
+from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from core.models import Currency, Status
+from core.search import index_queryset
+from core.order_totals import refresh_totals
+from materials.models import Material, Unit, MaterialType
+from customers.models import Customer
+from suppliers.models import Supplier, PaymentMethod
+from purchases.models import PurchaseOrder, PurchaseOrderLine, OrderStatus
+from sales.models import SalesOrder, SalesOrderLine, StockReservation
+from sales.reservations import save_reservations
+from inventory.models import InventoryLocation, InventoryMovement, MovementType
+from inventory.stock_levels import apply_movements
+from accounting.utils import (
+    get_purchase_accounts, get_sale_accounts,
+    build_purchase_entry_data, build_sale_entry_data, create_journal_entries_batch
+)
+
+
+SYNTHETIC_PREFIX = 'SYN'
+
+# Días al final del rango en que las órdenes quedan confirmadas (pendientes)
+PENDING_DAYS = 7
+
+_PRODUCT_WORDS = [
+    'Tornillo', 'Tuerca', 'Arandela', 'Perno', 'Cable', 'Tubo', 'Válvula', 'Filtro',
+    'Rodamiento', 'Correa', 'Sensor', 'Motor', 'Bomba', 'Panel', 'Lámina', 'Resina',
+    'Pintura', 'Adhesivo', 'Empaque', 'Caja', 'Etiqueta', 'Harina', 'Azúcar', 'Aceite',
+]
+_PRODUCT_QUALIFIERS = [
+    'acero', 'inoxidable', 'galvanizado', 'PVC', 'cobre', 'aluminio', 'industrial',
+    'reforzado', 'premium', 'estándar', 'grande', 'pequeño', 'x100', 'x500',
+]
+_COMPANY_WORDS = [
+    'Andes', 'Pacífico', 'Austral', 'Cóndor', 'Volcán', 'Amazonía', 'Litoral', 'Sierra',
+    'Galápagos', 'Chimborazo', 'Quitumbe', 'Guayas', 'Cotopaxi', 'Ecuatorial',
+]
+_COMPANY_SUFFIXES = ['S.A.', 'Cía. Ltda.', 'Distribuidora', 'Comercial', 'Industrias', 'Importadora']
+_CITIES = [
+    ('Quito', 'Pichincha'), ('Guayaquil', 'Guayas'), ('Cuenca', 'Azuay'),
+    ('Ambato', 'Tungurahua'), ('Machala', 'El Oro'), ('Loja', 'Loja'), ('Manta', 'Manabí'),
+]
+_FIRST_NAMES = ['Ana', 'Luis', 'María', 'Carlos', 'Sofía', 'Jorge', 'Valeria', 'Diego', 'Camila', 'Andrés']
+_LAST_NAMES = ['Pérez', 'García', 'Torres', 'Vera', 'Mora', 'Castro', 'Ruiz', 'Salazar', 'Benítez']
+
+
+def _slug(text):
+    ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return ascii_text.lower().replace(' ', '')
+
+
+class SyntheticDataGenerator:
+    """
+    Genera volúmenes realistas de datos maestros y transacciones.
+
+    Args:
+        seed: Semilla para obtener siempre los mismos datos
+        user: Usuario registrado como creador
+        batch_size: Filas por sentencia en bulk_create
+        post_entries: Si True, los asientos se crean contabilizados y
+            actualizan los saldos
+        log: Función que recibe mensajes de avance (ej: stdout.write)
+    """
+
+    def __init__(self, seed=None, user=None, batch_size=1000, post_entries=True, log=None):
+        self.random = random.Random(seed)
+        self.user = user
+        self.batch_size = batch_size
+        self.post_entries = post_entries
+        self.log = log or (lambda message: None)
+        self.counts = defaultdict(int)
+
+    # ==================== DATOS DE REFERENCIA ====================
+
+    def load_reference_data(self):
+        """
+        Carga las tablas de referencia necesarias.
+
+        Raises:
+            ValueError: Si falta algún dato básico (ver mensaje)
+        """
+        def require(queryset, message):
+            items = list(queryset)
+            if not items:
+                raise ValueError(message)
+            return items
+
+        self.units = require(Unit.objects.all(), 'No hay unidades de medida registradas.')
+        self.material_types = require(MaterialType.objects.all(), 'No hay tipos de material registrados.')
+        self.active_status = require(
+            Status.objects.filter(name__in=['Activo', 'Active']), "No existe el estado 'Activo'."
+        )[0]
+        self.payment_methods = require(PaymentMethod.objects.all(), 'No hay métodos de pago registrados.')
+        self.currency = (
+            Currency.objects.filter(code='USD').first()
+            or require(Currency.objects.all(), 'No hay monedas registradas.')[0]
+        )
+        self.locations = require(
+            InventoryLocation.objects.filter(status=True),
+            'No hay ubicaciones de inventario activas. Ejecute init_inventory_location.'
+        )
+
+        statuses = {status.symbol: status for status in OrderStatus.objects.all()}
+        movement_types = {mt.symbol: mt for mt in MovementType.objects.all()}
+        try:
+            self.status_confirmed = statuses['CONFIRMED']
+            self.status_received = statuses['RECEIVED']
+            self.status_delivered = statuses['DELIVERED']
+        except KeyError as e:
+            raise ValueError(f'Falta el estado de orden {e}. Ejecute init_order_statuses.')
+        try:
+            self.movement_in = movement_types['PURCHASE_IN']
+            self.movement_out = movement_types['SALE_OUT']
+        except KeyError as e:
+            raise ValueError(f'Falta el tipo de movimiento {e}. Ejecute init_movement_types.')
+
+        # Sin cuentas contables se generan las órdenes pero no los asientos
+        try:
+            self.purchase_accounts = get_purchase_accounts()
+            self.sale_accounts = get_sale_accounts()
+        except ValidationError as e:
+            self.purchase_accounts = self.sale_accounts = None
+            self.log(f'Sin asientos contables: {"; ".join(e.messages)}')
+
+    # ==================== DATOS MAESTROS ====================
+
+    def _next_sequence(self, model, field, prefix):
+        return model.objects.filter(**{f'{field}__startswith': prefix}).count() + 1
+
+    def _company(self):
+        name = f'{self.random.choice(_COMPANY_WORDS)} {self.random.choice(_COMPANY_WORDS)}'
+        return name, f'{name} {self.random.choice(_COMPANY_SUFFIXES)}'
+
+    def _partner_fields(self, number):
+        name, legal_name = self._company()
+        city, province = self.random.choice(_CITIES)
+        contact = f'{self.random.choice(_FIRST_NAMES)} {self.random.choice(_LAST_NAMES)}'
+        return {
+            'legal_name': legal_name,
+            'name': name,
+            'tax_id': f'{self.random.randint(10 ** 12, 10 ** 13 - 1)}001',
+            'country': 'Ecuador',
+            'state_province': province,
+            'city': city,
+            'address': f'Av. {self.random.choice(_COMPANY_WORDS)} {self.random.randint(1, 999)}',
+            'zip_code': self.random.randint(10000, 99999),
+            'phone': self.random.randint(20000000, 99999999),
+            'email': f'contacto{number}@{_slug(name)}.example.com',
+            'contact_name': contact,
+            'contact_role': self.random.choice(['Compras', 'Ventas', 'Gerencia', 'Bodega']),
+            'category': self.random.choice(['A', 'B', 'C']),
+            'payment_terms': self.random.choice(['Contado', '30 días', '60 días']),
+            'currency': self.currency.code,
+            'payment_method': self.random.choice(self.payment_methods),
+            'bank_account': str(self.random.randint(10 ** 9, 10 ** 10 - 1)),
+            'status': True,
+            'created_by': self.user,
+        }
+
+    def _bulk_create_master(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        codes = [getattr(obj, self._code_field(model)) for obj in objects]
+        # bulk_create no dispara señales: indexar para la búsqueda
+        index_queryset(model.objects.filter(**{f'{self._code_field(model)}__in': codes}))
+        self.counts[model._meta.label] += len(objects)
+
+    @staticmethod
+    def _code_field(model):
+        return {Material: 'id_material', Customer: 'id_customer', Supplier: 'id_supplier'}[model]
+
+    def create_materials(self, count):
+        prefix = f'{SYNTHETIC_PREFIX}-MAT-'
+        start = self._next_sequence(Material, 'id_material', prefix)
+        for offset in range(0, count, self.batch_size):
+            objects = []
+            for number in range(start + offset, start + min(offset + self.batch_size, count)):
+                name = f'{self.random.choice(_PRODUCT_WORDS)} {self.random.choice(_PRODUCT_QUALIFIERS)}'
+                objects.append(Material(
+                    id_material=f'{prefix}{number:06d}',
+                    name=name,
+                    description=f'{name} para pruebas de volumen',
+                    unit=self.random.choice(self.units),
+                    material_type=self.random.choice(self.material_types),
+                    status=self.active_status,
+                    created_by=self.user,
+                ))
+            self._bulk_create_master(Material, objects)
+        self.log(f'{count} materiales creados')
+
+    def create_customers(self, count):
+        prefix = f'{SYNTHETIC_PREFIX}-CUS-'
+        start = self._next_sequence(Customer, 'id_customer', prefix)
+        for offset in range(0, count, self.batch_size):
+            objects = [
+                Customer(id_customer=f'{prefix}{number:06d}', **self._partner_fields(number))
+                for number in range(start + offset, start + min(offset + self.batch_size, count))
+            ]
+            self._bulk_create_master(Customer, objects)
+        self.log(f'{count} clientes creados')
+
+    def create_suppliers(self, count):
+        prefix = f'{SYNTHETIC_PREFIX}-SUP-'
+        start = self._next_sequence(Supplier, 'id_supplier', prefix)
+        for offset in range(0, count, self.batch_size):
+            objects = [
+                Supplier(id_supplier=f'{prefix}{number:06d}', **self._partner_fields(number))
+                for number in range(start + offset, start + min(offset + self.batch_size, count))
+            ]
+            self._bulk_create_master(Supplier, objects)
+        self.log(f'{count} proveedores creados')
+
+    # ==================== TRANSACCIONES ====================
+
+    @staticmethod
+    def _last_number(values):
+        """Mayor número al final de códigos como PO-0012 (ignora los que no lo tienen)."""
+        last = 0
+        for value in values:
+            try:
+                last = max(last, int(value.rsplit('-', 1)[-1]))
+            except (ValueError, IndexError):
+                continue
+        return last
+
+    def _at(self, day, hour):
+        naive = datetime.datetime.combine(day, datetime.time(hour, self.random.randint(0, 59)))
+        return timezone.make_aware(naive) if timezone.is_naive(naive) else naive
+
+    def create_orders(self, years, purchases_per_day, sales_per_day, max_lines):
+        """
+        Genera órdenes día por día desde hace `years` años hasta hoy.
+        El volumen diario varía entre 0 y el doble del promedio indicado.
+        """
+        materials = list(Material.objects.filter(status=self.active_status).only('pk', 'unit_id'))
+        suppliers = list(Supplier.objects.filter(status=True).only('pk', 'name'))
+        customers = list(Customer.objects.filter(status=True).only('pk', 'name'))
+        if not materials or not suppliers or not customers:
+            raise ValueError('Se necesitan materiales, proveedores y clientes activos.')
+
+        self.materials = materials
+        self.suppliers = suppliers
+        self.customers = customers
+        self.next_po = self._last_number(PurchaseOrder.objects.values_list('id_purchase_order', flat=True)) + 1
+        self.next_so = self._last_number(SalesOrder.objects.values_list('id_sales_order', flat=True)) + 1
+
+        # Stock disponible por (material, ubicación) según lo generado
+        self.stock = defaultdict(int)
+        # Recepciones futuras: fecha -> [(material_id, location_id, cantidad)]
+        self.pending_receipts = defaultdict(list)
+
+        today = timezone.localdate()
+        day = today - datetime.timedelta(days=int(365 * years))
+        month = None
+        while day <= today:
+            if month != (day.year, day.month):
+                if month is not None:
+                    self._flush()
+                month = (day.year, day.month)
+                self._reset_buffers()
+
+            for material_id, location_id, quantity in self.pending_receipts.pop(day, []):
+                self.stock[(material_id, location_id)] += quantity
+
+            for _ in range(self.random.randint(0, 2 * purchases_per_day)):
+                self._purchase_order(day, today, max_lines)
+            for _ in range(self.random.randint(0, 2 * sales_per_day)):
+                self._sales_order(day, today, max_lines)
+            day += datetime.timedelta(days=1)
+
+        self._flush()
+        self._touch_last_sales_order()
+
+    def _reset_buffers(self):
+        self.purchase_orders = []
+        self.purchase_lines = []
+        self.sales_orders = []
+        self.sales_lines = []
+
+    def _purchase_order(self, day, today, max_lines):
+        delivery = day + datetime.timedelta(days=self.random.randint(2, 10))
+        received = delivery <= today - datetime.timedelta(days=PENDING_DAYS)
+        location = self.random.choice(self.locations)
+        supplier = self.random.choice(self.suppliers)
+        order = PurchaseOrder(
+            id_purchase_order=f'PO-{self.next_po:04d}',
+            supplier=supplier,
+            issue_date=day,
+            estimated_delivery_date=delivery,
+            status=self.status_received if received else self.status_confirmed,
+            destination_location=location,
+            created_by=self.user,
+        )
+        order.synthetic_created_at = self._at(day, 9)
+        self.next_po += 1
+
+        lines = []
+        for position, material in enumerate(
+                self.random.sample(self.materials, min(len(self.materials), self.random.randint(1, max_lines))), start=1):
+            quantity = self.random.randint(20, 200)
+            lines.append(PurchaseOrderLine(
+                id_purchase_order_line=f'{order.id_purchase_order}-L{position:03d}',
+                purchase_order=order,
+                material=material,
+                position=position,
+                quantity=quantity,
+                unit_material_id=material.unit_id,
+                price=Decimal(self.random.randint(100, 5000)) / 100,
+                currency_supplier=self.currency,
+                received_quantity=quantity if received else 0,
+                created_by=self.user,
+            ))
+            if received:
+                self.pending_receipts[delivery].append((material.pk, location.pk, quantity))
+        order.synthetic_received_at = self._at(delivery, 10) if received else None
+        self.purchase_orders.append(order)
+        self.purchase_lines.extend(lines)
+
+    def _sales_order(self, day, today, max_lines):
+        location = self.random.choice(self.locations)
+        delivered = day <= today - datetime.timedelta(days=PENDING_DAYS)
+
+        lines = []
+        used = set()
+        order = SalesOrder(
+            id_sales_order=f'SO-{self.next_so:04d}',
+            customer=self.random.choice(self.customers),
+            issue_date=day,
+            status=self.status_delivered if delivered else self.status_confirmed,
+            source_location=location,
+            created_by=self.user,
+        )
+        # Probar algunos materiales al azar y quedarse con los que tienen stock
+        wanted = self.random.randint(1, max_lines)
+        for _ in range(max_lines * 3):
+            if len(lines) >= wanted:
+                break
+            material = self.random.choice(self.materials)
+            available = self.stock[(material.pk, location.pk)]
+            if material.pk in used or available <= 0:
+                continue
+            used.add(material.pk)
+            quantity = self.random.randint(1, min(10, available))
+            # Las confirmadas también reservan el stock para poder entregarse
+            self.stock[(material.pk, location.pk)] -= quantity
+            lines.append(SalesOrderLine(
+                id_sales_order_line=f'{order.id_sales_order}-L{len(lines) + 1:03d}',
+                sales_order=order,
+                material=material,
+                position=len(lines) + 1,
+                quantity=quantity,
+                unit_material_id=material.unit_id,
+                price=Decimal(self.random.randint(200, 9000)) / 100,
+                currency_customer=self.currency,
+                delivered_quantity=quantity if delivered else 0,
+                created_by=self.user,
+            ))
+        if not lines:
+            return
+        order.synthetic_created_at = self._at(day, 11)
+        order.synthetic_delivered_at = self._at(day, 16) if delivered else None
+        self.next_so += 1
+        self.sales_orders.append(order)
+        self.sales_lines.extend(lines)
+
+    def _flush(self):
+        """Escribe las órdenes del mes con sus líneas, movimientos y asientos."""
+        if not self.purchase_orders and not self.sales_orders:
+            return
+        with transaction.atomic():
+            movements = []
+            PurchaseOrder.objects.bulk_create(self.purchase_orders, batch_size=self.batch_size)
+            PurchaseOrderLine.objects.bulk_create(self.purchase_lines, batch_size=self.batch_size)
+            refresh_totals(PurchaseOrder, [order.pk for order in self.purchase_orders])
+            for line in self.purchase_lines:
+                order = line.purchase_order
+                if order.synthetic_received_at:
+                    movements.append(self._movement(
+                        f'INV-{SYNTHETIC_PREFIX}-P{line.pk}', order.destination_location_id, line,
+                        self.movement_in, order.id_purchase_order, order.synthetic_received_at
+                    ))
+
+            SalesOrder.objects.bulk_create(self.sales_orders, batch_size=self.batch_size)
+            SalesOrderLine.objects.bulk_create(self.sales_lines, batch_size=self.batch_size)
+            refresh_totals(SalesOrder, [order.pk for order in self.sales_orders])
+            for line in self.sales_lines:
+                order = line.sales_order
+                if order.synthetic_delivered_at:
+                    movements.append(self._movement(
+                        f'INV-{SYNTHETIC_PREFIX}-S{line.pk}', order.source_location_id, line,
+                        self.movement_out, order.id_sales_order, order.synthetic_delivered_at
+                    ))
+
+            InventoryMovement.objects.bulk_create(movements, batch_size=self.batch_size)
+            apply_movements(movements)
+            save_reservations([
+                StockReservation(
+                    sales_order_line=line,
+                    sales_order=line.sales_order,
+                    material_id=line.material_id,
+                    location_id=line.sales_order.source_location_id,
+                    quantity=line.quantity,
+                )
+                for line in self.sales_lines if not line.sales_order.synthetic_delivered_at
+            ])
+
+            # auto_now_add ignora los valores al insertar; fijar las fechas históricas
+            for order in self.purchase_orders:
+                order.created_at = order.synthetic_created_at
+            for order in self.sales_orders:
+                order.created_at = order.synthetic_created_at
+            for movement in movements:
+                movement.movement_date = movement.created_at = movement.synthetic_at
+            PurchaseOrder.objects.bulk_update(self.purchase_orders, ['created_at'], batch_size=self.batch_size)
+            SalesOrder.objects.bulk_update(self.sales_orders, ['created_at'], batch_size=self.batch_size)
+            InventoryMovement.objects.bulk_update(
+                movements, ['movement_date', 'created_at'], batch_size=self.batch_size
+            )
+
+            entries = self._journal_entries()
+
+        self.counts['purchases.PurchaseOrder'] += len(self.purchase_orders)
+        self.counts['purchases.PurchaseOrderLine'] += len(self.purchase_lines)
+        self.counts['sales.SalesOrder'] += len(self.sales_orders)
+        self.counts['sales.SalesOrderLine'] += len(self.sales_lines)
+        self.counts['inventory.InventoryMovement'] += len(movements)
+        self.counts['accounting.JournalEntry'] += entries
+        first = (self.purchase_orders or self.sales_orders)[0]
+        self.log(
+            f'{first.issue_date:%Y-%m}: {len(self.purchase_orders)} compras, '
+            f'{len(self.sales_orders)} ventas, {len(movements)} movimientos, {entries} asientos'
+        )
+
+    def _movement(self, movement_id, location_id, line, movement_type, reference, at):
+        movement = InventoryMovement(
+            id_inventory_movement=movement_id,
+            location_id=location_id,
+            material_id=line.material_id,
+            quantity=line.quantity,
+            unit_type_id=line.unit_material_id,
+            movement_type=movement_type,
+            reference=reference,
+            created_by=self.user,
+        )
+        movement.synthetic_at = at
+        return movement
+
+    def _journal_entries(self):
+        if self.purchase_accounts is None:
+            return 0
+        received = [order.pk for order in self.purchase_orders if order.synthetic_received_at]
+        delivered = [order.pk for order in self.sales_orders if order.synthetic_delivered_at]
+        entries_data = [
+            build_purchase_entry_data(order, self.purchase_accounts)
+            for order in PurchaseOrder.objects.filter(pk__in=received)
+            .select_related('supplier').prefetch_related('lines__currency_supplier')
+        ]
+        entries_data += [
+            build_sale_entry_data(order, self.sale_accounts)
+            for order in SalesOrder.objects.filter(pk__in=delivered)
+            .select_related('customer').prefetch_related('lines__currency_customer')
+        ]
+        created = create_journal_entries_batch(entries_data, user=self.user, post=self.post_entries)
+        return len(created)
+
+    def _touch_last_sales_order(self):
+        """
+        La vista de creación numera la siguiente venta a partir de la más
+        reciente por created_at; la última generada debe ser la más reciente.
+        """
+        last = SalesOrder.objects.filter(
+            id_sales_order=f'SO-{self.next_so - 1:04d}'
+        ).first()
+        if last:
+            SalesOrder.objects.filter(pk=last.pk).update(created_at=timezone.now())
+
+    def summary(self):
+        return dict(self.counts)
@@ -0,0 +1,183 @@
+"""
+Datos de prueba compartidos por los tests de las apps.
+
+create_reference_data() deja la base de pruebas como después de la
+instalación (estados, tipos de movimiento, ubicación por defecto y cuentas
+esenciales) y los helpers crean órdenes y stock con los mismos modelos que
+usan las vistas:
+
+    class MyTests(TestCase):
+        @classmethod
+        def setUpTestData(cls):
+            cls.data = create_reference_data()
+            order = create_sales_order(cls.data, [(cls.data.materials[0], 5, '10.00')])
+"""
+
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from core import refdata
+
+
+def create_reference_data(materials=3):
+    """
+    Crea los datos de referencia, un usuario, un cliente, un proveedor y
+    `materials` materiales.
+
+    Returns:
+        SimpleNamespace: user, location, currency, customer, supplier, materials
+    """
+    from accounting.models import AccountGroup, AccountNature, AccountType
+    from core.models import Country, Currency, Status
+    from core.synthetic import SyntheticDataGenerator
+    from customers.models import Customer
+    from inventory.utils import get_default_inventory_location
+    from materials.models import Material, MaterialType, Unit
+    from suppliers.models import PaymentMethod, Supplier
+
+    # La caché de referencia puede traer filas de otra clase de pruebas
+    refdata.invalidate()
+
+    Status.objects.create(name='Activo')
+    Currency.objects.create(code='USD', name='Dólar', symbol='$')
+    Country.objects.create(code='EC', name='Ecuador')
+    Unit.objects.create(name='Unidad', symbol='u')
+    MaterialType.objects.create(name='Producto', symbol='PRD')
+    PaymentMethod.objects.create(name='Transferencia', symbol='TRF')
+    AccountGroup.objects.create(
+        id_account_group='1', name='General', code_prefix='1', description='Grupo general'
+    )
+    AccountType.objects.create(id_account_type='1', name='Asset', description='Activos')
+    AccountType.objects.create(id_account_type='2', name='Libiality', description='Pasivos')
+    AccountNature.objects.create(
+        id_account_nature='AN001', name='Deudora', symbol='DR', effect_on_balance='Débito aumenta'
+    )
+    AccountNature.objects.create(
+        id_account_nature='AN002', name='Acreedora', symbol='CR', effect_on_balance='Crédito aumenta'
+    )
+
+    for command in ('init_order_statuses', 'init_movement_types', 'init_inventory_location',
+                    'create_essential_accounts'):
+        call_command(command, stdout=StringIO())
+
+    user = get_user_model().objects.create_superuser('tester', 'tester@example.com', 'tester')
+    generator = SyntheticDataGenerator(seed=1, user=user, log=lambda message: None)
+    generator.load_reference_data()
+    generator.create_materials(materials)
+    generator.create_customers(1)
+    generator.create_suppliers(1)
+
+    return SimpleNamespace(
+        user=user,
+        location=get_default_inventory_location(),
+        currency=Currency.objects.get(code='USD'),
+        customer=Customer.objects.get(),
+        supplier=Supplier.objects.get(),
+        materials=list(Material.objects.order_by('id_material')),
+    )
+
+
+def _status(symbol):
+    from purchases.models import OrderStatus
+    return OrderStatus.objects.get(symbol=symbol)
+
+
+def create_sales_order(data, lines, status='CONFIRMED', issue_date=None):
+    """
+    Crea una orden de venta con sus líneas.
+
+    Args:
+        data: Resultado de create_reference_data()
+        lines: Lista de (material, cantidad, precio)
+        issue_date: Fecha de emisión (por defecto hoy); es la fecha del asiento
+    """
+    from sales.models import SalesOrder, SalesOrderLine
+
+    number = SalesOrder.objects.count() + 1
+    order = SalesOrder.objects.create(
+        id_sales_order=f'SO-T{number:04d}',
+        customer=data.customer,
+        issue_date=issue_date or timezone.localdate(),
+        status=_status(status),
+        source_location=data.location,
+        created_by=data.user,
+    )
+    for position, (material, quantity, price) in enumerate(lines, start=1):
+        SalesOrderLine.objects.create(
+            id_sales_order_line=f'{order.id_sales_order}-L{position:03d}',
+            sales_order=order,
+            material=material,
+            position=position,
+            quantity=quantity,
+            unit_material_id=material.unit_id,
+            price=Decimal(price),
+            currency_customer=data.currency,
+            created_by=data.user,
+        )
+    order.refresh_from_db()
+    return order
+
+
+def create_purchase_order(data, lines, status='CONFIRMED', issue_date=None):
+    """
+    Crea una orden de compra con sus líneas.
+
+    Args:
+        data: Resultado de create_reference_data()
+        lines: Lista de (material, cantidad, precio)
+        issue_date: Fecha de emisión (por defecto hoy); es la fecha del asiento
+    """
+    from purchases.models import PurchaseOrder, PurchaseOrderLine
+
+    number = PurchaseOrder.objects.count() + 1
+    order = PurchaseOrder.objects.create(
+        id_purchase_order=f'PO-T{number:04d}',
+        supplier=data.supplier,
+        issue_date=issue_date or timezone.localdate(),
+        estimated_delivery_date=issue_date or timezone.localdate(),
+        status=_status(status),
+        destination_location=data.location,
+        created_by=data.user,
+    )
+    for position, (material, quantity, price) in enumerate(lines, start=1):
+        PurchaseOrderLine.objects.create(
+            id_purchase_order_line=f'{order.id_purchase_order}-L{position:03d}',
+            purchase_order=order,
+            material=material,
+            position=position,
+            quantity=quantity,
+            unit_material_id=material.unit_id,
+            price=Decimal(price),
+            currency_supplier=data.currency,
+            created_by=data.user,
+        )
+    order.refresh_from_db()
+    return order
+
+
+def add_stock(data, material, quantity, movement_date=None):
+    """Registra una entrada de inventario en la ubicación por defecto (por defecto, ahora)."""
+    from inventory.models import InventoryMovement, MovementType
+
+    number = InventoryMovement.objects.count() + 1
+    movement = InventoryMovement.objects.create(
+        id_inventory_movement=f'INV-T{number:05d}',
+        location=data.location,
+        material=material,
+        quantity=quantity,
+        unit_type_id=material.unit_id,
+        movement_type=MovementType.objects.get(symbol='PURCHASE_IN'),
+        reference='TEST',
+        created_by=data.user,
+    )
+    if movement_date is not None:
+        # movement_date es auto_now_add: la fecha pasada se fija después,
+        # como en core.synthetic
+        InventoryMovement.objects.filter(pk=movement.pk).update(movement_date=movement_date)
+        movement.movement_date = movement_date
+    return movement
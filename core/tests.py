@@ -1,3 +1,489 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 
-# Crea tus pruebas aquí.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, connections, models, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from inventory.models import StockLevel
+from inventory.stock_levels import reconcile as reconcile_stock
+from materials.models import Material, Unit
+from purchases.models import PurchaseOrder
+from purchases.utils import bulk_transition_purchase_orders
+from sales.models import SalesOrder
+from sales.utils import bulk_transition_sales_orders
+from . import refdata
+from .autocomplete import autocomplete, clear_cache
+from .benchmarks import compare, run_benchmarks
+from .importers import CSVImporter
+from .jobs import UnknownJobType, claim_next_job, enqueue, register_job, requeue_stale_jobs, run_job
+from .metrics import registry as metrics_registry
+from .models import Currency, Job
+from .pagination import KeysetPaginator, cached_count, encode_cursor
+from .order_totals import reconcile
+from .search import ranked_ids, paginate_search
+from .synthetic import SyntheticDataGenerator
+from .testing import create_reference_data, create_sales_order, create_purchase_order, add_stock
+
+
+class OrderTotalsTests(TestCase):
+    """Totales almacenados en la cabecera de las órdenes (core.order_totals)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        for material in cls.data.materials:
+            add_stock(cls.data, material, 20)
+
+    def test_line_save_and_delete_refresh_totals(self):
+        order = create_sales_order(self.data, [
+            (self.data.materials[0], 2, '10.00'),
+            (self.data.materials[1], 3, '1.50'),
+        ], status='DRAFT')
+        self.assertEqual(order.total_amount, Decimal('24.50'))
+        self.assertEqual(order.line_count, 2)
+        self.assertEqual(order.currency, self.data.currency)
+
+        order.lines.get(position=2).delete()
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('20.00'))
+        self.assertEqual(order.line_count, 1)
+
+    def test_bulk_transitions_keep_totals_in_sync(self):
+        sale = create_sales_order(self.data, [(self.data.materials[0], 4, '5.00')], status='DRAFT')
+        purchase = create_purchase_order(self.data, [(self.data.materials[1], 8, '2.00')])
+        bulk_transition_sales_orders([sale.id_sales_order], 'confirm', self.data.user)
+        bulk_transition_sales_orders([sale.id_sales_order], 'deliver', self.data.user)
+        bulk_transition_purchase_orders([purchase.id_purchase_order], 'receive', self.data.user)
+
+        sale.refresh_from_db()
+        purchase.refresh_from_db()
+        self.assertEqual(sale.delivered_fraction, Decimal('1'))
+        self.assertEqual(purchase.received_fraction, Decimal('1'))
+        self.assertEqual(reconcile(SalesOrder, fix=False)[1], [])
+        self.assertEqual(reconcile(PurchaseOrder, fix=False)[1], [])
+
+    def test_reconcile_detects_and_fixes_drift(self):
+        order = create_sales_order(self.data, [(self.data.materials[0], 2, '10.00')], status='DRAFT')
+        SalesOrder.objects.filter(pk=order.pk).update(total_amount=0, line_count=0)
+
+        out = StringIO()
+        call_command('reconcile_order_totals', '--dry-run', '--only', 'sales', stdout=out)
+        self.assertIn(order.id_sales_order, out.getvalue())
+
+        checked, drifted = reconcile(SalesOrder)
+        self.assertEqual(drifted, [order.id_sales_order])
+        order.refresh_from_db()
+        self.assertEqual((order.total_amount, order.line_count), (Decimal('20.00'), 1))
+        self.assertEqual(reconcile(SalesOrder, fix=False)[1], [])
+
+    def test_mixed_currency_orders_show_no_total(self):
+        eur = Currency.objects.create(code='EUR', name='Euro', symbol='€')
+        sale = create_sales_order(self.data, [
+            (self.data.materials[0], 1, '100.00'),
+            (self.data.materials[1], 1, '23.45'),
+        ], status='DRAFT')
+        purchase = create_purchase_order(self.data, [
+            (self.data.materials[0], 1, '100.00'),
+            (self.data.materials[1], 1, '23.45'),
+        ], status='DRAFT')
+        sale.lines.filter(position=2).update(currency_customer=eur)
+        purchase.lines.filter(position=2).update(currency_supplier=eur)
+        reconcile(SalesOrder)
+        reconcile(PurchaseOrder)
+
+        self.client.force_login(self.data.user)
+        for url in (reverse('sales:sales_order_list'), reverse('purchases:purchase_order_list')):
+            response = self.client.get(url)
+            self.assertContains(response, 'Varias monedas')
+            # El monto se muestra con formato local (123,45)
+            self.assertNotContains(response, '123,45')
+
+            rows = list(csv.reader(StringIO(
+                self.client.get(url, {'export': 'csv'}).content.decode('utf-8-sig')
+            )))
+            header, row = rows[0], rows[1]
+            self.assertEqual(row[header.index('Moneda')], 'Varias')
+            self.assertEqual(row[header.index(next(h for h in header if h.startswith('Total')))], '')
+
+
+class SearchTests(TestCase):
+    """Búsqueda rankeada con los filtros del listado (core.search)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data(materials=0)
+        for number in range(1, 6):
+            Material.objects.create(
+                id_material=f'MAT-{number}', name=f'Bomba {number}', description='Bomba de agua',
+                unit=Unit.objects.get(),
+            )
+
+    def test_filters_apply_before_the_limit(self):
+        queryset = Material.objects.filter(id_material__in=['MAT-4', 'MAT-5'])
+        self.assertEqual(len(ranked_ids(Material.objects.all(), 'bomba')), 5)
+        self.assertEqual(
+            set(ranked_ids(queryset, 'bomba', limit=2)), set(queryset.values_list('pk', flat=True))
+        )
+
+    def test_paginated_total_counts_filtered_rows(self):
+        queryset = Material.objects.exclude(id_material='MAT-1')
+        page, context = paginate_search(RequestFactory().get('/'), queryset, 'bom', per_page=3)
+        self.assertEqual(len(page.object_list), 3)
+        self.assertEqual(context['total_count'], 4)
+        self.assertTrue(context['total_is_exact'])
+
+
+class AutocompleteTests(TestCase):
+    """Autocompletado paginado de los formularios de órdenes (core.autocomplete)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data(materials=0)
+        for number, name in enumerate(['Bomba de agua', 'Bomba sumergible', 'Codo', 'Tee', 'Bombín'], start=1):
+            Material.objects.create(
+                id_material=f'MAT-{number}', name=name, description=name, unit=Unit.objects.get(),
+            )
+        Material.objects.create(id_material='BOM-1', name='Válvula', description='Válvula', unit=Unit.objects.get())
+
+    def setUp(self):
+        clear_cache()
+
+    def codes(self, data):
+        return [item['code'] for item in data['results']]
+
+    def test_code_prefix_first_then_name(self):
+        self.assertEqual(self.codes(autocomplete('materials', 'mat-', limit=10)),
+                         ['MAT-1', 'MAT-2', 'MAT-3', 'MAT-4', 'MAT-5'])
+        codes = self.codes(autocomplete('materials', 'bom', limit=10))
+        self.assertEqual(codes[0], 'BOM-1')
+        self.assertEqual(set(codes[1:]), {'MAT-1', 'MAT-2', 'MAT-5'})
+
+    def test_pages_and_cache_invalidation(self):
+        first = autocomplete('materials', '', limit=4)
+        second = autocomplete('materials', '', page=2, limit=4)
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(len(first['results']) + len(second['results']), 6)
+
+        self.assertEqual(autocomplete('materials', 'mat-3')['results'][0]['label'], 'Codo')
+        # update() no emite señales: sigue la respuesta en caché
+        Material.objects.filter(id_material='MAT-3').update(name='Codo 90')
+        self.assertEqual(autocomplete('materials', 'mat-3')['results'][0]['label'], 'Codo')
+        Material.objects.get(id_material='MAT-3').save()
+        self.assertEqual(autocomplete('materials', 'mat-3')['results'][0]['label'], 'Codo 90')
+
+    def test_api(self):
+        self.client.force_login(self.data.user)
+        response = self.client.get(reverse('autocomplete', args=['materials']), {'q': 'MAT-4'})
+        self.assertEqual(response.json()['results'][0]['unit']['symbol'], 'u')
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['nada'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['materials']), {'page': 'x'}).status_code, 400)
+
+
+class ImporterCleanValueTests(TestCase):
+    """Validación rápida por columna del importador (CSVImporter._clean_value)."""
+
+    def setUp(self):
+        self.importer = CSVImporter()
+
+    def test_blank_values_use_the_field_empty_value(self):
+        self.assertEqual(self.importer._clean_value(models.CharField(max_length=10, blank=True), ''), '')
+        self.assertIsNone(self.importer._clean_value(models.IntegerField(null=True, blank=True), ''))
+        self.assertEqual(self.importer._clean_value(models.IntegerField(blank=True, default=3), ''), 3)
+        self.assertFalse(self.importer._clean_value(models.BooleanField(default=True), ''))
+        with self.assertRaises(ValidationError):
+            self.importer._clean_value(models.CharField(max_length=10), '')
+
+    def test_values_go_through_field_clean(self):
+        field = models.CharField(max_length=1, choices=[('A', 'Alta'), ('B', 'Baja')])
+        self.assertEqual(self.importer._clean_value(field, 'A'), 'A')
+        with self.assertRaises(ValidationError):
+            self.importer._clean_value(field, 'C')
+        with self.assertRaises(ValidationError):
+            self.importer._clean_value(models.IntegerField(), 'doce')
+        with self.assertRaises(ValidationError):
+            self.importer._clean_value(models.CharField(max_length=3), 'abcd')
+
+
+class RefdataTests(TestCase):
+    """Caché de tablas de referencia frente a transacciones (core.refdata)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Currency.objects.create(code='USD', name='Dólar', symbol='$')
+
+    def setUp(self):
+        refdata.invalidate()
+
+    def cached_name(self):
+        table = refdata._tables.get('core.Currency')
+        return table['by_key']['USD'].name if table else None
+
+    def test_rolled_back_change_does_not_stay_cached(self):
+        try:
+            with transaction.atomic():
+                currency = Currency.objects.get(code='USD')
+                currency.name = 'Dólar (sin confirmar)'
+                currency.save()
+                self.assertEqual(refdata.get_by_key(Currency, 'USD').name, 'Dólar (sin confirmar)')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertNotEqual(self.cached_name(), 'Dólar (sin confirmar)')
+        self.assertEqual(refdata.get_by_key(Currency, 'USD').name, 'Dólar')
+
+    def test_committed_change_invalidates_the_cache(self):
+        refdata._pending_labels().clear()
+        self.assertEqual(refdata.get_by_key(Currency, 'USD').name, 'Dólar')
+        with self.captureOnCommitCallbacks(execute=True):
+            Currency.objects.filter(code='USD').update(name='Dólar estadounidense')
+            Currency.objects.get(code='USD').save()
+            self.assertEqual(self.cached_name(), 'Dólar')
+
+        self.assertIsNone(self.cached_name())
+        self.assertEqual(refdata.get_by_key(Currency, 'USD').name, 'Dólar estadounidense')
+
+
+@register_job('tests.sum')
+def sum_job(job, progress):
+    progress.update(1, total=1, message='Sumando', force=True)
+    return {'total': sum(job.params['values'])}
+
+
+@register_job('tests.fail')
+def failing_job(job, progress):
+    raise ValueError('Archivo sin columnas')
+
+
+class JobQueueTests(TestCase):
+    """Cola de tareas en base de datos (core.jobs)."""
+
+    def test_jobs_are_claimed_oldest_first_and_run(self):
+        first = enqueue('tests.sum', params={'values': [1, 2]})
+        second = enqueue('tests.sum', params={'values': [3]})
+
+        job = claim_next_job('worker-1')
+        self.assertEqual((job.pk, job.status, job.worker), (first.pk, Job.STATUS_RUNNING, 'worker-1'))
+        self.assertEqual(claim_next_job('worker-2').pk, second.pk)
+        self.assertIsNone(claim_next_job('worker-3'))
+
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.STATUS_SUCCESS, {'total': 3}))
+        self.assertEqual((job.progress_current, job.progress_total, job.progress_message), (1, 1, 'Sumando'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_keeps_the_error(self):
+        enqueue('tests.fail')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            job = run_job(claim_next_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.STATUS_FAILED, 'Archivo sin columnas'))
+        self.assertIsNone(job.result)
+
+    def test_unknown_type_and_stale_jobs(self):
+        with self.assertRaises(UnknownJobType):
+            enqueue('tests.no_existe')
+
+        job = enqueue('tests.sum', params={'values': []})
+        claim_next_job('worker-1')
+        self.assertEqual(requeue_stale_jobs(3600), 0)
+        self.assertEqual(requeue_stale_jobs(-1), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Job.STATUS_PENDING, ''))
+
+
+class ExportJobTests(TestCase):
+    """Exportación CSV en segundo plano (core.jobs.export_csv)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        create_sales_order(cls.data, [(cls.data.materials[0], 2, '10.00')], status='DRAFT')
+
+    def setUp(self):
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+
+    def export(self, user):
+        enqueue('core.export_csv', params={
+            'path': reverse('sales:sales_order_list'), 'query': 'export=csv', 'filename': 'ventas.csv',
+        }, user=user)
+        return run_job(claim_next_job('test'))
+
+    def test_export_runs_the_list_view_as_the_requesting_user(self):
+        job = self.export(self.data.user)
+        self.assertEqual(job.status, Job.STATUS_SUCCESS)
+        with open(os.path.join(self.media, job.output_file), encoding='utf-8-sig') as output:
+            self.assertIn('SO-T0001', output.read())
+
+    def test_export_without_an_active_user_fails(self):
+        with self.assertLogs('core.jobs', 'ERROR'):
+            job = self.export(None)
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn('inactivo', job.error)
+        self.assertFalse(job.output_file)
+
+        self.data.user.is_active = False
+        self.data.user.save()
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(self.export(self.data.user).status, Job.STATUS_FAILED)
+
+
+class PaginationTests(TestCase):
+    """Paginación por cursor y conteos del listado (core.pagination)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_reference_data(materials=0)
+        for number in range(1, 6):
+            Material.objects.create(
+                id_material=f'MAT-{number}', name=f'Material {number}', description='', unit=Unit.objects.get(),
+            )
+
+    def test_cached_count_of_a_filter_without_rows(self):
+        self.assertEqual(cached_count(Material.objects.filter(pk__in=[])), (0, True))
+        self.assertEqual(cached_count(Material.objects.filter(id_material__in=['MAT-1', 'MAT-2'])), (2, True))
+
+    def paginator(self, ordering=('id_material',)):
+        return KeysetPaginator(Material.objects.all(), 2, ordering)
+
+    def ids(self, page):
+        return [material.id_material for material in page]
+
+    def test_forward_and_backward_pages(self):
+        paginator = self.paginator()
+        first = paginator.get_page()
+        second = paginator.get_page(after=first.next_cursor)
+        third = paginator.get_page(after=second.next_cursor)
+        self.assertEqual([self.ids(page) for page in (first, second, third)],
+                         [['MAT-1', 'MAT-2'], ['MAT-3', 'MAT-4'], ['MAT-5']])
+        self.assertEqual((first.has_previous, first.has_next), (False, True))
+        self.assertEqual((third.has_previous, third.has_next), (True, False))
+
+        back = paginator.get_page(before=third.previous_cursor)
+        self.assertEqual(self.ids(back), ['MAT-3', 'MAT-4'])
+        self.assertTrue(back.has_previous and back.has_next)
+        self.assertEqual(self.ids(paginator.get_page(before=back.previous_cursor)), ['MAT-1', 'MAT-2'])
+
+    def test_descending_order(self):
+        paginator = self.paginator(('-id_material',))
+        first = paginator.get_page()
+        self.assertEqual(self.ids(first), ['MAT-5', 'MAT-4'])
+        self.assertEqual(self.ids(paginator.get_page(after=first.next_cursor)), ['MAT-3', 'MAT-2'])
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = self.paginator()
+        for cursor in ('no-es-un-cursor', encode_cursor(['MAT-2', 1]), encode_cursor(['MAT-2'])[:-2] + 'xx'):
+            page = paginator.get_page(after=cursor)
+            self.assertEqual(self.ids(page), ['MAT-1', 'MAT-2'])
+            self.assertFalse(page.has_previous)
+
+    def test_list_view_ignores_a_tampered_cursor(self):
+        self.client.force_login(get_user_model().objects.get())
+        response = self.client.get(reverse('materials:materials_list'), {'after': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 5)
+        self.assertEqual(response.context['total_count'], 5)
+
+
+class QueryMetricsTests(TestCase):
+    """Métricas y presupuestos de consultas por vista (core.metrics)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data(materials=2)
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.client.force_login(self.data.user)
+
+    def test_requests_are_counted_per_view(self):
+        self.client.get(reverse('materials:materials_list'))
+        self.client.get(reverse('materials:materials_list'))
+
+        stats = self.client.get(reverse('metrics')).json()['views']['materials:materials_list']
+        self.assertEqual(stats['requests'], 2)
+        self.assertGreater(stats['queries_max'], 0)
+        self.assertEqual(stats['over_budget'], 0)
+
+    @override_settings(QUERY_BUDGETS={'materials:materials_list': 1})
+    def test_view_over_budget_logs_a_warning(self):
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(reverse('materials:materials_list'))
+        self.assertIn('presupuesto 1', logs.output[0])
+
+        data = self.client.get(reverse('metrics')).json()
+        self.assertEqual(data['over_budget'], ['materials:materials_list'])
+
+    def test_metrics_are_only_for_superusers(self):
+        user = get_user_model().objects.create_user('consulta', 'consulta@example.com', 'consulta')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+
+class SyntheticDataTests(TestCase):
+    """Datos sintéticos y suite de benchmarks (core.synthetic, core.benchmarks)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data(materials=4)
+        generator = SyntheticDataGenerator(seed=7, user=cls.data.user, log=lambda message: None)
+        generator.load_reference_data()
+        generator.create_orders(years=0.1, purchases_per_day=2, sales_per_day=2, max_lines=3)
+
+    def test_generated_data_is_consistent(self):
+        self.assertGreater(SalesOrder.objects.count(), 0)
+        self.assertGreater(PurchaseOrder.objects.count(), 0)
+        self.assertEqual(reconcile(SalesOrder, fix=False)[1], [])
+        self.assertEqual(reconcile(PurchaseOrder, fix=False)[1], [])
+        self.assertEqual(reconcile_stock(fix=False)[1], [])
+        self.assertFalse(StockLevel.objects.filter(on_hand__lt=0).exists())
+
+    def test_benchmarks_run_and_roll_back_writes(self):
+        statuses = list(SalesOrder.objects.order_by('pk').values_list('status__symbol', flat=True))
+        results = run_benchmarks(['inventory.stock_view', 'sales.deliver_orders'], self.data.user, repeat=1)
+
+        for result in results.values():
+            self.assertNotIn('error', result)
+            self.assertGreater(result['queries'], 0)
+        self.assertEqual(list(SalesOrder.objects.order_by('pk').values_list('status__symbol', flat=True)), statuses)
+
+        baseline = {'results': {name: {'median_s': result['median_s'] / 4} for name, result in results.items()}}
+        self.assertTrue(all(row[4] for row in compare(results, baseline, max_regression=2)))
+
+
+class SQLiteSettingsTests(TestCase):
+    """Configuración de SQLite para uso concurrente (settings.DATABASES)."""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+        self.assertEqual(self.pragma('cache_size'), -20000)
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_file_database_uses_wal(self):
+        # La base de pruebas está en memoria; el modo WAL se revisa en un archivo
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {**connections['default'].settings_dict, 'NAME': os.path.join(directory, 'wal.sqlite3')}
+            wrapper = connections['default'].__class__(settings_dict)
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+            finally:
+                wrapper.close()
@@ -4,4 +4,10 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('import-errors/<str:filename>/', views.import_error_file_view, name='import_error_file'),
+    path('jobs/<int:job_id>/', views.job_detail_view, name='job_detail'),
+    path('jobs/<int:job_id>/status/', views.job_status_api, name='job_status_api'),
+    path('jobs/<int:job_id>/download/', views.job_download_view, name='job_download'),
+    path('autocomplete/<str:source>/', views.autocomplete_api, name='autocomplete'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
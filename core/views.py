@@ -1,6 +1,14 @@
-from django.shortcuts import render
+import os
+
+from django.conf import settings
+from django.shortcuts import render, get_object_or_404
+from django.http import FileResponse, Http404, JsonResponse
 from django.contrib.auth.decorators import login_required
 from users.models import UserRole, Role
+from core.importers import error_file_path, error_file_owner
+from core.models import Job
+from core.autocomplete import autocomplete, UnknownSource, AUTOCOMPLETE_DEFAULT_LIMIT
+from core.metrics import registry as metrics_registry
 
 def index(request):
     from django.http import HttpResponse
@@ -44,3 +52,124 @@ def dashboard_view(request):
     }
     
     return render(request, "core/dashboard.html", context)
+
+
+@login_required
+def import_error_file_view(request, filename):
+    """
+    Descarga el archivo CSV con las filas rechazadas de una carga masiva.
+    Solo el usuario que realizó la carga (o un superusuario) puede descargarlo.
+    """
+    if not request.user.is_superuser and error_file_owner(filename) != str(request.user.pk):
+        raise Http404('Archivo no encontrado')
+
+    path = error_file_path(filename)
+    if not os.path.isfile(path):
+        raise Http404('Archivo no encontrado')
+
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=os.path.basename(path),
+        content_type='text/csv'
+    )
+
+
+def _get_user_job(request, job_id):
+    """Retorna la tarea si pertenece al usuario (o si es superusuario)."""
+    job = get_object_or_404(Job, pk=job_id)
+    if not request.user.is_superuser and job.created_by_id != request.user.pk:
+        raise Http404('Tarea no encontrada')
+    return job
+
+
+def _job_status_data(job):
+    return {
+        'id': job.pk,
+        'job_type': job.job_type,
+        'status': job.status,
+        'is_finished': job.is_finished,
+        'progress_current': job.progress_current,
+        'progress_total': job.progress_total,
+        'progress_percent': job.get_progress_percent(),
+        'progress_message': job.progress_message,
+        'result': job.result,
+        'error': job.error,
+        'has_output': bool(job.output_file),
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@login_required
+def job_detail_view(request, job_id):
+    """Página de seguimiento de una tarea en segundo plano (consulta el estado por JSON)."""
+    job = _get_user_job(request, job_id)
+    return render(request, 'core/job_detail.html', {'job': job, 'job_data': _job_status_data(job)})
+
+
+@login_required
+def job_status_api(request, job_id):
+    """Estado y progreso de una tarea en formato JSON, para consultas periódicas."""
+    job = _get_user_job(request, job_id)
+    return JsonResponse(_job_status_data(job))
+
+
+@login_required
+def job_download_view(request, job_id):
+    """Descarga el archivo generado por una tarea (ej: una exportación CSV)."""
+    job = _get_user_job(request, job_id)
+    if job.status != Job.STATUS_SUCCESS or not job.output_file:
+        raise Http404('La tarea no generó un archivo')
+
+    path = os.path.join(settings.MEDIA_ROOT, job.output_file)
+    if not os.path.isfile(path):
+        raise Http404('Archivo no encontrado')
+
+    filename = (job.result or {}).get('filename') or os.path.basename(path)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+
+
+@login_required
+def autocomplete_api(request, source):
+    """
+    Autocompletado paginado para los formularios de órdenes.
+
+    URL: /autocomplete/<source>/?q=<texto>&page=<n>&limit=<n>
+    source: materials, customers, suppliers o locations
+    """
+    try:
+        page = int(request.GET.get('page', 1))
+        limit = int(request.GET.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros de paginación inválidos'}, status=400)
+
+    try:
+        data = autocomplete(source, request.GET.get('q', ''), page=page, limit=limit)
+    except UnknownSource:
+        raise Http404('Fuente de autocompletado no encontrada')
+    return JsonResponse(data)
+
+
+@login_required
+def metrics_view(request):
+    """
+    Métricas por vista del proceso actual (consultas, tiempos, presupuestos).
+    Solo superusuarios. ?reset=1 reinicia los acumulados.
+
+    URL: /metrics/
+    """
+    if not request.user.is_superuser:
+        raise Http404('Página no encontrada')
+
+    if request.GET.get('reset') == '1':
+        metrics_registry.reset()
+
+    views = metrics_registry.snapshot()
+    return JsonResponse({
+        'pid': os.getpid(),
+        'since': metrics_registry.started_at,
+        'over_budget': sorted(name for name, stats in views.items() if stats['over_budget']),
+        'views': views,
+    })
@@ -94,3 +94,19 @@ class CSVUploadForm(forms.Form):
             'accept': '.csv'
         })
     )
+    run_in_background = forms.BooleanField(
+        required=False,
+        label='Process in background',
+        help_text='Recommended for large files. The upload is queued and you can follow its progress.',
+        widget=forms.CheckboxInput(attrs={
+            'class': 'h-4 w-4 text-blue-600 border-gray-300 rounded focus:ring-blue-500'
+        })
+    )
+    upsert = forms.BooleanField(
+        required=False,
+        label='Update existing records',
+        help_text='Rows whose ID already exists update that record instead of being rejected. Unchanged rows are skipped.',
+        widget=forms.CheckboxInput(attrs={
+            'class': 'h-4 w-4 text-blue-600 border-gray-300 rounded focus:ring-blue-500'
+        })
+    )
@@ -0,0 +1,13 @@
+"""
+Tareas en segundo plano del módulo de clientes.
+"""
+
+from core.jobs import register_job
+from core.importers import run_import_job
+from .utils import CustomerImporter
+
+
+@register_job('customers.import')
+def import_customers(job, progress):
+    """Carga masiva encolada desde customer_bulk_upload."""
+    return run_import_job(CustomerImporter, job, progress)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='import_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
@@ -25,6 +25,8 @@ class Customer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Hash del contenido de la última carga masiva (permite omitir filas sin cambios)
+    import_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
     
     class Meta:
         db_table = "customers"
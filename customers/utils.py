@@ -0,0 +1,24 @@
+"""
+Funciones de utilidad para el módulo de clientes.
+
+Incluye el importador de la carga masiva de clientes por CSV.
+"""
+
+from core.importers import CSVImporter
+from .models import Customer
+from .forms import CustomerForm
+
+
+class CustomerImporter(CSVImporter):
+    """Importa clientes desde un CSV (delimitador ';')."""
+
+    model = Customer
+    form_class = CustomerForm
+    unique_field = 'id_customer'
+    error_file_prefix = 'customers'
+
+    def prepare_row(self, row):
+        # Convertir status a booleano
+        if 'status' in row:
+            row['status'] = (row['status'] or '').lower() in ['true', '1', 'yes', 'active']
+        return row
@@ -1,12 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from core.pagination import paginate_keyset
+from core.search import search_filter, paginate_search
+from core.jobs import enqueue, enqueue_export, save_job_input
+from core.refdata import all_of
 from django.db.models import Q
 from django.http import HttpResponse
 from django.contrib import messages
 import csv
-import io
 from .models import Customer
+from .utils import CustomerImporter
 from .forms import CustomerForm, CSVUploadForm
 from suppliers.models import PaymentMethod
 
@@ -86,8 +89,17 @@ def customers_list(request):
     if created_by:
         customers = customers.filter(created_by__username__icontains=created_by)
     
+    # Búsqueda de texto completo (?search=) sobre el índice FTS
+    search = request.GET.get('search', '').strip()
+    if search:
+        customers = search_filter(customers, search)
+    
     # Exportar a CSV si se solicita
     if request.GET.get('export') == 'csv':
+        # Exportaciones grandes: generar el archivo en segundo plano
+        if request.GET.get('background'):
+            return enqueue_export(request, 'customers.csv')
+
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="customers.csv"'
         
@@ -127,17 +139,15 @@ def customers_list(request):
         
         return response
     
-    # Paginación
-    paginator = Paginator(customers, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Construir querystring sin page
-    querystring = request.GET.copy()
-    if 'page' in querystring:
-        querystring.pop('page')
+    # Paginación por cursor (sin OFFSET); '-id' desempata created_at.
+    # Con ?search= los resultados se ordenan por relevancia.
+    if search:
+        page_obj, pagination = paginate_search(request, customers, search, 10)
+    else:
+        page_obj, pagination = paginate_keyset(request, customers, 10, ('-created_at', '-id'))
     
     filters = {
+        'search': search,
         'id_customer': id_customer,
         'legal_name': legal_name,
         'name': name,
@@ -163,12 +173,13 @@ def customers_list(request):
     }
     
     # Cargar opciones para los filtros
-    payment_methods = PaymentMethod.objects.all()
+    payment_methods = all_of(PaymentMethod)
     
     context = {
         'page_obj': page_obj,
         'filters': filters,
-        'querystring': querystring.urlencode(),
+        'querystring': pagination['pagination_querystring'],
+        **pagination,
         'payment_methods': payment_methods,
     }
     
@@ -231,70 +242,40 @@ def customer_bulk_upload(request):
         if form.is_valid():
             csv_file = request.FILES['csv_file']
             
-            # Intentar decodificar el archivo
-            try:
-                decoded_file = csv_file.read().decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    csv_file.seek(0)
-                    decoded_file = csv_file.read().decode('iso-8859-1')
-                except Exception as e:
-                    messages.error(request, f'Error decoding file: {str(e)}')
-                    return render(request, 'customers/customer_bulk_upload.html', {'form': form})
-            
-            # Procesar CSV
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string, delimiter=';')
-            
-            # Limpiar BOM y espacios en cabeceras
-            reader.fieldnames = [field.strip().replace('\ufeff', '') for field in reader.fieldnames]
-            
-            valid_customers = []
-            error_rows = []
-            row_number = 1
+            # Archivos grandes: encolar y seguir el avance en la página de la tarea
+            if form.cleaned_data.get('run_in_background'):
+                job = enqueue(
+                    'customers.import',
+                    params={'upsert': form.cleaned_data.get('upsert', False)},
+                    user=request.user,
+                    input_file=save_job_input(csv_file, prefix='customers')
+                )
+                messages.info(request, 'The file was queued for processing.')
+                return redirect('job_detail', job_id=job.pk)
             
-            for row in reader:
-                row_number += 1
-                # Limpiar espacios en valores
-                cleaned_row = {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items()}
-                
-                # Convertir status a booleano
-                if 'status' in cleaned_row:
-                    status_value = cleaned_row['status'].lower()
-                    cleaned_row['status'] = status_value in ['true', '1', 'yes', 'active']
-                
-                # Crear formulario con los datos
-                customer_form = CustomerForm(cleaned_row)
-                
-                if customer_form.is_valid():
-                    customer = customer_form.save(commit=False)
-                    customer.created_by = request.user
-                    valid_customers.append(customer)
-                else:
-                    error_rows.append({
-                        'row': row_number,
-                        'data': cleaned_row,
-                        'errors': customer_form.errors
-                    })
-            
-            # Guardar todos los registros válidos en una sola operación
-            if valid_customers:
-                Customer.objects.bulk_create(valid_customers)
+            # Procesar el CSV por streaming, guardando en lotes
+            try:
+                result = CustomerImporter(
+                    user=request.user,
+                    upsert=form.cleaned_data.get('upsert', False)
+                ).run(csv_file)
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Error processing file: {str(e)}')
+                return render(request, 'customers/customer_bulk_upload.html', {'form': form})
             
             # Preparar contexto con el informe
             context = {
                 'form': form,
                 'upload_complete': True,
-                'total_rows': row_number - 1,
-                'successful_rows': len(valid_customers),
-                'error_count': len(error_rows),
-                'error_rows': error_rows
+                **result
             }
             
-            if valid_customers:
-                messages.success(request, f'Successfully uploaded {len(valid_customers)} customers.')
-            if error_rows:
-                messages.warning(request, f'{len(error_rows)} rows had errors and were not uploaded.')
+            if result['inserted_rows']:
+                messages.success(request, f"Successfully uploaded {result['inserted_rows']} customers.")
+            if result['updated_rows']:
+                messages.success(request, f"Updated {result['updated_rows']} existing customers.")
+            if result['error_count']:
+                messages.warning(request, f"{result['error_count']} rows had errors and were not uploaded.")
             
             return render(request, 'customers/customer_bulk_upload.html', context)
     else:
@@ -86,6 +86,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -118,10 +119,36 @@ WSGI_APPLICATION = 'erp_project.wsgi.application'
 
 # Base de datos
 
+# SQLite en modo WAL: las lecturas no bloquean a la escritura ni viceversa.
+# - timeout: segundos que una conexión espera un bloqueo antes de fallar
+#   con "database is locked" (busy timeout).
+# - transaction_mode IMMEDIATE: cada transacción toma el bloqueo de escritura
+#   al empezar; evita el fallo inmediato cuando dos transacciones que leyeron
+#   intentan escribir a la vez (una lectura no se puede "ascender").
+# - synchronous=NORMAL es seguro en WAL (solo el checkpoint hace fsync).
+# - CONN_MAX_AGE reutiliza la conexión entre peticiones del mismo hilo.
+# `python manage.py benchmark_sqlite_concurrency` compara contra la
+# configuración por defecto.
+
+SQLITE_INIT_COMMAND = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA cache_size=-20000;'
+    'PRAGMA temp_store=MEMORY;'
+    'PRAGMA mmap_size=134217728;'
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': SQLITE_INIT_COMMAND,
+        },
     }
 }
 
@@ -159,6 +186,24 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Archivos generados por la aplicación (ej: archivos de errores de importación)
+
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Métricas por vista (core.metrics): consultas y tiempos en /metrics/.
+# Una vista que supera su presupuesto de consultas genera un warning.
+
+QUERY_METRICS_ENABLED = True
+QUERY_METRICS_TRACK_MEMORY = False
+QUERY_BUDGET_DEFAULT = 100
+QUERY_BUDGETS = {
+    'reporting:sales_report': 50,
+    'reporting:purchases_report': 50,
+    'reporting:inventory_report': 50,
+    'reporting:accounting_report': 50,
+}
+
 # Tipo de campo de clave primaria predeterminado
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,43 @@
+"""
+Management command that repairs the stock counters (StockLevel).
+
+Usage:
+    python manage.py reconcile_stock_levels
+    python manage.py reconcile_stock_levels --dry-run
+
+Recomputes on_hand of every (material, location) from the inventory
+movements (starting from the last stock snapshot) and reserved from the
+sales order reservations, and rewrites the counters that drifted, e.g.
+after movements were loaded with raw SQL or orders were deleted in bulk.
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventory.stock_levels import reconcile
+
+
+# Máximo de pares con diferencias que se listan
+SHOW_KEYS = 20
+
+
+class Command(BaseCommand):
+    help = 'Recompute stock counters (on hand and reserved) and fix drifted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted counters without fixing them')
+
+    def handle(self, *args, **options):
+        fix = not options['dry_run']
+        checked, drifted = reconcile(fix=fix)
+
+        verb = 'fixed' if fix else 'drifted'
+        self.stdout.write(f'inventory.StockLevel: {checked} checked, {len(drifted)} {verb}')
+        if drifted:
+            shown = ', '.join(f'{material_id}@{location_id}' for material_id, location_id in drifted[:SHOW_KEYS])
+            more = f' (+{len(drifted) - SHOW_KEYS} more)' if len(drifted) > SHOW_KEYS else ''
+            self.stdout.write(self.style.WARNING(f'    {shown}{more}'))
+
+        if drifted and not fix:
+            self.stdout.write(self.style.WARNING('Run without --dry-run to fix them'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Stock counters are consistent'))
@@ -0,0 +1,60 @@
+"""
+Management command to write the daily stock checkpoints.
+
+Usage:
+    python manage.py write_stock_snapshots
+    python manage.py write_stock_snapshots --through 2026-06-30
+    python manage.py write_stock_snapshots --rebuild
+
+Stores the stock of every (material, location) at the end of each past
+day that had inventory movements, starting after the last existing
+checkpoint. Stock queries for a past date (see the as-of stock API)
+start from the nearest earlier checkpoint and only add the movements
+after it.
+
+Meant to run once a day (e.g. from cron after midnight). Editing or
+deleting a movement with a past date updates the later checkpoints; use
+--rebuild after loading movements in bulk with past dates.
+"""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.models import StockSnapshot
+from inventory.periods import write_daily_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Write the missing daily stock checkpoints (one per past day with movements)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--through', help='Last day to write, as YYYY-MM-DD (default: yesterday)')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Delete the existing daily checkpoints first (period close snapshots are kept)')
+
+    def handle(self, *args, **options):
+        through = None
+        if options['through']:
+            try:
+                through = date.fromisoformat(options['through'])
+            except ValueError:
+                raise CommandError(f"'{options['through']}' is not a valid YYYY-MM-DD date")
+
+        if options['rebuild']:
+            deleted, _ = StockSnapshot.objects.filter(period__isnull=True).delete()
+            self.stdout.write(f'Deleted {deleted} checkpoint rows')
+
+        start = time.perf_counter()
+        written = write_daily_snapshots(through)
+        elapsed = time.perf_counter() - start
+
+        if not written:
+            self.stdout.write('Daily stock checkpoints are up to date')
+            return
+        rows = sum(count for _, count in written)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(written)} checkpoints ({written[0][0]} - {written[-1][0]}, '
+            f'{rows} rows) in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_fiscalperiod'),
+        ('inventory', '0002_inventorymovement_movement_date_and_more'),
+        ('materials', '0004_material_import_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInventoryMovement',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('id_inventory_movement', models.CharField(max_length=50, unique=True)),
+                ('quantity', models.IntegerField()),
+                ('movement_date', models.DateTimeField()),
+                ('reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Archived Inventory Movement',
+                'verbose_name_plural': 'Archived Inventory Movements',
+                'db_table': 'inventory_movements_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Stock Snapshot',
+                'verbose_name_plural': 'Stock Snapshots',
+                'db_table': 'inventory_stock_snapshot',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['movement_date'], name='inventory_m_movemen_649272_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedinventorymovement',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_movements', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedinventorymovement',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_movements', to='inventory.inventorylocation'),
+        ),
+        migrations.AddField(
+            model_name='archivedinventorymovement',
+            name='material',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_movements', to='materials.material'),
+        ),
+        migrations.AddField(
+            model_name='archivedinventorymovement',
+            name='movement_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_movements', to='inventory.movementtype'),
+        ),
+        migrations.AddField(
+            model_name='archivedinventorymovement',
+            name='unit_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_movements', to='materials.unit'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.inventorylocation'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='material',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='materials.material'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='period',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='core.fiscalperiod'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedinventorymovement',
+            index=models.Index(fields=['movement_date'], name='inventory_m_movemen_64b608_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedinventorymovement',
+            index=models.Index(fields=['material', 'location'], name='inventory_m_materia_b77204_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['material', 'location', 'date'], name='inventory_s_materia_88e05b_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stocksnapshot',
+            unique_together={('date', 'material', 'location')},
+        ),
+    ]
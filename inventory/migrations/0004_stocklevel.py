@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, When, F, Sum
+
+
+def build_stock_levels(apps, schema_editor):
+    """Calcula las existencias de cada (material, ubicación) desde los movimientos, incluidos los archivados."""
+    StockLevel = apps.get_model('inventory', 'StockLevel')
+    on_hand = {}
+    for name in ('InventoryMovement', 'ArchivedInventoryMovement'):
+        rows = (
+            apps.get_model('inventory', name).objects
+            .values('material_id', 'location_id')
+            .annotate(total=Sum(Case(
+                When(movement_type__symbol__endswith='_OUT', then=-F('quantity')),
+                default=F('quantity'),
+            )))
+            .order_by()
+        )
+        for row in rows:
+            key = (row['material_id'], row['location_id'])
+            on_hand[key] = on_hand.get(key, 0) + (row['total'] or 0)
+    StockLevel.objects.bulk_create([
+        StockLevel(material_id=material_id, location_id=location_id, on_hand=quantity)
+        for (material_id, location_id), quantity in on_hand.items()
+        if quantity
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stock_snapshot_archive'),
+        ('materials', '0004_material_import_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_hand', models.IntegerField(default=0)),
+                ('reserved', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_levels', to='inventory.inventorylocation')),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_levels', to='materials.material')),
+            ],
+            options={
+                'verbose_name': 'Stock Level',
+                'verbose_name_plural': 'Stock Levels',
+                'db_table': 'inventory_stock_level',
+                'indexes': [models.Index(fields=['location', 'material'], name='inventory_s_locatio_ccdf7a_idx')],
+                'unique_together': {('material', 'location')},
+            },
+        ),
+        migrations.RunPython(build_stock_levels, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from django.core.exceptions import ValidationError
-from django.db.models import Sum, F, Case, When, DecimalField
+from django.utils import timezone
 from users.models import User
 from materials.models import Material, Unit
 
@@ -58,6 +58,9 @@ class InventoryMovement(models.Model):
         verbose_name = "Inventory Movement"
         verbose_name_plural = "Inventory Movements"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['movement_date']),
+        ]
     
     def __str__(self):
         return f"{self.id_inventory_movement} - {self.material.name}"
@@ -89,27 +92,19 @@ class InventoryMovement(models.Model):
         # Validación 3: Stock suficiente para salidas
         if self.movement_type and self.movement_type.symbol.endswith('_OUT'):
             if self.material and self.location and self.quantity:
-                # Calcular stock actual en esta ubicación para este material
-                # Excluir el movimiento actual si ya existe (en caso de edición)
-                movements_query = InventoryMovement.objects.filter(
-                    material=self.material,
-                    location=self.location
-                )
+                # Stock actual en esta ubicación para este material
+                # (parte del último cierre de período, ver inventory.periods)
+                from inventory.utils import get_stock_levels
+                current_stock = get_stock_levels([self.material.pk], [self.location.pk])[
+                    (self.material.pk, self.location.pk)
+                ]
                 
                 # Si estamos editando un movimiento existente, excluirlo del cálculo
                 if self.pk:
-                    movements_query = movements_query.exclude(pk=self.pk)
-                
-                # Calcular stock: entradas (+) - salidas (-)
-                current_stock = movements_query.aggregate(
-                    total=Sum(
-                        Case(
-                            When(movement_type__symbol__endswith='_OUT', then=-F('quantity')),
-                            default=F('quantity'),
-                            output_field=DecimalField()
-                        )
-                    )
-                )['total'] or 0
+                    stored = InventoryMovement.objects.filter(pk=self.pk).select_related('movement_type').first()
+                    if stored:
+                        sign = -1 if stored.movement_type.symbol.endswith('_OUT') else 1
+                        current_stock -= sign * stored.quantity
                 
                 # Verificar si hay suficiente stock para esta salida
                 if self.quantity > current_stock:
@@ -121,4 +116,142 @@ class InventoryMovement(models.Model):
         # Si hay errores, lanzar ValidationError
         if errors:
             raise ValidationError(errors)
+    
+    def save(self, *args, **kwargs):
+        # Los movimientos de períodos cerrados no se modifican
+        # (los nuevos llevan la fecha actual, que siempre está abierta)
+        stored = None
+        if not self._state.adding:
+            if self.movement_date:
+                from core.periods import ensure_open
+                ensure_open(timezone.localdate(self.movement_date))
+            stored = InventoryMovement.objects.filter(pk=self.pk).select_related('movement_type').first()
+        super().save(*args, **kwargs)
+        # Mantener los contadores de stock y los puntos de control posteriores al movimiento
+        from inventory.stock_levels import apply_movements
+        if stored:
+            apply_movements([stored], sign=-1)
+        apply_movements([self])
+        if stored and timezone.localdate(self.movement_date) < timezone.localdate():
+            stored._adjust_snapshots(-1)
+            self._adjust_snapshots(1)
+    
+    def delete(self, *args, **kwargs):
+        from core.periods import ensure_open
+        ensure_open(timezone.localdate(self.movement_date))
+        result = super().delete(*args, **kwargs)
+        from inventory.stock_levels import apply_movements
+        apply_movements([self], sign=-1)
+        if timezone.localdate(self.movement_date) < timezone.localdate():
+            self._adjust_snapshots(-1)
+        return result
+    
+    def _adjust_snapshots(self, sign):
+        """Aplica (sign=1) o revierte (sign=-1) el movimiento en los puntos de control diarios."""
+        from inventory.periods import adjust_snapshots
+        from inventory.stock_levels import signed
+        adjust_snapshots(
+            self.material_id, self.location_id, timezone.localdate(self.movement_date),
+            sign * signed(self.movement_type.symbol, self.quantity),
+        )
+
+
+class StockSnapshot(models.Model):
+    """
+    Stock de un material en una ubicación al final de un día.
+
+    Los cierres de período (period) y los puntos de control diarios
+    (period vacío, ver write_stock_snapshots) guardan una fila por cada par
+    (material, ubicación) con stock distinto de cero. El stock posterior
+    parte de la última foto y solo suma los movimientos siguientes (ver
+    inventory.periods).
+    """
+    date = models.DateField()
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='stock_snapshots')
+    location = models.ForeignKey(InventoryLocation, on_delete=models.CASCADE, related_name='stock_snapshots')
+    quantity = models.IntegerField()
+    period = models.ForeignKey(
+        'core.FiscalPeriod',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='stock_snapshots'
+    )
+    
+    class Meta:
+        db_table = "inventory_stock_snapshot"
+        verbose_name = "Stock Snapshot"
+        verbose_name_plural = "Stock Snapshots"
+        unique_together = [['date', 'material', 'location']]
+        indexes = [
+            models.Index(fields=['material', 'location', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.material_id}@{self.location_id}: {self.quantity}"
+
+
+class StockLevel(models.Model):
+    """
+    Contadores de stock por material y ubicación.
 
+    on_hand es el stock físico (lo mantienen save()/delete() de
+    InventoryMovement y los caminos masivos) y reserved lo reservado por
+    órdenes de venta confirmadas (ver sales.reservations). El disponible
+    para prometer es on_hand - reserved (ver inventory.stock_levels).
+    """
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='stock_levels')
+    location = models.ForeignKey(InventoryLocation, on_delete=models.CASCADE, related_name='stock_levels')
+    on_hand = models.IntegerField(default=0)
+    reserved = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = "inventory_stock_level"
+        verbose_name = "Stock Level"
+        verbose_name_plural = "Stock Levels"
+        unique_together = [['material', 'location']]
+        indexes = [
+            models.Index(fields=['location', 'material']),
+        ]
+    
+    def __str__(self):
+        return f"{self.material_id}@{self.location_id}: {self.on_hand} ({self.reserved} reservado)"
+    
+    @property
+    def available(self):
+        """Disponible para prometer."""
+        return self.on_hand - self.reserved
+
+
+class ArchivedInventoryMovement(models.Model):
+    """
+    Movimiento de inventario de un período cerrado y archivado.
+    Mismas columnas (y mismo id) que InventoryMovement.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    id_inventory_movement = models.CharField(max_length=50, unique=True)
+    location = models.ForeignKey(InventoryLocation, on_delete=models.PROTECT, related_name='archived_movements')
+    material = models.ForeignKey(Material, on_delete=models.PROTECT, related_name='archived_movements')
+    quantity = models.IntegerField()
+    unit_type = models.ForeignKey(Unit, on_delete=models.PROTECT, related_name='archived_movements')
+    movement_type = models.ForeignKey(MovementType, on_delete=models.PROTECT, related_name='archived_movements')
+    movement_date = models.DateTimeField()
+    reference = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_movements'
+    )
+    
+    class Meta:
+        db_table = "inventory_movements_archive"
+        verbose_name = "Archived Inventory Movement"
+        verbose_name_plural = "Archived Inventory Movements"
+        indexes = [
+            models.Index(fields=['movement_date']),
+            models.Index(fields=['material', 'location']),
+        ]
+    
+    def __str__(self):
+        return f"{self.id_inventory_movement} - {self.material_id}"
@@ -0,0 +1,228 @@
+"""
+Stock por (material, ubicación) a partir de fotos de stock (StockSnapshot).
+
+El stock al final de un día se arma con:
+
+- la última foto en o antes de ese día: la del cierre de período (ver
+  core.periods) o un punto de control diario (write_stock_snapshots)
+- más los movimientos posteriores a la foto
+
+Con puntos de control diarios, consultar el stock de una fecha pasada
+solo suma los movimientos de ese día. Si se edita o borra un movimiento
+con fecha pasada, su variación se aplica a los puntos de control
+posteriores del mismo par (ver adjust_snapshots).
+
+Usa la misma regla que InventoryMovement.clean(): los tipos que terminan
+en _OUT restan y el resto suma. Si el rango alcanza períodos archivados,
+los movimientos se suman también desde ArchivedInventoryMovement.
+"""
+
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum, Max, Case, When, F, DecimalField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.periods import archived_through
+from .models import InventoryMovement, ArchivedInventoryMovement, StockSnapshot
+
+
+# Columnas comunes de InventoryMovement y ArchivedInventoryMovement
+_MOVEMENT_COLUMNS = [
+    'id', 'id_inventory_movement', 'location_id', 'material_id', 'quantity', 'unit_type_id',
+    'movement_type_id', 'movement_date', 'reference', 'created_at', 'updated_at', 'created_by_id',
+]
+
+
+def day_end(date):
+    """Instante en que termina el día local `date` (inicio del día siguiente)."""
+    return timezone.make_aware(datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time.min))
+
+
+def signed_quantity():
+    """Cantidad con signo de cada movimiento (salidas en negativo)."""
+    return Sum(
+        Case(
+            When(movement_type__symbol__endswith='_OUT', then=-F('quantity')),
+            default=F('quantity'),
+            output_field=DecimalField()
+        )
+    )
+
+
+def movement_totals(after=None, through=None, material_ids=None, location_ids=None):
+    """
+    Variación de stock por (material, ubicación) de los movimientos
+    posteriores al día `after` y hasta el día `through` inclusive.
+
+    Returns:
+        defaultdict: (material_id, location_id) -> Decimal
+    """
+    models = [InventoryMovement]
+    archived = archived_through()
+    if archived is not None and (after is None or after < archived):
+        models.append(ArchivedInventoryMovement)
+
+    totals = defaultdict(Decimal)
+    for model in models:
+        movements = model.objects.all()
+        if after is not None:
+            movements = movements.filter(movement_date__gte=day_end(after))
+        if through is not None:
+            movements = movements.filter(movement_date__lt=day_end(through))
+        if material_ids is not None:
+            movements = movements.filter(material_id__in=set(material_ids))
+        if location_ids is not None:
+            movements = movements.filter(location_id__in=set(location_ids))
+        rows = movements.values('material_id', 'location_id').annotate(total=signed_quantity()).order_by()
+        for row in rows:
+            totals[(row['material_id'], row['location_id'])] += row['total'] or Decimal('0')
+    return totals
+
+
+def last_snapshot_date(through=None):
+    """Fecha de la última foto de stock en o antes de `through` (o la última de todas)."""
+    snapshots = StockSnapshot.objects.all()
+    if through is not None:
+        snapshots = snapshots.filter(date__lte=through)
+    return snapshots.aggregate(date=Max('date'))['date']
+
+
+def stock_through(date=None, material_ids=None, location_ids=None):
+    """
+    Stock por (material, ubicación) al final del día `date` (o actual),
+    partiendo de la última foto anterior.
+
+    Returns:
+        defaultdict: (material_id, location_id) -> Decimal; las claves
+        ausentes valen Decimal('0')
+    """
+    stock = defaultdict(Decimal)
+    snapshot_date = last_snapshot_date(date)
+    if snapshot_date is not None:
+        snapshots = StockSnapshot.objects.filter(date=snapshot_date)
+        if material_ids is not None:
+            snapshots = snapshots.filter(material_id__in=set(material_ids))
+        if location_ids is not None:
+            snapshots = snapshots.filter(location_id__in=set(location_ids))
+        for material_id, location_id, quantity in snapshots.values_list('material_id', 'location_id', 'quantity'):
+            stock[(material_id, location_id)] += Decimal(quantity)
+        if date is not None and snapshot_date == date:
+            return stock
+    for key, quantity in movement_totals(snapshot_date, date, material_ids, location_ids).items():
+        stock[key] += quantity
+    return stock
+
+
+def write_snapshot(date, period=None):
+    """
+    Guarda la foto de stock al final de `date` (reemplaza la existente).
+
+    Returns:
+        int: filas escritas (pares con stock distinto de cero)
+    """
+    stock = stock_through(date)
+    StockSnapshot.objects.filter(date=date).delete()
+    snapshots = [
+        StockSnapshot(date=date, material_id=material_id, location_id=location_id,
+                      quantity=int(quantity), period=period)
+        for (material_id, location_id), quantity in stock.items()
+        if quantity
+    ]
+    StockSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
+
+
+def stock_as_of(date, material_ids=None, location_ids=None):
+    """
+    Stock por (material, ubicación) al final del día `date`.
+
+    Returns:
+        tuple: (stock como en stock_through, fecha de la foto de partida o None)
+    """
+    return stock_through(date, material_ids, location_ids), last_snapshot_date(date)
+
+
+# ==================== PUNTOS DE CONTROL DIARIOS ====================
+
+def adjust_snapshots(material_id, location_id, date, delta):
+    """
+    Suma `delta` al stock del par en los puntos de control diarios desde
+    `date` (inclusive). Las fotos de cierre no se tocan: sus períodos no
+    admiten cambios.
+    """
+    if not delta:
+        return
+    checkpoints = StockSnapshot.objects.filter(period__isnull=True, date__gte=date)
+    days = set(checkpoints.values_list('date', flat=True).distinct().order_by())
+    if not days:
+        return
+    pair = checkpoints.filter(material_id=material_id, location_id=location_id)
+    existing = set(pair.values_list('date', flat=True))
+    pair.update(quantity=F('quantity') + delta)
+    StockSnapshot.objects.bulk_create([
+        StockSnapshot(date=day, material_id=material_id, location_id=location_id, quantity=delta)
+        for day in days - existing
+    ])
+    pair.filter(quantity=0).delete()
+
+
+def movement_days(after=None, through=None):
+    """Días (hora local) con movimientos posteriores a `after` y hasta `through` inclusive."""
+    movements = InventoryMovement.objects.all()
+    if after is not None:
+        movements = movements.filter(movement_date__gte=day_end(after))
+    if through is not None:
+        movements = movements.filter(movement_date__lt=day_end(through))
+    return sorted(
+        movements.annotate(day=TruncDate('movement_date'))
+        .values_list('day', flat=True).distinct().order_by()
+    )
+
+
+def write_daily_snapshots(through=None):
+    """
+    Escribe los puntos de control que faltan hasta `through` (por defecto
+    ayer; el día en curso nunca se guarda porque aún cambia).
+
+    Solo se guardan los días con movimientos: para un día sin movimientos
+    la foto anterior ya es su stock. Cada foto parte de la anterior, así
+    que el costo es proporcional a los movimientos de cada día.
+
+    Returns:
+        list: [(fecha, filas escritas), ...]
+    """
+    yesterday = timezone.localdate() - datetime.timedelta(days=1)
+    through = min(through or yesterday, yesterday)
+    written = []
+    for day in movement_days(last_snapshot_date(), through):
+        written.append((day, write_snapshot(day)))
+    return written
+
+
+# ==================== CIERRE ====================
+
+def close(period):
+    """Guarda el stock al cierre del período."""
+    write_snapshot(period.date_to, period=period)
+
+
+def archive(period):
+    """Mueve los movimientos del período a inventory_movements_archive."""
+    columns = ', '.join(_MOVEMENT_COLUMNS)
+    table = InventoryMovement._meta.db_table
+    params = [
+        connection.ops.adapt_datetimefield_value(day_end(period.date_from - datetime.timedelta(days=1))),
+        connection.ops.adapt_datetimefield_value(day_end(period.date_to)),
+    ]
+    where = 'movement_date >= %s AND movement_date < %s'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {ArchivedInventoryMovement._meta.db_table} ({columns}) '
+            f'SELECT {columns} FROM {table} WHERE {where}',
+            params,
+        )
+        cursor.execute(f'DELETE FROM {table} WHERE {where}', params)
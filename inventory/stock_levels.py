@@ -0,0 +1,184 @@
+"""
+Contadores de stock (StockLevel): existencias físicas y reservadas por
+material y ubicación, para responder el disponible para prometer sin
+recorrer movimientos.
+
+Cómo se mantienen al día (igual que los totales de las órdenes):
+
+- save() / delete() de InventoryMovement llaman a apply_movements()
+- los caminos masivos que usan bulk_create (entregas y recepciones en
+  bloque, datos sintéticos) llaman a apply_movements() con los
+  movimientos creados
+- sales.reservations suma y resta las reservas con apply_deltas()
+- `python manage.py reconcile_stock_levels` detecta y repara diferencias
+  (p. ej. tras cargar movimientos con SQL directo)
+
+Los contadores se actualizan con UPDATE ... SET x = x + delta, así dos
+transacciones concurrentes no se pisan.
+"""
+
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import StockLevel
+
+
+# Pares (material, ubicación) por sentencia UPDATE
+APPLY_BATCH_SIZE = 500
+
+
+def signed(symbol, quantity):
+    """Cantidad con signo de un movimiento del tipo `symbol` (salidas en negativo)."""
+    return -quantity if symbol.endswith('_OUT') else quantity
+
+
+def apply_deltas(field, deltas):
+    """
+    Suma las variaciones al contador `field` ('on_hand' o 'reserved').
+
+    Args:
+        deltas: dict (material_id, location_id) -> variación entera
+    """
+    if field not in ('on_hand', 'reserved'):
+        raise ValueError(f'Contador desconocido: {field}')
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    keys = list(deltas)
+    for start in range(0, len(keys), APPLY_BATCH_SIZE):
+        chunk = keys[start:start + APPLY_BATCH_SIZE]
+        if len(chunk) == 1:
+            material_id, location_id = chunk[0]
+            updated = StockLevel.objects.filter(material_id=material_id, location_id=location_id).update(
+                **{field: F(field) + deltas[chunk[0]]}, updated_at=timezone.now()
+            )
+            if updated:
+                continue
+        # Crear los pares que faltan y actualizar todos con un solo UPDATE
+        StockLevel.objects.bulk_create(
+            [StockLevel(material_id=material_id, location_id=location_id) for material_id, location_id in chunk],
+            ignore_conflicts=True,
+        )
+        ids = {
+            (material_id, location_id): pk
+            for pk, material_id, location_id in StockLevel.objects.filter(
+                material_id__in={material_id for material_id, _ in chunk},
+                location_id__in={location_id for _, location_id in chunk},
+            ).values_list('pk', 'material_id', 'location_id')
+        }
+        # SQL directo: con cientos de pares, armar Case/When en el ORM cuesta
+        # más que la propia sentencia
+        whens = ' '.join(['WHEN %s THEN %s'] * len(chunk))
+        params = [value for key in chunk for value in (ids[key], deltas[key])]
+        params.append(connection.ops.adapt_datetimefield_value(timezone.now()))
+        params.extend(ids[key] for key in chunk)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {StockLevel._meta.db_table} '
+                f'SET {field} = {field} + CASE id {whens} ELSE 0 END, updated_at = %s '
+                f'WHERE id IN ({", ".join(["%s"] * len(chunk))})',
+                params,
+            )
+
+
+def apply_movements(movements, sign=1):
+    """Aplica (sign=1) o revierte (sign=-1) movimientos de inventario en on_hand."""
+    deltas = defaultdict(int)
+    for movement in movements:
+        deltas[(movement.material_id, movement.location_id)] += sign * signed(
+            movement.movement_type.symbol, movement.quantity
+        )
+    apply_deltas('on_hand', deltas)
+
+
+def availability(material_ids, location_ids=None):
+    """
+    Existencias, reservas y disponible para prometer, en una consulta.
+
+    Returns:
+        dict: (material_id, location_id) -> {'on_hand', 'reserved', 'available'};
+        los pares sin contador no aparecen (equivalen a cero)
+    """
+    levels = StockLevel.objects.filter(material_id__in=set(material_ids))
+    if location_ids is not None:
+        levels = levels.filter(location_id__in=set(location_ids))
+    return {
+        (material_id, location_id): {
+            'on_hand': on_hand,
+            'reserved': reserved,
+            'available': on_hand - reserved,
+        }
+        for material_id, location_id, on_hand, reserved in levels.values_list(
+            'material_id', 'location_id', 'on_hand', 'reserved'
+        )
+    }
+
+
+def available_quantities(keys):
+    """Disponible para prometer de los pares (material_id, location_id) indicados; cero si no hay contador."""
+    keys = set(keys)
+    levels = availability({material_id for material_id, _ in keys}, {location_id for _, location_id in keys})
+    return {key: levels[key]['available'] if key in levels else 0 for key in keys}
+
+
+# ==================== RECONCILIACIÓN ====================
+
+def compute_levels():
+    """
+    Calcula los contadores desde cero: on_hand desde los movimientos
+    (inventory.periods) y reserved desde las reservas de venta.
+
+    Returns:
+        dict: (material_id, location_id) -> (on_hand, reserved)
+    """
+    from sales.models import StockReservation
+    from .periods import stock_through
+
+    levels = defaultdict(lambda: (0, 0))
+    for key, quantity in stock_through().items():
+        levels[key] = (int(quantity), 0)
+    reservations = (
+        StockReservation.objects.values('material_id', 'location_id')
+        .annotate(total=Sum('quantity')).order_by()
+    )
+    for row in reservations:
+        key = (row['material_id'], row['location_id'])
+        levels[key] = (levels[key][0], row['total'] or 0)
+    return {key: value for key, value in levels.items() if value != (0, 0)}
+
+
+def reconcile(fix=True):
+    """
+    Compara los contadores almacenados con los calculados.
+
+    Args:
+        fix: si es True, corrige los pares con diferencias
+
+    Returns:
+        tuple: (pares revisados, lista de pares (material_id, location_id) con diferencias)
+    """
+    expected = compute_levels()
+    stored = {
+        (level.material_id, level.location_id): level
+        for level in StockLevel.objects.only('material_id', 'location_id', 'on_hand', 'reserved')
+    }
+    drifted = []
+    to_update = []
+    to_create = []
+    for key in set(expected) | set(stored):
+        on_hand, reserved = expected.get(key, (0, 0))
+        level = stored.get(key)
+        if level is None:
+            drifted.append(key)
+            to_create.append(StockLevel(material_id=key[0], location_id=key[1], on_hand=on_hand, reserved=reserved))
+        elif (level.on_hand, level.reserved) != (on_hand, reserved):
+            drifted.append(key)
+            level.on_hand, level.reserved = on_hand, reserved
+            to_update.append(level)
+    if fix:
+        StockLevel.objects.bulk_create(to_create, batch_size=APPLY_BATCH_SIZE)
+        StockLevel.objects.bulk_update(to_update, ['on_hand', 'reserved'], batch_size=APPLY_BATCH_SIZE)
+    return len(set(expected) | set(stored)), sorted(drifted)
@@ -1,3 +1,113 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import create_reference_data, create_sales_order, add_stock
+from sales.utils import bulk_transition_sales_orders
+from .models import InventoryMovement, StockLevel, StockSnapshot
+from .periods import stock_as_of
+from .stock_levels import availability, reconcile
+
+
+class StockLevelTests(TestCase):
+    """Contadores de existencias y reservas (inventory.stock_levels)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        cls.material = cls.data.materials[0]
+        cls.key = (cls.material.pk, cls.data.location.pk)
+
+    def test_movement_save_and_delete_update_on_hand(self):
+        movement = add_stock(self.data, self.material, 8)
+        add_stock(self.data, self.material, 2)
+        self.assertEqual(availability([self.material.pk])[self.key]['on_hand'], 10)
+
+        movement.delete()
+        self.assertEqual(availability([self.material.pk])[self.key]['on_hand'], 2)
+
+    def test_reconcile_after_bulk_operations_and_drift(self):
+        add_stock(self.data, self.material, 10)
+        orders = [
+            create_sales_order(self.data, [(self.material, quantity, '1.00')], status='DRAFT')
+            for quantity in (2, 3)
+        ]
+        ids = [order.id_sales_order for order in orders]
+        bulk_transition_sales_orders(ids, 'confirm', self.data.user)
+        bulk_transition_sales_orders(ids[:1], 'deliver', self.data.user)
+        self.assertEqual(reconcile(fix=False)[1], [])
+
+        StockLevel.objects.filter(material=self.material).update(on_hand=0, reserved=0)
+        out = StringIO()
+        call_command('reconcile_stock_levels', stdout=out)
+        self.assertEqual(availability([self.material.pk])[self.key], {'on_hand': 8, 'reserved': 3, 'available': 5})
+        self.assertEqual(reconcile(fix=False)[1], [])
+
+
+class StockAsOfTests(TestCase):
+    """Stock a una fecha pasada desde los puntos de control diarios (inventory.periods)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        cls.material = cls.data.materials[0]
+        cls.key = (cls.material.pk, cls.data.location.pk)
+        cls.today = timezone.localdate()
+        for days_ago, quantity in ((6, 10), (4, 5), (2, 3), (0, 1)):
+            add_stock(cls.data, cls.material, quantity, movement_date=cls.at(days_ago))
+
+    @classmethod
+    def at(cls, days_ago):
+        day = cls.today - datetime.timedelta(days=days_ago)
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time(10)))
+
+    def day(self, days_ago):
+        return self.today - datetime.timedelta(days=days_ago)
+
+    def history(self):
+        return [stock_as_of(self.day(days_ago))[0][self.key] for days_ago in range(7, -1, -1)]
+
+    def test_checkpoints_give_the_same_stock_as_replaying_movements(self):
+        replayed = self.history()
+        self.assertEqual(replayed, [0, 10, 10, 15, 15, 18, 18, 19])
+        self.assertEqual(stock_as_of(self.day(3))[1], None)
+
+        call_command('write_stock_snapshots', stdout=StringIO())
+        self.assertEqual(
+            sorted(StockSnapshot.objects.values_list('date', flat=True)), [self.day(6), self.day(4), self.day(2)]
+        )
+        self.assertEqual(self.history(), replayed)
+        self.assertEqual(stock_as_of(self.day(3))[1], self.day(4))
+
+        # Solo se suman los movimientos posteriores al punto de control
+        InventoryMovement.objects.filter(movement_date__lt=self.at(5)).update(quantity=100)
+        self.assertEqual(stock_as_of(self.day(3))[0][self.key], 15)
+
+    def test_editing_a_past_movement_updates_later_checkpoints(self):
+        call_command('write_stock_snapshots', stdout=StringIO())
+        movement = InventoryMovement.objects.get(quantity=5)
+        movement.quantity = 7
+        movement.save()
+        self.assertEqual(self.history(), [0, 10, 10, 17, 17, 20, 20, 21])
+
+        InventoryMovement.objects.get(quantity=10).delete()
+        edited = self.history()
+        self.assertEqual(edited, [0, 0, 0, 7, 7, 10, 10, 11])
+        call_command('write_stock_snapshots', '--rebuild', stdout=StringIO())
+        self.assertEqual(self.history(), edited)
+
+    def test_api(self):
+        call_command('write_stock_snapshots', stdout=StringIO())
+        self.client.force_login(self.data.user)
+        url = reverse('inventory:api_stock_as_of')
 
-# Create your tests here.
+        data = self.client.get(url, {'date': self.day(3).isoformat(), 'material': self.material.id_material}).json()
+        self.assertEqual(data['checkpoint'], self.day(4).isoformat())
+        self.assertEqual([row['quantity'] for row in data['stock']], [15])
+        self.assertEqual(self.client.get(url, {'date': self.day(-1).isoformat()}).status_code, 400)
+        missing = self.client.get(url, {'date': self.day(3).isoformat(), 'material': 'NO-EXISTE'})
+        self.assertEqual(missing.status_code, 404)
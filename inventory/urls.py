@@ -8,4 +8,6 @@ urlpatterns = [
     path('movements/', views.inventory_movement_list_view, name='inventory_movement_list'),
     path('stock/', views.inventory_stock_view, name='inventory_stock'),
     path('adjustment/new/', views.inventory_adjustment_view, name='inventory_adjustment'),
+    path('api/stock/as-of/', views.stock_as_of_api, name='api_stock_as_of'),
+    path('api/stock/available/', views.stock_availability_api, name='api_stock_availability'),
 ]
@@ -11,6 +11,7 @@ from django.utils import timezone
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from inventory.models import InventoryLocation, MovementType, InventoryMovement
+from core.refdata import get_by_key
 
 
 def get_default_inventory_location():
@@ -48,16 +49,36 @@ def get_default_inventory_location():
     )
 
 
+def get_stock_levels(material_ids, location_ids=None):
+    """
+    Get the current stock for several materials.
+    
+    Uses the same rule as InventoryMovement.clean(): movements whose type
+    ends with _OUT subtract, every other movement adds. The calculation
+    starts from the last stock snapshot (period close) and only adds the
+    movements after it (see inventory.periods).
+    
+    Args:
+        material_ids: Iterable of Material primary keys.
+        location_ids: Optional iterable of InventoryLocation primary keys
+            to restrict the calculation.
+        
+    Returns:
+        defaultdict: Mapping (material_id, location_id) -> Decimal stock.
+            Missing keys return Decimal('0').
+    """
+    from inventory.periods import stock_through
+    return stock_through(None, material_ids, location_ids)
+
+
 def create_inventory_movements_for_purchase_order(purchase_order, user=None):
     """
     Create inventory movements for a purchase order that has been fully received.
     
     This function creates an entry (PURCHASE_IN) movement for each line in the
-    purchase order. It uses the received_quantity if available, otherwise uses
-    the original quantity.
-    
-    To avoid duplicates, this function checks if movements already exist for
-    this purchase order reference before creating new ones.
+    purchase order with its pending quantity (quantity - received_quantity),
+    so lines already received in partial receipts (see core.shipments) are
+    not moved twice. Call it before marking the lines as received.
     
     Args:
         purchase_order: PurchaseOrder instance that has been received.
@@ -79,39 +100,28 @@ def create_inventory_movements_for_purchase_order(purchase_order, user=None):
     
     # Get the PURCHASE_IN movement type
     try:
-        movement_type = MovementType.objects.get(symbol='PURCHASE_IN')
+        movement_type = get_by_key(MovementType, 'PURCHASE_IN')
     except MovementType.DoesNotExist:
         raise MovementType.DoesNotExist(
             "Tipo de movimiento 'PURCHASE_IN' no encontrado. "
             "Por favor, ejecute el comando init_movement_types."
         )
     
-    # Check if movements already exist for this purchase order
-    # to avoid duplicates
-    existing_movements = InventoryMovement.objects.filter(
-        reference=purchase_order.id_purchase_order,
-        movement_type=movement_type
-    ).exists()
-    
-    if existing_movements:
-        # Movements already exist, don't create duplicates
-        return []
-    
     created_movements = []
     
     # Iterate through all lines and create movements
     for line in purchase_order.lines.all():
-        # Use received_quantity if > 0, otherwise use the original quantity
-        quantity_to_receive = line.received_quantity if line.received_quantity > 0 else line.quantity
+        # Only the quantity not received yet
+        quantity_to_receive = line.quantity - line.received_quantity
         
         # Skip lines with zero quantity
         if quantity_to_receive <= 0:
             continue
         
         # Generate unique ID for the movement
-        # Format: INV-YYYYMMDD-HHMMSS-LINE_ID
+        # Format: INV-YYYYMMDD-HHMMSS-P<LINE_ID> (P = purchase line)
         timestamp = timezone.now().strftime('%Y%m%d-%H%M%S')
-        movement_id = f"INV-{timestamp}-{line.id}"
+        movement_id = f"INV-{timestamp}-P{line.id}"
         
         # Create the inventory movement
         movement = InventoryMovement(
@@ -179,7 +189,7 @@ def create_inventory_movements_for_production_order(production_order, user=None)
     
     # Get or create the PRODUCTION_OUT movement type
     try:
-        mt_out = MovementType.objects.get(symbol='PRODUCTION_OUT')
+        mt_out = get_by_key(MovementType, 'PRODUCTION_OUT')
     except MovementType.DoesNotExist:
         mt_out = MovementType.objects.create(
             name='Consumo en Producción',
@@ -188,7 +198,7 @@ def create_inventory_movements_for_production_order(production_order, user=None)
     
     # Get or create the PRODUCTION_IN movement type
     try:
-        mt_in = MovementType.objects.get(symbol='PRODUCTION_IN')
+        mt_in = get_by_key(MovementType, 'PRODUCTION_IN')
     except MovementType.DoesNotExist:
         mt_in = MovementType.objects.create(
             name='Producto Terminado',
@@ -284,8 +294,10 @@ def create_inventory_movements_for_sales_order(sales_order, user=None):
     sales order. It deducts the quantities from the source location specified
     in the order, or from the default location if not specified.
     
-    To avoid duplicates, this function checks if movements already exist for
-    this sales order reference before creating new ones.
+    Only the pending quantity of each line (quantity - delivered_quantity)
+    is moved, so lines already delivered in partial deliveries (see
+    core.shipments) are not moved twice. Call it before marking the lines
+    as delivered.
     
     Args:
         sales_order: SalesOrder instance that has been delivered.
@@ -308,40 +320,28 @@ def create_inventory_movements_for_sales_order(sales_order, user=None):
     
     # Get the SALE_OUT movement type
     try:
-        movement_type = MovementType.objects.get(symbol='SALE_OUT')
+        movement_type = get_by_key(MovementType, 'SALE_OUT')
     except MovementType.DoesNotExist:
         raise MovementType.DoesNotExist(
             "Tipo de movimiento 'SALE_OUT' no encontrado. "
             "Por favor, ejecute el comando init_movement_types."
         )
     
-    # Check if movements already exist for this sales order
-    # to avoid duplicates
-    existing_movements = InventoryMovement.objects.filter(
-        reference=sales_order.id_sales_order,
-        movement_type=movement_type
-    ).exists()
-    
-    if existing_movements:
-        # Movements already exist, don't create duplicates
-        return []
-    
     created_movements = []
     
     # Iterate through all lines and create movements
     for line in sales_order.lines.all():
-        # Use the quantity from the line (assuming full delivery)
-        # In the future, you could use delivered_quantity for partial deliveries
-        quantity_to_deliver = line.quantity
+        # Only the quantity not delivered yet
+        quantity_to_deliver = line.quantity - line.delivered_quantity
         
         # Skip lines with zero quantity
         if quantity_to_deliver <= 0:
             continue
         
         # Generate unique ID for the movement
-        # Format: INV-YYYYMMDD-HHMMSS-LINE_ID
+        # Format: INV-YYYYMMDD-HHMMSS-S<LINE_ID> (S = sales line)
         timestamp = timezone.now().strftime('%Y%m%d-%H%M%S')
-        movement_id = f"INV-{timestamp}-{line.id}"
+        movement_id = f"INV-{timestamp}-S{line.id}"
         
         # Create the inventory movement
         movement = InventoryMovement(
@@ -1,16 +1,24 @@
 import csv
+import json
 import random
 from datetime import datetime
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.core.paginator import Paginator
+from core.pagination import paginate_keyset
+from core.jobs import enqueue_export
+from core.refdata import all_of
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_GET, require_http_methods
 from django.db.models import Q, Sum, F, Case, When, DecimalField, Count
 from django.utils import timezone
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from .models import InventoryMovement, InventoryLocation, MovementType
+from .periods import stock_as_of
+from .stock_levels import availability
+from .utils import get_default_inventory_location
 from .forms import InventoryAdjustmentForm
 from accounting.utils import create_entry_for_inventory_adjustment
 import logging
@@ -124,6 +132,10 @@ def inventory_movement_list_view(request):
     # Manejar exportación a CSV
     export_format = request.GET.get('export', '').strip()
     if export_format == 'csv':
+        # Exportaciones grandes: generar el archivo en segundo plano
+        if request.GET.get('background'):
+            return enqueue_export(request, 'movimientos_inventario.csv')
+
         response = HttpResponse(content_type='text/csv; charset=utf-8')
         response['Content-Disposition'] = 'attachment; filename="movimientos_inventario.csv"'
         
@@ -167,14 +179,12 @@ def inventory_movement_list_view(request):
         
         return response
     
-    # Paginación
-    paginator = Paginator(movements, 10)  # 10 movimientos por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor (10 movimientos por página, sin OFFSET)
+    page_obj, pagination = paginate_keyset(request, movements, 10, ('-movement_date', '-id'))
     
     # Obtener datos para los filtros
     locations = InventoryLocation.objects.filter(status=True).order_by('name')
-    movement_types = MovementType.objects.all().order_by('name')
+    movement_types = all_of(MovementType)
     
     # Contexto para el template
     context = {
@@ -190,7 +200,7 @@ def inventory_movement_list_view(request):
             'date_from': date_from,
             'date_to': date_to,
         },
-        'total_count': paginator.count,
+        **pagination,
     }
     
     return render(request, 'inventory/inventory_movement_list.html', context)
@@ -258,6 +268,10 @@ def inventory_stock_view(request):
     # Manejar exportación a CSV
     export_format = request.GET.get('export', '').strip()
     if export_format == 'csv':
+        # Exportaciones grandes: generar el archivo en segundo plano
+        if request.GET.get('background'):
+            return enqueue_export(request, 'stock_inventario.csv')
+
         response = HttpResponse(content_type='text/csv; charset=utf-8')
         response['Content-Disposition'] = 'attachment; filename="stock_inventario.csv"'
         
@@ -416,4 +430,174 @@ def inventory_adjustment_view(request):
     return render(request, 'inventory/inventory_adjustment_form.html', context)
 
 
+@login_required
+@require_GET
+def stock_as_of_api(request):
+    """
+    API: Stock al final de una fecha pasada, por material y ubicación.
+
+    Parámetros:
+    - date (YYYY-MM-DD, obligatorio; no puede ser futura)
+    - material: id_material, uno o varios separados por coma (opcional)
+    - location: id_location o código de la ubicación (opcional)
+
+    Parte del punto de control de stock más cercano anterior a la fecha
+    (ver write_stock_snapshots) y solo suma los movimientos posteriores.
+
+    Returns:
+        JSON con la fecha, el punto de control usado y las filas con stock
+        distinto de cero
+    """
+    from materials.models import Material
+
+    try:
+        as_of = datetime.strptime(request.GET.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'error': 'Parámetro date obligatorio (YYYY-MM-DD)'}, status=400)
+    if as_of > timezone.localdate():
+        return JsonResponse({'error': 'La fecha no puede ser futura'}, status=400)
+
+    materials = None
+    codes = [code.strip() for code in request.GET.get('material', '').split(',') if code.strip()]
+    if codes:
+        materials = {
+            material.pk: material
+            for material in Material.objects.filter(id_material__in=codes).select_related('unit')
+        }
+        missing = set(codes) - {material.id_material for material in materials.values()}
+        if missing:
+            return JsonResponse({'error': f'Material no encontrado: {", ".join(sorted(missing))}'}, status=404)
+
+    location_ids = None
+    location_param = request.GET.get('location', '').strip()
+    if location_param:
+        location = InventoryLocation.objects.filter(
+            Q(id_location=location_param) | Q(code=location_param)
+        ).first()
+        if location is None:
+            return JsonResponse({'error': f'Ubicación no encontrada: {location_param}'}, status=404)
+        location_ids = [location.pk]
+
+    stock, checkpoint = stock_as_of(as_of, list(materials) if materials is not None else None, location_ids)
+    stock = {key: quantity for key, quantity in stock.items() if quantity}
+
+    if materials is None:
+        material_pks = {material_id for material_id, _ in stock}
+        materials = Material.objects.select_related('unit').in_bulk(material_pks)
+    locations = InventoryLocation.objects.in_bulk({location_id for _, location_id in stock})
+
+    rows = sorted(
+        (
+            {
+                'material': materials[material_id].id_material,
+                'material_name': materials[material_id].name,
+                'location': locations[location_id].id_location,
+                'location_name': locations[location_id].name,
+                'quantity': int(quantity),
+                'unit': materials[material_id].unit.symbol,
+            }
+            for (material_id, location_id), quantity in stock.items()
+        ),
+        key=lambda row: (row['material_name'], row['location_name']),
+    )
+    return JsonResponse({
+        'date': as_of.isoformat(),
+        'checkpoint': checkpoint.isoformat() if checkpoint else None,
+        'stock': rows,
+    })
+
+
+# Máximo de líneas por consulta de disponibilidad
+AVAILABILITY_MAX_LINES = 500
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+def stock_availability_api(request):
+    """
+    API: Disponible para prometer (existencias - reservas de órdenes de
+    venta confirmadas), leído de los contadores de StockLevel.
+
+    GET: ?material=<id_material>[,<id_material>...][&location=<id_location o código>]
+        Existencias, reservas y disponible por ubicación.
+
+    POST (JSON), para validar las líneas de una orden en una consulta:
+    {
+        "location": <id_location o código (opcional, por defecto la principal)>,
+        "lines": [{"material": <id_material>, "quantity": <int>}, ...]
+    }
+        Cada línea indica si el disponible alcanza; las líneas del mismo
+        material se acumulan.
+    """
+    from materials.models import Material
+
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            lines = data['lines']
+            requested = [(str(line['material']), int(line['quantity'])) for line in lines]
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return JsonResponse({'error': 'JSON inválido: se espera {"lines": [{"material", "quantity"}]}'}, status=400)
+        if not requested or len(requested) > AVAILABILITY_MAX_LINES:
+            return JsonResponse({'error': f'Debe incluir entre 1 y {AVAILABILITY_MAX_LINES} líneas'}, status=400)
+        location_param = str(data.get('location') or '').strip()
+        codes = {code for code, _ in requested}
+    else:
+        location_param = request.GET.get('location', '').strip()
+        codes = {code.strip() for code in request.GET.get('material', '').split(',') if code.strip()}
+        if not codes:
+            return JsonResponse({'error': 'Parámetro material obligatorio'}, status=400)
+        if len(codes) > AVAILABILITY_MAX_LINES:
+            return JsonResponse({'error': f'Máximo {AVAILABILITY_MAX_LINES} materiales'}, status=400)
+
+    location = None
+    if location_param:
+        location = InventoryLocation.objects.filter(
+            Q(id_location=location_param) | Q(code=location_param)
+        ).first()
+        if location is None:
+            return JsonResponse({'error': f'Ubicación no encontrada: {location_param}'}, status=404)
+    elif request.method == 'POST':
+        try:
+            location = get_default_inventory_location()
+        except InventoryLocation.DoesNotExist:
+            return JsonResponse({'error': 'No hay ubicaciones de inventario configuradas'}, status=400)
+
+    materials = {material.id_material: material for material in Material.objects.filter(id_material__in=codes)}
+    missing = codes - set(materials)
+    if missing:
+        return JsonResponse({'error': f'Material no encontrado: {", ".join(sorted(missing))}'}, status=404)
+
+    levels = availability(
+        [material.pk for material in materials.values()],
+        [location.pk] if location else None,
+    )
+    empty = {'on_hand': 0, 'reserved': 0, 'available': 0}
+
+    if request.method == 'GET':
+        codes_by_pk = {material.pk: code for code, material in materials.items()}
+        locations = InventoryLocation.objects.in_bulk({location_id for _, location_id in levels})
+        rows = [
+            {'material': codes_by_pk[material_id], 'location': locations[location_id].id_location, **values}
+            for (material_id, location_id), values in levels.items()
+        ]
+        rows.sort(key=lambda row: (row['material'], row['location']))
+        return JsonResponse({'stock': rows})
 
+    required = {}
+    result_lines = []
+    for code, quantity in requested:
+        key = (materials[code].pk, location.pk)
+        required[key] = required.get(key, 0) + quantity
+        values = levels.get(key, empty)
+        result_lines.append({
+            'material': code,
+            'quantity': quantity,
+            **values,
+            'ok': required[key] <= values['available'],
+        })
+    return JsonResponse({
+        'location': location.id_location,
+        'ok': all(line['ok'] for line in result_lines),
+        'lines': result_lines,
+    })
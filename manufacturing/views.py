@@ -6,6 +6,7 @@ from django.db import transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from manufacturing.models import WorkOrder, WorkOrderStatus, BillOfMaterials
+from core.refdata import get_by_key
 from accounting.utils import create_entry_for_production
 import logging
 
@@ -24,7 +25,7 @@ def work_order_list_view(request):
             # Cambiar de Borrador a En Proceso
             if work_order.status.symbol == 'DRAFT':
                 try:
-                    new_status = WorkOrderStatus.objects.get(symbol='IN_PROGRESS')
+                    new_status = get_by_key(WorkOrderStatus, 'IN_PROGRESS')
                 except WorkOrderStatus.DoesNotExist:
                     new_status = WorkOrderStatus.objects.create(name='En Proceso', symbol='IN_PROGRESS')
                 work_order.status = new_status
@@ -88,10 +89,10 @@ def work_order_list_view(request):
                         )
                         
                         # Actualizar estado a Terminado
-                        done_status, _ = WorkOrderStatus.objects.get_or_create(
-                            symbol='DONE',
-                            defaults={'name': 'Terminado'}
-                        )
+                        try:
+                            done_status = get_by_key(WorkOrderStatus, 'DONE')
+                        except WorkOrderStatus.DoesNotExist:
+                            done_status = WorkOrderStatus.objects.create(name='Terminado', symbol='DONE')
                         work_order.status = done_status
                         work_order.save()
                         
@@ -154,7 +155,7 @@ def work_order_list_view(request):
                     
                     # Cambiar estado a CANCELLED
                     try:
-                        cancelled_status = WorkOrderStatus.objects.get(symbol='CANCELLED')
+                        cancelled_status = get_by_key(WorkOrderStatus, 'CANCELLED')
                     except WorkOrderStatus.DoesNotExist:
                         cancelled_status = WorkOrderStatus.objects.create(
                             name='Cancelada',
@@ -223,7 +224,7 @@ def work_order_form_view(request):
         
         # Asignar estado inicial Borrador
         try:
-            draft_status = WorkOrderStatus.objects.get(symbol='DRAFT')
+            draft_status = get_by_key(WorkOrderStatus, 'DRAFT')
         except WorkOrderStatus.DoesNotExist:
             draft_status = WorkOrderStatus.objects.create(name='Borrador', symbol='DRAFT')
         # Generar ID único para la orden (WO-0001, WO-0002, ...)
@@ -0,0 +1,13 @@
+"""
+Tareas en segundo plano del módulo de materiales.
+"""
+
+from core.jobs import register_job
+from core.importers import run_import_job
+from .utils import MaterialImporter
+
+
+@register_job('materials.import')
+def import_materials(job, progress):
+    """Carga masiva encolada desde material_bulk_upload."""
+    return run_import_job(MaterialImporter, job, progress)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0003_material_material_type_material_status_material_unit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='import_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
@@ -1,3 +1,102 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from core.importers import error_file_path
+from core.testing import create_reference_data
+from .models import Material
+from .utils import MaterialImporter
+
+
+HEADER = 'id_material;name;description;unit;material_type;status'
+
+
+def csv_file(*rows, encoding='utf-8'):
+    content = '\n'.join((HEADER,) + rows) + '\n'
+    return SimpleUploadedFile('materiales.csv', content.encode(encoding), content_type='text/csv')
+
+
+class MaterialImportTests(TestCase):
+    """Carga masiva de materiales por CSV (core.importers.CSVImporter)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data(materials=0)
+
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+
+    def run_import(self, uploaded_file, batch_size=2, upsert=False):
+        importer = MaterialImporter(user=self.data.user, batch_size=batch_size, upsert=upsert)
+        with mock.patch.object(importer, 'flush', wraps=importer.flush) as flush:
+            result = importer.run(uploaded_file)
+        result['batches'] = flush.call_count
+        return result
+
+    def test_rows_are_saved_in_fixed_size_batches(self):
+        result = self.run_import(csv_file(
+            *(f'MAT-{number};Válvula {number};Válvula de bronce;u;PRD;Activo' for number in range(1, 6)),
+            'MAT-6;Válvula 6;Válvula de bronce;kg;PRD;Activo',
+            encoding='iso-8859-1',
+        ))
+
+        self.assertEqual((result['total_rows'], result['inserted_rows'], result['error_count']), (6, 5, 1))
+        self.assertEqual(result['batches'], 3)
+        self.assertEqual(Material.objects.get(id_material='MAT-1').name, 'Válvula 1')
+        self.assertEqual(Material.objects.get(id_material='MAT-5').created_by, self.data.user)
+
+        # La fila con error queda en el archivo descargable, no en memoria
+        self.assertIn('conversion', result['error_preview'][0]['errors'])
+        with open(error_file_path(result['error_file']), encoding='utf-8-sig') as errors:
+            lines = errors.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('7;'))
+        self.assertIn("Unidad 'kg' no encontrada", lines[1])
+
+    def test_only_rows_failing_the_column_checks_reach_the_form(self):
+        Material.objects.create(id_material='MAT-9', name='Existente', description='Ya cargado')
+        importer = MaterialImporter(user=self.data.user, batch_size=3)
+        with mock.patch.object(importer, 'validate_with_form', wraps=importer.validate_with_form) as form:
+            result = importer.run(csv_file(
+                'MAT-1;Codo;Codo de PVC;u;PRD;Activo',
+                f"MAT-2;{'x' * 201};Nombre demasiado largo;u;PRD;Activo",
+                'MAT-3;Tee;;u;PRD;Activo',
+                'MAT-1;Codo repetido;Codo de PVC;u;PRD;Activo',
+                'MAT-9;Existente;Ya cargado;u;PRD;Activo',
+            ))
+
+        self.assertEqual((result['inserted_rows'], result['error_count']), (1, 4))
+        self.assertEqual(form.call_count, 2)
+        errors = {row['row']: row['errors'] for row in result['error_preview']}
+        self.assertEqual(set(errors[3]), {'name'})
+        self.assertEqual(set(errors[4]), {'description'})
+        self.assertIn('fila 2', errors[5]['id_material'][0])
+        self.assertIn('id_material', errors[6])
+        self.assertEqual(Material.objects.get(id_material='MAT-1').name, 'Codo')
+
+    def test_upsert_updates_changed_rows_and_skips_unchanged_ones(self):
+        rows = ['MAT-1;Codo;Codo de PVC;u;PRD;Activo', 'MAT-2;Tee;Tee de PVC;u;PRD;Activo']
+        self.assertEqual(self.run_import(csv_file(*rows))['inserted_rows'], 2)
+        first_hash = Material.objects.get(id_material='MAT-1').import_hash
+        self.assertTrue(first_hash)
+
+        # Sin upsert las claves existentes son errores
+        self.assertEqual(self.run_import(csv_file(*rows))['error_count'], 2)
+
+        result = self.run_import(csv_file(*rows), upsert=True)
+        self.assertEqual((result['updated_rows'], result['unchanged_rows']), (0, 2))
+
+        result = self.run_import(csv_file(
+            rows[0], 'MAT-2;Tee reforzada;Tee de PVC;u;PRD;Activo', 'MAT-3;Unión;Unión de PVC;u;PRD;Activo',
+        ), upsert=True)
+        self.assertEqual(
+            (result['inserted_rows'], result['updated_rows'], result['unchanged_rows'], result['error_count']),
+            (1, 1, 1, 0)
+        )
+        self.assertEqual(Material.objects.get(id_material='MAT-2').name, 'Tee reforzada')
+        self.assertEqual(Material.objects.get(id_material='MAT-1').import_hash, first_hash)
+        self.assertNotEqual(Material.objects.get(id_material='MAT-2').import_hash, first_hash)
+        self.assertEqual(Material.objects.count(), 3)
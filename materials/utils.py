@@ -0,0 +1,69 @@
+"""
+Funciones de utilidad para el módulo de materiales.
+
+Incluye el importador de la carga masiva de materiales por CSV.
+"""
+
+from core.importers import CSVImporter, RowError
+from core.models import Status
+from .models import Material, Unit, MaterialType
+from .forms import MaterialForm
+
+
+class MaterialImporter(CSVImporter):
+    """
+    Importa materiales desde un CSV (delimitador ';').
+
+    Las columnas unit, material_type (o type) y status aceptan el nombre o
+    el símbolo del registro relacionado.
+    """
+
+    model = Material
+    form_class = MaterialForm
+    unique_field = 'id_material'
+    error_file_prefix = 'materials'
+
+    def setup(self):
+        # Construir diccionarios de mapeo (una consulta por tabla)
+        self.status_map = {status.name.lower(): status.id for status in Status.objects.all()}
+        self.unit_map = {}
+        for unit in Unit.objects.all():
+            self.unit_map[unit.symbol.lower()] = unit.id
+            self.unit_map[unit.name.lower()] = unit.id
+        self.type_map = {}
+        for mt in MaterialType.objects.all():
+            self.type_map[mt.symbol.lower()] = mt.id
+            self.type_map[mt.name.lower()] = mt.id
+
+    def prepare_row(self, row):
+        errors = []
+
+        # Convertir unit de texto a ID
+        if row.get('unit'):
+            unit_key = row['unit'].lower()
+            if unit_key in self.unit_map:
+                row['unit'] = self.unit_map[unit_key]
+            else:
+                errors.append(f"Unidad '{row['unit']}' no encontrada")
+
+        # Convertir type/material_type de texto a ID
+        type_key_name = 'type' if 'type' in row else 'material_type'
+        if row.get(type_key_name):
+            type_key = row[type_key_name].lower()
+            if type_key in self.type_map:
+                row['material_type'] = self.type_map[type_key]
+                row.pop('type', None)
+            else:
+                errors.append(f"Tipo '{row[type_key_name]}' no encontrado")
+
+        # Convertir status de texto a ID
+        if row.get('status'):
+            status_key = row['status'].lower()
+            if status_key in self.status_map:
+                row['status'] = self.status_map[status_key]
+            else:
+                errors.append(f"Estado '{row['status']}' no encontrado")
+
+        if errors:
+            raise RowError({'conversion': errors})
+        return row
@@ -1,13 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from core.pagination import paginate_keyset
+from core.search import search_filter, paginate_search
+from core.jobs import enqueue, enqueue_export, save_job_input
+from core.refdata import all_of
 from django.db.models import Q
 from django.http import HttpResponse
 from django.contrib import messages
 import csv
-import io
 from .models import Material, Unit, MaterialType
 from core.models import Status
+from .utils import MaterialImporter
 from .forms import MaterialForm, CSVUploadForm
 
 @login_required
@@ -45,8 +48,17 @@ def materials_list(request):
     if created_by:
         materials = materials.filter(created_by__username__icontains=created_by)
     
+    # Búsqueda de texto completo (?search=) sobre el índice FTS
+    search = request.GET.get('search', '').strip()
+    if search:
+        materials = search_filter(materials, search)
+    
     # Exportar a CSV si se solicita
     if request.GET.get('export') == 'csv':
+        # Exportaciones grandes: generar el archivo en segundo plano
+        if request.GET.get('background'):
+            return enqueue_export(request, 'materials.csv')
+
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="materials.csv"'
         
@@ -68,22 +80,20 @@ def materials_list(request):
         
         return response
     
-    # Paginación
-    paginator = Paginator(materials, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Construir querystring sin page
-    querystring = request.GET.copy()
-    if 'page' in querystring:
-        querystring.pop('page')
+    # Paginación por cursor (sin OFFSET); '-id' desempata created_at.
+    # Con ?search= los resultados se ordenan por relevancia.
+    if search:
+        page_obj, pagination = paginate_search(request, materials, search, 10)
+    else:
+        page_obj, pagination = paginate_keyset(request, materials, 10, ('-created_at', '-id'))
     
     # Cargar opciones para los filtros
-    units = Unit.objects.all()
+    units = all_of(Unit)
     material_types = MaterialType.objects.all()
-    statuses = Status.objects.all()
+    statuses = all_of(Status)
     
     filters = {
+        'search': search,
         'id_material': id_material,
         'name': name,
         'description': description,
@@ -98,7 +108,8 @@ def materials_list(request):
     context = {
         'page_obj': page_obj,
         'filters': filters,
-        'querystring': querystring.urlencode(),
+        'querystring': pagination['pagination_querystring'],
+        **pagination,
         'units': units,
         'material_types': material_types,
         'statuses': statuses,
@@ -163,114 +174,40 @@ def material_bulk_upload(request):
         if form.is_valid():
             csv_file = request.FILES['csv_file']
             
-            # Intentar decodificar el archivo
-            try:
-                decoded_file = csv_file.read().decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    csv_file.seek(0)
-                    decoded_file = csv_file.read().decode('iso-8859-1')
-                except Exception as e:
-                    messages.error(request, f'Error decoding file: {str(e)}')
-                    return render(request, 'materials/material_bulk_upload.html', {'form': form})
-            
-            # Construir diccionarios de mapeo
-            status_map = {status.name.lower(): status.id for status in Status.objects.all()}
-            unit_map = {}
-            for unit in Unit.objects.all():
-                unit_map[unit.symbol.lower()] = unit.id
-                unit_map[unit.name.lower()] = unit.id
-            type_map = {}
-            for mt in MaterialType.objects.all():
-                type_map[mt.symbol.lower()] = mt.id
-                type_map[mt.name.lower()] = mt.id
+            # Archivos grandes: encolar y seguir el avance en la página de la tarea
+            if form.cleaned_data.get('run_in_background'):
+                job = enqueue(
+                    'materials.import',
+                    params={'upsert': form.cleaned_data.get('upsert', False)},
+                    user=request.user,
+                    input_file=save_job_input(csv_file, prefix='materials')
+                )
+                messages.info(request, 'The file was queued for processing.')
+                return redirect('job_detail', job_id=job.pk)
             
-            # Procesar CSV
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string, delimiter=';')
-            
-            # Limpiar BOM y espacios en cabeceras
-            reader.fieldnames = [field.strip().replace('\ufeff', '') for field in reader.fieldnames]
-            
-            valid_materials = []
-            error_rows = []
-            row_number = 1
-            
-            for row in reader:
-                row_number += 1
-                # Limpiar espacios en valores
-                cleaned_row = {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items()}
-                
-                errors = []
-                
-                # Convertir unit de texto a ID
-                if 'unit' in cleaned_row and cleaned_row['unit']:
-                    unit_key = cleaned_row['unit'].lower()
-                    if unit_key in unit_map:
-                        cleaned_row['unit'] = unit_map[unit_key]
-                    else:
-                        errors.append(f"Unidad '{cleaned_row['unit']}' no encontrada")
-                
-                # Convertir type/material_type de texto a ID
-                type_key_name = 'type' if 'type' in cleaned_row else 'material_type'
-                if type_key_name in cleaned_row and cleaned_row[type_key_name]:
-                    type_key = cleaned_row[type_key_name].lower()
-                    if type_key in type_map:
-                        cleaned_row['material_type'] = type_map[type_key]
-                        if 'type' in cleaned_row:
-                            del cleaned_row['type']
-                    else:
-                        errors.append(f"Tipo '{cleaned_row[type_key_name]}' no encontrado")
-                
-                # Convertir status de texto a ID
-                if 'status' in cleaned_row and cleaned_row['status']:
-                    status_key = cleaned_row['status'].lower()
-                    if status_key in status_map:
-                        cleaned_row['status'] = status_map[status_key]
-                    else:
-                        errors.append(f"Estado '{cleaned_row['status']}' no encontrado")
-                
-                # Si hay errores de conversión, agregar a error_rows
-                if errors:
-                    error_rows.append({
-                        'row': row_number,
-                        'data': cleaned_row,
-                        'errors': {'conversion': errors}
-                    })
-                    continue
-                
-                # Crear formulario con los datos convertidos
-                material_form = MaterialForm(cleaned_row)
-                
-                if material_form.is_valid():
-                    material = material_form.save(commit=False)
-                    material.created_by = request.user
-                    valid_materials.append(material)
-                else:
-                    error_rows.append({
-                        'row': row_number,
-                        'data': cleaned_row,
-                        'errors': material_form.errors
-                    })
-            
-            # Guardar todos los registros válidos en una sola operación
-            if valid_materials:
-                Material.objects.bulk_create(valid_materials)
+            # Procesar el CSV por streaming, guardando en lotes
+            try:
+                result = MaterialImporter(
+                    user=request.user,
+                    upsert=form.cleaned_data.get('upsert', False)
+                ).run(csv_file)
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Error processing file: {str(e)}')
+                return render(request, 'materials/material_bulk_upload.html', {'form': form})
             
             # Preparar contexto con el informe
             context = {
                 'form': form,
                 'upload_complete': True,
-                'total_rows': row_number - 1,
-                'successful_rows': len(valid_materials),
-                'error_count': len(error_rows),
-                'error_rows': error_rows
+                **result
             }
             
-            if valid_materials:
-                messages.success(request, f'Successfully uploaded {len(valid_materials)} materials.')
-            if error_rows:
-                messages.warning(request, f'{len(error_rows)} rows had errors and were not uploaded.')
+            if result['inserted_rows']:
+                messages.success(request, f"Successfully uploaded {result['inserted_rows']} materials.")
+            if result['updated_rows']:
+                messages.success(request, f"Updated {result['updated_rows']} existing materials.")
+            if result['error_count']:
+                messages.warning(request, f"{result['error_count']} rows had errors and were not uploaded.")
             
             return render(request, 'materials/material_bulk_upload.html', context)
     else:
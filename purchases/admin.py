@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import OrderStatus, PurchaseOrder, PurchaseOrderLine
+from .models import OrderStatus, PurchaseOrder, PurchaseOrderLine, PurchaseReceipt
 
 @admin.register(OrderStatus)
 class OrderStatusAdmin(admin.ModelAdmin):
@@ -8,11 +8,33 @@ class OrderStatusAdmin(admin.ModelAdmin):
 
 @admin.register(PurchaseOrder)
 class PurchaseOrderAdmin(admin.ModelAdmin):
-    list_display = ['id_purchase_order', 'supplier', 'issue_date', 'estimated_delivery_date', 'status']
-    list_filter = ['status', 'issue_date', 'estimated_delivery_date', 'supplier']
-    search_fields = ['id_purchase_order']
+    list_display = ['id_purchase_order', 'supplier', 'issue_date', 'estimated_delivery_date', 'status', 'line_count', 'total_amount']
+    list_select_related = ['supplier', 'status']
+    list_filter = ['status', 'issue_date', 'estimated_delivery_date']
+    search_fields = ['id_purchase_order', 'supplier__name']
+    show_full_result_count = False
+    autocomplete_fields = ['supplier', 'destination_location']
+    raw_id_fields = ['created_by']
+    readonly_fields = ['total_amount', 'line_count', 'currency', 'received_fraction']
 
 @admin.register(PurchaseOrderLine)
 class PurchaseOrderLineAdmin(admin.ModelAdmin):
     list_display = ['purchase_order', 'position', 'material', 'quantity', 'unit_material', 'price', 'currency_supplier', 'received_quantity']
-    list_filter = ['material', 'unit_material', 'currency_supplier']
+    list_select_related = ['purchase_order__supplier', 'material', 'unit_material', 'currency_supplier']
+    list_filter = ['unit_material', 'currency_supplier']
+    search_fields = ['id_purchase_order_line', 'purchase_order__id_purchase_order', 'material__name']
+    show_full_result_count = False
+    raw_id_fields = ['purchase_order', 'created_by']
+    autocomplete_fields = ['material']
+
+@admin.register(PurchaseReceipt)
+class PurchaseReceiptAdmin(admin.ModelAdmin):
+    # Solo consulta: las recepciones se registran con la API (ver core.shipments)
+    list_display = ['id_purchase_receipt', 'purchase_order', 'number', 'key', 'created_at']
+    list_select_related = ['purchase_order__supplier']
+    search_fields = ['id_purchase_receipt', 'purchase_order__id_purchase_order', 'key']
+    show_full_result_count = False
+    readonly_fields = ['id_purchase_receipt', 'purchase_order', 'number', 'key', 'lines', 'created_at', 'created_by']
+
+    def has_add_permission(self, request):
+        return False
@@ -35,6 +35,7 @@ class Command(BaseCommand):
             {'name': 'Cerrado', 'symbol': 'CLOSED'},
             {'name': 'Facturado', 'symbol': 'INVOICED'},
             {'name': 'Entregada', 'symbol': 'DELIVERED'},
+            {'name': 'Parcial', 'symbol': 'PARTIAL'},
         ]
         
         created_count = 0
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:42
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Max, Min, Sum
+
+
+def backfill_totals(apps, schema_editor):
+    """Calcula los totales de las órdenes existentes a partir de sus líneas."""
+    PurchaseOrder = apps.get_model('purchases', 'PurchaseOrder')
+    PurchaseOrderLine = apps.get_model('purchases', 'PurchaseOrderLine')
+
+    rows = (
+        PurchaseOrderLine.objects.values('purchase_order_id')
+        .annotate(
+            count=Count('id'),
+            total=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=20, decimal_places=2)),
+            currency_min=Min('currency_supplier_id'),
+            currency_max=Max('currency_supplier_id'),
+            ordered=Sum('quantity'),
+            progress=Sum('received_quantity'),
+        )
+        .order_by()
+    )
+    orders = []
+    for row in rows.iterator():
+        fraction = Decimal(row['progress'] or 0) / row['ordered'] if row['ordered'] else Decimal('0')
+        orders.append(PurchaseOrder(
+            pk=row['purchase_order_id'],
+            total_amount=Decimal(row['total'] or 0).quantize(Decimal('0.01')),
+            line_count=row['count'],
+            currency_id=row['currency_min'] if row['currency_min'] == row['currency_max'] else None,
+            received_fraction=min(fraction, Decimal('1')).quantize(Decimal('0.0001')),
+        ))
+    PurchaseOrder.objects.bulk_update(
+        orders, ['total_amount', 'line_count', 'currency', 'received_fraction'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_search_index'),
+        ('purchases', '0003_purchaseorder_destination_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='currency',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchase_orders', to='core.currency'),
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='received_fraction',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
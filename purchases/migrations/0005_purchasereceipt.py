@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def add_partial_status(apps, schema_editor):
+    """Agrega el estado PARTIAL en las bases ya inicializadas (init_order_statuses)."""
+    OrderStatus = apps.get_model('purchases', 'OrderStatus')
+    if OrderStatus.objects.exists():
+        OrderStatus.objects.get_or_create(symbol='PARTIAL', defaults={'name': 'Parcial'})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchases', '0004_purchaseorder_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_purchase_receipt', models.CharField(max_length=60, unique=True)),
+                ('number', models.PositiveIntegerField()),
+                ('key', models.CharField(max_length=100)),
+                ('lines', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('purchase_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='purchases.purchaseorder')),
+            ],
+            options={
+                'verbose_name': 'Purchase Receipt',
+                'verbose_name_plural': 'Purchase Receipts',
+                'db_table': 'purchase_receipt',
+                'ordering': ['purchase_order', 'number'],
+                'unique_together': {('purchase_order', 'key'), ('purchase_order', 'number')},
+            },
+        ),
+        migrations.RunPython(add_partial_status, migrations.RunPython.noop),
+    ]
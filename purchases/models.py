@@ -1,5 +1,4 @@
 from django.db import models
-from django.db.models import Sum, F
 from users.models import User
 from suppliers.models import Supplier
 from materials.models import Material, Unit
@@ -32,6 +31,11 @@ class PurchaseOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Totales almacenados - se mantienen al guardar/eliminar líneas (ver refresh_totals)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    line_count = models.PositiveIntegerField(default=0, editable=False)
+    currency = models.ForeignKey(Currency, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='purchase_orders')
+    received_fraction = models.DecimalField(max_digits=5, decimal_places=4, default=0, editable=False)
     
     class Meta:
         db_table = "purchase_order"
@@ -44,15 +48,23 @@ class PurchaseOrder(models.Model):
     
     def get_total_amount(self):
         """
-        Calcula el monto total de la orden sumando precio * cantidad de todas las líneas.
+        Monto total de la orden (precio * cantidad de todas las líneas),
+        almacenado en la cabecera.
         
         Returns:
             Decimal: Total de la orden o 0 si no hay líneas
         """
-        total = self.lines.aggregate(
-            total=Sum(F('price') * F('quantity'), output_field=models.DecimalField())
-        )['total']
-        return total if total is not None else 0
+        return self.total_amount
+    
+    def refresh_totals(self):
+        """
+        Recalcula los totales almacenados desde las líneas y los guarda.
+        Se llama automáticamente al guardar o eliminar una línea.
+        """
+        from core.order_totals import refresh_totals
+        values = refresh_totals(PurchaseOrder, [self.pk], using=self._state.db)[self.pk]
+        for field, value in values.items():
+            setattr(self, field, value)
 
 class PurchaseOrderLine(models.Model):
     id_purchase_order_line = models.CharField(max_length=50, unique=True)
@@ -76,3 +88,39 @@ class PurchaseOrderLine(models.Model):
     
     def __str__(self):
         return f"{self.id_purchase_order_line} - {self.material.name}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Mantener los totales almacenados de la orden
+        self.purchase_order.refresh_totals()
+    
+    def delete(self, *args, **kwargs):
+        purchase_order = self.purchase_order
+        result = super().delete(*args, **kwargs)
+        purchase_order.refresh_totals()
+        return result
+
+class PurchaseReceipt(models.Model):
+    """
+    Recepción (parcial o final) de una orden de compra. Solo registra las
+    cantidades recibidas en ella; la clave de idempotencia es única por
+    orden (ver core.shipments).
+    """
+    id_purchase_receipt = models.CharField(max_length=60, unique=True)
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='receipts')
+    number = models.PositiveIntegerField()
+    key = models.CharField(max_length=100)
+    # Cantidad recibida por posición de línea
+    lines = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    
+    class Meta:
+        db_table = "purchase_receipt"
+        verbose_name = "Purchase Receipt"
+        verbose_name_plural = "Purchase Receipts"
+        ordering = ['purchase_order', 'number']
+        unique_together = [['purchase_order', 'key'], ['purchase_order', 'number']]
+    
+    def __str__(self):
+        return self.id_purchase_receipt
@@ -1,3 +1,154 @@
+import json
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounting.models import JournalEntry, JournalEntryLine
+from core.testing import create_reference_data, create_purchase_order
+from inventory.models import InventoryMovement
+from inventory.stock_levels import availability
+from .models import PurchaseOrder, PurchaseReceipt
+from .utils import bulk_transition_purchase_orders
+
+
+def entry_amount(reference):
+    """Importe debitado en los asientos de la orden (incluye los de sus recepciones, ej: PO-0001-R001)."""
+    return JournalEntryLine.objects.filter(journal_entry__reference__startswith=reference).aggregate(
+        total=Sum('debit')
+    )['total'] or Decimal('0.00')
+
+
+class BulkPurchaseOrderTransitionTests(TestCase):
+    """Acciones masivas sobre órdenes de compra (bulk_transition_purchase_orders)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+
+    def test_receive_and_close(self):
+        material = self.data.materials[0]
+        first = create_purchase_order(self.data, [(material, 10, '2.50')])
+        second = create_purchase_order(self.data, [
+            (material, 4, '2.50'),
+            (self.data.materials[1], 6, '1.25'),
+        ])
+        ids = [first.id_purchase_order, second.id_purchase_order]
+
+        summary = bulk_transition_purchase_orders(ids, 'receive', self.data.user)
+        self.assertEqual(summary['succeeded'], 2, summary['results'])
+        for order in PurchaseOrder.objects.filter(id_purchase_order__in=ids):
+            self.assertEqual(order.status.symbol, 'RECEIVED')
+            self.assertTrue(all(line.received_quantity == line.quantity for line in order.lines.all()))
+            self.assertEqual(entry_amount(order.id_purchase_order), order.total_amount)
+        self.assertEqual(
+            InventoryMovement.objects.filter(reference__in=ids, movement_type__symbol='PURCHASE_IN').count(), 3
+        )
+        key = (material.pk, self.data.location.pk)
+        self.assertEqual(availability([material.pk])[key]['on_hand'], 14)
+
+        summary = bulk_transition_purchase_orders(ids, 'close', self.data.user)
+        self.assertEqual(summary['succeeded'], 2)
+
+    def test_invalid_transition_does_not_stop_the_rest(self):
+        confirmed = create_purchase_order(self.data, [(self.data.materials[0], 1, '1.00')])
+        cancelled = create_purchase_order(self.data, [(self.data.materials[0], 1, '1.00')], status='CANCELLED')
+
+        summary = bulk_transition_purchase_orders(
+            [confirmed.id_purchase_order, cancelled.id_purchase_order], 'receive', self.data.user
+        )
+        results = {result['order_id']: result['success'] for result in summary['results']}
+        self.assertEqual(results, {confirmed.id_purchase_order: True, cancelled.id_purchase_order: False})
+        self.assertFalse(InventoryMovement.objects.filter(reference=cancelled.id_purchase_order).exists())
+
+    def test_api_rejects_non_object_json(self):
+        self.client.force_login(self.data.user)
+        response = self.client.post(
+            reverse('purchases:purchase_order_bulk_action_api'), data=json.dumps('receive'),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PurchaseReceiptTests(TestCase):
+    """Recepciones parciales con clave de idempotencia (core.shipments)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+
+    def setUp(self):
+        self.client.force_login(self.data.user)
+        self.order = create_purchase_order(self.data, [
+            (self.data.materials[0], 10, '3.00'),
+            (self.data.materials[1], 2, '4.50'),
+        ])
+
+    def receive(self, key, lines):
+        return self.client.post(
+            reverse('purchases:purchase_order_receipt_api', args=[self.order.id_purchase_order]),
+            data=json.dumps({'key': key, 'lines': [{'position': p, 'quantity': q} for p, q in lines]}),
+            content_type='application/json',
+        )
+
+    def test_partial_receipt_then_bulk_receive(self):
+        response = self.receive('first', [(1, 4)])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['status'], 'PARTIAL')
+        self.assertEqual(entry_amount(self.order.id_purchase_order), Decimal('12.00'))
+
+        summary = bulk_transition_purchase_orders([self.order.id_purchase_order], 'receive', self.data.user)
+        self.assertEqual(summary['succeeded'], 1, summary['results'])
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status.symbol, 'RECEIVED')
+        self.assertEqual(entry_amount(self.order.id_purchase_order), self.order.total_amount)
+        self.assertEqual(
+            sorted(InventoryMovement.objects.filter(reference=self.order.id_purchase_order)
+                   .values_list('quantity', flat=True)),
+            [2, 4, 6],
+        )
+        key = (self.data.materials[0].pk, self.data.location.pk)
+        self.assertEqual(availability([self.data.materials[0].pk])[key]['on_hand'], 10)
+
+    def test_replayed_key_writes_nothing(self):
+        self.assertEqual(self.receive('retry', [(1, 4), (2, 2)]).status_code, 201)
+        counts = (PurchaseReceipt.objects.count(), InventoryMovement.objects.count(), JournalEntry.objects.count())
+
+        response = self.receive('retry', [(1, 4), (2, 2)])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['created'])
+        self.assertEqual(
+            (PurchaseReceipt.objects.count(), InventoryMovement.objects.count(), JournalEntry.objects.count()), counts
+        )
+        self.assertEqual(self.receive('retry', [(1, 5)]).status_code, 409)
+
+
+class PurchaseAdminTests(TestCase):
+    """Listados del admin de compras: consultas fijas sin importar las filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+
+    def setUp(self):
+        self.client.force_login(self.data.user)
+
+    def queries(self):
+        counts = []
+        for name in ('admin:purchases_purchaseorder_changelist', 'admin:purchases_purchaseorderline_changelist'):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+            counts.append(len(context.captured_queries))
+        return counts
 
-# Create your tests here.
+    def test_changelists_do_not_query_per_row(self):
+        create_purchase_order(self.data, [(self.data.materials[0], 2, '3.00')])
+        self.queries()  # carga las tablas de referencia en caché
+        few = self.queries()
+        for _ in range(5):
+            create_purchase_order(self.data, [(self.data.materials[1], 4, '2.00'), (self.data.materials[2], 1, '9.00')])
+        self.assertEqual(self.queries(), few)
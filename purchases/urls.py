@@ -17,4 +17,6 @@ urlpatterns = [
     path('api/supplier/details/<str:supplier_id>/', views.supplier_detail_api, name='supplier_detail_api'),
     path('api/material/details/<str:material_id>/', views.material_detail_api, name='material_detail_api'),
     path('api/purchase-order/create/', views.create_purchase_order_api, name='purchase_order_create_api'),
+    path('api/purchase-order/bulk-action/', views.bulk_purchase_order_action_api, name='purchase_order_bulk_action_api'),
+    path('api/purchase-order/<str:order_id>/receipts/', views.purchase_order_receipt_api, name='purchase_order_receipt_api'),
 ]
@@ -0,0 +1,274 @@
+"""
+Funciones de utilidad para el módulo de compras.
+
+Incluye el procesamiento masivo de cambios de estado de órdenes de compra
+(recibir, cancelar, cerrar), pensado para cierres de mes donde se procesan
+cientos de órdenes a la vez. Recibir una orden con recepciones parciales
+(estado PARTIAL, ver core.shipments) mueve y contabiliza solo lo pendiente.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.core.exceptions import ValidationError
+
+from core.refdata import get_by_key
+from core.order_totals import refresh_totals
+from core.shipments import PARTIAL_STATUS, pending_amount
+from inventory.models import InventoryLocation, MovementType, InventoryMovement
+from inventory.utils import get_default_inventory_location
+from inventory.stock_levels import apply_movements
+from accounting.utils import (
+    get_purchase_accounts, build_purchase_entry_data, create_journal_entries_batch
+)
+from .models import PurchaseOrder, PurchaseOrderLine, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+
+# Acción -> (estado destino, estados de origen permitidos)
+# Mismas reglas que purchase_order_detail_view
+BULK_ACTIONS = {
+    'receive': ('RECEIVED', ['DRAFT', 'CONFIRMED', PARTIAL_STATUS]),
+    'cancel': ('CANCELLED', ['DRAFT', 'CONFIRMED']),
+    'close': ('CLOSED', ['RECEIVED']),
+}
+
+DEFAULT_CHUNK_SIZE = 100
+
+
+def _chunks(items, size):
+    """Divide una lista en bloques de tamaño fijo."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_transition_purchase_orders(order_ids, action, user=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                                    post_entries=False):
+    """
+    Aplica un cambio de estado a varias órdenes de compra procesándolas por bloques.
+
+    Los estados, la ubicación por defecto, el tipo de movimiento PURCHASE_IN
+    y las cuentas contables se consultan una sola vez. Por cada bloque se
+    cargan las órdenes con sus líneas y se escriben los movimientos de
+    inventario, las cantidades recibidas y los estados con operaciones
+    masivas dentro de una transacción.
+
+    Una orden que no cumple las validaciones no detiene al resto.
+
+    Args:
+        order_ids: Lista de identificadores (id_purchase_order) a procesar
+        action: 'receive', 'cancel' o 'close'
+        user: Usuario que ejecuta la acción (opcional)
+        chunk_size: Número de órdenes por bloque/transacción
+        post_entries: Si True, los asientos se crean contabilizados y se
+            actualizan los saldos de las cuentas
+
+    Returns:
+        dict: Resumen con 'action', 'processed', 'succeeded', 'failed' y
+        'results' (lista con el resultado de cada orden)
+
+    Raises:
+        ValueError: Si la acción no es válida
+        OrderStatus.DoesNotExist: Si el estado destino no existe
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f'Acción no válida: {action}')
+
+    target_symbol, allowed_symbols = BULK_ACTIONS[action]
+    new_status = get_by_key(OrderStatus, target_symbol)
+
+    # Datos compartidos para todas las órdenes (una consulta cada uno)
+    movement_type = None
+    default_location = None
+    accounts = None
+    accounting_error = None
+    if action == 'receive':
+        try:
+            movement_type = get_by_key(MovementType, 'PURCHASE_IN')
+        except MovementType.DoesNotExist:
+            raise MovementType.DoesNotExist(
+                "Tipo de movimiento 'PURCHASE_IN' no encontrado. "
+                "Por favor, ejecute el comando init_movement_types."
+            )
+        try:
+            default_location = get_default_inventory_location()
+        except InventoryLocation.DoesNotExist:
+            default_location = None
+        try:
+            accounts = get_purchase_accounts()
+        except ValidationError as e:
+            # Igual que en la vista: la orden se recibe aunque falle la contabilidad
+            accounting_error = str(e)
+
+    # Eliminar duplicados conservando el orden recibido
+    order_ids = list(dict.fromkeys(str(order_id) for order_id in order_ids))
+
+    results = []
+    for chunk in _chunks(order_ids, max(1, chunk_size)):
+        results.extend(_process_chunk(
+            chunk, action, new_status, allowed_symbols, user,
+            movement_type, default_location, accounts, accounting_error, post_entries
+        ))
+
+    succeeded = sum(1 for result in results if result['success'])
+    return {
+        'action': action,
+        'processed': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+    }
+
+
+def _process_chunk(chunk, action, new_status, allowed_symbols, user,
+                   movement_type, default_location, accounts, accounting_error, post_entries):
+    """
+    Procesa un bloque de órdenes de compra. Retorna la lista de resultados.
+    """
+    orders = {
+        order.id_purchase_order: order
+        for order in PurchaseOrder.objects.select_related(
+            'supplier', 'status', 'destination_location'
+        ).prefetch_related(
+            'lines__material',
+            'lines__unit_material',
+            'lines__currency_supplier'
+        ).filter(id_purchase_order__in=chunk)
+    }
+
+    results = {}
+    valid_orders = []
+
+    for order_id in chunk:
+        order = orders.get(order_id)
+        if order is None:
+            results[order_id] = _result(order_id, False, 'Orden de compra no encontrada')
+        elif order.status.symbol not in allowed_symbols:
+            results[order_id] = _result(
+                order_id, False,
+                f'No se puede aplicar "{action}" a una orden en estado "{order.status.name}".'
+            )
+        elif action == 'receive' and not (order.destination_location or default_location):
+            results[order_id] = _result(
+                order_id, False,
+                'No hay ubicaciones de inventario configuradas.'
+            )
+        else:
+            valid_orders.append(order)
+
+    movements = []
+    amounts = {}
+    if action == 'receive' and valid_orders:
+        movements = _build_receipt_movements(valid_orders, user, movement_type, default_location)
+        # Importe pendiente, antes de marcar las líneas como recibidas
+        amounts = {order.pk: pending_amount(order) for order in valid_orders}
+
+    if valid_orders:
+        valid_pks = [order.pk for order in valid_orders]
+        try:
+            with transaction.atomic():
+                if action == 'receive':
+                    PurchaseOrderLine.objects.filter(purchase_order_id__in=valid_pks).update(
+                        received_quantity=F('quantity'),
+                        updated_at=timezone.now()
+                    )
+                    for order in valid_orders:
+                        for line in order.lines.all():
+                            line.received_quantity = line.quantity
+                    # update() no pasa por save(): recalcular la fracción recibida
+                    refresh_totals(PurchaseOrder, valid_pks)
+                if movements:
+                    InventoryMovement.objects.bulk_create(movements)
+                    # bulk_create no pasa por save(): actualizar los contadores de stock
+                    apply_movements(movements)
+                PurchaseOrder.objects.filter(pk__in=valid_pks).update(
+                    status=new_status,
+                    updated_at=timezone.now()
+                )
+
+                for order in valid_orders:
+                    order.status = new_status
+                    results[order.id_purchase_order] = _result(order.id_purchase_order, True, f'Orden {order.id_purchase_order} actualizada.')
+
+                if action == 'receive':
+                    _create_purchase_entries(valid_orders, amounts, results, user, accounts, accounting_error, post_entries)
+        except Exception as e:
+            logger.exception(f'Error en bloque de órdenes de compra ({action})')
+            for order in valid_orders:
+                results[order.id_purchase_order] = _result(order.id_purchase_order, False, f'Error: {str(e)}')
+
+    return [results[order_id] for order_id in chunk]
+
+
+def _build_receipt_movements(orders, user, movement_type, default_location):
+    """
+    Arma los movimientos PURCHASE_IN del bloque.
+
+    Igual que create_inventory_movements_for_purchase_order, solo se mueve
+    lo pendiente de cada línea, y las líneas cuya unidad no coincide con la
+    del material se omiten y se registran en el log.
+    """
+    movements = []
+    timestamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+
+    for order in orders:
+        location = order.destination_location or default_location
+        for line in order.lines.all():
+            pending = line.quantity - line.received_quantity
+            if pending <= 0:
+                continue
+            if line.unit_material_id != line.material.unit_id:
+                logger.warning(
+                    f'Línea {line.id} de {order.id_purchase_order} omitida: '
+                    f'la unidad no coincide con la unidad base del material'
+                )
+                continue
+            movements.append(InventoryMovement(
+                id_inventory_movement=f"INV-{timestamp}-P{line.id}",
+                location=location,
+                material=line.material,
+                quantity=pending,
+                unit_type=line.unit_material,
+                movement_type=movement_type,
+                movement_date=timezone.now(),
+                reference=order.id_purchase_order,
+                created_by=user
+            ))
+
+    return movements
+
+
+def _create_purchase_entries(orders, amounts, results, user, accounts, accounting_error, post_entries):
+    """
+    Genera en lote los asientos de compra del bloque dentro de un savepoint,
+    por el importe pendiente de cada orden (amounts: pk -> importe).
+    Un fallo contable no revierte el cambio de estado; se informa en el resultado.
+    """
+    if accounting_error:
+        for order in orders:
+            results[order.id_purchase_order]['warning'] = f'Orden recibida pero fallo contable: {accounting_error}'
+        return
+    try:
+        with transaction.atomic():
+            entries = create_journal_entries_batch(
+                [build_purchase_entry_data(order, accounts, total=amounts[order.pk]) for order in orders],
+                user=user,
+                post=post_entries
+            )
+    except Exception as e:
+        logger.error(f'Error al crear asientos contables de compra en lote: {str(e)}')
+        for order in orders:
+            results[order.id_purchase_order]['warning'] = f'Orden recibida pero error en contabilidad: {str(e)}'
+        return
+    for order in orders:
+        entry = entries.get(order.id_purchase_order)
+        if entry:
+            results[order.id_purchase_order]['journal_entry'] = entry.id_journal_entry
+
+
+def _result(order_id, success, message):
+    """Construye el resultado de una orden."""
+    return {'order_id': order_id, 'success': success, 'message': message}
@@ -1,10 +1,15 @@
 from django.shortcuts import render, redirect
 from django.http import JsonResponse, Http404, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.db.models import Q
 from django.contrib import messages
-from django.core.paginator import Paginator
+from core.pagination import paginate_keyset
+from core.jobs import enqueue_export
+from core.refdata import get_by_key, get_by_id, all_of
+from core.shipments import PARTIAL_STATUS, KeyConflict, pending_amount, parse_lines, record_shipment
 from django.core.exceptions import ValidationError
 from suppliers.models import Supplier
 from materials.models import Material
@@ -14,6 +19,7 @@ from .models import PurchaseOrder, PurchaseOrderLine, OrderStatus
 from inventory.utils import create_inventory_movements_for_purchase_order
 from inventory.models import InventoryLocation, MovementType
 from accounting.utils import create_entry_for_purchase
+from .utils import bulk_transition_purchase_orders, BULK_ACTIONS, DEFAULT_CHUNK_SIZE
 from datetime import date
 import json
 import logging
@@ -33,7 +39,8 @@ def purchase_order_detail_view(request, order_id):
     Parámetro: order_id es el identificador único de la orden (ej: PO-0001)
     
     Acciones POST:
-        - receive: Marca la orden como recibida y actualiza cantidades
+        - receive: Marca la orden como recibida y actualiza cantidades; tras
+          recepciones parciales solo mueve y contabiliza lo pendiente
         - cancel: Cancela la orden
         - close: Cierra la orden administrativamente
     
@@ -73,7 +80,7 @@ def purchase_order_detail_view(request, order_id):
             
             # Obtener el estado destino
             try:
-                new_status = OrderStatus.objects.get(symbol=status_symbol)
+                new_status = get_by_key(OrderStatus, status_symbol)
             except OrderStatus.DoesNotExist:
                 messages.error(
                     request,
@@ -84,8 +91,8 @@ def purchase_order_detail_view(request, order_id):
             
             # Aplicar lógica específica por acción
             if action == 'receive':
-                # Solo permitir recibir si está en DRAFT o CONFIRMED
-                if order.status.symbol not in ['DRAFT', 'CONFIRMED']:
+                # Solo permitir recibir si está en DRAFT, CONFIRMED o con recepciones parciales
+                if order.status.symbol not in ['DRAFT', 'CONFIRMED', PARTIAL_STATUS]:
                     messages.error(
                         request, 
                         f'No se puede recibir una orden en estado "{order.status.name}". '
@@ -96,6 +103,15 @@ def purchase_order_detail_view(request, order_id):
                 # Marcar todas las líneas como totalmente recibidas y crear movimientos de inventario
                 try:
                     with transaction.atomic():
+                        # Importe pendiente, antes de marcar las líneas como recibidas
+                        amount = pending_amount(order)
+                        
+                        # Crear movimientos de inventario (solo lo pendiente de cada línea)
+                        created_movements = create_inventory_movements_for_purchase_order(
+                            order, 
+                            user=request.user if request.user.is_authenticated else None
+                        )
+                        
                         # Actualizar cantidades recibidas en todas las líneas
                         for line in order.lines.all():
                             line.received_quantity = line.quantity
@@ -105,17 +121,12 @@ def purchase_order_detail_view(request, order_id):
                         order.status = new_status
                         order.save()
                         
-                        # Crear movimientos de inventario
-                        created_movements = create_inventory_movements_for_purchase_order(
-                            order, 
-                            user=request.user if request.user.is_authenticated else None
-                        )
-                        
                         # Crear asiento contable automático
                         try:
                             journal_entry = create_entry_for_purchase(
                                 order,
-                                user=request.user if request.user.is_authenticated else None
+                                user=request.user if request.user.is_authenticated else None,
+                                total=amount
                             )
                             if journal_entry:
                                 logger.info(f'Asiento contable {journal_entry.id_journal_entry} creado para compra {order.id_purchase_order}')
@@ -211,7 +222,7 @@ def purchase_order_detail_view(request, order_id):
         
         # Determinar qué acciones están disponibles según el estado actual
         available_actions = {
-            'can_receive': order.status.symbol in ['DRAFT', 'CONFIRMED'],
+            'can_receive': order.status.symbol in ['DRAFT', 'CONFIRMED', PARTIAL_STATUS],
             'can_cancel': order.status.symbol in ['DRAFT', 'CONFIRMED'],
             'can_close': order.status.symbol == 'RECEIVED',
         }
@@ -249,7 +260,7 @@ def purchase_order_list_view(request):
         - CSV descargable si export=csv
     """
     # Obtener todas las órdenes con sus relaciones optimizadas
-    orders = PurchaseOrder.objects.select_related('supplier', 'status', 'created_by').all()
+    orders = PurchaseOrder.objects.select_related('supplier', 'status', 'created_by', 'currency').all()
     
     # Leer parámetros de filtro
     q = request.GET.get('q', '').strip()
@@ -294,6 +305,10 @@ def purchase_order_list_view(request):
     
     # Si se solicita exportación CSV, generar el archivo
     if export_format == 'csv':
+        # Exportaciones grandes: generar el archivo en segundo plano
+        if request.GET.get('background'):
+            return enqueue_export(request, 'ordenes_compra.csv')
+
         # Preparar respuesta CSV
         response = HttpResponse(content_type='text/csv; charset=utf-8')
         response['Content-Disposition'] = 'attachment; filename="ordenes_compra.csv"'
@@ -311,7 +326,8 @@ def purchase_order_list_view(request):
             'Estado',
             'Fecha Emisión',
             'Fecha Estimada Entrega',
-            'Total Orden (USD)',
+            'Total Orden',
+            'Moneda',
             'Creado Por',
             'Fecha Creación'
         ])
@@ -325,20 +341,20 @@ def purchase_order_list_view(request):
                 order.status.name,
                 order.issue_date.strftime('%Y-%m-%d') if order.issue_date else '',
                 order.estimated_delivery_date.strftime('%Y-%m-%d') if order.estimated_delivery_date else '',
-                f'{order.get_total_amount():.2f}',
+                # Órdenes con varias monedas: sin total (la suma no tiene sentido)
+                f'{order.total_amount:.2f}' if order.currency or not order.line_count else '',
+                order.currency.code if order.currency else ('Varias' if order.line_count else ''),
                 order.created_by.username if order.created_by else '',
                 order.created_at.strftime('%Y-%m-%d %H:%M:%S') if order.created_at else ''
             ])
         
         return response
     
-    # Aplicar paginación (10 órdenes por página)
-    paginator = Paginator(orders, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Aplicar paginación por cursor (10 órdenes por página, sin OFFSET)
+    page_obj, pagination = paginate_keyset(request, orders, 10, ('-created_at', '-id'))
     
     # Obtener listas para los selectores de filtro
-    statuses = OrderStatus.objects.all().order_by('name')
+    statuses = all_of(OrderStatus)
     suppliers = Supplier.objects.all().order_by('name')
     
     # Preparar contexto
@@ -354,7 +370,7 @@ def purchase_order_list_view(request):
             'date_from': date_from,
             'date_to': date_to,
         },
-        'total_count': paginator.count,
+        **pagination,
     }
     
     return render(request, 'purchases/purchase_order_list.html', context)
@@ -373,7 +389,7 @@ def purchase_order_form_view(request):
     from inventory.models import InventoryLocation
     
     context = {
-        'currencies': Currency.objects.all().order_by('code'),
+        'currencies': all_of(Currency),
         'locations': InventoryLocation.objects.filter(status=True).order_by('name'),
         'today': date.today().strftime('%Y-%m-%d'),
     }
@@ -534,7 +550,7 @@ def create_purchase_order_api(request):
         
         # Obtener el estado por defecto (DRAFT)
         try:
-            default_status = OrderStatus.objects.get(symbol='DRAFT')
+            default_status = get_by_key(OrderStatus, 'DRAFT')
         except OrderStatus.DoesNotExist:
             return JsonResponse({
                 'error': 'Estado "DRAFT" no encontrado. Por favor, cree el estado DRAFT en el sistema.'
@@ -602,12 +618,12 @@ def create_purchase_order_api(request):
                 return JsonResponse({'error': f'Line {index}: Material not found ({material_id})'}, status=400)
             
             try:
-                unit = Unit.objects.get(id=unit_id)
+                unit = get_by_id(Unit, unit_id)
             except Unit.DoesNotExist:
                 return JsonResponse({'error': f'Line {index}: Unit with id {unit_id} does not exist'}, status=400)
             
             try:
-                currency = Currency.objects.get(id=currency_id)
+                currency = get_by_id(Currency, currency_id)
             except Currency.DoesNotExist:
                 return JsonResponse({'error': f'Line {index}: Currency with id {currency_id} does not exist'}, status=400)
             
@@ -643,3 +659,118 @@ def create_purchase_order_api(request):
         import traceback
         traceback.print_exc()
         return JsonResponse({'error': f'Internal server error: {str(e)}'}, status=500)
+
+
+@login_required
+@require_POST
+def bulk_purchase_order_action_api(request):
+    """
+    API para aplicar una acción a varias órdenes de compra a la vez.
+    
+    URL: /purchases/api/purchase-order/bulk-action/
+    Método: POST
+    
+    JSON esperado:
+    {
+        "action": "receive" | "cancel" | "close",
+        "order_ids": ["PO-0001", "PO-0002", ...],
+        "chunk_size": <int (opcional)>
+    }
+    
+    Retorna:
+        - JSON con el resumen y el resultado de cada orden
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+    
+    action = data.get('action')
+    order_ids = data.get('order_ids')
+    
+    if action not in BULK_ACTIONS:
+        return JsonResponse({'error': f'Acción no válida: {action}'}, status=400)
+    
+    if not isinstance(order_ids, list) or len(order_ids) == 0:
+        return JsonResponse({'error': 'Debe incluir al menos una orden en order_ids'}, status=400)
+    
+    try:
+        chunk_size = int(data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    except (ValueError, TypeError):
+        return JsonResponse({'error': 'chunk_size inválido'}, status=400)
+    
+    try:
+        summary = bulk_transition_purchase_orders(
+            order_ids,
+            action,
+            user=request.user,
+            chunk_size=chunk_size
+        )
+    except (OrderStatus.DoesNotExist, MovementType.DoesNotExist) as e:
+        return JsonResponse({'error': str(e) or 'Estado no encontrado en el sistema'}, status=500)
+    except Exception as e:
+        logger.error(f'Error en bulk_purchase_order_action_api: {str(e)}')
+        return JsonResponse({'error': f'Internal server error: {str(e)}'}, status=500)
+    
+    return JsonResponse(summary)
+
+
+@login_required
+@require_POST
+def purchase_order_receipt_api(request, order_id):
+    """
+    API para registrar una recepción parcial de una orden de compra.
+    
+    URL: /purchases/api/purchase-order/<order_id>/receipts/
+    Método: POST
+    
+    JSON esperado:
+    {
+        "key": "<clave de idempotencia>",
+        "lines": [{"position": 1, "quantity": 5}, ...]
+    }
+    La clave también puede enviarse en la cabecera Idempotency-Key.
+    
+    Solo escribe los movimientos y el asiento de lo recibido en esta tanda
+    (ver core.shipments). La orden pasa a PARTIAL o, si se completan todas
+    las líneas, a RECEIVED.
+    
+    Retorna:
+        - 201 con la recepción registrada
+        - 200 con la recepción ya registrada si la clave se repite
+        - 400 si las líneas o las cantidades no son válidas
+        - 404 si la orden no existe
+        - 409 si la clave ya se usó con otras cantidades
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+    
+    try:
+        order = PurchaseOrder.objects.get(id_purchase_order=order_id)
+    except PurchaseOrder.DoesNotExist:
+        return JsonResponse({'error': f'Orden de compra "{order_id}" no encontrada'}, status=404)
+    
+    try:
+        result = record_shipment(
+            order,
+            data.get('key') or request.headers.get('Idempotency-Key'),
+            parse_lines(data.get('lines')),
+            user=request.user
+        )
+    except ValidationError as e:
+        return JsonResponse({'error': e.messages[0]}, status=400)
+    except KeyConflict as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    except (OrderStatus.DoesNotExist, MovementType.DoesNotExist) as e:
+        return JsonResponse({'error': str(e) or 'Estado no encontrado en el sistema'}, status=500)
+    except Exception as e:
+        logger.error(f'Error en purchase_order_receipt_api: {str(e)}')
+        return JsonResponse({'error': f'Internal server error: {str(e)}'}, status=500)
+    
+    return JsonResponse(result, status=201 if result['created'] else 200)
@@ -37,20 +37,12 @@ def monthly_income_api(request):
                 next_month = month_date.replace(month=month_date.month + 1, day=1)
                 last_day = next_month - timedelta(days=1)
             
-            # Calcular ingresos desde ventas (suma de totales)
-            sales_income = 0
-            sales = SalesOrder.objects.filter(
+            # Calcular ingresos desde ventas (suma de totales almacenados)
+            sales_income = float(SalesOrder.objects.filter(
                 status__symbol='DELIVERED',
                 issue_date__gte=first_day,
                 issue_date__lte=last_day
-            ).prefetch_related('lines')
-            
-            for sale in sales:
-                sale_total = sum(
-                    Decimal(str(line.quantity)) * line.price 
-                    for line in sale.lines.all()
-                )
-                sales_income += float(sale_total)
+            ).aggregate(total=Sum('total_amount'))['total'] or 0)
             
             months_data.append({
                 'month': first_day.strftime('%B'),
@@ -93,20 +85,12 @@ def monthly_expenses_api(request):
                 next_month = month_date.replace(month=month_date.month + 1, day=1)
                 last_day = next_month - timedelta(days=1)
             
-            # Calcular egresos desde compras
-            purchases_expense = 0
-            purchases = PurchaseOrder.objects.filter(
+            # Calcular egresos desde compras (suma de totales almacenados)
+            purchases_expense = float(PurchaseOrder.objects.filter(
                 status__symbol__in=['RECEIVED', 'CLOSED'],
                 created_at__gte=first_day,
                 created_at__lte=last_day
-            ).prefetch_related('lines')
-            
-            for purchase in purchases:
-                purchase_total = sum(
-                    Decimal(str(line.quantity)) * line.price 
-                    for line in purchase.lines.all()
-                )
-                purchases_expense += float(purchase_total)
+            ).aggregate(total=Sum('total_amount'))['total'] or 0)
             
             months_data.append({
                 'month': first_day.strftime('%B'),
@@ -239,13 +223,10 @@ def metrics_summary_api(request):
             issue_date__gte=first_day_month
         ).count()
         
-        sales_total = 0
-        for sale in SalesOrder.objects.filter(status__symbol='DELIVERED', issue_date__gte=first_day_month):
-            sale_total = sum(
-                Decimal(str(line.quantity)) * line.price 
-                for line in sale.lines.all()
-            )
-            sales_total += float(sale_total)
+        sales_total = float(SalesOrder.objects.filter(
+            status__symbol='DELIVERED',
+            issue_date__gte=first_day_month
+        ).aggregate(total=Sum('total_amount'))['total'] or 0)
         
         # Compras del mes
         purchases_count = PurchaseOrder.objects.filter(
@@ -253,13 +234,10 @@ def metrics_summary_api(request):
             created_at__gte=first_day_month
         ).count()
         
-        purchases_total = 0
-        for purchase in PurchaseOrder.objects.filter(status__symbol__in=['RECEIVED', 'CLOSED'], created_at__gte=first_day_month):
-            purchase_total = sum(
-                Decimal(str(line.quantity)) * line.price 
-                for line in purchase.lines.all()
-            )
-            purchases_total += float(purchase_total)
+        purchases_total = float(PurchaseOrder.objects.filter(
+            status__symbol__in=['RECEIVED', 'CLOSED'],
+            created_at__gte=first_day_month
+        ).aggregate(total=Sum('total_amount'))['total'] or 0)
         
         # Producción del mes
         production_count = WorkOrder.objects.filter(
@@ -1,20 +1,62 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q, F
+from django.db.models import Sum, Count, Q, F, DecimalField
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 from collections import defaultdict
 
-from sales.models import SalesOrder
-from purchases.models import PurchaseOrder
+from sales.models import SalesOrder, SalesOrderLine
+from purchases.models import PurchaseOrder, PurchaseOrderLine
+from materials.models import Material
 from accounting.models import JournalEntry, AccountAccount
+from accounting.statements import trial_balance, income_statement, balance_sheet
 from inventory.models import InventoryMovement
 from manufacturing.models import WorkOrder
 from customers.models import Customer
 from suppliers.models import Supplier
 
 
+def _sum_totals(orders):
+    """Suma los totales almacenados de un queryset de órdenes."""
+    return float(orders.aggregate(total=Sum('total_amount'))['total'] or 0)
+
+
+def _analysis_by(orders, field, model, limit):
+    """
+    Número de órdenes y monto total agrupados por `field` (cliente o
+    proveedor), de mayor a menor monto.
+    """
+    rows = list(
+        orders.order_by().values(field)
+        .annotate(count=Count('id'), total=Sum('total_amount'))
+        .order_by('-total')[:limit]
+    )
+    objects = model.objects.in_bulk([row[field] for row in rows])
+    return [
+        {field: objects[row[field]], 'count': row['count'], 'total': float(row['total'] or 0)}
+        for row in rows
+    ]
+
+
+def _top_materials(lines, limit=5):
+    """Materiales con mayor monto en las líneas dadas (cantidad y total)."""
+    rows = list(
+        lines.order_by().values('material')
+        .annotate(
+            # total antes que quantity: F('quantity') debe referirse a la columna
+            total=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=20, decimal_places=2)),
+            quantity=Sum('quantity')
+        )
+        .order_by('-total')[:limit]
+    )
+    materials = Material.objects.in_bulk([row['material'] for row in rows])
+    return [
+        {'material': materials[row['material']], 'quantity': float(row['quantity']), 'total': float(row['total'])}
+        for row in rows
+    ]
+
+
 @login_required
 def dashboard(request):
     """
@@ -47,18 +89,16 @@ def dashboard(request):
         date__gte=first_day_month
     ).count()
     
-    # Calcular totales monetarios
+    # Calcular totales monetarios (totales almacenados en las órdenes)
     # Total de ventas completadas del mes
-    monthly_sales_total = 0
-    for sale in SalesOrder.objects.filter(status__symbol='DELIVERED', issue_date__gte=first_day_month):
-        sale_total = sum(Decimal(str(line.quantity)) * line.price for line in sale.lines.all())
-        monthly_sales_total += float(sale_total)
+    monthly_sales_total = _sum_totals(
+        SalesOrder.objects.filter(status__symbol='DELIVERED', issue_date__gte=first_day_month)
+    )
     
     # Total de compras recibidas del mes
-    monthly_purchases_total = 0
-    for purchase in PurchaseOrder.objects.filter(status__symbol__in=['RECEIVED', 'CLOSED'], created_at__gte=first_day_month):
-        purchase_total = sum(Decimal(str(line.quantity)) * line.price for line in purchase.lines.all())
-        monthly_purchases_total += float(purchase_total)
+    monthly_purchases_total = _sum_totals(
+        PurchaseOrder.objects.filter(status__symbol__in=['RECEIVED', 'CLOSED'], created_at__gte=first_day_month)
+    )
     
     # Beneficio neto
     net_benefit = monthly_sales_total - monthly_purchases_total
@@ -100,51 +140,21 @@ def sales_report(request):
     sales_query = SalesOrder.objects.filter(
         status__symbol='DELIVERED',
         issue_date__gte=start_date
-    ).select_related('customer', 'status').prefetch_related('lines__material')
+    ).select_related('customer', 'status')
     
     if customer_id:
         sales_query = sales_query.filter(customer_id=customer_id)
     
     sales = sales_query.order_by('-issue_date')
     
-    # Análisis por cliente
-    from customers.models import Customer
-    from django.db.models import Count
-    
-    customer_analysis = []
-    for customer in Customer.objects.all():
-        customer_sales = sales.filter(customer=customer)
-        if customer_sales.exists():
-            total = sum(
-                sum(Decimal(str(line.quantity)) * line.price for line in sale.lines.all())
-                for sale in customer_sales
-            )
-            customer_analysis.append({
-                'customer': customer,
-                'count': customer_sales.count(),
-                'total': float(total)
-            })
-    
-    customer_analysis.sort(key=lambda x: x['total'], reverse=True)
+    # Análisis por cliente (top 10, una consulta agrupada)
+    customer_analysis = _analysis_by(sales, 'customer', Customer, limit=10)
     
     # Top 5 productos más vendidos
-    from collections import defaultdict
-    product_sales = defaultdict(lambda: {'quantity': 0, 'total': 0, 'material': None})
-    
-    for sale in sales:
-        for line in sale.lines.all():
-            key = line.material.id
-            product_sales[key]['material'] = line.material
-            product_sales[key]['quantity'] += float(line.quantity)
-            product_sales[key]['total'] += float(Decimal(str(line.quantity)) * line.price)
-    
-    top_products = sorted(product_sales.values(), key=lambda x: x['total'], reverse=True)[:5]
+    top_products = _top_materials(SalesOrderLine.objects.filter(sales_order__in=sales.values('pk')))
     
     # Totales generales
-    total_sales = float(sum(
-        sum(Decimal(str(line.quantity)) * line.price for line in sale.lines.all())
-        for sale in sales
-    ))
+    total_sales = _sum_totals(sales)
     
     # Comparativa con periodo anterior
     if period == 'month':
@@ -160,10 +170,7 @@ def sales_report(request):
         issue_date__lte=prev_end
     )
     
-    prev_total = float(sum(
-        sum(Decimal(str(line.quantity)) * line.price for line in sale.lines.all())
-        for sale in prev_sales
-    ))
+    prev_total = _sum_totals(prev_sales)
     
     if prev_total > 0:
         growth_percentage = ((total_sales - prev_total) / prev_total) * 100
@@ -173,7 +180,7 @@ def sales_report(request):
     context = {
         'sales': sales,
         'period': period,
-        'customer_analysis': customer_analysis[:10],  # Top 10
+        'customer_analysis': customer_analysis,  # Top 10
         'top_products': top_products,
         'total_sales': total_sales,
         'sales_count': sales.count(),
@@ -210,50 +217,21 @@ def purchases_report(request):
     purchases_query = PurchaseOrder.objects.filter(
         status__symbol__in=['RECEIVED', 'CLOSED'],
         created_at__gte=start_date
-    ).select_related('supplier', 'status').prefetch_related('lines__material')
+    ).select_related('supplier', 'status')
     
     if supplier_id:
         purchases_query = purchases_query.filter(supplier_id=supplier_id)
     
     purchases = purchases_query.order_by('-created_at')
     
-    # Análisis por proveedor
-    from suppliers.models import Supplier
-    
-    supplier_analysis = []
-    for supplier in Supplier.objects.all():
-        supplier_purchases = purchases.filter(supplier=supplier)
-        if supplier_purchases.exists():
-            total = sum(
-                sum(Decimal(str(line.quantity)) * line.price for line in purchase.lines.all())
-                for purchase in supplier_purchases
-            )
-            supplier_analysis.append({
-                'supplier': supplier,
-                'count': supplier_purchases.count(),
-                'total': float(total)
-            })
-    
-    supplier_analysis.sort(key=lambda x: x['total'], reverse=True)
+    # Análisis por proveedor (top 10, una consulta agrupada)
+    supplier_analysis = _analysis_by(purchases, 'supplier', Supplier, limit=10)
     
     # Top 5 materiales más comprados
-    from collections import defaultdict
-    material_purchases = defaultdict(lambda: {'quantity': 0, 'total': 0, 'material': None})
-    
-    for purchase in purchases:
-        for line in purchase.lines.all():
-            key = line.material.id
-            material_purchases[key]['material'] = line.material
-            material_purchases[key]['quantity'] += float(line.quantity)
-            material_purchases[key]['total'] += float(Decimal(str(line.quantity)) * line.price)
-    
-    top_materials = sorted(material_purchases.values(), key=lambda x: x['total'], reverse=True)[:5]
+    top_materials = _top_materials(PurchaseOrderLine.objects.filter(purchase_order__in=purchases.values('pk')))
     
     # Totales generales
-    total_purchases = float(sum(
-        sum(Decimal(str(line.quantity)) * line.price for line in purchase.lines.all())
-        for purchase in purchases
-    ))
+    total_purchases = _sum_totals(purchases)
     
     # Comparativa con periodo anterior
     if period == 'month':
@@ -269,10 +247,7 @@ def purchases_report(request):
         created_at__lte=prev_end
     )
     
-    prev_total = float(sum(
-        sum(Decimal(str(line.quantity)) * line.price for line in purchase.lines.all())
-        for purchase in prev_purchases
-    ))
+    prev_total = _sum_totals(prev_purchases)
     
     if prev_total > 0:
         growth_percentage = ((total_purchases - prev_total) / prev_total) * 100
@@ -282,7 +257,7 @@ def purchases_report(request):
     context = {
         'purchases': purchases,
         'period': period,
-        'supplier_analysis': supplier_analysis[:10],  # Top 10
+        'supplier_analysis': supplier_analysis,  # Top 10
         'top_materials': top_materials,
         'total_purchases': total_purchases,
         'purchases_count': purchases.count(),
@@ -335,25 +310,34 @@ def inventory_report(request):
 
 @login_required
 def accounting_report(request):
-    """Vista detallada de reporte contable"""
-    # Asientos del mes actual
+    """
+    Vista detallada de reporte contable: balance de comprobación, estado
+    de resultados y balance general del período (por defecto el mes actual).
+    Los estados salen de una consulta agregada por cuenta (ver
+    accounting.statements) y se cachean cuando el período está cerrado.
+    """
     today = timezone.now().date()
-    first_day_month = today.replace(day=1)
-    
-    entries = JournalEntry.objects.filter(
-        date__gte=first_day_month,
-        status='POSTED'
-    ).select_related('currency').prefetch_related('lines__account')
-    
-    # Totales
-    total_debit = sum(e.get_total_debit() for e in entries)
-    total_credit = sum(e.get_total_credit() for e in entries)
+    date_from = today.replace(day=1)
+    date_to = today
+    try:
+        if request.GET.get('fecha_desde'):
+            date_from = datetime.strptime(request.GET['fecha_desde'], '%Y-%m-%d').date()
+        if request.GET.get('fecha_hasta'):
+            date_to = datetime.strptime(request.GET['fecha_hasta'], '%Y-%m-%d').date()
+    except ValueError:
+        date_from, date_to = today.replace(day=1), today
+    
+    trial = trial_balance(date_from, date_to)
     
     context = {
-        'entries': entries,
-        'total_debit': total_debit,
-        'total_credit': total_credit,
-        'period': first_day_month.strftime('%B %Y'),
+        'trial_balance': trial,
+        'income_statement': income_statement(date_from, date_to),
+        'balance_sheet': balance_sheet(date_to),
+        'total_debit': trial['total_debit'],
+        'total_credit': trial['total_credit'],
+        'date_from': date_from,
+        'date_to': date_to,
+        'period': f"{date_from.strftime('%d/%m/%Y')} - {date_to.strftime('%d/%m/%Y')}",
     }
     
     return render(request, 'reporting/accounting_report.html', context)
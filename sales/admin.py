@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SalesOrder, SalesOrderLine
+from .models import SalesOrder, SalesOrderLine, SalesDelivery
 
 
 class SalesOrderLineInline(admin.TabularInline):
@@ -8,15 +8,20 @@ class SalesOrderLineInline(admin.TabularInline):
     fields = ['id_sales_order_line', 'material', 'position', 'quantity', 
               'unit_material', 'price', 'currency_customer', 'delivered_quantity']
     readonly_fields = ['created_at', 'updated_at']
+    autocomplete_fields = ['material']
 
 
 @admin.register(SalesOrder)
 class SalesOrderAdmin(admin.ModelAdmin):
     list_display = ['id_sales_order', 'customer', 'issue_date', 'status', 
-                    'invoice_number', 'source_location', 'created_at']
+                    'invoice_number', 'source_location', 'line_count', 'total_amount', 'created_at']
+    list_select_related = ['customer', 'status', 'source_location']
     list_filter = ['status', 'issue_date', 'created_at']
     search_fields = ['id_sales_order', 'customer__name', 'invoice_number']
-    readonly_fields = ['created_at', 'updated_at', 'created_by']
+    show_full_result_count = False
+    autocomplete_fields = ['customer', 'source_location']
+    readonly_fields = ['created_at', 'updated_at', 'created_by',
+                       'total_amount', 'line_count', 'currency', 'delivered_fraction']
     inlines = [SalesOrderLineInline]
     
     fieldsets = (
@@ -29,6 +34,9 @@ class SalesOrderAdmin(admin.ModelAdmin):
         ('Additional Information', {
             'fields': ('notes', 'invoice_number')
         }),
+        ('Totals', {
+            'fields': ('total_amount', 'line_count', 'currency', 'delivered_fraction')
+        }),
         ('Audit Information', {
             'fields': ('created_at', 'updated_at', 'created_by'),
             'classes': ('collapse',)
@@ -45,7 +53,11 @@ class SalesOrderAdmin(admin.ModelAdmin):
 class SalesOrderLineAdmin(admin.ModelAdmin):
     list_display = ['id_sales_order_line', 'sales_order', 'material', 'position',
                     'quantity', 'price', 'currency_customer', 'delivered_quantity']
+    list_select_related = ['sales_order__customer', 'material', 'currency_customer']
     list_filter = ['sales_order__status', 'created_at']
+    show_full_result_count = False
+    raw_id_fields = ['sales_order']
+    autocomplete_fields = ['material']
     search_fields = ['id_sales_order_line', 'sales_order__id_sales_order', 
                      'material__name']
     readonly_fields = ['created_at', 'updated_at', 'created_by']
@@ -70,3 +82,16 @@ class SalesOrderLineAdmin(admin.ModelAdmin):
         if not change:
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(SalesDelivery)
+class SalesDeliveryAdmin(admin.ModelAdmin):
+    # Solo consulta: las entregas se registran con la API (ver core.shipments)
+    list_display = ['id_sales_delivery', 'sales_order', 'number', 'key', 'created_at']
+    list_select_related = ['sales_order__customer']
+    search_fields = ['id_sales_delivery', 'sales_order__id_sales_order', 'key']
+    show_full_result_count = False
+    readonly_fields = ['id_sales_delivery', 'sales_order', 'number', 'key', 'lines', 'created_at', 'created_by']
+    
+    def has_add_permission(self, request):
+        return False
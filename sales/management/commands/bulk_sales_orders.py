@@ -0,0 +1,99 @@
+"""
+Management command to apply a status transition to many sales orders at once.
+
+Usage:
+    python manage.py bulk_sales_orders deliver SO-0001 SO-0002
+    python manage.py bulk_sales_orders deliver --status CONFIRMED
+    python manage.py bulk_sales_orders confirm --status DRAFT --chunk-size 200 --user admin
+
+Orders are processed in chunks (one transaction per chunk). Orders that fail
+validation (wrong status, insufficient stock, ...) are reported and skipped
+without affecting the rest. Journal entries for the whole chunk are written
+in one batch; pass --post-entries to create them already posted.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from purchases.models import OrderStatus
+from sales.models import SalesOrder
+from sales.utils import bulk_transition_sales_orders, BULK_ACTIONS, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Apply confirm/deliver/cancel to many sales orders in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=sorted(BULK_ACTIONS.keys()))
+        parser.add_argument('order_ids', nargs='*', help='Sales order IDs (e.g. SO-0001)')
+        parser.add_argument(
+            '--status',
+            help='Process every order currently in this status symbol (e.g. CONFIRMED)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--user', help='Username recorded as creator of movements and entries')
+        parser.add_argument(
+            '--post-entries',
+            action='store_true',
+            help='Create the journal entries as POSTED and update account balances'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Resolve the list of orders and run the bulk transition.
+        """
+        order_ids = list(options['order_ids'])
+
+        if options['status']:
+            if not OrderStatus.objects.filter(symbol=options['status']).exists():
+                raise CommandError(f"Status '{options['status']}' not found")
+            order_ids += list(
+                SalesOrder.objects.filter(status__symbol=options['status'])
+                .order_by('issue_date', 'id')
+                .values_list('id_sales_order', flat=True)
+            )
+
+        if not order_ids:
+            raise CommandError('No orders to process. Pass order IDs or --status.')
+
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User '{options['user']}' not found")
+
+        self.stdout.write(self.style.WARNING(
+            f"Processing {len(order_ids)} order(s) with action '{options['action']}'..."
+        ))
+        self.stdout.write('')
+
+        try:
+            summary = bulk_transition_sales_orders(
+                order_ids,
+                options['action'],
+                user=user,
+                chunk_size=options['chunk_size'],
+                post_entries=options['post_entries']
+            )
+        except Exception as e:
+            raise CommandError(str(e))
+
+        for result in summary['results']:
+            if result['success']:
+                line = f"✓ {result['order_id']}"
+                if result.get('journal_entry'):
+                    line += f" ({result['journal_entry']})"
+                self.stdout.write(self.style.SUCCESS(line))
+                if result.get('warning'):
+                    self.stdout.write(self.style.WARNING(f"  {result['warning']}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"✗ {result['order_id']}: {result['message']}"))
+
+        # Summary
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(self.style.SUCCESS('Summary:'))
+        self.stdout.write(self.style.SUCCESS(f"  Succeeded: {summary['succeeded']} order(s)"))
+        self.stdout.write(self.style.ERROR(f"  Failed: {summary['failed']} order(s)"))
+        self.stdout.write(self.style.SUCCESS(f"  Total: {summary['processed']} order(s)"))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
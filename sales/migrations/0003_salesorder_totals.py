@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:42
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Max, Min, Sum
+
+
+def backfill_totals(apps, schema_editor):
+    """Calcula los totales de las órdenes existentes a partir de sus líneas."""
+    SalesOrder = apps.get_model('sales', 'SalesOrder')
+    SalesOrderLine = apps.get_model('sales', 'SalesOrderLine')
+
+    rows = (
+        SalesOrderLine.objects.values('sales_order_id')
+        .annotate(
+            count=Count('id'),
+            total=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=20, decimal_places=2)),
+            currency_min=Min('currency_customer_id'),
+            currency_max=Max('currency_customer_id'),
+            ordered=Sum('quantity'),
+            progress=Sum('delivered_quantity'),
+        )
+        .order_by()
+    )
+    orders = []
+    for row in rows.iterator():
+        fraction = Decimal(row['progress'] or 0) / row['ordered'] if row['ordered'] else Decimal('0')
+        orders.append(SalesOrder(
+            pk=row['sales_order_id'],
+            total_amount=Decimal(row['total'] or 0).quantize(Decimal('0.01')),
+            line_count=row['count'],
+            currency_id=row['currency_min'] if row['currency_min'] == row['currency_max'] else None,
+            delivered_fraction=min(fraction, Decimal('1')).quantize(Decimal('0.0001')),
+        ))
+    SalesOrder.objects.bulk_update(
+        orders, ['total_amount', 'line_count', 'currency', 'delivered_fraction'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_search_index'),
+        ('sales', '0002_salesorder_invoice_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesorder',
+            name='currency',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Moneda común de las líneas (vacía si no hay líneas o si mezclan monedas)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales_orders', to='core.currency', verbose_name='Currency'),
+        ),
+        migrations.AddField(
+            model_name='salesorder',
+            name='delivered_fraction',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, help_text='Cantidad entregada / cantidad pedida (de 0 a 1)', max_digits=5, verbose_name='Delivered Fraction'),
+        ),
+        migrations.AddField(
+            model_name='salesorder',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Número de líneas de la orden', verbose_name='Line Count'),
+        ),
+        migrations.AddField(
+            model_name='salesorder',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Suma de cantidad × precio de las líneas', max_digits=14, verbose_name='Total Amount'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def reserve_confirmed_orders(apps, schema_editor):
+    """Reserva la cantidad pendiente de las órdenes que ya están confirmadas."""
+    SalesOrderLine = apps.get_model('sales', 'SalesOrderLine')
+    StockReservation = apps.get_model('sales', 'StockReservation')
+    StockLevel = apps.get_model('inventory', 'StockLevel')
+    InventoryLocation = apps.get_model('inventory', 'InventoryLocation')
+
+    default_location = (
+        InventoryLocation.objects.filter(main_location=True, status=True).first()
+        or InventoryLocation.objects.filter(status=True).order_by('name').first()
+    )
+    lines = SalesOrderLine.objects.filter(
+        sales_order__status__symbol='CONFIRMED', quantity__gt=F('delivered_quantity')
+    ).values_list('pk', 'sales_order_id', 'sales_order__source_location_id', 'material_id', 'quantity', 'delivered_quantity')
+
+    reservations = []
+    reserved = {}
+    for pk, order_id, location_id, material_id, quantity, delivered in lines:
+        location_id = location_id or (default_location.pk if default_location else None)
+        if location_id is None:
+            continue
+        reservations.append(StockReservation(
+            sales_order_line_id=pk, sales_order_id=order_id,
+            material_id=material_id, location_id=location_id, quantity=quantity - delivered,
+        ))
+        key = (material_id, location_id)
+        reserved[key] = reserved.get(key, 0) + quantity - delivered
+    StockReservation.objects.bulk_create(reservations, batch_size=1000)
+
+    levels = {
+        (level.material_id, level.location_id): level
+        for level in StockLevel.objects.filter(material_id__in={material_id for material_id, _ in reserved})
+    }
+    new_levels = []
+    for key, quantity in reserved.items():
+        if key in levels:
+            levels[key].reserved = quantity
+        else:
+            new_levels.append(StockLevel(material_id=key[0], location_id=key[1], reserved=quantity))
+    StockLevel.objects.bulk_update([levels[key] for key in reserved if key in levels], ['reserved'], batch_size=1000)
+    StockLevel.objects.bulk_create(new_levels, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stocklevel'),
+        ('materials', '0004_material_import_hash'),
+        ('sales', '0003_salesorder_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(help_text='Cantidad reservada (pendiente de entrega)', verbose_name='Quantity')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('location', models.ForeignKey(help_text='Ubicación de la que se entregará', on_delete=django.db.models.deletion.PROTECT, related_name='stock_reservations', to='inventory.inventorylocation', verbose_name='Location')),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_reservations', to='materials.material', verbose_name='Material')),
+                ('sales_order', models.ForeignKey(help_text='Orden de venta de la línea', on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='sales.salesorder', verbose_name='Sales Order')),
+                ('sales_order_line', models.OneToOneField(help_text='Línea de la orden que reserva el stock', on_delete=django.db.models.deletion.CASCADE, related_name='reservation', to='sales.salesorderline', verbose_name='Sales Order Line')),
+            ],
+            options={
+                'verbose_name': 'Stock Reservation',
+                'verbose_name_plural': 'Stock Reservations',
+                'db_table': 'sales_stock_reservation',
+                'indexes': [models.Index(fields=['material', 'location'], name='sales_stock_materia_976b38_idx')],
+            },
+        ),
+        migrations.RunPython(reserve_confirmed_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 04:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_stockreservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_sales_delivery', models.CharField(help_text='Identificador de la entrega (ej: SO-0001-D001); referencia de su asiento contable', max_length=60, unique=True, verbose_name='Delivery ID')),
+                ('number', models.PositiveIntegerField(help_text='Número de la entrega dentro de la orden', verbose_name='Number')),
+                ('key', models.CharField(help_text='Clave enviada por el cliente para no registrar dos veces la misma entrega', max_length=100, verbose_name='Idempotency Key')),
+                ('lines', models.JSONField(default=dict, help_text='Cantidad entregada por posición de línea', verbose_name='Lines')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_sales_deliveries', to=settings.AUTH_USER_MODEL, verbose_name='Created By')),
+                ('sales_order', models.ForeignKey(help_text='Orden de venta entregada', on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='sales.salesorder', verbose_name='Sales Order')),
+            ],
+            options={
+                'verbose_name': 'Sales Delivery',
+                'verbose_name_plural': 'Sales Deliveries',
+                'db_table': 'sales_delivery',
+                'ordering': ['sales_order', 'number'],
+                'unique_together': {('sales_order', 'key'), ('sales_order', 'number')},
+            },
+        ),
+    ]
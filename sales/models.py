@@ -59,6 +59,40 @@ class SalesOrder(models.Model):
         help_text="Número de factura o referencia contable asociada (integración contable)"
     )
     
+    # Totales almacenados - se mantienen al guardar/eliminar líneas (ver refresh_totals)
+    total_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Total Amount",
+        help_text="Suma de cantidad × precio de las líneas"
+    )
+    line_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Line Count",
+        help_text="Número de líneas de la orden"
+    )
+    currency = models.ForeignKey(
+        Currency,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='sales_orders',
+        verbose_name="Currency",
+        help_text="Moneda común de las líneas (vacía si no hay líneas o si mezclan monedas)"
+    )
+    delivered_fraction = models.DecimalField(
+        max_digits=5,
+        decimal_places=4,
+        default=0,
+        editable=False,
+        verbose_name="Delivered Fraction",
+        help_text="Cantidad entregada / cantidad pedida (de 0 a 1)"
+    )
+    
     # Campos de auditoría
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -96,9 +130,18 @@ class SalesOrder(models.Model):
         """
         Calcula el monto total de la orden sumando todas sus líneas.
         Retorna un diccionario con totales por moneda.
+        
+        Usa el total almacenado en la cabecera; solo recorre las líneas
+        cuando la orden mezcla monedas.
         """
         from decimal import Decimal
         from collections import defaultdict
+        from core.refdata import get_by_id
+        
+        if not self.line_count:
+            return {}
+        if self.currency_id:
+            return {get_by_id(Currency, self.currency_id).code: self.total_amount}
         
         totals = defaultdict(Decimal)
         for line in self.lines.all():
@@ -108,21 +151,24 @@ class SalesOrder(models.Model):
         
         return dict(totals)
     
+    def refresh_totals(self):
+        """
+        Recalcula los totales almacenados desde las líneas y los guarda.
+        Se llama automáticamente al guardar o eliminar una línea.
+        """
+        from core.order_totals import refresh_totals
+        values = refresh_totals(SalesOrder, [self.pk], using=self._state.db)[self.pk]
+        for field, value in values.items():
+            setattr(self, field, value)
+    
     def get_delivery_status(self):
         """
         Calcula el estado de entrega de la orden.
         Retorna: 'not_delivered', 'partially_delivered', 'fully_delivered'
         """
-        lines = self.lines.all()
-        if not lines:
-            return 'not_delivered'
-        
-        total_ordered = sum(line.quantity for line in lines)
-        total_delivered = sum(line.delivered_quantity for line in lines)
-        
-        if total_delivered == 0:
+        if not self.line_count or not self.delivered_fraction:
             return 'not_delivered'
-        elif total_delivered < total_ordered:
+        elif self.delivered_fraction < 1:
             return 'partially_delivered'
         else:
             return 'fully_delivered'
@@ -220,6 +266,17 @@ class SalesOrderLine(models.Model):
     def __str__(self):
         return f"{self.id_sales_order_line} - {self.material.name}"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Mantener los totales almacenados de la orden
+        self.sales_order.refresh_totals()
+    
+    def delete(self, *args, **kwargs):
+        sales_order = self.sales_order
+        result = super().delete(*args, **kwargs)
+        sales_order.refresh_totals()
+        return result
+    
     def get_line_total(self):
         """
         Calcula el total de la línea (cantidad × precio).
@@ -238,3 +295,121 @@ class SalesOrderLine(models.Model):
         Verifica si la línea ha sido completamente entregada.
         """
         return self.delivered_quantity >= self.quantity
+
+
+class StockReservation(models.Model):
+    """
+    Cantidad reservada por una línea de una orden de venta confirmada en
+    la ubicación de la que se entregará.
+
+    Se crea al confirmar la orden y se libera al entregarla o cancelarla;
+    StockLevel.reserved lleva la suma por material y ubicación (ver
+    sales.reservations).
+    """
+    sales_order_line = models.OneToOneField(
+        SalesOrderLine,
+        on_delete=models.CASCADE,
+        related_name='reservation',
+        verbose_name="Sales Order Line",
+        help_text="Línea de la orden que reserva el stock"
+    )
+    sales_order = models.ForeignKey(
+        SalesOrder,
+        on_delete=models.CASCADE,
+        related_name='reservations',
+        verbose_name="Sales Order",
+        help_text="Orden de venta de la línea"
+    )
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.PROTECT,
+        related_name='stock_reservations',
+        verbose_name="Material"
+    )
+    location = models.ForeignKey(
+        InventoryLocation,
+        on_delete=models.PROTECT,
+        related_name='stock_reservations',
+        verbose_name="Location",
+        help_text="Ubicación de la que se entregará"
+    )
+    quantity = models.IntegerField(
+        verbose_name="Quantity",
+        help_text="Cantidad reservada (pendiente de entrega)"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Created At"
+    )
+    
+    class Meta:
+        db_table = 'sales_stock_reservation'
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        indexes = [
+            models.Index(fields=['material', 'location']),
+        ]
+    
+    def __str__(self):
+        return f"{self.sales_order_id} - {self.material_id}@{self.location_id}: {self.quantity}"
+
+
+class SalesDelivery(models.Model):
+    """
+    Entrega (parcial o final) de una orden de venta.
+
+    Cada entrega registra solo las cantidades despachadas en ella: sus
+    movimientos de inventario y su asiento contable cubren únicamente esa
+    variación (ver core.shipments). La clave de idempotencia (key) es única
+    por orden: reenviar la misma entrega devuelve la ya registrada sin
+    volver a escribir nada.
+    """
+    id_sales_delivery = models.CharField(
+        max_length=60,
+        unique=True,
+        verbose_name="Delivery ID",
+        help_text="Identificador de la entrega (ej: SO-0001-D001); referencia de su asiento contable"
+    )
+    sales_order = models.ForeignKey(
+        SalesOrder,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+        verbose_name="Sales Order",
+        help_text="Orden de venta entregada"
+    )
+    number = models.PositiveIntegerField(
+        verbose_name="Number",
+        help_text="Número de la entrega dentro de la orden"
+    )
+    key = models.CharField(
+        max_length=100,
+        verbose_name="Idempotency Key",
+        help_text="Clave enviada por el cliente para no registrar dos veces la misma entrega"
+    )
+    lines = models.JSONField(
+        default=dict,
+        verbose_name="Lines",
+        help_text="Cantidad entregada por posición de línea"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Created At"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_sales_deliveries',
+        verbose_name="Created By"
+    )
+    
+    class Meta:
+        db_table = 'sales_delivery'
+        verbose_name = 'Sales Delivery'
+        verbose_name_plural = 'Sales Deliveries'
+        ordering = ['sales_order', 'number']
+        unique_together = [['sales_order', 'key'], ['sales_order', 'number']]
+    
+    def __str__(self):
+        return self.id_sales_delivery
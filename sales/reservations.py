@@ -0,0 +1,258 @@
+"""
+Reservas de stock de las órdenes de venta.
+
+- Confirmar una orden reserva la cantidad pendiente de cada línea en su
+  ubicación de origen (o la ubicación por defecto). Si el disponible para
+  prometer (existencias - reservas) no alcanza, la orden no se confirma.
+- Entregarla o cancelarla libera sus reservas; una entrega parcial (ver
+  core.shipments) descuenta de la reserva de cada línea lo entregado.
+- Al entregar, el stock se valida contra el disponible más lo que la
+  propia orden tiene reservado (ver delivery_available), porque esa
+  reserva se libera con la entrega.
+
+Cada reserva es una fila de StockReservation por línea; la suma por
+material y ubicación se lleva en StockLevel.reserved (ver
+inventory.stock_levels), así el disponible se consulta sin recorrer
+órdenes ni movimientos.
+"""
+
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+
+from inventory.models import InventoryLocation
+from inventory.stock_levels import apply_deltas, available_quantities
+from inventory.utils import get_default_inventory_location
+from .models import StockReservation
+
+
+def _default_location():
+    try:
+        return get_default_inventory_location()
+    except InventoryLocation.DoesNotExist:
+        return None
+
+
+def _reservation_deltas(reservations, sign=1):
+    deltas = defaultdict(int)
+    for reservation in reservations:
+        deltas[(reservation.material_id, reservation.location_id)] += sign * reservation.quantity
+    return deltas
+
+
+def build_reservations(orders, default_location=None):
+    """
+    Valida el disponible de las órdenes y arma sus reservas (sin guardar).
+
+    El disponible de todos los pares (material, ubicación) del lote se lee
+    con una consulta y se descuenta a medida que se aceptan órdenes, para
+    que dos órdenes del lote no reserven las mismas existencias.
+
+    Args:
+        orders: Órdenes con sus líneas (idealmente con prefetch de lines__material)
+        default_location: Ubicación para las órdenes sin source_location;
+            si es None se busca la ubicación por defecto cuando haga falta
+
+    Returns:
+        tuple: (órdenes aceptadas, reservas a crear, {id_sales_order: mensaje de error})
+    """
+    if default_location is None and any(order.source_location_id is None for order in orders):
+        default_location = _default_location()
+
+    def location_id(order):
+        if order.source_location_id:
+            return order.source_location_id
+        return default_location.pk if default_location else None
+
+    available = available_quantities({
+        (line.material_id, location_id(order))
+        for order in orders if location_id(order)
+        for line in order.lines.all()
+    })
+
+    accepted = []
+    reservations = []
+    errors = {}
+    for order in orders:
+        location = location_id(order)
+        if location is None:
+            errors[order.id_sales_order] = 'No hay ubicaciones de inventario configuradas.'
+            continue
+
+        required = defaultdict(int)
+        order_reservations = []
+        error = None
+        for line in order.lines.all():
+            pending = line.quantity - line.delivered_quantity
+            if pending <= 0:
+                continue
+            key = (line.material_id, location)
+            required[key] += pending
+            if required[key] > available[key]:
+                error = (
+                    f'Stock insuficiente para reservar {line.material.name} '
+                    f'(línea {line.position}). Disponible: {max(available[key], 0)}'
+                )
+                break
+            order_reservations.append(StockReservation(
+                sales_order_line=line,
+                sales_order=order,
+                material_id=line.material_id,
+                location_id=location,
+                quantity=pending,
+            ))
+
+        if error:
+            errors[order.id_sales_order] = error
+            continue
+
+        for key, quantity in required.items():
+            available[key] -= quantity
+        reservations.extend(order_reservations)
+        accepted.append(order)
+
+    return accepted, reservations, errors
+
+
+def save_reservations(reservations):
+    """Guarda las reservas y las suma a StockLevel.reserved."""
+    StockReservation.objects.bulk_create(reservations, batch_size=500)
+    apply_deltas('reserved', _reservation_deltas(reservations))
+
+
+def reserve_order(order):
+    """
+    Reserva el stock de una orden (confirmación individual).
+
+    Raises:
+        ValidationError: Si no hay disponible suficiente o no hay ubicación
+    """
+    accepted, reservations, errors = build_reservations([order])
+    if errors:
+        raise ValidationError(errors[order.id_sales_order])
+    save_reservations(reservations)
+    return reservations
+
+
+def delivery_available(keys, order_pks):
+    """
+    Disponible para entregar las órdenes, en dos consultas.
+
+    Lo que puede entregar cada orden en un par (material, ubicación) es el
+    disponible para prometer más lo que la propia orden tiene reservado
+    ahí.
+
+    Args:
+        keys: Pares (material_id, location_id) a consultar
+        order_pks: Órdenes que se van a entregar
+
+    Returns:
+        tuple: ({par: disponible para prometer}, {pk de la orden: {par: reservado}});
+        incluye los pares reservados por las órdenes aunque no estén en keys
+    """
+    own = defaultdict(lambda: defaultdict(int))
+    rows = StockReservation.objects.filter(sales_order_id__in=list(order_pks)).values_list(
+        'sales_order_id', 'material_id', 'location_id', 'quantity'
+    )
+    for order_id, material_id, location_id, quantity in rows:
+        own[order_id][(material_id, location_id)] += quantity
+    keys = set(keys) | {key for reserved in own.values() for key in reserved}
+    return available_quantities(keys), own
+
+
+def check_delivery(order, location):
+    """
+    Valida que haya stock para entregar todo lo pendiente de la orden desde
+    la ubicación (entrega individual).
+
+    Raises:
+        ValidationError: Si alguna línea supera el disponible más la reserva de la orden
+    """
+    lines = list(order.lines.select_related('material'))
+    keys = {(line.material_id, location.pk) for line in lines}
+    available, own = delivery_available(keys, [order.pk])
+    required = defaultdict(int)
+    for line in lines:
+        pending = line.quantity - line.delivered_quantity
+        if pending <= 0:
+            continue
+        key = (line.material_id, location.pk)
+        required[key] += pending
+        limit = available[key] + own[order.pk][key]
+        if required[key] > limit:
+            raise ValidationError(
+                f'Stock insuficiente para entregar {line.material.name} '
+                f'(línea {line.position}). Disponible: {max(limit, 0)}'
+            )
+
+
+def shipment_available(order, keys, quantities):
+    """
+    Disponible para una entrega parcial (ver core.shipments): el disponible
+    para prometer más la reserva de las líneas entregadas, hasta lo que se
+    entrega de cada una (el resto de su reserva sigue apartado).
+
+    Args:
+        order: Orden de venta
+        keys: Pares (material_id, location_id) de la entrega
+        quantities: dict pk de la línea -> cantidad entregada
+
+    Returns:
+        dict: par -> cantidad que se puede entregar
+    """
+    available = available_quantities(keys)
+    rows = StockReservation.objects.filter(
+        sales_order=order, sales_order_line_id__in=list(quantities)
+    ).values_list('sales_order_line_id', 'material_id', 'location_id', 'quantity')
+    for line_id, material_id, location_id, quantity in rows:
+        key = (material_id, location_id)
+        if key in available:
+            available[key] += min(quantity, quantities[line_id])
+    return available
+
+
+def release_orders(order_pks):
+    """
+    Libera las reservas de las órdenes (entrega o cancelación).
+
+    Returns:
+        int: reservas liberadas
+    """
+    reservations = list(
+        StockReservation.objects.filter(sales_order_id__in=list(order_pks))
+        .only('pk', 'material_id', 'location_id', 'quantity')
+    )
+    if not reservations:
+        return 0
+    StockReservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]).delete()
+    apply_deltas('reserved', _reservation_deltas(reservations, sign=-1))
+    return len(reservations)
+
+
+def consume_reservations(order, quantities):
+    """
+    Descuenta de las reservas de la orden lo entregado en una entrega
+    parcial. Las reservas que llegan a cero se eliminan.
+
+    Args:
+        order: Orden de venta
+        quantities: dict pk de la línea -> cantidad entregada
+    """
+    reservations = list(
+        StockReservation.objects.filter(sales_order=order, sales_order_line_id__in=list(quantities))
+        .only('pk', 'sales_order_line_id', 'material_id', 'location_id', 'quantity')
+    )
+    deltas = defaultdict(int)
+    to_update = []
+    to_delete = []
+    for reservation in reservations:
+        consumed = min(quantities[reservation.sales_order_line_id], reservation.quantity)
+        deltas[(reservation.material_id, reservation.location_id)] -= consumed
+        reservation.quantity -= consumed
+        if reservation.quantity > 0:
+            to_update.append(reservation)
+        else:
+            to_delete.append(reservation.pk)
+    StockReservation.objects.bulk_update(to_update, ['quantity'])
+    StockReservation.objects.filter(pk__in=to_delete).delete()
+    apply_deltas('reserved', deltas)
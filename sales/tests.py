@@ -1,3 +1,278 @@
+import json
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounting.models import JournalEntry, JournalEntryLine
+from core.testing import create_reference_data, create_sales_order, add_stock
+from inventory.models import InventoryMovement
+from inventory.stock_levels import availability, reconcile
+from .models import SalesOrder, SalesDelivery, StockReservation
+from .utils import bulk_transition_sales_orders
+
+
+def entry_amount(reference):
+    """Importe debitado en los asientos de la orden (incluye los de sus entregas, ej: SO-0001-D001)."""
+    return JournalEntryLine.objects.filter(journal_entry__reference__startswith=reference).aggregate(
+        total=Sum('debit')
+    )['total'] or Decimal('0.00')
+
+
+class BulkSalesOrderTransitionTests(TestCase):
+    """Acciones masivas sobre órdenes de venta (bulk_transition_sales_orders)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        for material in cls.data.materials:
+            add_stock(cls.data, material, 50)
+
+    def test_confirm_and_deliver(self):
+        first = create_sales_order(self.data, [(self.data.materials[0], 5, '10.00')], status='DRAFT')
+        second = create_sales_order(self.data, [
+            (self.data.materials[0], 3, '10.00'),
+            (self.data.materials[1], 2, '7.50'),
+        ], status='DRAFT')
+        ids = [first.id_sales_order, second.id_sales_order]
+
+        summary = bulk_transition_sales_orders(ids, 'confirm', self.data.user)
+        self.assertEqual(summary['succeeded'], 2)
+        summary = bulk_transition_sales_orders(ids, 'deliver', self.data.user)
+        self.assertEqual(summary['succeeded'], 2, summary['results'])
+
+        for order in SalesOrder.objects.filter(id_sales_order__in=ids):
+            self.assertEqual(order.status.symbol, 'DELIVERED')
+            self.assertFalse(order.reservations.exists())
+            self.assertTrue(all(line.delivered_quantity == line.quantity for line in order.lines.all()))
+            self.assertEqual(entry_amount(order.id_sales_order), order.total_amount)
+        self.assertEqual(
+            InventoryMovement.objects.filter(reference__in=ids, movement_type__symbol='SALE_OUT').count(), 3
+        )
+
+    def test_invalid_transition_does_not_stop_the_rest(self):
+        draft = create_sales_order(self.data, [(self.data.materials[0], 1, '10.00')], status='DRAFT')
+        confirmed = create_sales_order(self.data, [(self.data.materials[0], 1, '10.00')], status='DRAFT')
+        bulk_transition_sales_orders([confirmed.id_sales_order], 'confirm', self.data.user)
+
+        summary = bulk_transition_sales_orders(
+            [draft.id_sales_order, confirmed.id_sales_order, 'SO-MISSING'], 'deliver', self.data.user
+        )
+        results = {result['order_id']: result['success'] for result in summary['results']}
+        self.assertEqual(results, {draft.id_sales_order: False, confirmed.id_sales_order: True, 'SO-MISSING': False})
+        draft.refresh_from_db()
+        self.assertEqual(draft.status.symbol, 'DRAFT')
+
+    def test_api_rejects_non_object_json(self):
+        self.client.force_login(self.data.user)
+        response = self.client.post(
+            reverse('sales:bulk_sales_order_action_api'), data=json.dumps([1, 2]), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class StockReservationTests(TestCase):
+    """Reservas de stock de las órdenes confirmadas (sales.reservations)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        cls.material = cls.data.materials[0]
+        cls.key = (cls.material.pk, cls.data.location.pk)
+        add_stock(cls.data, cls.material, 10)
+
+    def confirmed_order(self, quantity):
+        order = create_sales_order(self.data, [(self.material, quantity, '10.00')], status='DRAFT')
+        summary = bulk_transition_sales_orders([order.id_sales_order], 'confirm', self.data.user)
+        self.assertEqual(summary['succeeded'], 1, summary['results'])
+        return order
+
+    def level(self):
+        return availability([self.material.pk])[self.key]
+
+    def test_confirm_reserves_and_rejects_over_available(self):
+        self.confirmed_order(6)
+        self.assertEqual(self.level(), {'on_hand': 10, 'reserved': 6, 'available': 4})
+
+        order = create_sales_order(self.data, [(self.material, 5, '10.00')], status='DRAFT')
+        summary = bulk_transition_sales_orders([order.id_sales_order], 'confirm', self.data.user)
+        self.assertEqual(summary['failed'], 1)
+        self.assertFalse(StockReservation.objects.filter(sales_order=order).exists())
+
+        self.client.force_login(self.data.user)
+        response = self.client.get(reverse('inventory:api_stock_availability'), {'material': self.material.id_material})
+        self.assertEqual(response.json()['stock'][0]['available'], 4)
+
+    def test_delivery_uses_own_reservation_only(self):
+        first = self.confirmed_order(6)
+        second = self.confirmed_order(4)
+        # Un pedido confirmado sin reserva (p. ej. anterior a las reservas)
+        # no puede llevarse el stock reservado por los demás
+        unreserved = create_sales_order(self.data, [(self.material, 1, '10.00')])
+
+        summary = bulk_transition_sales_orders([unreserved.id_sales_order], 'deliver', self.data.user)
+        self.assertEqual(summary['failed'], 1)
+
+        self.client.force_login(self.data.user)
+        self.client.post(
+            reverse('sales:sales_order_detail', args=[unreserved.id_sales_order]), {'action': 'deliver'}
+        )
+        unreserved.refresh_from_db()
+        self.assertEqual(unreserved.status.symbol, 'CONFIRMED')
+        self.assertFalse(InventoryMovement.objects.filter(reference=unreserved.id_sales_order).exists())
+
+        summary = bulk_transition_sales_orders(
+            [first.id_sales_order, second.id_sales_order], 'deliver', self.data.user
+        )
+        self.assertEqual(summary['succeeded'], 2, summary['results'])
+        self.assertEqual(self.level(), {'on_hand': 0, 'reserved': 0, 'available': 0})
+
+    def test_counters_match_after_bulk_operations(self):
+        delivered = self.confirmed_order(3)
+        cancelled = self.confirmed_order(2)
+        self.confirmed_order(1)
+        bulk_transition_sales_orders([delivered.id_sales_order], 'deliver', self.data.user)
+        bulk_transition_sales_orders([cancelled.id_sales_order], 'cancel', self.data.user)
+
+        self.assertEqual(self.level(), {'on_hand': 7, 'reserved': 1, 'available': 6})
+        self.assertEqual(reconcile(fix=False)[1], [])
+
+
+class SalesDeliveryTests(TestCase):
+    """Entregas parciales con clave de idempotencia (core.shipments)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        for material in cls.data.materials:
+            add_stock(cls.data, material, 20)
+
+    def setUp(self):
+        self.client.force_login(self.data.user)
+        self.order = create_sales_order(self.data, [
+            (self.data.materials[0], 5, '10.00'),
+            (self.data.materials[1], 4, '2.50'),
+        ], status='DRAFT')
+        bulk_transition_sales_orders([self.order.id_sales_order], 'confirm', self.data.user)
+
+    def deliver(self, key, lines):
+        return self.client.post(
+            reverse('sales:sales_order_delivery_api', args=[self.order.id_sales_order]),
+            data=json.dumps({'key': key, 'lines': [{'position': p, 'quantity': q} for p, q in lines]}),
+            content_type='application/json',
+        )
+
+    def delivered_quantities(self):
+        quantities = {}
+        for movement in InventoryMovement.objects.filter(reference=self.order.id_sales_order):
+            quantities[movement.material_id] = quantities.get(movement.material_id, 0) + movement.quantity
+        return quantities
+
+    def test_partial_delivery_then_bulk_deliver(self):
+        response = self.deliver('first', [(1, 2)])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['status'], 'PARTIAL')
+        self.assertEqual(entry_amount(self.order.id_sales_order), Decimal('20.00'))
+        self.assertEqual(
+            StockReservation.objects.get(sales_order=self.order, sales_order_line__position=1).quantity, 3
+        )
+
+        summary = bulk_transition_sales_orders([self.order.id_sales_order], 'deliver', self.data.user)
+        self.assertEqual(summary['succeeded'], 1, summary['results'])
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status.symbol, 'DELIVERED')
+        self.assertEqual(self.delivered_quantities(), {self.data.materials[0].pk: 5, self.data.materials[1].pk: 4})
+        self.assertEqual(entry_amount(self.order.id_sales_order), self.order.total_amount)
+        self.assertFalse(StockReservation.objects.filter(sales_order=self.order).exists())
+        self.assertEqual(reconcile(fix=False)[1], [])
+
+    def test_replayed_key_writes_nothing(self):
+        self.assertEqual(self.deliver('retry', [(1, 2), (2, 1)]).status_code, 201)
+        counts = (SalesDelivery.objects.count(), InventoryMovement.objects.count(), JournalEntry.objects.count())
+
+        response = self.deliver('retry', [(1, 2), (2, 1)])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['created'])
+        self.assertEqual(
+            (SalesDelivery.objects.count(), InventoryMovement.objects.count(), JournalEntry.objects.count()), counts
+        )
+
+        self.assertEqual(self.deliver('retry', [(1, 3)]).status_code, 409)
+        self.assertEqual(self.deliver('too-much', [(2, 4)]).status_code, 400)
+        self.assertEqual(SalesDelivery.objects.count(), counts[0])
+
+    def test_cancel_partial_order_releases_remaining_reservation(self):
+        self.assertEqual(self.deliver('first', [(1, 2)]).status_code, 201)
+        key = (self.data.materials[0].pk, self.data.location.pk)
+        self.assertEqual(availability([self.data.materials[0].pk])[key]['reserved'], 3)
+
+        summary = bulk_transition_sales_orders([self.order.id_sales_order], 'cancel', self.data.user)
+        self.assertEqual(summary['succeeded'], 1, summary['results'])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status.symbol, 'CANCELLED')
+        self.assertFalse(StockReservation.objects.filter(sales_order=self.order).exists())
+        self.assertEqual(availability([self.data.materials[0].pk])[key], {'on_hand': 18, 'reserved': 0, 'available': 18})
+        self.assertEqual(reconcile(fix=False)[1], [])
+
+    def test_cancel_partial_order_from_detail_view(self):
+        self.assertEqual(self.deliver('first', [(2, 1)]).status_code, 201)
+        self.client.post(reverse('sales:sales_order_detail', args=[self.order.id_sales_order]), {'action': 'cancel'})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status.symbol, 'CANCELLED')
+        self.assertFalse(StockReservation.objects.filter(sales_order=self.order).exists())
+        self.assertEqual(reconcile(fix=False)[1], [])
+
+
+class SalesOrderListTests(TestCase):
+    """Listado y exportación de órdenes con los totales de cabecera."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = create_reference_data()
+        create_sales_order(cls.data, [(cls.data.materials[0], 2, '10.00'), (cls.data.materials[1], 1, '0.50')])
+
+    def setUp(self):
+        self.client.force_login(self.data.user)
+
+    def queries(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('sales:sales_order_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self.queries()  # carga las tablas de referencia en caché
+        few, response = self.queries()
+        few_csv = self.queries(export='csv')[0]
+        self.assertContains(response, '20,50 USD')
+        for _ in range(6):
+            create_sales_order(self.data, [(self.data.materials[2], 3, '4.00')])
+        self.assertEqual(self.queries()[0], few)
+        self.assertEqual(self.queries(export='csv')[0], few_csv)
+
+    def test_admin_changelists_do_not_query_per_row(self):
+        names = ['admin:sales_salesorder_changelist', 'admin:sales_salesorderline_changelist']
+
+        def queries():
+            counts = []
+            for name in names:
+                with CaptureQueriesContext(connection) as context:
+                    self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+                counts.append(len(context.captured_queries))
+            return counts
+
+        queries()  # carga las tablas de referencia en caché
+        few = queries()
+        for _ in range(5):
+            create_sales_order(self.data, [(self.data.materials[2], 3, '4.00'), (self.data.materials[0], 1, '1.00')])
+        self.assertEqual(queries(), few)
 
-# Create your tests here.
+    def test_csv_lists_stored_totals(self):
+        content = self.queries(export='csv')[1].content.decode('utf-8-sig').splitlines()
+        self.assertEqual(len(content), 2)
+        self.assertIn('20.50', content[1])
+        self.assertIn('USD', content[1])
@@ -14,4 +14,6 @@ urlpatterns = [
     path('api/customer/<str:customer_id>/', views.customer_detail_api, name='customer_detail_api'),
     path('api/material/<str:material_id>/', views.material_detail_api, name='material_detail_api'),
     path('api/create/', views.create_sales_order_api, name='create_sales_order_api'),
+    path('api/bulk-action/', views.bulk_sales_order_action_api, name='bulk_sales_order_action_api'),
+    path('api/sales-order/<str:order_id>/deliveries/', views.sales_order_delivery_api, name='sales_order_delivery_api'),
 ]
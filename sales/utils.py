@@ -0,0 +1,328 @@
+"""
+Funciones de utilidad para el módulo de ventas.
+
+Incluye el procesamiento masivo de cambios de estado de órdenes de venta
+(confirmar, entregar, cancelar), pensado para cierres de mes donde se
+entregan cientos de órdenes a la vez.
+
+Confirmar reserva el stock de las órdenes; entregar o cancelar libera
+sus reservas (ver sales.reservations). Entregar una orden con entregas
+parciales (estado PARTIAL, ver core.shipments) mueve y contabiliza solo
+lo pendiente.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.core.exceptions import ValidationError
+
+from core.refdata import get_by_key
+from core.order_totals import refresh_totals
+from core.shipments import PARTIAL_STATUS, pending_amount
+from purchases.models import OrderStatus
+from inventory.models import InventoryLocation, MovementType, InventoryMovement
+from inventory.utils import get_default_inventory_location
+from inventory.stock_levels import apply_movements
+from accounting.utils import (
+    get_sale_accounts, build_sale_entry_data, create_journal_entries_batch
+)
+from .models import SalesOrder, SalesOrderLine
+from .reservations import build_reservations, save_reservations, release_orders, delivery_available
+
+logger = logging.getLogger(__name__)
+
+
+# Acción -> (estado destino, estados de origen permitidos)
+# Mismas reglas que sales_order_detail_view
+BULK_ACTIONS = {
+    'confirm': ('CONFIRMED', ['DRAFT']),
+    'deliver': ('DELIVERED', ['CONFIRMED', PARTIAL_STATUS]),
+    # Cancelar una orden PARTIAL libera la reserva de lo que no se entregó
+    'cancel': ('CANCELLED', ['DRAFT', 'CONFIRMED', PARTIAL_STATUS]),
+}
+
+DEFAULT_CHUNK_SIZE = 100
+
+
+def _chunks(items, size):
+    """Divide una lista en bloques de tamaño fijo."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_transition_sales_orders(order_ids, action, user=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                                 post_entries=False):
+    """
+    Aplica un cambio de estado a varias órdenes de venta procesándolas por bloques.
+
+    Los estados, la ubicación por defecto, el tipo de movimiento SALE_OUT y
+    las cuentas contables se consultan una sola vez. Por cada bloque se
+    cargan las órdenes con sus líneas, se valida el estado y el stock en
+    memoria, y se escriben los movimientos de inventario, las reservas, las
+    cantidades entregadas y los estados con operaciones masivas dentro de
+    una transacción.
+
+    Una orden que no cumple las validaciones no detiene al resto.
+
+    Args:
+        order_ids: Lista de identificadores (id_sales_order) a procesar
+        action: 'confirm', 'deliver' o 'cancel'
+        user: Usuario que ejecuta la acción (opcional)
+        chunk_size: Número de órdenes por bloque/transacción
+        post_entries: Si True, los asientos se crean contabilizados y se
+            actualizan los saldos de las cuentas
+
+    Returns:
+        dict: Resumen con 'action', 'processed', 'succeeded', 'failed' y
+        'results' (lista con el resultado de cada orden)
+
+    Raises:
+        ValueError: Si la acción no es válida
+        OrderStatus.DoesNotExist: Si el estado destino no existe
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f'Acción no válida: {action}')
+
+    target_symbol, allowed_symbols = BULK_ACTIONS[action]
+    new_status = get_by_key(OrderStatus, target_symbol)
+
+    # Datos compartidos para todas las órdenes (una consulta cada uno)
+    movement_type = None
+    default_location = None
+    accounts = None
+    accounting_error = None
+    if action in ('deliver', 'confirm'):
+        try:
+            default_location = get_default_inventory_location()
+        except InventoryLocation.DoesNotExist:
+            default_location = None
+    if action == 'deliver':
+        try:
+            movement_type = get_by_key(MovementType, 'SALE_OUT')
+        except MovementType.DoesNotExist:
+            raise MovementType.DoesNotExist(
+                "Tipo de movimiento 'SALE_OUT' no encontrado. "
+                "Por favor, ejecute el comando init_movement_types."
+            )
+        try:
+            accounts = get_sale_accounts()
+        except ValidationError as e:
+            # Igual que en la vista: la orden se entrega aunque falle la contabilidad
+            accounting_error = str(e)
+
+    # Eliminar duplicados conservando el orden recibido
+    order_ids = list(dict.fromkeys(str(order_id) for order_id in order_ids))
+
+    results = []
+    for chunk in _chunks(order_ids, max(1, chunk_size)):
+        results.extend(_process_chunk(
+            chunk, action, new_status, allowed_symbols, user,
+            movement_type, default_location, accounts, accounting_error, post_entries
+        ))
+
+    succeeded = sum(1 for result in results if result['success'])
+    return {
+        'action': action,
+        'processed': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+    }
+
+
+def _process_chunk(chunk, action, new_status, allowed_symbols, user,
+                   movement_type, default_location, accounts, accounting_error, post_entries):
+    """
+    Procesa un bloque de órdenes de venta. Retorna la lista de resultados.
+    """
+    orders = {
+        order.id_sales_order: order
+        for order in SalesOrder.objects.select_related(
+            'customer', 'status', 'source_location'
+        ).prefetch_related(
+            'lines__material',
+            'lines__unit_material',
+            'lines__currency_customer'
+        ).filter(id_sales_order__in=chunk)
+    }
+
+    results = {}
+    valid_orders = []
+
+    for order_id in chunk:
+        order = orders.get(order_id)
+        if order is None:
+            results[order_id] = _result(order_id, False, 'Orden de venta no encontrada')
+        elif order.status.symbol not in allowed_symbols:
+            results[order_id] = _result(
+                order_id, False,
+                f'No se puede aplicar "{action}" a una orden en estado "{order.status.name}".'
+            )
+        else:
+            valid_orders.append(order)
+
+    movements = []
+    reservations = []
+    amounts = {}
+    if action == 'deliver' and valid_orders:
+        valid_orders, movements = _build_delivery_movements(
+            valid_orders, results, user, movement_type, default_location
+        )
+        # Importe pendiente, antes de marcar las líneas como entregadas
+        amounts = {order.pk: pending_amount(order) for order in valid_orders}
+    elif action == 'confirm' and valid_orders:
+        valid_orders, reservations, errors = build_reservations(valid_orders, default_location)
+        for order_id, error in errors.items():
+            results[order_id] = _result(order_id, False, error)
+
+    if valid_orders:
+        valid_pks = [order.pk for order in valid_orders]
+        try:
+            with transaction.atomic():
+                if movements:
+                    InventoryMovement.objects.bulk_create(movements)
+                    # bulk_create no pasa por save(): actualizar los contadores de stock
+                    apply_movements(movements)
+                if action == 'confirm':
+                    save_reservations(reservations)
+                else:
+                    release_orders(valid_pks)
+                if action == 'deliver':
+                    SalesOrderLine.objects.filter(sales_order_id__in=valid_pks).update(
+                        delivered_quantity=F('quantity'),
+                        updated_at=timezone.now()
+                    )
+                    # update() no pasa por save(): recalcular la fracción entregada
+                    refresh_totals(SalesOrder, valid_pks)
+                SalesOrder.objects.filter(pk__in=valid_pks).update(
+                    status=new_status,
+                    updated_at=timezone.now()
+                )
+
+                for order in valid_orders:
+                    order.status = new_status
+                    results[order.id_sales_order] = _result(order.id_sales_order, True, f'Orden {order.id_sales_order} actualizada.')
+
+                if action == 'deliver':
+                    _create_sale_entries(valid_orders, amounts, results, user, accounts, accounting_error, post_entries)
+        except Exception as e:
+            logger.exception(f'Error en bloque de órdenes de venta ({action})')
+            for order in valid_orders:
+                results[order.id_sales_order] = _result(order.id_sales_order, False, f'Error: {str(e)}')
+
+    return [results[order_id] for order_id in chunk]
+
+
+def _build_delivery_movements(orders, results, user, movement_type, default_location):
+    """
+    Valida unidades y stock en memoria y arma los movimientos SALE_OUT del bloque.
+
+    Cada orden puede entregar el disponible para prometer más lo que ella
+    misma tiene reservado (ver sales.reservations.delivery_available). El
+    disponible se ajusta a medida que se aceptan órdenes para que dos
+    órdenes del mismo bloque no consuman las mismas existencias. Solo se
+    mueve lo pendiente de cada línea (lo ya entregado en entregas
+    parciales no se vuelve a mover).
+    """
+    keys = {
+        (line.material_id, (order.source_location or default_location).pk)
+        for order in orders if order.source_location or default_location
+        for line in order.lines.all()
+    }
+    available, own = delivery_available(keys, [order.pk for order in orders])
+
+    accepted = []
+    movements = []
+    timestamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+
+    for order in orders:
+        location = order.source_location or default_location
+        if location is None:
+            results[order.id_sales_order] = _result(
+                order.id_sales_order, False,
+                'No hay ubicaciones de inventario configuradas.'
+            )
+            continue
+
+        order_movements = []
+        required = {}
+        error = None
+        for line in order.lines.all():
+            pending = line.quantity - line.delivered_quantity
+            if pending <= 0:
+                continue
+            if line.unit_material_id != line.material.unit_id:
+                error = (
+                    f'La unidad de la línea {line.position} no coincide con la unidad '
+                    f'base de {line.material.name}.'
+                )
+                break
+            key = (line.material_id, location.pk)
+            required[key] = required.get(key, 0) + pending
+            limit = available[key] + own[order.pk][key]
+            if required[key] > limit:
+                error = (
+                    f'Stock insuficiente para entregar {line.material.name} '
+                    f'(línea {line.position}). Disponible: {max(limit, 0)}'
+                )
+                break
+            order_movements.append(InventoryMovement(
+                id_inventory_movement=f"INV-{timestamp}-S{line.id}",
+                location=location,
+                material=line.material,
+                quantity=pending,
+                unit_type=line.unit_material,
+                movement_type=movement_type,
+                movement_date=timezone.now(),
+                reference=order.id_sales_order,
+                created_by=user
+            ))
+
+        if error:
+            results[order.id_sales_order] = _result(order.id_sales_order, False, error)
+            continue
+
+        # La entrega libera las reservas de la orden y descuenta lo entregado
+        for key, quantity in own[order.pk].items():
+            available[key] += quantity
+        for key, quantity in required.items():
+            available[key] -= quantity
+        movements.extend(order_movements)
+        accepted.append(order)
+
+    return accepted, movements
+
+
+def _create_sale_entries(orders, amounts, results, user, accounts, accounting_error, post_entries):
+    """
+    Genera en lote los asientos de venta del bloque dentro de un savepoint,
+    por el importe pendiente de cada orden (amounts: pk -> importe).
+    Un fallo contable no revierte el cambio de estado; se informa en el resultado.
+    """
+    if accounting_error:
+        for order in orders:
+            results[order.id_sales_order]['warning'] = f'Orden entregada pero fallo contable: {accounting_error}'
+        return
+    try:
+        with transaction.atomic():
+            entries = create_journal_entries_batch(
+                [build_sale_entry_data(order, accounts, total=amounts[order.pk]) for order in orders],
+                user=user,
+                post=post_entries
+            )
+    except Exception as e:
+        logger.error(f'Error al crear asientos contables de venta en lote: {str(e)}')
+        for order in orders:
+            results[order.id_sales_order]['warning'] = f'Orden entregada pero error en contabilidad: {str(e)}'
+        return
+    for order in orders:
+        entry = entries.get(order.id_sales_order)
+        if entry:
+            results[order.id_sales_order]['journal_entry'] = entry.id_journal_entry
+
+
+def _result(order_id, success, message):
+    """Construye el resultado de una orden."""
+    return {'order_id': order_id, 'success': success, 'message': message}
@@ -1,19 +1,26 @@
 from django.shortcuts import render, redirect
 from django.http import JsonResponse, Http404, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.db.models import Q
 from django.contrib import messages
-from django.core.paginator import Paginator
+from core.pagination import paginate_keyset
+from core.jobs import enqueue_export
+from core.refdata import get_by_key, get_by_id, all_of
+from core.shipments import PARTIAL_STATUS, KeyConflict, pending_amount, parse_lines, record_shipment
 from django.core.exceptions import ValidationError
 from customers.models import Customer
 from materials.models import Material, Unit
 from core.models import Currency
 from purchases.models import OrderStatus
 from inventory.models import InventoryLocation, MovementType
-from inventory.utils import create_inventory_movements_for_sales_order
+from inventory.utils import create_inventory_movements_for_sales_order, get_default_inventory_location
 from accounting.utils import create_entry_for_sale
 from .models import SalesOrder, SalesOrderLine
+from .utils import bulk_transition_sales_orders, BULK_ACTIONS, DEFAULT_CHUNK_SIZE
+from .reservations import reserve_order, release_orders, check_delivery
 from datetime import date
 import json
 import logging
@@ -43,12 +50,14 @@ def sales_order_list_view(request):
         - CSV si export=csv
     """
     
-    # Obtener órdenes con relaciones optimizadas
+    # Obtener órdenes con relaciones optimizadas; los totales están
+    # almacenados en la cabecera, no se recorren las líneas
     sales_orders = SalesOrder.objects.select_related(
         'customer', 
         'status', 
         'created_by',
-        'source_location'
+        'source_location',
+        'currency'
     ).all()
     
     # Aplicar filtros
@@ -93,12 +102,17 @@ def sales_order_list_view(request):
     
     # Exportar a CSV si se solicita
     if request.GET.get('export') == 'csv':
+        # Exportaciones grandes: generar el archivo en segundo plano
+        if request.GET.get('background'):
+            return enqueue_export(request, 'sales_orders.csv')
+
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="sales_orders.csv"'
         
         writer = csv.writer(response)
         writer.writerow(['ID Orden', 'Cliente', 'ID Cliente', 'Fecha Emisión', 
-                        'Estado', 'Ubicación Origen', 'Creado Por', 'Fecha Creación'])
+                        'Estado', 'Ubicación Origen', 'Líneas', 'Total', 'Moneda',
+                        '% Entregado', 'Creado Por', 'Fecha Creación'])
         
         for order in sales_orders:
             writer.writerow([
@@ -108,24 +122,28 @@ def sales_order_list_view(request):
                 order.issue_date.strftime('%Y-%m-%d'),
                 order.status.name,
                 order.source_location.code if order.source_location else 'N/A',
+                order.line_count,
+                # Órdenes con varias monedas: sin total (la suma no tiene sentido)
+                f'{order.total_amount:.2f}' if order.currency or not order.line_count else '',
+                order.currency.code if order.currency else ('Varias' if order.line_count else ''),
+                f'{order.delivered_fraction * 100:.0f}',
                 order.created_by.username if order.created_by else 'Sistema',
                 order.created_at.strftime('%Y-%m-%d %H:%M:%S')
             ])
         
         return response
     
-    # Paginación
-    paginator = Paginator(sales_orders, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginación por cursor (sin OFFSET); '-id' desempata created_at
+    page_obj, pagination = paginate_keyset(request, sales_orders, 10, ('-created_at', '-id'))
     
     # Obtener datos para filtros
-    statuses = OrderStatus.objects.all()
+    statuses = all_of(OrderStatus)
     customers = Customer.objects.filter(status=True).order_by('name')
     
     context = {
         'page_obj': page_obj,
         'sales_orders': page_obj.object_list,
+        **pagination,
         'statuses': statuses,
         'customers': customers,
         'search_query': search_query,
@@ -149,20 +167,15 @@ def sales_order_create_view(request):
         - HTML con el formulario de creación de orden de venta
     """
     
-    # Obtener datos necesarios para el formulario
-    customers = Customer.objects.filter(status=True).order_by('name')
-    currencies = Currency.objects.all().order_by('code')
+    # Solo tablas de referencia pequeñas; clientes y materiales se cargan
+    # con el autocompletado (core.autocomplete) mientras se escribe
+    currencies = all_of(Currency)
     locations = InventoryLocation.objects.filter(status=True).order_by('code')
-    materials = Material.objects.filter(status__name__in=['Activo', 'Active']).order_by('id_material')
-    units = Unit.objects.all().order_by('symbol')
     today = date.today()
     
     context = {
-        'customers': customers,
         'currencies': currencies,
         'locations': locations,
-        'materials': materials,
-        'units': units,
         'today': today,
     }
     
@@ -205,7 +218,7 @@ def sales_order_edit_view(request, order_id):
             return redirect('sales:sales_order_detail', order_id=order.id_sales_order)
         
         # Obtener datos necesarios para el formulario
-        currencies = Currency.objects.all().order_by('code')
+        currencies = all_of(Currency)
         locations = InventoryLocation.objects.filter(status=True).order_by('code')
         
         context = {
@@ -229,9 +242,11 @@ def sales_order_detail_view(request, order_id):
     Método: GET, POST
     
     Acciones POST:
-        - confirm: Confirma la orden (DRAFT -> CONFIRMED)
-        - deliver: Marca la orden como entregada (CONFIRMED -> DELIVERED)
-        - cancel: Cancela la orden
+        - confirm: Confirma la orden (DRAFT -> CONFIRMED) y reserva su stock
+        - deliver: Marca la orden como entregada (CONFIRMED o PARTIAL -> DELIVERED);
+          tras entregas parciales solo mueve y contabiliza lo pendiente
+        - cancel: Cancela la orden (DRAFT, CONFIRMED o PARTIAL)
+        Entregar o cancelar libera las reservas de la orden.
     
     Retorna:
         - HTML con el detalle de la orden de venta
@@ -270,7 +285,7 @@ def sales_order_detail_view(request, order_id):
             
             # Obtener el estado destino
             try:
-                new_status = OrderStatus.objects.get(symbol=status_symbol)
+                new_status = get_by_key(OrderStatus, status_symbol)
             except OrderStatus.DoesNotExist:
                 messages.error(
                     request,
@@ -289,9 +304,10 @@ def sales_order_detail_view(request, order_id):
                     )
                     return redirect('sales:sales_order_detail', order_id=order.id_sales_order)
                 
-                # Cambiar estado a CONFIRMED
+                # Cambiar estado a CONFIRMED y reservar el stock
                 try:
                     with transaction.atomic():
+                        reserve_order(order)
                         order.status = new_status
                         order.save()
                         
@@ -299,6 +315,8 @@ def sales_order_detail_view(request, order_id):
                             request,
                             f'Orden {order.id_sales_order} confirmada exitosamente.'
                         )
+                except ValidationError as e:
+                    messages.error(request, f'No se puede confirmar la orden: {e.messages[0]}')
                 except Exception as e:
                     logger.error(f'Error al confirmar orden {order.id_sales_order}: {str(e)}')
                     messages.error(request, f'Error al confirmar la orden: {str(e)}')
@@ -306,8 +324,8 @@ def sales_order_detail_view(request, order_id):
                 return redirect('sales:sales_order_detail', order_id=order.id_sales_order)
             
             elif action == 'deliver':
-                # Solo permitir entregar si está en CONFIRMED
-                if order.status.symbol != 'CONFIRMED':
+                # Solo permitir entregar si está en CONFIRMED o con entregas parciales
+                if order.status.symbol not in ['CONFIRMED', PARTIAL_STATUS]:
                     messages.error(
                         request,
                         f'No se puede entregar una orden en estado "{order.status.name}". '
@@ -318,8 +336,13 @@ def sales_order_detail_view(request, order_id):
                 # Implementar creación de movimientos de inventario
                 try:
                     with transaction.atomic():
+                        # Importe pendiente, antes de marcar las líneas como entregadas
+                        amount = pending_amount(order)
+                        
                         # Crear movimientos de inventario para la orden de venta
                         try:
+                            # Validar contra el disponible más la reserva de la propia orden
+                            check_delivery(order, order.source_location or get_default_inventory_location())
                             created_movements = create_inventory_movements_for_sales_order(
                                 order, 
                                 user=request.user if request.user.is_authenticated else None
@@ -350,16 +373,18 @@ def sales_order_detail_view(request, order_id):
                             line.delivered_quantity = line.quantity
                             line.save()
                         
-                        # Cambiar estado a DELIVERED
+                        # Cambiar estado a DELIVERED y liberar las reservas
                         order.status = new_status
                         order.save()
+                        release_orders([order.pk])
                         
                         # Crear asiento contable automático
                         print(f"\nDEBUG VIEWS: Llamando create_entry_for_sale para orden {order.id_sales_order}")
                         try:
                             journal_entry = create_entry_for_sale(
                                 order,
-                                user=request.user if request.user.is_authenticated else None
+                                user=request.user if request.user.is_authenticated else None,
+                                total=amount
                             )
                             if journal_entry:
                                 print(f"DEBUG VIEWS: ✓ Asiento {journal_entry.id_journal_entry} creado exitosamente")
@@ -402,20 +427,22 @@ def sales_order_detail_view(request, order_id):
                 return redirect('sales:sales_order_detail', order_id=order.id_sales_order)
             
             elif action == 'cancel':
-                # Permitir cancelar si está en DRAFT o CONFIRMED
-                if order.status.symbol not in ['DRAFT', 'CONFIRMED']:
+                # Permitir cancelar si está en DRAFT, CONFIRMED o con entregas parciales
+                # (lo ya entregado se mantiene; se libera la reserva del resto)
+                if order.status.symbol not in ['DRAFT', 'CONFIRMED', PARTIAL_STATUS]:
                     messages.error(
                         request,
                         f'No se puede cancelar una orden en estado "{order.status.name}". '
-                        f'Solo órdenes en Draft o Confirmed pueden cancelarse.'
+                        f'Solo órdenes en Draft, Confirmed o Parcial pueden cancelarse.'
                     )
                     return redirect('sales:sales_order_detail', order_id=order.id_sales_order)
                 
-                # Cambiar estado a CANCELLED
+                # Cambiar estado a CANCELLED y liberar las reservas
                 try:
                     with transaction.atomic():
                         order.status = new_status
                         order.save()
+                        release_orders([order.pk])
                         
                         messages.success(
                             request,
@@ -604,7 +631,7 @@ def create_sales_order_api(request):
         
         # Obtener estado DRAFT
         try:
-            draft_status = OrderStatus.objects.get(symbol='DRAFT')
+            draft_status = get_by_key(OrderStatus, 'DRAFT')
         except OrderStatus.DoesNotExist:
             return JsonResponse({'error': 'Estado DRAFT no encontrado en el sistema'}, status=500)
         
@@ -679,7 +706,7 @@ def create_sales_order_api(request):
                 
                 # Validar que la unidad existe
                 try:
-                    unit = Unit.objects.get(pk=line_data['unit_id'])
+                    unit = get_by_id(Unit, line_data['unit_id'])
                 except Unit.DoesNotExist:
                     return JsonResponse({
                         'error': f'Línea {idx}: unidad con ID {line_data["unit_id"]} no encontrada'
@@ -687,7 +714,7 @@ def create_sales_order_api(request):
                 
                 # Validar que la moneda existe
                 try:
-                    currency = Currency.objects.get(pk=line_data['currency_id'])
+                    currency = get_by_id(Currency, line_data['currency_id'])
                 except Currency.DoesNotExist:
                     return JsonResponse({
                         'error': f'Línea {idx}: moneda con ID {line_data["currency_id"]} no encontrada'
@@ -724,3 +751,117 @@ def create_sales_order_api(request):
         logger.error(f'Error en create_sales_order_api: {str(e)}')
         return JsonResponse({'error': f'Error interno: {str(e)}'}, status=500)
 
+
+@login_required
+@require_POST
+def bulk_sales_order_action_api(request):
+    """
+    API para aplicar una acción a varias órdenes de venta a la vez.
+    
+    URL: /sales/api/bulk-action/
+    Método: POST
+    
+    JSON esperado:
+    {
+        "action": "confirm" | "deliver" | "cancel",
+        "order_ids": ["SO-0001", "SO-0002", ...],
+        "chunk_size": <int (opcional)>
+    }
+    
+    Retorna:
+        - JSON con el resumen y el resultado de cada orden
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    
+    action = data.get('action')
+    order_ids = data.get('order_ids')
+    
+    if action not in BULK_ACTIONS:
+        return JsonResponse({'error': f'Acción no válida: {action}'}, status=400)
+    
+    if not isinstance(order_ids, list) or len(order_ids) == 0:
+        return JsonResponse({'error': 'Debe incluir al menos una orden en order_ids'}, status=400)
+    
+    try:
+        chunk_size = int(data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+    except (ValueError, TypeError):
+        return JsonResponse({'error': 'chunk_size inválido'}, status=400)
+    
+    try:
+        summary = bulk_transition_sales_orders(
+            order_ids,
+            action,
+            user=request.user,
+            chunk_size=chunk_size
+        )
+    except (OrderStatus.DoesNotExist, MovementType.DoesNotExist) as e:
+        return JsonResponse({'error': str(e) or 'Estado no encontrado en el sistema'}, status=500)
+    except Exception as e:
+        logger.error(f'Error en bulk_sales_order_action_api: {str(e)}')
+        return JsonResponse({'error': f'Error interno: {str(e)}'}, status=500)
+    
+    return JsonResponse(summary)
+
+
+@login_required
+@require_POST
+def sales_order_delivery_api(request, order_id):
+    """
+    API para registrar una entrega parcial de una orden de venta.
+    
+    URL: /sales/api/sales-order/<order_id>/deliveries/
+    Método: POST
+    
+    JSON esperado:
+    {
+        "key": "<clave de idempotencia>",
+        "lines": [{"position": 1, "quantity": 5}, ...]
+    }
+    La clave también puede enviarse en la cabecera Idempotency-Key.
+    
+    Solo escribe los movimientos, el asiento y las reservas de lo
+    entregado en esta tanda (ver core.shipments). La orden pasa a PARTIAL
+    o, si se completan todas las líneas, a DELIVERED.
+    
+    Retorna:
+        - 201 con la entrega registrada
+        - 200 con la entrega ya registrada si la clave se repite
+        - 400 si las líneas, las cantidades o el stock no son válidos
+        - 404 si la orden no existe
+        - 409 si la clave ya se usó con otras cantidades
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    
+    try:
+        order = SalesOrder.objects.get(id_sales_order=order_id)
+    except SalesOrder.DoesNotExist:
+        return JsonResponse({'error': f'Orden de venta "{order_id}" no encontrada'}, status=404)
+    
+    try:
+        result = record_shipment(
+            order,
+            data.get('key') or request.headers.get('Idempotency-Key'),
+            parse_lines(data.get('lines')),
+            user=request.user
+        )
+    except ValidationError as e:
+        return JsonResponse({'error': e.messages[0]}, status=400)
+    except KeyConflict as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    except (OrderStatus.DoesNotExist, MovementType.DoesNotExist) as e:
+        return JsonResponse({'error': str(e) or 'Estado no encontrado en el sistema'}, status=500)
+    except Exception as e:
+        logger.error(f'Error en sales_order_delivery_api: {str(e)}')
+        return JsonResponse({'error': f'Error interno: {str(e)}'}, status=500)
+    
+    return JsonResponse(result, status=201 if result['created'] else 200)
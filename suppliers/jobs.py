@@ -0,0 +1,13 @@
+"""
+Tareas en segundo plano del módulo de proveedores.
+"""
+
+from core.jobs import register_job
+from core.importers import run_import_job
+from .utils import SupplierImporter
+
+
+@register_job('suppliers.import')
+def import_suppliers(job, progress):
+    """Carga masiva encolada desde supplier_bulk_upload."""
+    return run_import_job(SupplierImporter, job, progress)
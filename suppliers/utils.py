@@ -0,0 +1,24 @@
+"""
+Funciones de utilidad para el módulo de proveedores.
+
+Incluye el importador de la carga masiva de proveedores por CSV.
+"""
+
+from core.importers import CSVImporter
+from .models import Supplier
+from .forms import SupplierForm
+
+
+class SupplierImporter(CSVImporter):
+    """Importa proveedores desde un CSV (delimitador ';')."""
+
+    model = Supplier
+    form_class = SupplierForm
+    unique_field = 'id_supplier'
+    error_file_prefix = 'suppliers'
+
+    def prepare_row(self, row):
+        # Convertir status a booleano
+        if 'status' in row:
+            row['status'] = (row['status'] or '').lower() in ['true', '1', 'yes', 'active']
+        return row
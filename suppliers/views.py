@@ -1,12 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from core.pagination import paginate_keyset
+from core.search import search_filter, paginate_search
+from core.jobs import enqueue, enqueue_export, save_job_input
+from core.refdata import all_of
 from django.db.models import Q
 from django.http import HttpResponse
 from django.contrib import messages
 import csv
-import io
 from .models import Supplier
+from .utils import SupplierImporter
 from .forms import SupplierForm, CSVUploadForm
 from suppliers.models import PaymentMethod
 
@@ -86,8 +89,17 @@ def suppliers_list(request):
     if created_by:
         suppliers = suppliers.filter(created_by__username__icontains=created_by)
     
+    # Búsqueda de texto completo (?search=) sobre el índice FTS
+    search = request.GET.get('search', '').strip()
+    if search:
+        suppliers = search_filter(suppliers, search)
+    
     # Exportar a CSV si se solicita
     if request.GET.get('export') == 'csv':
+        # Exportaciones grandes: generar el archivo en segundo plano
+        if request.GET.get('background'):
+            return enqueue_export(request, 'suppliers.csv')
+
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="suppliers.csv"'
         
@@ -127,17 +139,15 @@ def suppliers_list(request):
         
         return response
     
-    # Paginación
-    paginator = Paginator(suppliers, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Construir querystring sin page
-    querystring = request.GET.copy()
-    if 'page' in querystring:
-        querystring.pop('page')
+    # Paginación por cursor (sin OFFSET); '-id' desempata created_at.
+    # Con ?search= los resultados se ordenan por relevancia.
+    if search:
+        page_obj, pagination = paginate_search(request, suppliers, search, 10)
+    else:
+        page_obj, pagination = paginate_keyset(request, suppliers, 10, ('-created_at', '-id'))
     
     filters = {
+        'search': search,
         'id_supplier': id_supplier,
         'legal_name': legal_name,
         'name': name,
@@ -163,12 +173,13 @@ def suppliers_list(request):
     }
     
     # Cargar opciones para los filtros
-    payment_methods = PaymentMethod.objects.all()
+    payment_methods = all_of(PaymentMethod)
     
     context = {
         'page_obj': page_obj,
         'filters': filters,
-        'querystring': querystring.urlencode(),
+        'querystring': pagination['pagination_querystring'],
+        **pagination,
         'payment_methods': payment_methods,
     }
     
@@ -231,70 +242,40 @@ def supplier_bulk_upload(request):
         if form.is_valid():
             csv_file = request.FILES['csv_file']
             
-            # Intentar decodificar el archivo
-            try:
-                decoded_file = csv_file.read().decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    csv_file.seek(0)
-                    decoded_file = csv_file.read().decode('iso-8859-1')
-                except Exception as e:
-                    messages.error(request, f'Error decoding file: {str(e)}')
-                    return render(request, 'suppliers/supplier_bulk_upload.html', {'form': form})
-            
-            # Procesar CSV
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string, delimiter=';')
-            
-            # Limpiar BOM y espacios en cabeceras
-            reader.fieldnames = [field.strip().replace('\ufeff', '') for field in reader.fieldnames]
-            
-            valid_suppliers = []
-            error_rows = []
-            row_number = 1
+            # Archivos grandes: encolar y seguir el avance en la página de la tarea
+            if form.cleaned_data.get('run_in_background'):
+                job = enqueue(
+                    'suppliers.import',
+                    params={'upsert': form.cleaned_data.get('upsert', False)},
+                    user=request.user,
+                    input_file=save_job_input(csv_file, prefix='suppliers')
+                )
+                messages.info(request, 'The file was queued for processing.')
+                return redirect('job_detail', job_id=job.pk)
             
-            for row in reader:
-                row_number += 1
-                # Limpiar espacios en valores
-                cleaned_row = {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items()}
-                
-                # Convertir status a booleano
-                if 'status' in cleaned_row:
-                    status_value = cleaned_row['status'].lower()
-                    cleaned_row['status'] = status_value in ['true', '1', 'yes', 'active']
-                
-                # Crear formulario con los datos
-                supplier_form = SupplierForm(cleaned_row)
-                
-                if supplier_form.is_valid():
-                    supplier = supplier_form.save(commit=False)
-                    supplier.created_by = request.user
-                    valid_suppliers.append(supplier)
-                else:
-                    error_rows.append({
-                        'row': row_number,
-                        'data': cleaned_row,
-                        'errors': supplier_form.errors
-                    })
-            
-            # Guardar todos los registros válidos en una sola operación
-            if valid_suppliers:
-                Supplier.objects.bulk_create(valid_suppliers)
+            # Procesar el CSV por streaming, guardando en lotes
+            try:
+                result = SupplierImporter(
+                    user=request.user,
+                    upsert=form.cleaned_data.get('upsert', False)
+                ).run(csv_file)
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Error processing file: {str(e)}')
+                return render(request, 'suppliers/supplier_bulk_upload.html', {'form': form})
             
             # Preparar contexto con el informe
             context = {
                 'form': form,
                 'upload_complete': True,
-                'total_rows': row_number - 1,
-                'successful_rows': len(valid_suppliers),
-                'error_count': len(error_rows),
-                'error_rows': error_rows
+                **result
             }
             
-            if valid_suppliers:
-                messages.success(request, f'Successfully uploaded {len(valid_suppliers)} suppliers.')
-            if error_rows:
-                messages.warning(request, f'{len(error_rows)} rows had errors and were not uploaded.')
+            if result['inserted_rows']:
+                messages.success(request, f"Successfully uploaded {result['inserted_rows']} suppliers.")
+            if result['updated_rows']:
+                messages.success(request, f"Updated {result['updated_rows']} existing suppliers.")
+            if result['error_count']:
+                messages.warning(request, f"{result['error_count']} rows had errors and were not uploaded.")
             
             return render(request, 'suppliers/supplier_bulk_upload.html', context)
     else: